@@ -0,0 +1,31 @@
+"""Ключ результата в validation_results
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+  op.add_column('validation_results', sa.Column('result_key', sa.String(64), nullable=True))
+  op.add_column('validation_results', sa.Column('params_hash', sa.String(16), nullable=True))
+  op.add_column('validation_results', sa.Column('data_version', sa.String(64), nullable=True))
+  op.add_column('validation_results', sa.Column('window_config', sa.JSON(), nullable=True))
+
+  op.create_index('ix_validation_results_result_key', 'validation_results', ['result_key'])
+
+
+def downgrade():
+  op.drop_index('ix_validation_results_result_key')
+  op.drop_column('validation_results', 'window_config')
+  op.drop_column('validation_results', 'data_version')
+  op.drop_column('validation_results', 'params_hash')
+  op.drop_column('validation_results', 'result_key')
@@ -8,24 +8,20 @@ import logging
 import pandas as pd
 
 from ..core.bayesian import CDMGenerator
+from ..core.bayesian.cdm_registry import GLOBAL_CDM_REGISTRY
 from ..core import data_manager
 from ..core.lottery_context import LotteryContext
 
 router = APIRouter(prefix="/bayesian", tags=["bayesian"])
 logger = logging.getLogger(__name__)
 
-# Глобальное хранилище CDM генераторов
-CDM_GENERATORS = {}
+# Глобальное хранилище CDM генераторов (живые модели реестра)
+CDM_GENERATORS = GLOBAL_CDM_REGISTRY.generators
 
 
 def get_or_create_cdm_generator(lottery_type: str) -> CDMGenerator:
-  """Получить или создать CDM генератор"""
-  if lottery_type not in CDM_GENERATORS:
-    config = data_manager.LOTTERY_CONFIGS.get(lottery_type)
-    if not config:
-      raise ValueError(f"Неизвестный тип лотереи: {lottery_type}")
-    CDM_GENERATORS[lottery_type] = CDMGenerator(config)
-  return CDM_GENERATORS[lottery_type]
+  """Получить или создать CDM генератор (с восстановлением из снапшота)"""
+  return GLOBAL_CDM_REGISTRY.get_or_create(lottery_type)
 
 
 @router.post("/train")
@@ -48,11 +44,8 @@ async def train_cdm_model(
       if window_size:
         df = df.tail(window_size)
 
-      # Получаем генератор
-      generator = get_or_create_cdm_generator(lottery_type)
-
-      # Обучение
-      metrics = generator.train(df)
+      # Обучение (со снапшотом состояния)
+      metrics = GLOBAL_CDM_REGISTRY.train(lottery_type, df)
 
       return {
         "lottery_type": lottery_type,
@@ -69,7 +62,7 @@ async def train_cdm_model(
 @router.get("/generate")
 async def generate_combinations(
     lottery_type: str,
-    count: int = Query(5, ge=1, le=20, description="Количество комбинаций"),
+    count: int = Query(5, ge=1, le=1000, description="Количество комбинаций"),
     strategy: str = Query("mixed", description="Стратегия: sampling, map, mean, mixed")
 ) -> Dict:
   """
@@ -85,7 +78,7 @@ async def generate_combinations(
         df = data_manager.fetch_draws_from_db()
         if df is None or df.empty:
           raise HTTPException(status_code=404, detail="Нет данных для обучения")
-        generator.train(df)
+        GLOBAL_CDM_REGISTRY.train(lottery_type, df)
 
       # Генерация
       combinations = generator.generate(count=count, strategy=strategy)
@@ -112,10 +105,8 @@ async def update_with_new_draw(
   """
   try:
     with LotteryContext(lottery_type):
-      generator = get_or_create_cdm_generator(lottery_type)
-
-      # Обновление
-      metrics = generator.update_with_new_draw(new_draw)
+      # Обновление (со снапшотом состояния)
+      metrics = GLOBAL_CDM_REGISTRY.update(lottery_type, new_draw)
 
       return {
         "lottery_type": lottery_type,
@@ -167,7 +158,7 @@ async def get_hot_cold_analysis(lottery_type: str) -> Dict:
         df = data_manager.fetch_draws_from_db()
         if df is None or df.empty:
           raise HTTPException(status_code=404, detail="Нет данных")
-        generator.train(df)
+        GLOBAL_CDM_REGISTRY.train(lottery_type, df)
 
       analysis = generator.get_hot_cold_analysis()
 
@@ -185,15 +176,18 @@ async def get_hot_cold_analysis(lottery_type: str) -> Dict:
 @router.post("/simulate")
 async def simulate_performance(
     lottery_type: str,
-    test_size: int = Query(100, description="Размер тестовой выборки"),
-    n_simulations: int = Query(100, description="Количество симуляций")
+    test_size: int = Query(100, ge=1, description="Размер тестовой выборки"),
+    n_simulations: int = Query(100, ge=1, le=10000, description="Количество симуляций"),
+    ticket_price: float = Query(100.0, gt=0, description="Стоимость билета")
 ) -> Dict:
   """
   Симуляция производительности CDM модели
   """
   try:
     with LotteryContext(lottery_type):
-      generator = get_or_create_cdm_generator(lottery_type)
+      # Отдельный генератор: обучение на урезанной истории не должно
+      # затирать апостериорное состояние живой модели
+      generator = CDMGenerator(data_manager.LOTTERY_CONFIGS[lottery_type])
 
       # Получаем данные
       df = data_manager.fetch_draws_from_db()
@@ -209,7 +203,7 @@ async def simulate_performance(
       generator.train(train_df)
 
       # Симуляция на тестовых
-      results = generator.simulate_performance(test_df, n_simulations)
+      results = generator.simulate_performance(test_df, n_simulations, ticket_price)
 
       return {
         "lottery_type": lottery_type,
@@ -18,6 +18,7 @@ from backend.app.api.analysis import set_lottery_context
 from backend.app.api.auth import get_current_user
 from backend.app.models.schemas import GenerationResponse, Combination
 from backend.app.core.genetic.GeneticGenerator import GENETIC_GENERATOR, get_genetic_prediction
+from backend.app.core.genetic.fitness_cache import GLOBAL_FITNESS_CACHE
 
 router = APIRouter(prefix="/genetic", tags=["Genetic Algorithm"])
 logger = logging.getLogger(__name__)
@@ -298,5 +299,6 @@ async def get_genetic_statistics(
     'total_time': stats['total_time'],
     'final_diversity': stats['final_diversity'],
     'fitness_progression': stats['fitness_progression'],
-    'best_solution': stats['best_solution']
+    'best_solution': stats['best_solution'],
+    'fitness_cache': GLOBAL_FITNESS_CACHE.get_stats()
   }
\ No newline at end of file
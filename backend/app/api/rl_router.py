@@ -13,9 +13,19 @@ from pydantic import BaseModel
 
 from backend.app.core import data_manager
 from backend.app.core.rl.rl_generator import GLOBAL_RL_MANAGER
+from backend.app.core.rl.training_orchestrator import GLOBAL_RL_ORCHESTRATOR
 
 logger = logging.getLogger(__name__)
 
+
+def _reload_after_training(status: Dict):
+  """Перечитывание моделей API-процессом после завершения задачи обучения"""
+  if status.get('status') == 'completed':
+    GLOBAL_RL_MANAGER.reload_models(status['lottery_type'])
+
+
+GLOBAL_RL_ORCHESTRATOR.add_completion_listener(_reload_after_training)
+
 # Создаем роутер с префиксом
 router = APIRouter(
   prefix="/rl",
@@ -27,6 +37,7 @@ router = APIRouter(
 class TrainRequest(BaseModel):
   episodes: int = 100
   quick: bool = False  # Быстрое обучение для тестов
+  num_envs: int = 1  # Параллельные среды DQN
 
 class GenerateRequest(BaseModel):
   count: int = 5
@@ -107,16 +118,19 @@ class GeneratedCombination(BaseModel):
 @router.post("/train")
 async def train_agents(
     lottery_type: str,
-    request: TrainRequest,
-    background_tasks: BackgroundTasks
+    request: TrainRequest
 ):
-  """Запуск обучения RL агентов"""
+  """
+  Постановка обучения RL агентов в очередь
+
+  Обучение выполняется в процессах RLTrainingOrchestrator, а не в процессе
+  API; прогресс доступен через /rl/train/jobs/{job_id}.
+  """
   try:
     if lottery_type not in data_manager.LOTTERY_CONFIGS:
       raise HTTPException(status_code=404, detail=f"Unknown lottery type: {lottery_type}")
 
     config = data_manager.LOTTERY_CONFIGS[lottery_type]
-    generator = GLOBAL_RL_MANAGER.get_generator(lottery_type, config)
 
     # Загружаем данные
     df_history = data_manager.fetch_draws_from_db()
@@ -144,35 +158,50 @@ async def train_agents(
         q_episodes = min(request.episodes * 2, 3000)
         dqn_episodes = min(request.episodes, 2000)
 
-    # Запускаем обучение в фоне
-    def train_in_background():
-      try:
-        logger.info(f"Starting RL training for {lottery_type}: Q={q_episodes}, DQN={dqn_episodes}")
-        stats = generator.train(
-          df_history=df_history,
-          q_episodes=q_episodes,
-          dqn_episodes=dqn_episodes,
-          verbose=True
-        )
-        logger.info(f"Training completed for {lottery_type}: {stats}")
-      except Exception as e:
-        logger.error(f"Training failed for {lottery_type}: {e}")
-
-    background_tasks.add_task(train_in_background)
+    # Ставим задачи в очередь оркестратора
+    job_ids = GLOBAL_RL_ORCHESTRATOR.submit_lottery(
+      lottery_type,
+      q_episodes=q_episodes,
+      dqn_episodes=dqn_episodes,
+      num_envs=request.num_envs
+    )
+    logger.info(f"Queued RL training for {lottery_type}: Q={q_episodes}, DQN={dqn_episodes}, jobs={job_ids}")
 
     return {
       "lottery_type": lottery_type,
-      "status": "training_started",
+      "status": "training_queued",
+      "job_ids": job_ids,
       "q_episodes": q_episodes,
       "dqn_episodes": dqn_episodes,
       "quick_mode": request.quick,
       "timestamp": datetime.now().isoformat()
     }
 
+  except HTTPException:
+    raise
   except Exception as e:
     logger.error(f"Error starting training: {e}")
     raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/train/jobs")
+async def list_training_jobs(lottery_type: Optional[str] = None):
+  """Статусы задач обучения (новые первыми)"""
+  return {
+    "jobs": GLOBAL_RL_ORCHESTRATOR.list_jobs(lottery_type),
+    "max_jobs": GLOBAL_RL_ORCHESTRATOR.max_jobs,
+    "threads_per_job": GLOBAL_RL_ORCHESTRATOR.threads_per_job
+  }
+
+
+@router.get("/train/jobs/{job_id}")
+async def get_training_job(job_id: str):
+  """Статус и прогресс задачи обучения"""
+  status = GLOBAL_RL_ORCHESTRATOR.get_status(job_id)
+  if status is None:
+    raise HTTPException(status_code=404, detail=f"Training job not found: {job_id}")
+  return status
+
+
 # @router.get("/generate")
 # async def generate_rl_combinations(
 #     lottery_type: str,
@@ -558,11 +587,12 @@ async def reset_rl_agents(lottery_type: str):
 
     # Удаляем сохраненные файлы
     import os
-    q_path = os.path.join(generator.models_dir, "q_agent.pkl")
+    q_paths = [os.path.join(generator.models_dir, name) for name in ("q_agent.npz", "q_agent.pkl")]
     dqn_path = os.path.join(generator.models_dir, "dqn_agent.pth")
 
-    if os.path.exists(q_path):
-      os.remove(q_path)
+    for q_path in q_paths:
+      if os.path.exists(q_path):
+        os.remove(q_path)
     if os.path.exists(dqn_path):
       os.remove(dqn_path)
 
@@ -1,19 +1,27 @@
 """
 API для симуляции стратегий с интеграцией bankroll_manager
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Dict, Optional
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
+from scipy.stats import binom
 
 from backend.app.core.auth import get_current_user
 from backend.app.core.lottery_context import LotteryContext
 from backend.app.core import data_manager, combination_generator, pattern_analyzer
 from backend.app.core.database import User, UserPreferences, get_db
 from backend.app.core.bankroll_manager import BankrollManager
+from backend.app.core.prize_probability import GLOBAL_PRIZE_ENGINE
+from backend.app.core.backtester import HistoricalBacktester, apply_betting_strategy
+from backend.app.core.bankroll_simulator import VectorizedBankrollSimulator
+from backend.app.core.method_comparison import (
+    GLOBAL_METHOD_COMPARATOR, COMPARISON_METHODS, method_seed, run_method_trials
+)
 from enum import Enum
 import logging
 
@@ -27,6 +35,18 @@ class BettingStrategy(Enum):
     MARTINGALE = "martingale"
     FIBONACCI = "fibonacci"
 
+
+def _parse_betting_strategy(value: str) -> BettingStrategy:
+    """Стратегия ставок по имени (без учета регистра), 422 для неизвестного имени"""
+    try:
+        return BettingStrategy[value.upper()]
+    except KeyError:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Неизвестная стратегия ставок: {value}. "
+                   f"Допустимые: {', '.join(s.value for s in BettingStrategy)}"
+        )
+
 class StrategySimulationRequest(BaseModel):
     """Запрос на симуляцию стратегии"""
     lottery_type: str = "4x20"
@@ -36,6 +56,7 @@ class StrategySimulationRequest(BaseModel):
     use_favorites: bool = False
     initial_bankroll: float = 10000.0
     bet_size: float = 100.0
+    betting_strategy: Optional[str] = None  # fixed, kelly, percentage, martingale, fibonacci
 
 
 class ROICalculationRequest(BaseModel):
@@ -56,6 +77,12 @@ class BankrollSimulationRequest(BaseModel):
     num_draws: int = 100
     risk_level: float = 0.02  # 2% риска по умолчанию
     bet_size: float = 100.0
+    fraction: Optional[float] = None  # Доля Келли / доля банкролла для percentage
+    grid_search: bool = False
+    grid_base_bets: Optional[List[float]] = None
+    grid_risk_levels: Optional[List[float]] = None
+    grid_fractions: Optional[List[float]] = None
+    grid_max_simulations: int = 20000  # Траекторий для сетки (подмножество общих исходов)
 
 @router.post("/strategy")
 async def simulate_strategy(
@@ -90,23 +117,27 @@ async def simulate_strategy(
             logger.info(f"💰 BankrollManager инициализирован: банкролл={request.initial_bankroll}, цена билета={request.bet_size}")
 
             # Выбираем стратегию ставок
-            if request.strategy in ["martingale", "fibonacci"]:
-                betting_strategy = BettingStrategy[request.strategy.upper()]
+            if request.betting_strategy:
+                betting_strategy = _parse_betting_strategy(request.betting_strategy)
+            elif request.strategy in ["martingale", "fibonacci"]:
+                betting_strategy = _parse_betting_strategy(request.strategy)
             else:
                 betting_strategy = BettingStrategy.FIXED
 
-            results = []
-            wins = 0
-            total_spent = 0
-            total_won = 0
-            consecutive_losses = 0
-            consecutive_wins = 0
-
             # Берём случайную выборку из истории для симуляции
             sample_draws = df_history.sample(n=min(request.num_draws, len(df_history)))
+            backtester = HistoricalBacktester(config, GLOBAL_PRIZE_ENGINE.get_table(request.lottery_type))
 
-            for idx, (_, draw) in enumerate(sample_draws.iterrows()):
-                # Генерируем комбинации согласно стратегии
+            # Генерируем билеты один раз: случайные - свои для каждого тиража,
+            # остальные стратегии строятся по всей истории и играют одним набором
+            if request.strategy == "random":
+                combinations = _generate_random_tickets(
+                    config, len(sample_draws) * request.combinations_per_draw
+                )
+                outcomes = backtester.backtest_per_draw(
+                    combinations, sample_draws, request.combinations_per_draw
+                )
+            else:
                 combinations = _generate_strategy_combinations(
                     request.strategy,
                     request.combinations_per_draw,
@@ -115,84 +146,41 @@ async def simulate_strategy(
                     db,
                     current_user.id if request.use_favorites else None
                 )
+                outcomes = backtester.backtest_portfolio(combinations, sample_draws)
+
+            # Ставки и банкролл - последовательный проход по итогам тиражей
+            prize_table = backtester.prize_table
+            tickets_per_draw = request.combinations_per_draw if request.strategy == "random" else len(combinations)
+            scan = apply_betting_strategy(
+                outcomes['draw_payouts'],
+                outcomes['draw_won'],
+                strategy=betting_strategy.value,
+                base_bet=request.bet_size,
+                initial_bankroll=request.initial_bankroll,
+                tickets_per_draw=tickets_per_draw,
+                win_probability=prize_table.win_probability,
+                odds=prize_table.average_prize / request.bet_size if request.bet_size > 0 else 0
+            )
 
-                # Рассчитываем размер ставки
-                # Для Kelly нужна вероятность и коэффициент
-                if betting_strategy == BettingStrategy.KELLY:
-                    bet_size = bankroll_mgr.calculate_kelly_bet(
-                        win_probability=0.05,
-                        odds=100,
-                        fraction=0.25  # Используем четверть Келли для безопасности
-                    )
-                # Для Martingale учитываем серию проигрышей
-                elif betting_strategy == BettingStrategy.MARTINGALE:
-                    base_bet = request.bet_size
-                    bet_size = base_bet * (2 ** consecutive_losses)
-                    bet_size = min(bet_size, bankroll_mgr.current_bankroll * 0.5)  # Не более 50% банкролла
-                # Для Fibonacci
-                elif betting_strategy == BettingStrategy.FIBONACCI:
-                    fib_sequence = [1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144]
-                    fib_index = min(consecutive_losses, len(fib_sequence) - 1)
-                    bet_size = request.bet_size * fib_sequence[fib_index]
-                    bet_size = min(bet_size, bankroll_mgr.current_bankroll * 0.3)
-                # Процент от банкролла
-                elif betting_strategy == BettingStrategy.PERCENTAGE:
-                    bet_size = bankroll_mgr.current_bankroll * 0.02  # 2% от банкролла
-                # Фиксированная ставка
-                else:
-                    bet_size = request.bet_size
-
-                # Ограничиваем ставку текущим банкроллом
-                bet_size = min(bet_size, bankroll_mgr.current_bankroll)
-
-                # Проверяем выигрыш для каждой комбинации
-                draw_won = False
-                prize = 0
-
-                # Правильно извлекаем числа из draw
-                draw_field1 = draw.get('field1_numbers', draw.get('Числа_Поле1_list', []))
-                draw_field2 = draw.get('field2_numbers', draw.get('Числа_Поле2_list', []))
-
-                for combo in combinations:
-                    is_win = _check_combination_win(
-                        combo['field1'],
-                        combo['field2'],
-                        draw_field1,
-                        draw_field2,
-                        config
-                    )
-
-                    if is_win['won']:
-                        draw_won = True
-                        prize = _calculate_prize(is_win['match_level'], bet_size)
-                        total_won += prize
-                        bankroll_mgr.update_bankroll(prize)
-                        wins += 1
-                        consecutive_wins += 1
-                        consecutive_losses = 0
-                        break
-
-                if not draw_won:
-                    consecutive_losses += 1
-                    consecutive_wins = 0
-
-                # Обновляем банкролл
-                total_spent += bet_size * request.combinations_per_draw
-                bankroll_mgr.update_bankroll(-bet_size * request.combinations_per_draw)
-
-                results.append({
+            draw_numbers = sample_draws['Тираж'].to_numpy() if 'Тираж' in sample_draws else np.arange(1, len(sample_draws) + 1)
+
+            results = [
+                {
                     "draw": idx + 1,
-                    "draw_number": int(draw.get('Тираж', draw.get('draw_number', idx + 1))),
-                    "combinations_played": request.combinations_per_draw,
-                    "bet_size": round(bet_size, 2),
-                    "won": draw_won,
-                    "bankroll": round(bankroll_mgr.current_bankroll, 2),
-                    "prize": prize
-                })
-
-                # Проверка на банкротство
-                if bankroll_mgr.current_bankroll <= 0:
-                    break
+                    "draw_number": int(draw_numbers[idx]),
+                    "combinations_played": tickets_per_draw,
+                    "bet_size": round(float(scan['bets'][idx]), 2),
+                    "won": bool(scan['won'][idx]),
+                    "bankroll": round(float(scan['bankroll'][idx]), 2),
+                    "prize": round(float(scan['prizes'][idx]), 2)
+                }
+                for idx in range(len(scan['bets']))
+            ]
+
+            wins = int(scan['won'].sum())
+            total_spent = float((scan['bets'] * tickets_per_draw).sum())
+            total_won = float(scan['prizes'].sum())
+            bankroll_mgr.update_bankroll(total_won - total_spent)
 
             # Расчёт итоговой статистики
             roi = ((total_won - total_spent) / total_spent) * 100 if total_spent > 0 else 0
@@ -225,7 +213,10 @@ async def simulate_strategy(
 
             logger.info(f"✅ Результат симуляции: ROI={result['roi']}%, WinRate={result['win_rate']}%")
             logger.info(f"📊 Структура результата: {list(result.keys())}")
+            return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Ошибка симуляции стратегии: {e}")
         logger.error(f"❌ Тип ошибки: {type(e).__name__}")
@@ -233,6 +224,28 @@ async def simulate_strategy(
         raise HTTPException(status_code=500, detail=f"Ошибка симуляции стратегии: {str(e)}")
 
 
+@router.get("/prize-table")
+async def get_prize_table(
+    lottery_type: str = "4x20",
+    ticket_price: float = 0.0,
+    num_tickets: int = 1,
+    current_user: User = Depends(get_current_user)
+):
+    """Точные вероятности призовых категорий, матожидание и дисперсия выплат билета"""
+    try:
+        prize_table = GLOBAL_PRIZE_ENGINE.get_table(lottery_type)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    return {
+        "status": "success",
+        "lottery_type": lottery_type,
+        **prize_table.to_dict(ticket_price),
+        "portfolio": prize_table.summary(ticket_price, num_tickets),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
 @router.post("/roi")
 async def calculate_roi(
     request: ROICalculationRequest,
@@ -258,8 +271,9 @@ async def calculate_roi(
 
             logger.info(f"🎫 Билетов: {num_tickets}, Тиражей: {total_draws}")
 
-            # Анализируем реальные вероятности на основе истории
-            win_probabilities = _calculate_real_win_probabilities(df_history, config)
+            # Точные вероятности выигрыша по таблице призов лотереи
+            prize_table = GLOBAL_PRIZE_ENGINE.get_table(request.lottery_type)
+            win_probabilities = _calculate_real_win_probabilities(prize_table, num_tickets)
 
             # Моделируем различные сценарии на основе реальных данных
             scenarios = {}
@@ -291,12 +305,11 @@ async def calculate_roi(
                 investment=request.investment
             )
 
-            # Монте-Карло симуляция для более точной оценки
+            # Распределение ROI: точные моменты + мультиномиальная выборка для квантилей
             monte_carlo_results = _monte_carlo_roi_simulation(
+                prize_table=prize_table,
                 num_tickets=num_tickets,
-                total_draws=total_draws,
                 investment=request.investment,
-                win_probabilities=win_probabilities,
                 num_simulations=1000
             )
             logger.info(f"✅ ROI расчёт завершён успешно")
@@ -321,6 +334,11 @@ async def calculate_roi(
 @router.post("/compare")
 async def compare_methods(
     lottery_type: str,
+    num_simulations: int = 50,
+    seed: int = 42,
+    methods: Optional[List[str]] = Query(None),
+    time_budget: Optional[float] = None,
+    partial_results: bool = True,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -336,23 +354,26 @@ async def compare_methods(
                 raise HTTPException(status_code=404, detail="Нет исторических данных")
 
             logger.info(f"📊 Доступно {len(df_history)} тиражей для сравнения")
-            config = data_manager.get_current_config()
-
-            # Методы для сравнения
-            methods = ["random", "hot", "cold", "mixed", "ai"]
-            comparison_results = []
-
-            for method in methods:
-                try:
-                    logger.info(f"🧪 Тестирование метода: {method}")
 
-                    method_result = _test_generation_method(method, df_history, config, 50)
-                    comparison_results.append(method_result)
-                    logger.info(f"✅ Метод {method} протестирован")
+            # Методы тестируются параллельно в пуле процессов, у каждого свой бюджет
+            budgets = {'default': {'time_budget': time_budget}} if time_budget else None
+            comparison = await run_in_threadpool(
+                GLOBAL_METHOD_COMPARATOR.compare,
+                lottery_type, df_history,
+                methods=methods or COMPARISON_METHODS,
+                num_simulations=num_simulations,
+                seed=seed,
+                budgets=budgets,
+                partial_results=partial_results
+            )
 
-                except Exception as method_error:
-                    logger.error(f"❌ Ошибка тестирования метода {method}: {method_error}")
-                    continue
+            comparison_results = []
+            for raw in comparison['results']:
+                if raw['status'] in ('completed', 'partial'):
+                    comparison_results.append(_format_method_result(raw))
+                    logger.info(f"✅ Метод {raw['method']} протестирован ({raw['completed']}/{raw['requested']})")
+                else:
+                    logger.error(f"❌ Метод {raw['method']} не протестирован: {raw.get('error', raw['status'])}")
 
             if not comparison_results:
                 raise HTTPException(status_code=500, detail="Не удалось протестировать ни один метод")
@@ -366,9 +387,15 @@ async def compare_methods(
                 "comparison": comparison_results,
                 "best_overall": best_method['method'],
                 "summary": f"Протестировано {len(comparison_results)} методов",
+                "seed": seed,
+                "data_version": comparison['data_version'],
+                "cached": comparison['cached'],
+                "partial": any(r['status'] == 'partial' for r in comparison_results),
                 "timestamp": datetime.utcnow().isoformat()
             }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Ошибка сравнения методов: {e}")
         logger.error(f"❌ Тип ошибки: {type(e).__name__}")
@@ -459,77 +486,41 @@ async def simulate_bankroll_management(
             config = data_manager.get_current_config()
             logger.info(f"🎯 Конфигурация лотереи: {config.get('name', 'Unknown')}")
 
-            # Инициализация банкролл менеджера (ИСПРАВЛЕННАЯ ВЕРСИЯ)
-            bankroll_mgr = BankrollManager(
-                initial_bankroll=request.initial_bankroll,
-                ticket_cost=request.bet_size if hasattr(request, 'bet_size') else 100
+            # Выбор стратегии
+            strategy = _parse_betting_strategy(request.strategy)
+
+            # Все исходы тиражей тянутся одной матрицей из точной таблицы призов,
+            # траектории банкролла продвигаются синхронно
+            simulator = VectorizedBankrollSimulator(
+                GLOBAL_PRIZE_ENGINE.get_table(request.lottery_type),
+                ticket_price=request.bet_size,
+                initial_bankroll=request.initial_bankroll
+            )
+            outcomes = simulator.sample_outcomes(request.num_simulations, request.num_draws)
+            paths = simulator.run(
+                outcomes, strategy.value,
+                base_bet=request.bet_size,
+                risk_level=request.risk_level,
+                fraction=request.fraction
             )
-            logger.info(f"💰 BankrollManager инициализирован: банкролл={request.initial_bankroll}, цена билета={request.bet_size}")
 
-            # Выбор стратегии
-            strategy = BettingStrategy[request.strategy.upper()]
-
-            # Запуск множественных симуляций
-            simulation_results = []
-
-            for sim_idx in range(request.num_simulations):
-                sim_bankroll = request.initial_bankroll
-                sim_history = []
-                consecutive_losses = 0
-                consecutive_wins = 0
-
-                for draw_idx in range(request.num_draws):
-                    # Расчёт размера ставки
-                    bet_size = bankroll_mgr.calculate_bet_size(
-                        strategy=strategy,
-                        win_probability=0.05,
-                        odds=100,
-                        current_streak=consecutive_losses if strategy == BettingStrategy.MARTINGALE else 0
-                    )
-
-                    # Ограничение ставки текущим банкроллом
-                    bet_size = min(bet_size, sim_bankroll * request.risk_level)
-
-                    # Симуляция результата (вероятность выигрыша ~5%)
-                    is_win = np.random.random() < 0.05
-
-                    if is_win:
-                        prize = bet_size * np.random.choice([5, 10, 20, 50, 100], p=[0.5, 0.3, 0.15, 0.04, 0.01])
-                        sim_bankroll += prize - bet_size
-                        consecutive_wins += 1
-                        consecutive_losses = 0
-                    else:
-                        sim_bankroll -= bet_size
-                        consecutive_losses += 1
-                        consecutive_wins = 0
-
-                    sim_history.append(sim_bankroll)
-
-                    # Проверка на банкротство
-                    if sim_bankroll <= 0:
-                        break
-
-                simulation_results.append({
-                    "final_bankroll": sim_bankroll,
-                    "survived": sim_bankroll > 0,
-                    "max_bankroll": max(sim_history),
-                    "min_bankroll": min(sim_history),
-                    "draws_played": len(sim_history)
-                })
-
-            # Анализ результатов
-            survived_count = sum(1 for r in simulation_results if r["survived"])
-            survival_rate = (survived_count / request.num_simulations) * 100
-
-            avg_final_bankroll = np.mean([r["final_bankroll"] for r in simulation_results])
-            median_final_bankroll = np.median([r["final_bankroll"] for r in simulation_results])
-
-            profitable_count = sum(1 for r in simulation_results if r["final_bankroll"] > request.initial_bankroll)
-            profitability_rate = (profitable_count / request.num_simulations) * 100
-
-            # Расчёт рисков
-            var_95 = np.percentile([r["final_bankroll"] for r in simulation_results], 5)
-            cvar_95 = np.mean([r["final_bankroll"] for r in simulation_results if r["final_bankroll"] <= var_95])
+            final_bankrolls = paths['final_bankroll'][0]
+            metrics = simulator.summarize(final_bankrolls)
+            survival_rate = metrics['survival_rate']
+            profitability_rate = metrics['profitability_rate']
+            var_95 = metrics['var_95']
+            cvar_95 = metrics['cvar_95']
+
+            grid_results = None
+            if request.grid_search:
+                grid_outcomes = outcomes[:max(1, min(request.grid_max_simulations, request.num_simulations))]
+                grid_results = simulator.grid_search(
+                    grid_outcomes, strategy.value,
+                    base_bets=request.grid_base_bets or [request.bet_size * k for k in (0.5, 1, 2)],
+                    risk_levels=request.grid_risk_levels or [request.risk_level * k for k in (0.5, 1, 2)],
+                    fractions=request.grid_fractions
+                )
+                logger.info(f"🔍 Сетка параметров: {len(grid_results)} вариантов на {len(grid_outcomes)} траекториях")
 
             return {
                 "status": "success",
@@ -537,16 +528,8 @@ async def simulate_bankroll_management(
                 "initial_bankroll": request.initial_bankroll,
                 "num_simulations": request.num_simulations,
                 "num_draws": request.num_draws,
-                "results": {
-                    "survival_rate": round(survival_rate, 2),
-                    "profitability_rate": round(profitability_rate, 2),
-                    "avg_final_bankroll": round(avg_final_bankroll, 2),
-                    "median_final_bankroll": round(median_final_bankroll, 2),
-                    "best_result": round(max(r["final_bankroll"] for r in simulation_results), 2),
-                    "worst_result": round(min(r["final_bankroll"] for r in simulation_results), 2),
-                    "var_95": round(var_95, 2),
-                    "cvar_95": round(cvar_95, 2)
-                },
+                "results": {key: round(value, 2) for key, value in metrics.items()},
+                "avg_draws_played": round(float(paths['draws_played'][0].mean()), 2),
                 "recommendation": _get_bankroll_recommendation(
                     strategy, survival_rate, profitability_rate, var_95
                 ),
@@ -554,10 +537,14 @@ async def simulate_bankroll_management(
                 "optimal_settings": _suggest_optimal_settings(
                     request.initial_bankroll, survival_rate, profitability_rate
                 ),
+                "grid_search": [
+                    {key: round(value, 4) for key, value in result.items()} for result in grid_results
+                ] if grid_results is not None else None,
                 "timestamp": datetime.utcnow().isoformat()
             }
 
-
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Ошибка симуляции стратегии: {e}")
         logger.error(f"❌ Тип ошибки: {type(e).__name__}")
@@ -639,32 +626,14 @@ def _generate_strategy_combinations(strategy, count, df_history, config, db, use
 
     return combinations
 
-def _check_combination_win(field1, field2, draw_field1, draw_field2, config):
-    """Проверка выигрыша комбинации"""
-    match_f1 = len(set(field1) & set(draw_field1))
-    match_f2 = len(set(field2) & set(draw_field2))
-
-    # Определение уровня выигрыша (упрощённо)
-    if match_f1 == config['field1_size'] and match_f2 == config['field2_size']:
-        return {"won": True, "match_level": "jackpot"}
-    elif match_f1 == config['field1_size'] and match_f2 >= 1:
-        return {"won": True, "match_level": "major"}
-    elif match_f1 >= 3 and match_f2 >= 1:
-        return {"won": True, "match_level": "minor"}
-    elif match_f1 >= 2:
-        return {"won": True, "match_level": "small"}
-    else:
-        return {"won": False, "match_level": None}
-
-def _calculate_prize(match_level, bet_size):
-    """Расчёт выигрыша"""
-    prizes = {
-        "jackpot": bet_size * 10000,
-        "major": bet_size * 1000,
-        "minor": bet_size * 100,
-        "small": bet_size * 5
-    }
-    return prizes.get(match_level, 0)
+def _generate_random_tickets(config, count):
+    """Пакетная генерация случайных билетов по конфигурации лотереи"""
+    field1 = np.argsort(np.random.random((count, config['field1_max'])), axis=1)[:, :config['field1_size']] + 1
+    field2 = np.argsort(np.random.random((count, config['field2_max'])), axis=1)[:, :config['field2_size']] + 1
+    return [
+        {'field1': sorted(f1.tolist()), 'field2': sorted(f2.tolist())}
+        for f1, f2 in zip(field1, field2)
+    ]
 
 def _calculate_max_drawdown(bankroll_history):
     """Расчёт максимальной просадки"""
@@ -693,15 +662,20 @@ def _get_strategy_recommendation(roi, win_rate, max_drawdown):
     else:
         return "🔴 Высокий риск потерь, не рекомендуется"
 
-def _calculate_real_win_probabilities(df_history, config):
-    """Расчёт реальных вероятностей на основе истории"""
-    # Здесь должен быть анализ реальных выигрышных комбинаций
-    # Упрощённая версия
+def _calculate_real_win_probabilities(prize_table, num_tickets):
+    """
+    Вероятности выигрыша по точной таблице призов
+
+    median - точная вероятность выигрыша билета, low/high - 5% и 95% квантили
+    доли выигравших билетов среди num_tickets (биномиальное распределение).
+    """
+    p = prize_table.win_probability
+    n = max(int(num_tickets), 1)
     return {
-        "low": 0.01,
-        "median": 0.05,
-        "high": 0.10,
-        "avg_prize": 500
+        "low": float(binom.ppf(0.05, n, p) / n),
+        "median": p,
+        "high": float(binom.ppf(0.95, n, p) / n),
+        "avg_prize": prize_table.average_prize
     }
 
 def _simulate_roi_scenario(num_tickets, total_draws, win_rate, avg_prize, investment):
@@ -718,28 +692,28 @@ def _simulate_roi_scenario(num_tickets, total_draws, win_rate, avg_prize, invest
         "profit_loss": round(expected_return - investment, 2)
     }
 
-def _monte_carlo_roi_simulation(num_tickets, total_draws, investment, win_probabilities, num_simulations):
-    """Монте-Карло симуляция ROI"""
-    results = []
+def _monte_carlo_roi_simulation(prize_table, num_tickets, investment, num_simulations):
+    """
+    Распределение ROI для num_tickets билетов
 
-    for _ in range(num_simulations):
-        total_return = 0
-        for _ in range(num_tickets):
-            if np.random.random() < win_probabilities['median']:
-                # Случайный приз из распределения
-                prize = np.random.gamma(2, win_probabilities['avg_prize'] / 2)
-                total_return += prize
+    Среднее и стандартное отклонение считаются точно, квантили и вероятность
+    прибыли - по мультиномиальной выборке исходов (без цикла по билетам).
+    """
+    if investment <= 0:
+        return {"mean_roi": 0.0, "median_roi": 0.0, "std_roi": 0.0,
+                "percentile_5": 0.0, "percentile_95": 0.0, "probability_profit": 0.0}
 
-        roi = ((total_return - investment) / investment) * 100
-        results.append(roi)
+    exact = prize_table.summary(num_tickets=num_tickets)
+    totals = prize_table.sample_total_payouts(num_tickets, num_simulations)
+    results = (totals - investment) / investment * 100
 
     return {
-        "mean_roi": round(np.mean(results), 2),
-        "median_roi": round(np.median(results), 2),
-        "std_roi": round(np.std(results), 2),
-        "percentile_5": round(np.percentile(results, 5), 2),
-        "percentile_95": round(np.percentile(results, 95), 2),
-        "probability_profit": round(sum(1 for r in results if r > 0) / num_simulations * 100, 2)
+        "mean_roi": round((exact['expected_payout'] - investment) / investment * 100, 2),
+        "median_roi": round(float(np.median(results)), 2),
+        "std_roi": round(exact['payout_std'] / investment * 100, 2),
+        "percentile_5": round(float(np.percentile(results, 5)), 2),
+        "percentile_95": round(float(np.percentile(results, 95)), 2),
+        "probability_profit": round(float(np.mean(results > 0)) * 100, 2)
     }
 
 def _get_roi_recommendation(scenarios, monte_carlo):
@@ -779,108 +753,35 @@ def _assess_risk_level(scenarios, monte_carlo):
         return {"level": "LOW", "description": "Низкий риск"}
 
 
-def _test_generation_method(method, df_history, config, num_simulations):
-    """Тестирование метода генерации"""
-    from backend.app.core import combination_generator
-    import numpy as np
-
-    scores = []
-    wins = 0
-
-    for _ in range(num_simulations):
-        try:
-            # Генерируем комбинацию методом
-            if method == "random":
-                f1, f2 = combination_generator.generate_random_combination()
-                combo = {'field1': f1, 'field2': f2}
-
-            elif method == "hot":
-                generated = combination_generator.generate_pattern_based_combinations(
-                    df_history.tail(50), 1, 'hot'
-                )
-                if generated:
-                    f1, f2, desc = generated[0]
-                    combo = {'field1': f1, 'field2': f2}
-                else:
-                    f1, f2 = combination_generator.generate_random_combination()
-                    combo = {'field1': f1, 'field2': f2}
-
-            elif method == "cold":
-                generated = combination_generator.generate_pattern_based_combinations(
-                    df_history.tail(50), 1, 'cold'
-                )
-                if generated:
-                    f1, f2, desc = generated[0]
-                    combo = {'field1': f1, 'field2': f2}
-                else:
-                    f1, f2 = combination_generator.generate_random_combination()
-                    combo = {'field1': f1, 'field2': f2}
-
-            elif method == "mixed":
-                generated = combination_generator.generate_pattern_based_combinations(
-                    df_history.tail(50), 1, 'balanced'
-                )
-                if generated:
-                    f1, f2, desc = generated[0]
-                    combo = {'field1': f1, 'field2': f2}
-                else:
-                    f1, f2 = combination_generator.generate_random_combination()
-                    combo = {'field1': f1, 'field2': f2}
+def _test_generation_method(method, df_history, config, num_simulations, seed=42):
+    """Тестирование метода генерации (в текущем процессе)"""
+    raw = run_method_trials(method, df_history, config, num_simulations, method_seed(seed, method))
+    return _format_method_result(raw)
 
-            elif method == "ai":
-                generated = combination_generator.generate_rf_ranked_combinations(
-                    df_history.tail(50), 1
-                )
-                if generated:
-                    f1, f2, desc = generated[0]
-                    combo = {'field1': f1, 'field2': f2}
-                else:
-                    f1, f2 = combination_generator.generate_random_combination()
-                    combo = {'field1': f1, 'field2': f2}
-
-            else:  # pattern или другие
-                f1, f2 = combination_generator.generate_random_combination()
-                combo = {'field1': f1, 'field2': f2}
-
-            # Оцениваем комбинацию
-            score = _evaluate_combination_score(combo, df_history)
-            scores.append(score)
-
-            # Проверяем на случайном тираже
-            if not df_history.empty:
-                random_draw = df_history.sample(1).iloc[0]
-
-                # Извлекаем числа из тиража правильно
-                draw_f1 = random_draw.get('field1_numbers', random_draw.get('Числа_Поле1_list', []))
-                draw_f2 = random_draw.get('field2_numbers', random_draw.get('Числа_Поле2_list', []))
-
-                if isinstance(draw_f1, list) and isinstance(draw_f2, list):
-                    win_check = _check_combination_win(
-                        combo['field1'], combo['field2'],
-                        draw_f1, draw_f2,
-                        config
-                    )
-                    if win_check.get('won', False):
-                        wins += 1
-
-        except Exception as e:
-            logger.warning(f"Ошибка тестирования метода {method}: {e}")
-            scores.append(50)  # Средний скор при ошибке
+def _format_method_result(raw):
+    """Метрики метода по сырым результатам прогона"""
+    scores = raw['scores']
+    completed = raw['completed']
 
     avg_score = round(np.mean(scores) if scores else 50, 2)
-    win_rate = round((wins / num_simulations) * 100, 2) if num_simulations > 0 else 0
-    roi = round((wins * 500 - num_simulations * 100) / (num_simulations * 100) * 100,
-                2) if num_simulations > 0 else -100
+    win_rate = round((raw['wins'] / completed) * 100, 2) if completed > 0 else 0
+    roi = round((raw['wins'] * 500 - completed * 100) / (completed * 100) * 100,
+                2) if completed > 0 else -100
 
     return {
-        "method": method,
+        "method": raw['method'],
         "avg_score": avg_score,
         "win_rate": win_rate,
         "roi": roi,
-        "complexity": _get_method_complexity(method),
+        "complexity": _get_method_complexity(raw['method']),
         "consistency": max(0, 100 - (np.std(scores) if scores else 50)),
-        "pros": _get_method_pros(method),  # ДОБАВИТЬ
-        "cons": _get_method_cons(method)  # ДОБАВИТЬ
+        "pros": _get_method_pros(raw['method']),  # ДОБАВИТЬ
+        "cons": _get_method_cons(raw['method']),  # ДОБАВИТЬ
+        "status": raw['status'],
+        "simulations_completed": completed,
+        "simulations_requested": raw['requested'],
+        "seed": raw['seed'],
+        "elapsed_seconds": round(raw['elapsed'], 2)
     }
 
 # def _evaluate_combination_score(combo, df_history):
@@ -981,36 +882,3 @@ def _suggest_optimal_settings(initial_bankroll, survival_rate, profitability_rat
         "suggested_stop_loss": round(initial_bankroll * 0.3, 2),
         "suggested_take_profit": round(initial_bankroll * 1.5, 2)
     }
-
-
-def _evaluate_combination_score(combo, df_history):
-    """Оценка качества комбинации"""
-    if df_history.empty:
-        return 50
-
-    try:
-        from backend.app.core import pattern_analyzer
-
-        score = 50  # Базовый скор
-
-        # Анализ горячих/холодных чисел
-        hot_cold = pattern_analyzer.GLOBAL_PATTERN_ANALYZER.analyze_hot_cold_numbers(
-            df_history.tail(20), window_sizes=[20], top_n=10
-        )
-
-        # Добавляем баллы за горячие числа
-        if 'field1_window20' in hot_cold:
-            hot_numbers_f1 = [item[0] for item in hot_cold['field1_window20'].get('hot_numbers', [])]
-            hot_count_f1 = len(set(combo['field1']) & set(hot_numbers_f1))
-            score += hot_count_f1 * 5
-
-        if 'field2_window20' in hot_cold:
-            hot_numbers_f2 = [item[0] for item in hot_cold['field2_window20'].get('hot_numbers', [])]
-            hot_count_f2 = len(set(combo['field2']) & set(hot_numbers_f2))
-            score += hot_count_f2 * 3
-
-        return min(100, max(0, score))
-
-    except Exception as e:
-        logger.warning(f"Ошибка при оценке комбинации: {e}")
-        return 50
\ No newline at end of file
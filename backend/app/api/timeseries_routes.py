@@ -10,11 +10,12 @@ import logging
 from ..core.timeseries import TimeSeriesGenerator
 from ..core import data_manager
 from ..core.lottery_context import LotteryContext
+from ..core.validation.walk_forward import chronological_history
 
 router = APIRouter(prefix="/timeseries", tags=["timeseries"])
 logger = logging.getLogger(__name__)
 
-# Глобальное хранилище генераторов
+# Глобальное хранилище генераторов (обученные модели рядов - в GLOBAL_ARIMA_CACHE)
 TIMESERIES_GENERATORS = {}
 
 
@@ -24,10 +25,18 @@ def get_or_create_generator(lottery_type: str) -> TimeSeriesGenerator:
     config = data_manager.LOTTERY_CONFIGS.get(lottery_type)
     if not config:
       raise ValueError(f"Неизвестный тип лотереи: {lottery_type}")
-    TIMESERIES_GENERATORS[lottery_type] = TimeSeriesGenerator(config)
+    TIMESERIES_GENERATORS[lottery_type] = TimeSeriesGenerator(config, lottery_type=lottery_type)
   return TIMESERIES_GENERATORS[lottery_type]
 
 
+def fetch_chronological_draws() -> Optional[pd.DataFrame]:
+  """История текущей лотереи от старых тиражей к новым (БД отдает новые первыми)"""
+  df = data_manager.fetch_draws_from_db()
+  if df is None or df.empty:
+    return df
+  return chronological_history(df)[0]
+
+
 @router.post("/analyze")
 async def analyze_timeseries(
     lottery_type: str,
@@ -39,13 +48,14 @@ async def analyze_timeseries(
   try:
     with LotteryContext(lottery_type):
       # Получаем данные
-      df = data_manager.fetch_draws_from_db()
+      df = fetch_chronological_draws()
 
       if df is None or df.empty:
         raise HTTPException(status_code=404, detail="Нет данных для анализа")
 
       # Ограничиваем размер окна
       if window_size:
+        # Последние window_size тиражей
         df = df.tail(window_size)
 
       # Получаем генератор
@@ -81,13 +91,14 @@ async def generate_combinations(
   try:
     with LotteryContext(lottery_type):
       # Получаем данные
-      df = data_manager.fetch_draws_from_db()
+      df = fetch_chronological_draws()
 
       if df is None or df.empty:
         raise HTTPException(status_code=404, detail="Нет данных для генерации")
 
       # Ограничиваем окно
       if window_size:
+        # Последние window_size тиражей
         df = df.tail(window_size)
 
       # Получаем генератор
@@ -126,7 +137,7 @@ async def get_acf_pacf_analysis(
       from ..core.timeseries import ACFPACFAnalyzer
 
       # Получаем данные
-      df = data_manager.fetch_draws_from_db()
+      df = fetch_chronological_draws()
 
       if df is None or df.empty or field_name not in df.columns:
         raise HTTPException(status_code=404, detail="Данные не найдены")
@@ -150,6 +161,55 @@ async def get_acf_pacf_analysis(
     raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/matrix")
+async def get_series_matrix(
+    lottery_type: str,
+    kind: str = Query("all", description="Ряды: all, positional, occurrence"),
+    window_size: Optional[int] = Query(None, description="Размер окна истории"),
+    max_lag: int = Query(40, ge=1, le=200, description="Максимальный лаг"),
+    max_period: int = Query(52, ge=2, description="Максимальный период")
+) -> Dict:
+  """
+  ACF/PACF и доминирующие периоды всех позиционных рядов и рядов
+  появления чисел одним запросом
+  """
+  try:
+    with LotteryContext(lottery_type):
+      from ..core.timeseries.series_matrix import SERIES_KINDS, analyze_series_matrix
+
+      if kind not in SERIES_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind должен быть одним из: {', '.join(SERIES_KINDS)}")
+
+      # Получаем данные
+      df = fetch_chronological_draws()
+
+      if df is None or df.empty:
+        raise HTTPException(status_code=404, detail="Данные не найдены")
+
+      if window_size:
+        # Последние window_size тиражей
+        df = df.tail(window_size)
+
+      results = analyze_series_matrix(
+        df, data_manager.LOTTERY_CONFIGS[lottery_type], kind=kind,
+        max_lag=max_lag, max_period=max_period
+      )
+
+      return {
+        "lottery_type": lottery_type,
+        "kind": kind,
+        "draws_analyzed": len(df),
+        "analysis": results,
+        "status": "success"
+      }
+
+  except HTTPException:
+    raise
+  except Exception as e:
+    logger.error(f"Ошибка пакетного анализа рядов: {e}")
+    raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/seasonality")
 async def detect_seasonality(
     lottery_type: str,
@@ -164,7 +224,7 @@ async def detect_seasonality(
       from ..core.timeseries import SeasonalityDetector
 
       # Получаем данные
-      df = data_manager.fetch_draws_from_db()
+      df = fetch_chronological_draws()
 
       if df is None or df.empty or field_name not in df.columns:
         raise HTTPException(status_code=404, detail="Данные не найдены")
@@ -201,7 +261,7 @@ async def analyze_trends(
       from ..core.timeseries import TrendDecomposer
 
       # Получаем данные
-      df = data_manager.fetch_draws_from_db()
+      df = fetch_chronological_draws()
 
       if df is None or df.empty or field_name not in df.columns:
         raise HTTPException(status_code=404, detail="Данные не найдены")
@@ -240,7 +300,7 @@ async def forecast_arima(
       from ..core.timeseries import ARIMAModel
 
       # Получаем данные
-      df = data_manager.fetch_draws_from_db()
+      df = fetch_chronological_draws()
 
       if df is None or df.empty or field_name not in df.columns:
         raise HTTPException(status_code=404, detail="Данные не найдены")
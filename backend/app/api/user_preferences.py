@@ -1,13 +1,14 @@
 """
 API для управления предпочтениями пользователя
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
 from sqlalchemy.orm import Session
 from typing import Dict, List, Optional
 from pydantic import BaseModel
 
 from backend.app.core.database import get_db, User, UserPreferences  # Импортируем всё из database.py!
-from backend.app.core.auth import get_current_user
+from backend.app.core.auth import get_current_user, verify_token, get_user_by_email
+from backend.app.core.win_notifications import GLOBAL_WIN_NOTIFIER
 import json
 import logging
 
@@ -19,6 +20,8 @@ class FavoriteNumbersUpdate(BaseModel):
     """Модель для обновления избранных чисел"""
     favorite_numbers: Dict[str, List[int]]
     lottery_type: Optional[str] = "4x20"
+    # Частичное обновление настроек уведомлений, например {"winning_tickets": false}
+    notification_settings: Optional[Dict[str, bool]] = None
 
 
 class UserPreferencesResponse(BaseModel):
@@ -29,6 +32,27 @@ class UserPreferencesResponse(BaseModel):
     notification_settings: Dict = {}
 
 
+def _merge_notification_settings(prefs: UserPreferences, updates: Optional[Dict[str, bool]]):
+    """Слияние переданных настроек уведомлений с сохранёнными"""
+    if not updates:
+        return
+    settings = json.loads(prefs.notification_settings) if prefs.notification_settings else {}
+    settings.update(updates)
+    prefs.notification_settings = json.dumps(settings)
+
+
+def _sync_win_subscriptions(user_id: int, prefs: UserPreferences):
+    """Обновляет индекс подписок на выигрыши после изменения избранного"""
+    try:
+        GLOBAL_WIN_NOTIFIER.set_user_favorites(
+            user_id,
+            json.loads(prefs.favorite_numbers) if prefs.favorite_numbers else {},
+            json.loads(prefs.notification_settings) if prefs.notification_settings else {}
+        )
+    except Exception as e:
+        logger.error(f"Ошибка обновления подписок на выигрыши: {e}")
+
+
 @router.get("/preferences", response_model=UserPreferencesResponse)
 async def get_user_preferences(
     lottery_type: str = "4x20",
@@ -71,7 +95,7 @@ async def update_user_preferences(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Обновить избранные числа пользователя для конкретной лотереи"""
+    """Обновить избранные числа пользователя для конкретной лотереи и настройки уведомлений"""
     try:
         # Ищем существующие предпочтения
         prefs = db.query(UserPreferences).filter_by(user_id=current_user.id).first()
@@ -84,6 +108,7 @@ async def update_user_preferences(
                 favorite_numbers=json.dumps(all_favorites),
                 default_lottery=data.lottery_type or "4x20"
             )
+            _merge_notification_settings(prefs, data.notification_settings)
             db.add(prefs)
         else:
             # Обновляем существующие
@@ -93,9 +118,11 @@ async def update_user_preferences(
 
             if data.lottery_type:
                 prefs.default_lottery = data.lottery_type
+            _merge_notification_settings(prefs, data.notification_settings)
 
         db.commit()
         db.refresh(prefs)
+        _sync_win_subscriptions(current_user.id, prefs)
 
         # Возвращаем обновлённые предпочтения для текущей лотереи
         return UserPreferencesResponse(
@@ -126,6 +153,7 @@ async def clear_favorite_numbers(
             all_favorites[lottery_type] = {"field1": [], "field2": []}
             prefs.favorite_numbers = json.dumps(all_favorites)
             db.commit()
+            _sync_win_subscriptions(current_user.id, prefs)
 
         return {"status": "success", "message": f"Избранные числа очищены для {lottery_type}"}
 
@@ -177,4 +205,34 @@ async def update_user_subscription(
     except Exception as e:
         logger.error(f"Ошибка обновления подписки: {e}")
         db.rollback()
-        raise HTTPException(status_code=500, detail="Ошибка обновления подписки")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Ошибка обновления подписки")
+
+
+@router.get("/notifications")
+async def get_win_notifications(current_user: User = Depends(get_current_user)):
+    """Забрать накопленные уведомления о выигрыше сохранённых комбинаций"""
+    queue_sink = GLOBAL_WIN_NOTIFIER.get_sink('queue')
+    notifications = queue_sink.drain(current_user.id) if queue_sink else []
+    return {"notifications": notifications, "count": len(notifications)}
+
+
+@router.websocket("/notifications/ws")
+async def win_notifications_socket(websocket: WebSocket, token: str):
+    """WebSocket-канал уведомлений о выигрыше (токен передаётся в query-параметре)"""
+    token_data = verify_token(token)
+    user = get_user_by_email(token_data["email"]) if token_data else None
+    if not user:
+        await websocket.close(code=1008)
+        return
+
+    ws_sink = GLOBAL_WIN_NOTIFIER.get_sink('websocket')
+    await websocket.accept()
+    ws_sink.register(user.id, websocket)
+    try:
+        while True:
+            # Входящие сообщения не используются - держим соединение открытым
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        ws_sink.unregister(user.id, websocket)
@@ -7,9 +7,15 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 import logging
 import asyncio
+import os
+from fastapi.concurrency import run_in_threadpool
 
 from backend.app.core import data_manager
+from backend.app.core.utils import get_data_version
 from backend.app.core.validation.walk_forward import WalkForwardValidator, ValidationResults
+from backend.app.core.validation.result_store import (
+    GLOBAL_VALIDATION_STORE, COMPARISON_MODEL_NAME, result_key, comparison_key
+)
 from backend.app.core.xgboost_model import XGBoostLotteryModel
 from backend.app.core.ai_model import RFModel, LotteryLSTMOps
 from backend.app.core.lottery_context import LotteryContext
@@ -22,8 +28,26 @@ from backend.app.api.dashboard import DashboardService
 router = APIRouter(prefix="/validation", tags=["Model Validation"])
 logger = logging.getLogger(__name__)
 
-# Хранилище результатов валидации (в продакшене использовать БД)
+# Задачи текущего процесса (прогресс выполняющихся); результаты - в GLOBAL_VALIDATION_STORE
 validation_cache = {}
+# Ключ результата -> task_id выполняющейся задачи (повторный запрос не запускает дубль)
+running_tasks: Dict[str, str] = {}
+
+MODEL_SPECS = {
+    'xgboost': (XGBoostLotteryModel, {}),
+    'rf': (RFModel, {'n_estimators': 100}),
+    'lstm': (LotteryLSTMOps, {'n_steps_in': 5})
+}
+
+
+def window_config(validator: WalkForwardValidator) -> Dict[str, Any]:
+    """Конфигурация окон - часть ключа результата"""
+    return {
+        'initial_train_size': validator.initial_train_size,
+        'test_size': validator.test_size,
+        'step_size': validator.step_size,
+        'expanding_window': validator.expanding_window
+    }
 
 
 @router.post("/walk-forward", summary="🔬 Walk-forward валидация модели")
@@ -77,25 +101,39 @@ async def run_walk_forward_validation(
         )
         
         # Выбираем модель
-        if model_type == 'xgboost':
-            from backend.app.core.xgboost_model import XGBoostLotteryModel
-            model_class = XGBoostLotteryModel
-            model_params = {}
-        elif model_type == 'rf':
-            model_class = RFModel
-            model_params = {'n_estimators': 100}
-        else:  # lstm
-            model_class = LotteryLSTMOps
-            model_params = {'n_steps_in': 5}
+        model_class, model_params = MODEL_SPECS[model_type]
+        lottery_type = data_manager.CURRENT_LOTTERY
+        data_version = get_data_version(df_history)
+        key = result_key(model_class.__name__, model_params, lottery_type,
+                         data_version, window_config(validator))
+        
+        # Та же модель на тех же данных и окнах уже проверялась
+        stored = GLOBAL_VALIDATION_STORE.find(key)
+        if stored:
+            return {
+                'task_id': stored['task_id'],
+                'status': 'completed',
+                'cached': True,
+                'message': f'Результат валидации {model_type} взят из хранилища',
+                'check_status_url': f'/api/v1/{lottery_type}/validation/status/{stored["task_id"]}'
+            }
+        if key in running_tasks:
+            return {
+                'task_id': running_tasks[key],
+                'status': 'running',
+                'message': f'Валидация {model_type} уже выполняется',
+                'check_status_url': f'/api/v1/{lottery_type}/validation/status/{running_tasks[key]}'
+            }
         
         # Генерируем уникальный ID для задачи
-        task_id = f"{model_type}_{data_manager.CURRENT_LOTTERY}_{datetime.now().timestamp()}"
+        task_id = f"{model_type}_{lottery_type}_{datetime.now().timestamp()}"
+        running_tasks[key] = task_id
         
         # Запускаем валидацию в фоне
         background_tasks.add_task(
             run_validation_background,
             task_id, validator, model_class, model_params,
-            df_history, config, current_user.id
+            df_history, config, current_user.id, lottery_type, key, data_version
         )
         
         return {
@@ -125,11 +163,10 @@ async def get_validation_status(
     - Результаты валидации если завершено
     - Промежуточные метрики если выполняется
     """
-    if task_id not in validation_cache:
+    task_data = validation_cache.get(task_id) or stored_task(task_id)
+    if task_data is None:
         raise HTTPException(status_code=404, detail="Задача не найдена")
     
-    task_data = validation_cache[task_id]
-    
     if task_data['status'] == 'completed':
         # Возвращаем полные результаты
         results = task_data['results']
@@ -199,15 +236,30 @@ async def compare_models_validation(
             )
         
         config = data_manager.get_current_config()
+        lottery_type = data_manager.CURRENT_LOTTERY
+        data_version = get_data_version(df_history)
+        
+        stored = GLOBAL_VALIDATION_STORE.find(
+            comparison_key(comparison_model_keys(models, initial_train_size, test_size, lottery_type, data_version))
+        )
+        if stored:
+            return {
+                'task_id': stored['task_id'],
+                'status': 'completed',
+                'cached': True,
+                'models': models,
+                'message': 'Результат сравнения взят из хранилища',
+                'check_status_url': f'/api/v1/{lottery_type}/validation/comparison/{stored["task_id"]}'
+            }
         
         # Генерируем ID задачи
-        task_id = f"compare_{data_manager.CURRENT_LOTTERY}_{datetime.now().timestamp()}"
+        task_id = f"compare_{lottery_type}_{datetime.now().timestamp()}"
         
         # Запускаем сравнение в фоне
         background_tasks.add_task(
             run_comparison_background,
             task_id, models, initial_train_size, test_size,
-            df_history, config, current_user.id
+            df_history, config, current_user.id, lottery_type, data_version
         )
         
         return {
@@ -232,11 +284,10 @@ async def get_comparison_results(
     """
     Получить результаты сравнения моделей
     """
-    if task_id not in validation_cache:
+    task_data = validation_cache.get(task_id) or stored_task(task_id)
+    if task_data is None:
         raise HTTPException(status_code=404, detail="Сравнение не найдено")
     
-    task_data = validation_cache[task_id]
-    
     if task_data['status'] == 'completed':
         return {
             'task_id': task_id,
@@ -267,9 +318,27 @@ async def get_validation_history(
     current_user = Depends(get_current_user)
 ):
     """
-    Получить историю выполненных валидаций
+    Получить историю выполненных валидаций (из хранилища - переживает
+    перезапуск и общая для реплик)
     """
-    # Фильтруем по текущей лотерее и пользователю
+    stored = GLOBAL_VALIDATION_STORE.history(data_manager.CURRENT_LOTTERY, current_user.id, limit)
+    if stored is not None:
+        return {
+            'validations': [
+                {
+                    'task_id': row['task_id'],
+                    'status': row['status'],
+                    'model': row['model_type'],
+                    'started_at': row['started_at'],
+                    'completed_at': row['completed_at'],
+                    'summary': stored_summary(row)
+                }
+                for row in stored
+            ],
+            'total': len(stored)
+        }
+    
+    # Хранилище недоступно - задачи текущего процесса
     user_validations = [
         {
             'task_id': task_id,
@@ -293,12 +362,60 @@ async def get_validation_history(
     }
 
 
+# Хранилище результатов
+
+def stored_task(task_id: str) -> Optional[Dict]:
+    """Задача из хранилища в формате validation_cache"""
+    row = GLOBAL_VALIDATION_STORE.get_task(task_id)
+    if row is None:
+        return None
+    
+    task_data = dict(row)
+    if row['status'] == 'completed' and row['full_results']:
+        if row['model_type'] == COMPARISON_MODEL_NAME:
+            task_data.update(row['full_results'])
+        else:
+            task_data['results'] = ValidationResults.from_dict(row['full_results'])
+    return task_data
+
+
+def stored_summary(row: Dict) -> Optional[Dict]:
+    """Сводка записи хранилища для истории"""
+    if row['status'] != 'completed' or not row['full_results']:
+        return None
+    if row['model_type'] == COMPARISON_MODEL_NAME:
+        return {'winner': row['full_results'].get('winner'), 'ranking': row['full_results'].get('ranking')}
+    return row['full_results'].get('summary')
+
+
+def comparison_validator(initial_train_size: int, test_size: int,
+                         max_workers: Optional[int] = None) -> WalkForwardValidator:
+    return WalkForwardValidator(
+        initial_train_size=initial_train_size,
+        test_size=test_size,
+        step_size=test_size,
+        expanding_window=True,
+        max_workers=max_workers
+    )
+
+
+def comparison_model_keys(models: List[str], initial_train_size: int, test_size: int,
+                          lottery_type: str, data_version: str) -> List[str]:
+    """Ключи результатов моделей сравнения"""
+    config = window_config(comparison_validator(initial_train_size, test_size))
+    return [
+        result_key(MODEL_SPECS[name][0].__name__, MODEL_SPECS[name][1], lottery_type, data_version, config)
+        for name in models
+    ]
+
+
 # Фоновые задачи
 
 async def run_validation_background(task_id: str, validator: WalkForwardValidator,
                                    model_class: Any, model_params: Dict,
                                    df_history: pd.DataFrame, config: Dict,
-                                   user_id: int):
+                                   user_id: int, lottery_type: str,
+                                   key: str, data_version: str):
     """Фоновая задача для выполнения валидации"""
     try:
         # Инициализируем запись в кэше
@@ -308,25 +425,31 @@ async def run_validation_background(task_id: str, validator: WalkForwardValidato
             'message': 'Инициализация валидации...',
             'started_at': datetime.now().isoformat(),
             'user_id': user_id,
-            'lottery_type': data_manager.CURRENT_LOTTERY,
+            'lottery_type': lottery_type,
             'model_type': model_class.__name__
         }
+        GLOBAL_VALIDATION_STORE.start(
+            task_id, key, model_class.__name__, model_params,
+            lottery_type, data_version, window_config(validator), user_id
+        )
         
         # Запускаем валидацию
         logger.info(f"🚀 Запуск фоновой валидации {task_id}")
         
-        results = validator.validate_model(
+        results = await run_in_threadpool(
+            validator.validate_model,
             model_class, model_params,
             df_history, config
         )
         
         # Сохраняем результаты
+        GLOBAL_VALIDATION_STORE.complete(task_id, results)
         validation_cache[task_id] = {
             'status': 'completed',
             'results': results,
             'completed_at': datetime.now().isoformat(),
             'user_id': user_id,
-            'lottery_type': data_manager.CURRENT_LOTTERY,
+            'lottery_type': lottery_type,
             'model_type': model_class.__name__
         }
         
@@ -340,7 +463,7 @@ async def run_validation_background(task_id: str, validator: WalkForwardValidato
                           f'accuracy={results.average_metrics["accuracy"]:.3f}, '
                           f'f1={results.average_metrics["f1"]:.3f}',
                 user_id=user_id,
-                lottery_type=data_manager.CURRENT_LOTTERY,
+                lottery_type=lottery_type,
                 details={
                     'model': model_class.__name__,
                     'windows': results.total_windows,
@@ -356,19 +479,28 @@ async def run_validation_background(task_id: str, validator: WalkForwardValidato
         
     except Exception as e:
         logger.error(f"❌ Ошибка валидации {task_id}: {e}")
+        GLOBAL_VALIDATION_STORE.fail(task_id, str(e))
         validation_cache[task_id] = {
             'status': 'error',
             'error': str(e),
             'user_id': user_id,
-            'lottery_type': data_manager.CURRENT_LOTTERY
+            'lottery_type': lottery_type
         }
+    finally:
+        running_tasks.pop(key, None)
 
 
 async def run_comparison_background(task_id: str, models: List[str],
                                    initial_train_size: int, test_size: int,
                                    df_history: pd.DataFrame, config: Dict,
-                                   user_id: int):
-    """Фоновая задача для сравнения моделей"""
+                                   user_id: int, lottery_type: str, data_version: str):
+    """
+    Фоновая задача для сравнения моделей
+    
+    Модели, уже проверенные на тех же данных и окнах, берутся из
+    хранилища; остальные валидируются одновременно, процессы окон
+    делятся между ними поровну.
+    """
     try:
         validation_cache[task_id] = {
             'status': 'running',
@@ -376,28 +508,56 @@ async def run_comparison_background(task_id: str, models: List[str],
             'current_model': None,
             'started_at': datetime.now().isoformat(),
             'user_id': user_id,
-            'lottery_type': data_manager.CURRENT_LOTTERY
+            'lottery_type': lottery_type
         }
         
-        validator = WalkForwardValidator(
-            initial_train_size=initial_train_size,
-            test_size=test_size,
-            step_size=test_size,
-            expanding_window=True
+        keys = comparison_model_keys(models, initial_train_size, test_size, lottery_type, data_version)
+        GLOBAL_VALIDATION_STORE.start(
+            task_id, comparison_key(keys), COMPARISON_MODEL_NAME, {'models': models},
+            lottery_type, data_version, window_config(comparison_validator(initial_train_size, test_size)), user_id
         )
         
-        model_configs = []
-        for model_name in models:
-            if model_name == 'xgboost':
-                from backend.app.core.xgboost_model import XGBoostLotteryModel
-                model_configs.append((XGBoostLotteryModel, {}))
-            elif model_name == 'rf':
-                model_configs.append((RFModel, {'n_estimators': 100}))
-            elif model_name == 'lstm':
-                model_configs.append((LotteryLSTMOps, {'n_steps_in': 5}))
+        stored = {name: GLOBAL_VALIDATION_STORE.find(key) for name, key in zip(models, keys)}
+        pending = [(name, key) for name, key in zip(models, keys) if stored[name] is None]
+        workers = max(1, (os.cpu_count() or 1) // max(1, len(pending)))
+        validation_cache[task_id]['current_model'] = [name for name, _ in pending]
         
-        # Запускаем сравнение
-        comparison_df = validator.compare_models(model_configs, df_history, config)
+        async def validate(name: str, key: str) -> Dict:
+            model_class, model_params = MODEL_SPECS[name]
+            validator = comparison_validator(initial_train_size, test_size, workers)
+            model_task_id = f"{task_id}_{name}"
+            GLOBAL_VALIDATION_STORE.start(
+                model_task_id, key, model_class.__name__, model_params,
+                lottery_type, data_version, window_config(validator), user_id
+            )
+            logger.info(f"🔄 Валидация модели {model_class.__name__}")
+            try:
+                results = await run_in_threadpool(
+                    validator.validate_model, model_class, model_params, df_history, config
+                )
+            except Exception as e:
+                logger.error(f"Ошибка валидации {model_class.__name__}: {e}")
+                GLOBAL_VALIDATION_STORE.fail(model_task_id, str(e))
+                return {'model': model_class.__name__, 'status': 'error', 'error': str(e)}
+            
+            GLOBAL_VALIDATION_STORE.complete(model_task_id, results)
+            validation_cache[task_id]['progress'] += 100 // len(pending)
+            return {**results.get_summary(), 'status': 'success'}
+        
+        validated = dict(zip(
+            [name for name, _ in pending],
+            await asyncio.gather(*(validate(name, key) for name, key in pending))
+        ))
+        summaries = [
+            validated[name] if name in validated
+            else {**stored[name]['full_results']['summary'], 'status': 'success'}
+            for name in models
+        ]
+        
+        # Сортируем по F1 score
+        comparison_df = pd.DataFrame(summaries)
+        if 'avg_f1' in comparison_df.columns:
+            comparison_df = comparison_df.sort_values('avg_f1', ascending=False)
         
         # Определяем победителя
         if 'avg_f1' in comparison_df.columns:
@@ -408,25 +568,30 @@ async def run_comparison_background(task_id: str, models: List[str],
             winner = 'Unknown'
             ranking = []
         
-        validation_cache[task_id] = {
-            'status': 'completed',
+        comparison = {
             'comparison': comparison_df.to_dict('records'),
             'winner': winner,
-            'ranking': ranking,
+            'ranking': ranking
+        }
+        GLOBAL_VALIDATION_STORE.complete_comparison(task_id, comparison)
+        validation_cache[task_id] = {
+            'status': 'completed',
+            **comparison,
             'completed_at': datetime.now().isoformat(),
             'user_id': user_id,
-            'lottery_type': data_manager.CURRENT_LOTTERY
+            'lottery_type': lottery_type
         }
         
         logger.info(f"✅ Сравнение {task_id} завершено. Победитель: {winner}")
         
     except Exception as e:
         logger.error(f"❌ Ошибка сравнения {task_id}: {e}")
+        GLOBAL_VALIDATION_STORE.fail(task_id, str(e))
         validation_cache[task_id] = {
             'status': 'error',
             'error': str(e),
             'user_id': user_id,
-            'lottery_type': data_manager.CURRENT_LOTTERY
+            'lottery_type': lottery_type
         }
 
 
@@ -2,9 +2,10 @@ from fastapi import APIRouter, Depends, Path, HTTPException, UploadFile, File
 from typing import List
 import pandas as pd
 import io
-from collections import defaultdict
+from fastapi.concurrency import run_in_threadpool
 
 from backend.app.core import ticket_verifier, data_manager, utils
+from backend.app.core.verification_engine import GLOBAL_VERIFICATION_ENGINE
 from backend.app.models.schemas import TicketVerificationRequest, TicketCheckResponse, VerificationResult
 from .analysis import set_lottery_context  # Используем ту же зависимость
 
@@ -45,11 +46,38 @@ def verify_single_ticket(ticket: TicketVerificationRequest, context: None = Depe
   )
 
 
+# Размер порции строк при потоковом чтении CSV
+CSV_CHUNK_ROWS = 20000
+
+
+def _ticket_responses(checked_tickets):
+  """Преобразование результатов verification_engine в Pydantic модели"""
+  responses = []
+  for ticket in checked_tickets:
+    wins_models = [VerificationResult(
+      draw_number=res.get("Тираж"),
+      draw_date=res.get("Дата тиража"),
+      winning_numbers=res.get("Выигрышные номера"),
+      matches=res.get("Совпадения"),
+      category=res.get("Категория")
+    ) for res in ticket['wins']]
+
+    responses.append(TicketCheckResponse(
+      ticket_checked=ticket['ticket'],
+      is_winner=len(wins_models) > 0,
+      wins=wins_models
+    ))
+  return responses
+
+
 @router.post("/verify-csv", response_model=List[TicketCheckResponse], summary="Проверить все билеты из CSV файла")
 async def verify_csv_tickets(file: UploadFile = File(...), context: None = Depends(set_lottery_context)):
   """
   Загружает CSV файл с колонками 'Поле1' и 'Поле2', проверяет каждый билет
   и возвращает сгруппированный результат для каждого билета.
+
+  Файл читается порциями по CSV_CHUNK_ROWS строк без декодирования целиком,
+  каждая порция проверяется пакетно по битсетам тиражей.
   """
   if not file.filename.endswith('.csv'):
     raise HTTPException(status_code=400, detail="Неверный формат файла. Требуется CSV.")
@@ -58,53 +86,23 @@ async def verify_csv_tickets(file: UploadFile = File(...), context: None = Depen
   if df_history.empty:
     raise HTTPException(status_code=404, detail="История тиражей не найдена.")
 
+  lottery_type = data_manager.CURRENT_LOTTERY
+  # Индекс истории строится один раз на все порции
+  await run_in_threadpool(GLOBAL_VERIFICATION_ENGINE.get_index, df_history, lottery_type)
+
+  final_response = []
   try:
-    contents = await file.read()
-    buffer = io.StringIO(contents.decode('utf-8'))
-    tickets_df = pd.read_csv(buffer)
-    if 'Поле1' not in tickets_df.columns or 'Поле2' not in tickets_df.columns:
-      raise HTTPException(status_code=400, detail="В CSV файле отсутствуют обязательные колонки 'Поле1' и/или 'Поле2'.")
+    stream = io.TextIOWrapper(file.file, encoding='utf-8')
+    for tickets_chunk in pd.read_csv(stream, chunksize=CSV_CHUNK_ROWS):
+      if 'Поле1' not in tickets_chunk.columns or 'Поле2' not in tickets_chunk.columns:
+        raise HTTPException(status_code=400, detail="В CSV файле отсутствуют обязательные колонки 'Поле1' и/или 'Поле2'.")
+
+      checked = await run_in_threadpool(
+        GLOBAL_VERIFICATION_ENGINE.verify_frame, tickets_chunk, df_history, lottery_type)
+      final_response.extend(_ticket_responses(checked))
+  except HTTPException:
+    raise
   except Exception as e:
     raise HTTPException(status_code=400, detail=f"Ошибка чтения или парсинга CSV файла: {e}")
 
-  # --- КОРРЕКТНАЯ ЛОГИКА ВМЕСТО ЗАГЛУШКИ ---
-
-  # 1. Получаем плоский список всех выигрышей по всем билетам
-  all_wins_flat = ticket_verifier.verify_multiple_tickets_from_df(tickets_df, df_history)
-
-  # 2. Группируем выигрыши по идентификатору билета
-  grouped_wins = defaultdict(list)
-  for win in all_wins_flat:
-    # Пропускаем сообщения "без выигрыша"
-    if win.get("Категория") != "-":
-      ticket_id = win.get("Билет")
-      grouped_wins[ticket_id].append(win)
-
-  # 3. Формируем финальный ответ, проходя по исходному списку билетов
-  final_response = []
-  for index, row in tickets_df.iterrows():
-    f1_str = str(row['Поле1'])
-    f2_str = str(row['Поле2'])
-    ticket_id = f"Билет {index + 1} ({f1_str} | {f2_str})"
-
-    ticket_wins = grouped_wins.get(ticket_id, [])
-    is_winner = len(ticket_wins) > 0
-
-    # Преобразуем выигрыши в Pydantic модель
-    wins_models = [VerificationResult(
-      draw_number=res.get("Тираж"),
-      draw_date=res.get("Дата тиража"),
-      winning_numbers=res.get("Выигрышные номера"),
-      matches=res.get("Совпадения"),
-      category=res.get("Категория")
-    ) for res in ticket_wins]
-
-    final_response.append(
-      TicketCheckResponse(
-        ticket_checked=ticket_id,
-        is_winner=is_winner,
-        wins=wins_models
-      )
-    )
-
-  return final_response
\ No newline at end of file
+  return final_response
@@ -325,6 +325,7 @@ async def get_xgboost_metrics(
 @router.post("/train", summary="🎓 Принудительное обучение XGBoost")
 async def train_xgboost_model(
     force: bool = Query(False, description="Переобучить даже если модель уже обучена"),
+    cross_validate: Optional[bool] = Query(None, description="Кросс-валидация (по умолчанию - по расписанию)"),
     context: None = Depends(set_lottery_context),
     current_user = Depends(require_premium)
 ):
@@ -364,7 +365,7 @@ async def train_xgboost_model(
         
         # Обучаем модель
         logger.info(f"Запуск обучения XGBoost для {data_manager.CURRENT_LOTTERY}...")
-        success = xgb_model.train(df_history)
+        success = xgb_model.train(df_history, cross_validate=cross_validate)
         
         if not success:
             raise HTTPException(
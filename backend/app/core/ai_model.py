@@ -127,6 +127,9 @@ class RFModel:
     # Сохраняем параметры для восстановления размерности признаков
     self._feature_vector_length = 0
 
+    # Номер успешного обучения (по нему узнают, что модель сменилась)
+    self.train_version = 0
+
   def _count_consecutive(self, numbers: List[int]) -> int:
     """Подсчитывает максимальную длину последовательных чисел"""
     if len(numbers) < 2:
@@ -273,70 +276,93 @@ class RFModel:
     Optional[np.ndarray], Optional[List[np.ndarray]], Optional[List[np.ndarray]]]:
     """
     Подготовка данных для Random Forest обучения.
+
+    Векторная сборка по матрице тиражей: строка i - признаки
+    _create_feature_vector для тиража i-1 и lookback предыдущих, цели -
+    числа тиража i. Частоты - разности префиксных сумм, последнее появление -
+    накопленный максимум номеров строк с числом.
     """
     if df_history.empty or 'Числа_Поле1_list' not in df_history.columns or 'Числа_Поле2_list' not in df_history.columns:
       print("AI Model (RF): Отсутствуют необходимые колонки для подготовки данных.")
       return None, None, None
 
-    df_copy = df_history.copy()
-
     # Универсальная валидация списков чисел
-    df_copy['Числа_Поле1_list'] = df_copy['Числа_Поле1_list'].apply(
-      lambda x: x if isinstance(x, list) and len(x) == self.field1_size else None)
-    df_copy['Числа_Поле2_list'] = df_copy['Числа_Поле2_list'].apply(
-      lambda x: x if isinstance(x, list) and len(x) == self.field2_size else None)
-    df_copy.dropna(subset=['Числа_Поле1_list', 'Числа_Поле2_list'], inplace=True)
+    valid = [
+      isinstance(f1, list) and len(f1) == self.field1_size and isinstance(f2, list) and len(f2) == self.field2_size
+      for f1, f2 in zip(df_history['Числа_Поле1_list'], df_history['Числа_Поле2_list'])
+    ]
+    draws_f1 = [f1 for f1, ok in zip(df_history['Числа_Поле1_list'], valid) if ok]
+    draws_f2 = [f2 for f2, ok in zip(df_history['Числа_Поле2_list'], valid) if ok]
+    num_draws = len(draws_f1)
 
     # Требуем больше истории для расширенных признаков
-    lookback_draws = min(5, len(df_copy) // 2)  # Адаптивное окно
+    lookback_draws = min(5, num_draws // 2)  # Адаптивное окно
     min_required_rows = lookback_draws + 1
-    if len(df_copy) < min_required_rows:
+    if num_draws < min_required_rows or lookback_draws == 0:
       print(f"AI Model (RF): Недостаточно строк данных для создания признаков (нужно минимум {min_required_rows}).")
       return None, None, None
 
-    X_list = []
-    Y_f1_list = [[] for _ in range(self.field1_size)]
-    Y_f2_list = [[] for _ in range(self.field2_size)]
+    fields = [
+      self._draw_arrays(draws_f1, self.field1_size, self.field1_max),
+      self._draw_arrays(draws_f2, self.field2_size, self.field2_max)
+    ]
+    targets = np.arange(lookback_draws, num_draws)
+    # Тираж i-1 и предыдущие для строки i
+    prev = targets - 1
+    blocks = []
 
-    # Предварительно вычисляем частоты для всех чисел
-    for i in range(lookback_draws, len(df_copy)):
-      # Собираем исторические данные
-      history_data = []
-      for j in range(1, min(lookback_draws + 1, i + 1)):
-        hist_f1 = df_copy.iloc[i - j]['Числа_Поле1_list']
-        hist_f2 = df_copy.iloc[i - j]['Числа_Поле2_list']
-        history_data.append((hist_f1, hist_f2))
+    # 1. Числа из последних тиражей (отсортированные)
+    for j in range(lookback_draws):
+      for numbers, sorted_numbers, counts in fields:
+        blocks.append(sorted_numbers[prev - j])
 
-      # Текущие числа для признаков
-      current_f1 = df_copy.iloc[i - 1]['Числа_Поле1_list']
-      current_f2 = df_copy.iloc[i - 1]['Числа_Поле2_list']
+    # 2. Частоты каждого числа за последние тиражи (окно = lookback)
+    for numbers, sorted_numbers, counts in fields:
+      prefix = np.vstack([np.zeros((1, counts.shape[1])), np.cumsum(counts, axis=0)])
+      blocks.append(prefix[targets] - prefix[targets - lookback_draws])
 
-      # Создаем вектор признаков
-      try:
-        features = self._create_feature_vector(current_f1, current_f2, history_data, df_copy.iloc[:i])
-        X_list.append(features)
-      except Exception as e:
-        print(f"AI Model (RF): Ошибка создания признаков для строки {i}: {e}")
-        continue
+    # 3. Количество тиражей с последнего выпадения каждого числа
+    for numbers, sorted_numbers, counts in fields:
+      seen_at = np.maximum.accumulate(np.where(counts > 0, np.arange(num_draws)[:, None], -1), axis=0)
+      distance = targets[:, None] - seen_at[prev]
+      blocks.append(np.where(distance == 1, 0, np.where(distance <= lookback_draws, distance, lookback_draws)))
 
-      # Целевые переменные - текущий тираж
-      curr_f1 = df_copy.iloc[i]['Числа_Поле1_list']
-      curr_f2 = df_copy.iloc[i]['Числа_Поле2_list']
+    # 4. Статистики последних тиражей (адаптивно)
+    for j in range(min(3, lookback_draws)):
+      rows = prev - j
+      (n1, s1, c1), (n2, s2, c2) = fields
+      blocks.append(np.column_stack([
+        n1[rows].sum(axis=1), n2[rows].sum(axis=1),
+        (n1[rows] % 2 == 0).sum(axis=1), (n2[rows] % 2 == 0).sum(axis=1),
+        s1[rows, -1] - s1[rows, 0], s2[rows, -1] - s2[rows, 0]
+      ]))
+      if self.field1_size >= 5:
+        blocks.append(np.column_stack([np.median(n1[rows], axis=1),
+                                       (c1[rows, :self.field1_max // 2] > 0).sum(axis=1)]))
+      if self.field2_size >= 3:
+        blocks.append(np.column_stack([np.median(n2[rows], axis=1),
+                                       (c2[rows, :self.field2_max // 2] > 0).sum(axis=1)]))
 
-      if (isinstance(curr_f1, list) and len(curr_f1) == self.field1_size and
-          isinstance(curr_f2, list) and len(curr_f2) == self.field2_size):
-        for pos in range(self.field1_size):
-          Y_f1_list[pos].append(curr_f1[pos])
-        for pos in range(self.field2_size):
-          Y_f2_list[pos].append(curr_f2[pos])
+    # 5. День недели (7 признаков) - используем текущее время
+    blocks.append(np.tile(np.eye(7)[datetime.now().weekday()], (len(targets), 1)))
 
-    if not X_list:
-      print("AI Model (RF): Не удалось сформировать ни одного набора признаков (X_list).")
-      return None, None, None
+    # 6. Дополнительные признаки для больших лотерей
+    if self.field1_max > 20:
+      n1, s1, c1 = fields[0]
+      # Анализ распределения по декадам
+      decades = np.zeros((len(targets), self.field1_max // 10 + 1))
+      for d in range(decades.shape[1]):
+        decades[:, d] = c1[prev, max(d * 10, 1) - 1:min(d * 10 + 9, self.field1_max)].sum(axis=1)
+      blocks.append(decades)
+      # Паттерны последовательности
+      blocks.append(self._max_consecutive(s1[prev])[:, None])
 
-    X = np.array(X_list)
-    Y_f1 = [np.array(y_pos) for y_pos in Y_f1_list]
-    Y_f2 = [np.array(y_pos) for y_pos in Y_f2_list]
+    X = np.hstack(blocks).astype(np.float32)
+    self._feature_vector_length = X.shape[1]
+
+    # Целевые переменные - текущий тираж
+    Y_f1 = [fields[0][0][targets, pos] for pos in range(self.field1_size)]
+    Y_f2 = [fields[1][0][targets, pos] for pos in range(self.field2_size)]
 
     print(f"AI Model (RF): Подготовлено {X.shape[0]} образцов с {X.shape[1]} признаками")
     print(f"AI Model (RF): Поле1: {self.field1_size} позиций x {self.field1_max} чисел")
@@ -344,6 +370,26 @@ class RFModel:
 
     return X, Y_f1, Y_f2
 
+  @staticmethod
+  def _draw_arrays(draws: List[List[int]], size: int, max_num: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Числа тиражей (как в списках), они же по возрастанию и частоты чисел 1..max_num"""
+    numbers = np.array(draws, dtype=np.int64).reshape(len(draws), size)
+    counts = np.zeros((len(draws), max_num + 2))
+    np.add.at(counts, (np.repeat(np.arange(len(draws)), size), np.clip(numbers, 0, max_num + 1).ravel()), 1)
+    return numbers, np.sort(numbers, axis=1), counts[:, 1:max_num + 1]
+
+  @staticmethod
+  def _max_consecutive(sorted_numbers: np.ndarray) -> np.ndarray:
+    """_count_consecutive для строк отсортированной матрицы (повторы не прерывают серию)"""
+    if sorted_numbers.shape[1] < 2:
+      return np.zeros(len(sorted_numbers))
+    streak = np.ones(len(sorted_numbers))
+    best = np.ones(len(sorted_numbers))
+    for step in np.diff(sorted_numbers, axis=1).T:
+      streak = np.where(step == 1, streak + 1, np.where(step == 0, streak, 1))
+      best = np.maximum(best, streak)
+    return best
+
   def train(self, df_history: pd.DataFrame):
     """
     Универсальное обучение Random Forest моделей на исторических данных.
@@ -390,11 +436,72 @@ class RFModel:
 
     if trained_at_least_one_model:
       self.is_trained = True
+      self.train_version += 1
       print(f"AI Model (RF): Обучение случайного леса завершено для {self.field1_size}+{self.field2_size} позиций.")
     else:
       self.is_trained = False
       print("AI Model (RF): Обучение случайного леса не удалось ни для одной из позиций из-за проблем с данными.")
 
+  def walk_forward_features(self, df_chrono: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Признаки всей истории для walk-forward валидации (считаются один раз)
+
+    Args:
+        df_chrono: История в хронологическом порядке (старые тиражи первыми)
+
+    Returns:
+        X, Y (числа позиций поля 1, затем поля 2), positions - хронологическая
+        позиция тиража-цели каждой строки, lookback - сколько предыдущих тиражей
+        нужно строке внутри окна обучения
+    """
+    # Те же правила отбора строк, что в _prepare_rf_data - позиции не сбиваются
+    valid = np.array([
+      isinstance(f1, list) and len(f1) == self.field1_size and isinstance(f2, list) and len(f2) == self.field2_size
+      for f1, f2 in zip(df_chrono['Числа_Поле1_list'], df_chrono['Числа_Поле2_list'])
+    ], dtype=bool)
+    kept = np.flatnonzero(valid)
+    lookback = 5
+
+    X, Y_f1, Y_f2 = self._prepare_rf_data(df_chrono.iloc[kept]) if len(kept) >= 2 * lookback else (None, None, None)
+    if X is None:
+      return {'X': np.zeros((0, 0)), 'Y': np.zeros((0, 0)), 'positions': np.zeros(0, dtype=np.int64), 'lookback': lookback}
+
+    return {'X': X, 'Y': np.column_stack(Y_f1 + Y_f2), 'positions': kept[lookback:], 'lookback': lookback}
+
+  def fit_features(self, X: np.ndarray, Y: np.ndarray, warm_start: Optional['RFModel'] = None) -> bool:
+    """
+    Обучение позиционных лесов на готовой матрице признаков
+
+    Леса обучаются заново: классы позиций меняются от окна к окну,
+    поэтому warm start sklearn здесь неприменим.
+    """
+    models = self.models_f1 + self.models_f2
+    classes = []
+    for i, model in enumerate(models):
+      if len(np.unique(Y[:, i])) > 1:
+        model.fit(X, Y[:, i])
+        classes.append(model.classes_)
+      else:
+        classes.append(np.array([]))
+
+    self._classes_f1 = classes[:self.field1_size]
+    self._classes_f2 = classes[self.field1_size:]
+    self._feature_vector_length = X.shape[1]
+    self.is_trained = any(len(c) for c in classes)
+    return self.is_trained
+
+  def predict_features(self, X: np.ndarray) -> List[Tuple[Optional[List[int]], Optional[List[int]]]]:
+    """Комбинации для каждой строки признаков (predict_proba - один вызов на позицию)"""
+    probabilities_f1 = self._position_probabilities(self.models_f1, X, '')
+    probabilities_f2 = self._position_probabilities(self.models_f2, X, ' поля 2')
+    return [
+      self._combination_from_probabilities(
+        [p[row] if p is not None else None for p in probabilities_f1],
+        [p[row] if p is not None else None for p in probabilities_f2]
+      )
+      for row in range(len(X))
+    ]
+
   async def train_async(self, df_history: pd.DataFrame):
     """
     Асинхронная обертка для универсального обучения Random Forest моделей.
@@ -507,87 +614,65 @@ class RFModel:
         print(f"AI Model (RF): Ошибка подготовки признаков: {e}")
         return None, None
 
-    # Генерация предсказаний для поля 1
-    predicted_f1 = []
-    available_numbers_f1 = list(range(1, self.field1_max + 1))
+    return self._combination_from_features(features)
 
-    for i in range(self.field1_size):
-      if hasattr(self.models_f1[i], 'classes_') and self.models_f1[i].classes_.size > 0:
+  def _combination_from_features(self, features: np.ndarray) -> Tuple[Optional[List[int]], Optional[List[int]]]:
+    """
+    Комбинация по вектору признаков (1, n_features): для каждой позиции -
+    самое вероятное еще не занятое число
+    """
+    probabilities_f1 = [row[0] if row is not None else None
+                        for row in self._position_probabilities(self.models_f1, features, '')]
+    probabilities_f2 = [row[0] if row is not None else None
+                        for row in self._position_probabilities(self.models_f2, features, ' поля 2')]
+    return self._combination_from_probabilities(probabilities_f1, probabilities_f2)
+
+  def _position_probabilities(self, models: List[RandomForestClassifier], features: np.ndarray,
+                              field_label: str) -> List[Optional[np.ndarray]]:
+    """Вероятности классов каждой позиции для всех строк признаков (None - позиция не обучена)"""
+    result = []
+    for i, model in enumerate(models):
+      if hasattr(model, 'classes_') and model.classes_.size > 0:
         try:
-          probabilities = self.models_f1[i].predict_proba(features)[0]
-          sorted_class_indices = np.argsort(probabilities)[::-1]
-          predicted_num_for_pos = None
-
-          for class_idx in sorted_class_indices:
-            num = int(self.models_f1[i].classes_[class_idx])
-            if num in available_numbers_f1:
-              predicted_num_for_pos = num
-              break
-
-          if predicted_num_for_pos is not None:
-            predicted_f1.append(predicted_num_for_pos)
-            available_numbers_f1.remove(predicted_num_for_pos)
-          else:
-            if available_numbers_f1:
-              fallback_num = random.choice(available_numbers_f1)
-              predicted_f1.append(fallback_num)
-              available_numbers_f1.remove(fallback_num)
+          result.append(model.predict_proba(features))
+          continue
         except Exception as e:
-          print(f"AI Model (RF): Ошибка предсказания для позиции {i}: {e}")
-          if available_numbers_f1:
-            fallback_num = random.choice(available_numbers_f1)
-            predicted_f1.append(fallback_num)
-            available_numbers_f1.remove(fallback_num)
-      else:
-        if available_numbers_f1:
-          fallback_num = random.choice(available_numbers_f1)
-          predicted_f1.append(fallback_num)
-          available_numbers_f1.remove(fallback_num)
+          print(f"AI Model (RF): Ошибка предсказания для позиции {i}{field_label}: {e}")
+      result.append(None)
+    return result
 
-    # Дополняем если не хватает
-    while len(predicted_f1) < self.field1_size and available_numbers_f1:
-      predicted_f1.append(available_numbers_f1.pop(random.randrange(len(available_numbers_f1))))
+  def _pick_field_numbers(self, models: List[RandomForestClassifier], probabilities: List[Optional[np.ndarray]],
+                          size: int, max_num: int) -> List[int]:
+    predicted = []
+    available_numbers = list(range(1, max_num + 1))
+
+    for model, position_probabilities in zip(models, probabilities):
+      predicted_num_for_pos = None
+      if position_probabilities is not None:
+        sorted_class_indices = np.argsort(position_probabilities)[::-1]
+        for class_idx in sorted_class_indices:
+          num = int(model.classes_[class_idx])
+          if num in available_numbers:
+            predicted_num_for_pos = num
+            break
+
+      if predicted_num_for_pos is None and available_numbers:
+        predicted_num_for_pos = random.choice(available_numbers)
+      if predicted_num_for_pos is not None:
+        predicted.append(predicted_num_for_pos)
+        available_numbers.remove(predicted_num_for_pos)
 
-    # Генерация предсказаний для поля 2
-    predicted_f2 = []
-    available_numbers_f2 = list(range(1, self.field2_max + 1))
+    # Дополняем если не хватает
+    while len(predicted) < size and available_numbers:
+      predicted.append(available_numbers.pop(random.randrange(len(available_numbers))))
 
-    for i in range(self.field2_size):
-      if hasattr(self.models_f2[i], 'classes_') and self.models_f2[i].classes_.size > 0:
-        try:
-          probabilities = self.models_f2[i].predict_proba(features)[0]
-          sorted_class_indices = np.argsort(probabilities)[::-1]
-          predicted_num_for_pos = None
-
-          for class_idx in sorted_class_indices:
-            num = int(self.models_f2[i].classes_[class_idx])
-            if num in available_numbers_f2:
-              predicted_num_for_pos = num
-              break
-
-          if predicted_num_for_pos is not None:
-            predicted_f2.append(predicted_num_for_pos)
-            available_numbers_f2.remove(predicted_num_for_pos)
-          else:
-            if available_numbers_f2:
-              fallback_num = random.choice(available_numbers_f2)
-              predicted_f2.append(fallback_num)
-              available_numbers_f2.remove(fallback_num)
-        except Exception as e:
-          print(f"AI Model (RF): Ошибка предсказания для позиции {i} поля 2: {e}")
-          if available_numbers_f2:
-            fallback_num = random.choice(available_numbers_f2)
-            predicted_f2.append(fallback_num)
-            available_numbers_f2.remove(fallback_num)
-      else:
-        if available_numbers_f2:
-          fallback_num = random.choice(available_numbers_f2)
-          predicted_f2.append(fallback_num)
-          available_numbers_f2.remove(fallback_num)
+    return predicted
 
-    # Дополняем если не хватает
-    while len(predicted_f2) < self.field2_size and available_numbers_f2:
-      predicted_f2.append(available_numbers_f2.pop(random.randrange(len(available_numbers_f2))))
+  def _combination_from_probabilities(self, probabilities_f1: List[Optional[np.ndarray]],
+                                      probabilities_f2: List[Optional[np.ndarray]]) -> Tuple[Optional[List[int]], Optional[List[int]]]:
+    """Комбинация по вероятностям классов позиций одной строки признаков"""
+    predicted_f1 = self._pick_field_numbers(self.models_f1, probabilities_f1, self.field1_size, self.field1_max)
+    predicted_f2 = self._pick_field_numbers(self.models_f2, probabilities_f2, self.field2_size, self.field2_max)
 
     # Финальная проверка перед возвратом
     if len(predicted_f1) != self.field1_size or len(predicted_f2) != self.field2_size:
@@ -1107,6 +1192,13 @@ class ModelManager:
       self._rf_models[lottery_type] = RFModel(lottery_config=lottery_config)
       return self._rf_models[lottery_type]
 
+  def set_rf_model(self, lottery_type: str, model: RFModel):
+    """
+    Устанавливает готовую RF модель лотереи (например, обученную в другом процессе).
+    """
+    with self._lock:
+      self._rf_models[lottery_type] = model
+
   def get_lstm_model(self, lottery_type: str, lottery_config: dict) -> LotteryLSTMOps:
     """
     Получает LSTM модель для указанной лотереи.
@@ -1284,6 +1376,11 @@ class GlobalModelProxy:
     model = self._get_cached_model()
     return model.is_trained if model else False
 
+  def invalidate(self):
+    """Сбрасывает ссылку на модель: следующий вызов возьмет ее из GLOBAL_MODEL_MANAGER"""
+    self._cached_model = None
+    self._cached_lottery = None
+
   def _get_cached_model(self):
     """Получает кэшированную модель для текущей лотереи"""
     from backend.app.core import data_manager
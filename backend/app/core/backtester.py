@@ -0,0 +1,305 @@
+# core/backtester.py
+"""
+Векторизованный бэктест билетов на истории тиражей.
+
+Билеты и тиражи кодируются битовыми масками (бит n - число n в поле),
+число совпадений - popcount от AND масок. Матрица совпадений
+(билеты x тиражи) отображается в выплаты через таблицу призовых категорий
+за один проход, а стратегии ставок применяются последовательным
+проходом по итогам тиражей.
+"""
+
+import logging
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.app.core.prize_probability import PrizeTable, build_prize_table
+
+logger = logging.getLogger(__name__)
+
+_FIBONACCI = np.array([1, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144], dtype=np.float64)
+
+BETTING_STRATEGIES = ('fixed', 'martingale', 'fibonacci', 'percentage', 'kelly')
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+  """Количество единичных битов в каждом элементе uint64 массива"""
+  values = np.asarray(values, dtype=np.uint64)
+  if hasattr(np, 'bitwise_count'):
+    return np.bitwise_count(values).astype(np.uint8)
+
+  # SWAR для numpy < 2.0
+  v = values - ((values >> np.uint64(1)) & np.uint64(0x5555555555555555))
+  v = (v & np.uint64(0x3333333333333333)) + ((v >> np.uint64(2)) & np.uint64(0x3333333333333333))
+  v = (v + (v >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+  return ((v * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.uint8)
+
+
+def numbers_to_bitmask(numbers: Sequence[Sequence[int]]) -> np.ndarray:
+  """
+  Кодирование наборов чисел в битовые маски.
+
+  Args:
+      numbers: Наборы чисел (одинаковой длины или списки разной длины); числа 1..63
+
+  Returns:
+      np.ndarray uint64 с маской для каждого набора
+  """
+  masks = np.zeros(len(numbers), dtype=np.uint64)
+  if len(numbers) == 0:
+    return masks
+
+  try:
+    arr = np.asarray(numbers, dtype=np.int64)
+  except ValueError:
+    arr = None
+
+  if arr is not None and arr.ndim == 2:
+    if arr.shape[1]:
+      bits = np.left_shift(np.uint64(1), arr.astype(np.uint64))
+      masks = np.bitwise_or.reduce(bits, axis=1)
+    return masks
+
+  # Неровные наборы (например, битые строки истории) - поштучно
+  for i, nums in enumerate(numbers):
+    mask = 0
+    for n in nums or []:
+      mask |= 1 << int(n)
+    masks[i] = mask
+  return masks
+
+
+class HistoricalBacktester:
+  """Бэктест наборов билетов по таблице призов лотереи"""
+
+  def __init__(self, config: Dict, prize_table: Optional[PrizeTable] = None):
+    """
+    Args:
+        config: Конфигурация лотереи (LOTTERY_CONFIGS)
+        prize_table: Готовая таблица призов (иначе строится по config)
+    """
+    self.config = config
+    self.prize_table = prize_table or build_prize_table(config)
+
+    # Выплата для пары (m1, m2); -1 в индексе категорий - без выигрыша
+    index = self.prize_table.category_index
+    self.payout_lookup = np.where(index >= 0, self.prize_table.payouts[np.maximum(index, 0)], 0.0)
+    self.category_lookup = index
+
+  def encode_tickets(self, combinations: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Маски билетов
+
+    Args:
+        combinations: Список (field1, field2, ...) или словарей {'field1', 'field2'}
+    """
+    field1, field2 = [], []
+    for combo in combinations:
+      if isinstance(combo, dict):
+        field1.append(combo['field1'])
+        field2.append(combo['field2'])
+      else:
+        field1.append(combo[0])
+        field2.append(combo[1])
+    return numbers_to_bitmask(field1), numbers_to_bitmask(field2)
+
+  def encode_draws(self, df_history: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """Маски тиражей истории (строки в порядке DataFrame)"""
+    return (numbers_to_bitmask(df_history['Числа_Поле1_list'].tolist()),
+            numbers_to_bitmask(df_history['Числа_Поле2_list'].tolist()))
+
+  def match_matrix(self, tickets: Tuple[np.ndarray, np.ndarray],
+                   draws: Tuple[np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Полная матрица совпадений (билеты x тиражи) для обоих полей
+
+    Returns:
+        (m1, m2) - uint8 матрицы формы (T, D)
+    """
+    m1 = popcount(tickets[0][:, None] & draws[0][None, :])
+    m2 = popcount(tickets[1][:, None] & draws[1][None, :])
+    return self._clip_matches(m1, m2)
+
+  def match_pairs(self, tickets: Tuple[np.ndarray, np.ndarray],
+                  draws: Tuple[np.ndarray, np.ndarray],
+                  draw_index: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Совпадения билета i только с тиражом draw_index[i]"""
+    m1 = popcount(tickets[0] & draws[0][draw_index])
+    m2 = popcount(tickets[1] & draws[1][draw_index])
+    return self._clip_matches(m1, m2)
+
+  def _clip_matches(self, m1: np.ndarray, m2: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Защита от некорректных строк истории с лишними числами
+    return (np.minimum(m1, self.payout_lookup.shape[0] - 1),
+            np.minimum(m2, self.payout_lookup.shape[1] - 1))
+
+  def payouts(self, m1: np.ndarray, m2: np.ndarray) -> np.ndarray:
+    """Выплаты по таблице призов для массивов совпадений любой формы"""
+    return self.payout_lookup[m1, m2]
+
+  def categories(self, m1: np.ndarray, m2: np.ndarray) -> np.ndarray:
+    """Индексы призовых категорий (-1 - без выигрыша)"""
+    return self.category_lookup[m1, m2]
+
+  def match_codes(self, m1: np.ndarray, m2: np.ndarray) -> np.ndarray:
+    """Код пары совпадений m1 * (field2_size + 1) + m2 - индекс в плоских таблицах"""
+    return m1 * np.uint8(self.payout_lookup.shape[1]) + m2
+
+  def backtest_portfolio(self, combinations: Sequence, df_history: pd.DataFrame,
+                         by_category: bool = False, chunk_size: int = 256) -> Dict:
+    """
+    Один набор билетов, сыгранный в каждом тираже истории
+
+    Матрица (билеты x тиражи) обрабатывается блоками по chunk_size билетов,
+    чтобы промежуточные массивы оставались в кэше.
+
+    Args:
+        combinations: Билеты
+        df_history: Тиражи
+        by_category: Считать число выигрышей по категориям (гистограмма кодов
+                     совпадений, заметно дороже остального прохода)
+        chunk_size: Билетов в блоке
+
+    Returns:
+        Словарь с выплатами по тиражам, выигрышами по билетам и категориям
+    """
+    tickets = self.encode_tickets(combinations)
+    draws = self.encode_draws(df_history)
+    n_tickets, n_draws = len(tickets[0]), len(draws[0])
+
+    flat_payouts = self.payout_lookup.ravel()
+    n_codes = flat_payouts.size
+
+    draw_payouts = np.zeros(n_draws)
+    draw_won = np.zeros(n_draws, dtype=bool)
+    ticket_payouts = np.zeros(n_tickets)
+    ticket_wins = np.zeros(n_tickets, dtype=np.int64)
+    code_counts = np.zeros(n_codes, dtype=np.int64)
+
+    for start in range(0, n_tickets, chunk_size):
+      block = slice(start, start + chunk_size)
+      m1, m2 = self.match_matrix((tickets[0][block], tickets[1][block]), draws)
+      codes = self.match_codes(m1, m2)
+
+      payouts = flat_payouts[codes]
+      won = payouts > 0
+      draw_payouts += payouts.sum(axis=0)
+      draw_won |= won.any(axis=0)
+      ticket_payouts[block] = payouts.sum(axis=1)
+      ticket_wins[block] = won.sum(axis=1)
+      if by_category:
+        code_counts += np.bincount(codes.ravel(), minlength=n_codes)
+
+    flat_categories = self.category_lookup.ravel()
+    category_counts = np.bincount(flat_categories[flat_categories >= 0],
+                                  weights=code_counts[flat_categories >= 0],
+                                  minlength=len(self.prize_table.categories))
+    return {
+      'draw_payouts': draw_payouts,
+      'draw_won': draw_won,
+      'ticket_payouts': ticket_payouts,
+      'ticket_wins': ticket_wins,
+      'wins_by_category': {
+        self.prize_table.categories[i].get('name'): int(c)
+        for i, c in enumerate(category_counts) if c > 0
+      }
+    }
+
+  def backtest_per_draw(self, combinations: Sequence, df_draws: pd.DataFrame,
+                        tickets_per_draw: int) -> Dict:
+    """
+    Свои билеты для каждого тиража: билеты [i*k, (i+1)*k) играют в тираже i
+
+    Returns:
+        Словарь с выплатами и признаком выигрыша по тиражам
+    """
+    n_draws = len(df_draws)
+    tickets = self.encode_tickets(combinations)
+    draw_index = np.repeat(np.arange(n_draws), tickets_per_draw)[:len(tickets[0])]
+
+    m1, m2 = self.match_pairs(tickets, self.encode_draws(df_draws), draw_index)
+    payouts = self.payouts(m1, m2)
+
+    return {
+      'draw_payouts': np.bincount(draw_index, weights=payouts, minlength=n_draws),
+      'draw_won': np.bincount(draw_index, weights=payouts > 0, minlength=n_draws) > 0
+    }
+
+
+def apply_betting_strategy(draw_payouts: np.ndarray, draw_won: np.ndarray,
+                           strategy: str, base_bet: float, initial_bankroll: float,
+                           tickets_per_draw: int = 1, ticket_price: Optional[float] = None,
+                           win_probability: float = 0.0, odds: float = 0.0) -> Dict[str, np.ndarray]:
+  """
+  Последовательное применение стратегии ставок к итогам тиражей
+
+  Выплаты draw_payouts рассчитаны на билеты цены ticket_price и
+  масштабируются отношением ставки к цене билета.
+
+  Args:
+      draw_payouts: Суммарная выплата билетов в каждом тираже
+      draw_won: Был ли выигрыш в тираже
+      strategy: fixed, martingale, fibonacci, percentage или kelly
+      base_bet: Базовая ставка на билет
+      initial_bankroll: Начальный банкролл
+      tickets_per_draw: Билетов в тираже
+      ticket_price: Цена билета, к которой относятся выплаты (по умолчанию base_bet)
+      win_probability: Вероятность выигрыша (для kelly)
+      odds: Коэффициент выплаты (для kelly)
+
+  Returns:
+      Массивы ставок, выигрышей и банкролла по сыгранным тиражам
+  """
+  from backend.app.core.bankroll_manager import BankrollManager
+
+  strategy = strategy.lower()
+  if strategy not in BETTING_STRATEGIES:
+    raise ValueError(f"Неизвестная стратегия ставок: {strategy}")
+
+  ticket_price = ticket_price or base_bet
+  n = len(draw_payouts)
+  bets = np.zeros(n)
+  prizes = np.zeros(n)
+  bankroll_history = np.zeros(n)
+
+  kelly_mgr = BankrollManager(initial_bankroll, base_bet) if strategy == 'kelly' else None
+
+  bankroll = float(initial_bankroll)
+  losses = 0
+  played = 0
+
+  for i in range(n):
+    if strategy == 'martingale':
+      bet = min(base_bet * (2 ** min(losses, 60)), bankroll * 0.5)
+    elif strategy == 'fibonacci':
+      bet = min(base_bet * _FIBONACCI[min(losses, len(_FIBONACCI) - 1)], bankroll * 0.3)
+    elif strategy == 'percentage':
+      bet = bankroll * 0.02
+    elif strategy == 'kelly':
+      kelly_mgr.current_bankroll = bankroll
+      bet = kelly_mgr.calculate_kelly_bet(win_probability, odds)
+    else:
+      bet = base_bet
+
+    bet = min(bet, bankroll)
+    prize = draw_payouts[i] * bet / ticket_price if ticket_price > 0 else 0.0
+    bankroll += prize - bet * tickets_per_draw
+
+    bets[i] = bet
+    prizes[i] = prize
+    bankroll_history[i] = bankroll
+    played = i + 1
+
+    losses = 0 if draw_won[i] else losses + 1
+
+    if bankroll <= 0:
+      break
+
+  return {
+    'bets': bets[:played],
+    'prizes': prizes[:played],
+    'won': np.asarray(draw_won[:played], dtype=bool),
+    'bankroll': bankroll_history[:played]
+  }
@@ -0,0 +1,206 @@
+# core/bankroll_simulator.py
+"""
+Векторизованная Монте-Карло симуляция банкролла.
+
+Все исходы билетов тянутся заранее одной матрицей (симуляции x тиражи)
+из точного распределения призов, после чего все траектории банкролла
+продвигаются синхронно по тиражам. Банкротство и серии проигрышей
+хранятся массивами-масками. Несколько наборов параметров стратегии
+(сетка) прогоняются на одних и тех же исходах - сравнение без шума
+разных выборок.
+"""
+
+import itertools
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from backend.app.core.prize_probability import PrizeTable
+
+logger = logging.getLogger(__name__)
+
+_FIBONACCI = np.array([1, 1, 2, 3, 5, 8, 13, 21, 34, 55], dtype=np.float64)
+_POWERS_OF_TWO = 2.0 ** np.arange(61)
+
+# Доля по умолчанию: четверть Келли / 2% банкролла
+DEFAULT_FRACTIONS = {'kelly': 0.25, 'percentage': 0.02}
+
+
+class VectorizedBankrollSimulator:
+  """Синхронная симуляция множества траекторий банкролла"""
+
+  def __init__(self, prize_table: PrizeTable, ticket_price: float, initial_bankroll: float):
+    """
+    Args:
+        prize_table: Точная таблица призов лотереи
+        ticket_price: Цена билета, к которой относятся выплаты таблицы
+        initial_bankroll: Начальный банкролл
+    """
+    self.prize_table = prize_table
+    self.ticket_price = float(ticket_price)
+    self.initial_bankroll = float(initial_bankroll)
+
+    # Исход 0..K-1 - категории, K - без выигрыша
+    self.outcome_payouts = np.append(prize_table.payouts, 0.0)
+    self._outcome_probs = np.append(prize_table.probabilities, max(0.0, 1.0 - prize_table.win_probability))
+    self._outcome_probs /= self._outcome_probs.sum()
+
+  def sample_outcomes(self, num_simulations: int, num_draws: int,
+                      rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Матрица исходов (симуляции x тиражи) - индексы категорий uint8"""
+    rng = rng or np.random.default_rng()
+    cdf = np.cumsum(self._outcome_probs)
+    cdf[-1] = 1.0
+    uniforms = rng.random((num_simulations, num_draws), dtype=np.float32)
+    return np.searchsorted(cdf, uniforms, side='right').astype(np.uint8)
+
+  def run(self, outcomes: np.ndarray, strategy: str,
+          base_bet, risk_level, fraction=None) -> Dict[str, np.ndarray]:
+    """
+    Прогон стратегии на заранее вытянутых исходах
+
+    base_bet, risk_level и fraction могут быть скалярами или массивами
+    одной длины G - тогда симулируются G наборов параметров сразу.
+
+    Args:
+        outcomes: Матрица исходов (S, D) из sample_outcomes
+        strategy: fixed, kelly, percentage, martingale или fibonacci
+        base_bet: Базовая ставка
+        risk_level: Максимальная доля банкролла на ставку
+        fraction: Доля Келли (kelly) или доля банкролла (percentage)
+
+    Returns:
+        Массивы (G, S): итоговый банкролл, число сыгранных тиражей и признак выживания
+    """
+    strategy = strategy.lower()
+    if fraction is None:
+      fraction = DEFAULT_FRACTIONS.get(strategy, 0.0)
+
+    base_bet, risk_level, fraction = np.broadcast_arrays(
+      np.atleast_1d(np.asarray(base_bet, dtype=np.float64)),
+      np.atleast_1d(np.asarray(risk_level, dtype=np.float64)),
+      np.atleast_1d(np.asarray(fraction, dtype=np.float64))
+    )
+    base_bet, risk_level, fraction = (a[:, None] for a in (base_bet, risk_level, fraction))
+
+    num_params = base_bet.shape[0]
+    num_sims, num_draws = outcomes.shape
+    shape = (num_params, num_sims)
+
+    bankroll = np.full(shape, self.initial_bankroll)
+    draws_played = np.zeros(shape, dtype=np.int64)
+    losses = np.zeros(shape, dtype=np.int64)
+    alive = np.ones(shape, dtype=bool)
+    positive = np.empty(shape, dtype=bool)
+
+    # Чистый результат ставки в 1 на исход: выплата / цена билета - 1
+    net_return = (self.outcome_payouts / self.ticket_price if self.ticket_price > 0
+                  else np.zeros_like(self.outcome_payouts)) - 1.0
+
+    kelly = self._kelly_fraction(fraction) if strategy == 'kelly' else None
+
+    # Тиражи по строкам - столбец исходов читается непрерывным блоком
+    outcomes_by_draw = np.ascontiguousarray(outcomes.T)
+
+    for draw_idx in range(num_draws):
+      net = net_return[outcomes_by_draw[draw_idx]]
+
+      bet = self._bet_size(strategy, bankroll, base_bet, fraction, losses, kelly)
+      np.minimum(bet, bankroll * risk_level, out=bet)
+      bet *= alive
+
+      bankroll += bet * net
+      draws_played += alive
+
+      # Серия проигрышей: +1 всем, обнуление у выигравших траекторий
+      losses += 1
+      losses *= net <= -1.0
+
+      np.greater(bankroll, 0, out=positive)
+      alive &= positive
+      if not alive.any():
+        break
+
+    return {
+      'final_bankroll': bankroll,
+      'draws_played': draws_played,
+      'survived': bankroll > 0
+    }
+
+  def _kelly_fraction(self, fraction: np.ndarray) -> np.ndarray:
+    """Доля Келли по точной вероятности выигрыша (как BankrollManager.calculate_kelly_bet)"""
+    p = self.prize_table.win_probability
+    odds = self.prize_table.average_prize / self.ticket_price if self.ticket_price > 0 else 0.0
+    b = odds - 1
+    if p <= 0 or p >= 1 or b <= 0:
+      return np.zeros_like(fraction)
+    return (b * p - (1 - p)) / b * fraction
+
+  @staticmethod
+  def _bet_size(strategy: str, bankroll: np.ndarray, base_bet: np.ndarray,
+                fraction: np.ndarray, losses: np.ndarray,
+                kelly: Optional[np.ndarray]) -> np.ndarray:
+    """Размер ставки для всех траекторий (правила BankrollManager.calculate_bet_size)"""
+    if strategy == 'kelly':
+      bet = np.maximum(base_bet, np.minimum(bankroll * kelly, bankroll * 0.1))
+      return np.where(kelly > 0, bet, base_bet)
+    if strategy == 'percentage':
+      return bankroll * fraction
+    if strategy == 'martingale':
+      return np.minimum(base_bet * _POWERS_OF_TWO[np.minimum(losses, len(_POWERS_OF_TWO) - 1)], bankroll * 0.5)
+    if strategy == 'fibonacci':
+      return np.minimum(base_bet * _FIBONACCI[np.minimum(losses, len(_FIBONACCI) - 1)], bankroll * 0.3)
+    return np.repeat(base_bet, bankroll.shape[1], axis=1)
+
+  def summarize(self, final_bankroll: np.ndarray) -> Dict[str, float]:
+    """Метрики одного набора параметров по итоговым банкроллам (S,)"""
+    var_95 = float(np.percentile(final_bankroll, 5))
+    tail = final_bankroll[final_bankroll <= var_95]
+    return {
+      'survival_rate': float(np.mean(final_bankroll > 0) * 100),
+      'profitability_rate': float(np.mean(final_bankroll > self.initial_bankroll) * 100),
+      'avg_final_bankroll': float(np.mean(final_bankroll)),
+      'median_final_bankroll': float(np.median(final_bankroll)),
+      'best_result': float(np.max(final_bankroll)),
+      'worst_result': float(np.min(final_bankroll)),
+      'var_95': var_95,
+      'cvar_95': float(np.mean(tail)) if len(tail) else var_95
+    }
+
+  def grid_search(self, outcomes: np.ndarray, strategy: str,
+                  base_bets: Sequence[float], risk_levels: Sequence[float],
+                  fractions: Optional[Sequence[float]] = None) -> List[Dict]:
+    """
+    Перебор сетки параметров стратегии на общих исходах
+
+    Returns:
+        Список результатов, отсортированный по медианному итоговому банкроллу
+        среди вариантов с выживаемостью не ниже 95% (затем остальные)
+    """
+    strategy = strategy.lower()
+
+    # Параметры, которые стратегия не использует, в сетку не размножаются
+    if not fractions or strategy not in DEFAULT_FRACTIONS:
+      fractions = [DEFAULT_FRACTIONS.get(strategy, 0.0)]
+    if strategy == 'percentage':
+      base_bets = list(base_bets)[:1]
+    grid = list(itertools.product(base_bets, risk_levels, fractions))
+    if not grid:
+      return []
+
+    params = np.array(grid, dtype=np.float64)
+    paths = self.run(outcomes, strategy, params[:, 0], params[:, 1], params[:, 2])
+
+    results = []
+    for idx, (base_bet, risk_level, fraction) in enumerate(grid):
+      metrics = self.summarize(paths['final_bankroll'][idx])
+      results.append({
+        'base_bet': float(base_bet),
+        'risk_level': float(risk_level),
+        'fraction': float(fraction),
+        **metrics
+      })
+
+    results.sort(key=lambda r: (r['survival_rate'] >= 95, r['median_final_bankroll']), reverse=True)
+    return results
@@ -7,10 +7,12 @@ from .dirichlet_model import DirichletMultinomialModel
 from .prior_posterior import PriorPosteriorManager
 from .bayesian_updater import BayesianUpdater
 from .cdm_generator import CDMGenerator
+from .cdm_registry import CDMRegistry
 
 __all__ = [
     'DirichletMultinomialModel',
     'PriorPosteriorManager',
     'BayesianUpdater',
-    'CDMGenerator'
+    'CDMGenerator',
+    'CDMRegistry'
 ]
\ No newline at end of file
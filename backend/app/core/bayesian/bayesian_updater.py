@@ -10,7 +10,7 @@ from collections import deque
 import logging
 
 from .prior_posterior import PriorPosteriorManager
-from .dirichlet_model import DirichletMultinomialModel
+from .dirichlet_model import DirichletMultinomialModel, gumbel_top_k
 
 logger = logging.getLogger(__name__)
 
@@ -101,12 +101,14 @@ class BayesianUpdater:
     # Обновление модели field1
     field1_data = self._extract_field_data(historical_data, 'field1')
     if field1_data is not None:
+      # Преобразование в индексы 0-based (как в update_incremental)
+      field1_data = field1_data - 1
+
       # Обновление CDM модели
       cdm_metrics = self.field_models['field1'].fit(field1_data)
 
       # Обновление Prior/Posterior менеджера
-      flattened_data = field1_data.flatten() - 1  # Преобразование в индексы 0-based
-      self.prior_managers['field1'].update_posterior(flattened_data)
+      self.prior_managers['field1'].update_posterior(field1_data.flatten())
 
       metrics['field1'] = {
         **cdm_metrics,
@@ -117,10 +119,10 @@ class BayesianUpdater:
     if 'field2' in self.field_models:
       field2_data = self._extract_field_data(historical_data, 'field2')
       if field2_data is not None:
+        field2_data = field2_data - 1
         cdm_metrics = self.field_models['field2'].fit(field2_data)
 
-        flattened_data = field2_data.flatten() - 1
-        self.prior_managers['field2'].update_posterior(flattened_data)
+        self.prior_managers['field2'].update_posterior(field2_data.flatten())
 
         metrics['field2'] = {
           **cdm_metrics,
@@ -161,7 +163,8 @@ class BayesianUpdater:
         # Применяем затухание к старым наблюдениям
         self.prior_managers['field1'].posterior_alpha *= self.decay_factor
 
-      self.prior_managers['field1'].update_posterior(field1_array)
+      # Частоты тиража добавляются к накопленному апостериорному - O(field_max)
+      self.prior_managers['field1'].add_observations(field1_array)
 
       metrics['field1'] = {
         **cdm_metrics,
@@ -177,7 +180,7 @@ class BayesianUpdater:
       if self.decay_factor < 1.0:
         self.prior_managers['field2'].posterior_alpha *= self.decay_factor
 
-      self.prior_managers['field2'].update_posterior(field2_array)
+      self.prior_managers['field2'].add_observations(field2_array)
 
       metrics['field2'] = {
         **cdm_metrics,
@@ -192,72 +195,53 @@ class BayesianUpdater:
 
     return metrics
 
-  def get_predictions(self, n_predictions: int = 5) -> List[Dict]:
+  def get_predictions(self, n_predictions: int = 5, alternate: bool = True) -> List[Dict]:
     """
     Получение предсказаний на основе текущего состояния
 
+    Все комбинации генерируются пакетно: четные - сэмплированием CDM,
+    нечетные - выборкой из апостериорного среднего (Gumbel-top-k).
+
     Args:
         n_predictions: Количество предсказаний
+        alternate: False - все комбинации из сэмплирования CDM
 
     Returns:
         Список предсказанных комбинаций
     """
-    predictions = []
-
-    for i in range(n_predictions):
-      prediction = {
-        'field1': [],
-        'field2': [],
-        'confidence': 0.0,
-        'method': 'bayesian_cdm'
-      }
-
-      # Предсказание field1
-      # Комбинируем предсказания CDM и Prior/Posterior
-      cdm_pred = self.field_models['field1'].predict_next_draw(1, method='sampling')[0]
-
-      # Получаем вероятности из Prior/Posterior
-      posterior_probs = self.prior_managers['field1'].get_posterior_mean()
-
-      # Взвешенное комбинирование
-      if i % 2 == 0:
-        # Четные - используем CDM
-        prediction['field1'] = (cdm_pred + 1).tolist()  # Обратно к 1-based
-      else:
-        # Нечетные - сэмплируем из posterior
-        sampled = np.random.choice(
-          len(posterior_probs),
-          size=self.config['field1_size'],
-          replace=False,
-          p=posterior_probs
+    if n_predictions <= 0:
+      return []
+
+    fields = ['field1'] + (['field2'] if 'field2' in self.field_models else [])
+    use_cdm = np.arange(n_predictions) % 2 == 0 if alternate else np.ones(n_predictions, dtype=bool)
+    n_cdm = int(use_cdm.sum())
+
+    sampled = {}
+    for field in fields:
+      combos = np.empty((n_predictions, self.config[f'{field}_size']), dtype=np.int64)
+      if n_cdm:
+        combos[use_cdm] = self.field_models[field].sample_draws(n_cdm, method='sampling')
+      if n_cdm < n_predictions:
+        posterior_probs = self.prior_managers[field].get_posterior_mean()
+        combos[~use_cdm] = gumbel_top_k(
+          np.broadcast_to(np.log(posterior_probs), (n_predictions - n_cdm, len(posterior_probs))),
+          self.config[f'{field}_size']
         )
-        prediction['field1'] = sorted((sampled + 1).tolist())
-
-      # Предсказание field2
-      if 'field2' in self.field_models:
-        if i % 2 == 0:
-          cdm_pred_2 = self.field_models['field2'].predict_next_draw(1, method='sampling')[0]
-          prediction['field2'] = (cdm_pred_2 + 1).tolist()
-        else:
-          posterior_probs_2 = self.prior_managers['field2'].get_posterior_mean()
-          sampled_2 = np.random.choice(
-            len(posterior_probs_2),
-            size=self.config['field2_size'],
-            replace=False,
-            p=posterior_probs_2
-          )
-          prediction['field2'] = sorted((sampled_2 + 1).tolist())
-
-      # Оценка уверенности на основе энтропии
-      entropy = self.prior_managers['field1'].calculate_entropy()
-      max_entropy = np.log(self.config['field1_max'])  # Максимальная энтропия
-
-      # Чем меньше энтропия, тем выше уверенность
-      prediction['confidence'] = max(0.3, min(0.8, 1.0 - entropy / max_entropy))
-
-      predictions.append(prediction)
-
-    return predictions
+      sampled[field] = (combos + 1).tolist()  # Обратно к 1-based
+
+    # Оценка уверенности на основе энтропии (одна на все предсказания)
+    entropy = self.prior_managers['field1'].calculate_entropy()
+    max_entropy = np.log(self.config['field1_max'])  # Максимальная энтропия
+
+    # Чем меньше энтропия, тем выше уверенность
+    confidence = max(0.3, min(0.8, 1.0 - entropy / max_entropy))
+
+    return [{
+      'field1': sampled['field1'][i],
+      'field2': sampled['field2'][i] if 'field2' in sampled else [],
+      'confidence': confidence,
+      'method': 'bayesian_cdm'
+    } for i in range(n_predictions)]
 
   def get_probability_distribution(self, field: str = 'field1') -> Dict:
     """
@@ -323,7 +307,13 @@ class BayesianUpdater:
     field_columns = [col for col in df.columns if col.startswith(field)]
 
     if not field_columns:
-      return None
+      # Формат fetch_draws_from_db: списки чисел в 'Числа_Поле{N}_list'
+      list_column = f"Числа_Поле{field[-1]}_list"
+      size = self.config[f'{field}_size']
+      if list_column not in df.columns:
+        return None
+      rows = [r for r in df[list_column] if isinstance(r, (list, tuple)) and len(r) == size]
+      return np.array(rows, dtype=np.int64).reshape(len(rows), size) if rows else None
 
     data = df[field_columns].values
     return data
@@ -368,6 +358,34 @@ class BayesianUpdater:
       'mean_likelihood': float(np.mean(likelihoods)) if likelihoods else 0.0
     }
 
+  def get_state(self) -> Dict:
+    """Состояние всех моделей полей для снапшота"""
+    return {
+      'update_count': self.update_count,
+      'observation_window': list(self.observation_window),
+      'fields': {
+        field: {
+          'cdm': self.field_models[field].get_state(),
+          # История обновлений posterior растет с каждым тиражом - в снапшот идет хвост
+          'posterior': {**self.prior_managers[field].get_state(),
+                        'update_history': self.prior_managers[field].update_history[-self.window_size:]}
+        }
+        for field in self.field_models
+      }
+    }
+
+  def set_state(self, state: Dict):
+    """Восстановление из get_state"""
+    for field, field_state in state.get('fields', {}).items():
+      if field not in self.field_models:
+        continue
+      self.field_models[field].set_state(field_state['cdm'])
+      self.prior_managers[field].set_state(field_state['posterior'])
+
+    self.update_count = state.get('update_count', 0)
+    self.observation_window.clear()
+    self.observation_window.extend(state.get('observation_window', []))
+
   def reset(self):
     """Сброс всех моделей к начальному состоянию"""
     self._initialize_models()
@@ -8,6 +8,7 @@ from typing import Dict, List, Optional
 import logging
 
 from .bayesian_updater import BayesianUpdater
+from ..backtester import HistoricalBacktester, numbers_to_bitmask
 from .dirichlet_model import DirichletMultinomialModel
 
 logger = logging.getLogger(__name__)
@@ -32,6 +33,8 @@ class CDMGenerator:
     )
     self.is_trained = False
     self.training_metrics = {}
+    # Номер последнего учтенного тиража - защита от повторного применения
+    self.last_draw_number: Optional[int] = None
 
     logger.info(f"CDM генератор инициализирован для лотереи {config.get('name', 'unknown')}")
 
@@ -53,16 +56,17 @@ class CDMGenerator:
     # Кросс-валидация для оценки качества
     if len(df) >= 50:
       # Извлекаем данные field1 для валидации
-      field1_cols = [col for col in df.columns if col.startswith('field1_')]
-      if field1_cols:
-        field1_data = df[field1_cols].values
+      field1_data = self.updater._extract_field_data(df, 'field1')
+      if field1_data is not None:
         cv_metrics = self.updater.field_models['field1'].cross_validate(
-          field1_data, folds=min(5, len(df) // 10)
+          field1_data - 1, folds=min(5, len(df) // 10)
         )
         metrics['cross_validation'] = cv_metrics
 
     self.is_trained = True
     self.training_metrics = metrics
+    if 'Тираж' in df.columns and len(df):
+      self.last_draw_number = int(df['Тираж'].max())
 
     logger.info(f"Обучение завершено. Энтропия field1: "
                 f"{metrics.get('field1', {}).get('entropy', 'N/A'):.3f}")
@@ -85,26 +89,20 @@ class CDMGenerator:
 
     logger.info(f"Генерация {count} комбинаций со стратегией '{strategy}'")
 
-    combinations = []
+    # Все комбинации сэмплируются из CDM одним пакетом
+    combinations = self.updater.get_predictions(count, alternate=False)
+    context = self._bayesian_context()
 
-    for i in range(count):
-      # Выбор метода для этой комбинации
+    for i, combination in enumerate(combinations):
+      # Метод, назначенный этой комбинации
       if strategy == 'mixed':
         # Чередуем методы
         methods = ['sampling', 'map', 'mean']
-        method = methods[i % len(methods)]
+        combination['strategy'] = methods[i % len(methods)]
       else:
-        method = strategy
+        combination['strategy'] = strategy
 
-      # Генерация через байесовский обновитель
-      predictions = self.updater.get_predictions(1)
-      combination = predictions[0]
-
-      # Добавление дополнительной информации
-      combination['strategy'] = method
-      combination['bayesian_info'] = self._get_bayesian_info(combination)
-
-      combinations.append(combination)
+      combination['bayesian_info'] = self._get_bayesian_info(combination, context)
 
     # Сортировка по уверенности
     combinations.sort(key=lambda x: x['confidence'], reverse=True)
@@ -125,12 +123,32 @@ class CDMGenerator:
 
     metrics = self.updater.update_incremental(new_draw)
 
+    if new_draw.get('draw_number') is not None:
+      self.last_draw_number = int(new_draw['draw_number'])
+
     # Обновление статуса обученности
     if self.updater.update_count >= 10:
       self.is_trained = True
 
     return metrics
 
+  def get_state(self) -> Dict:
+    """Снапшот генератора: апостериорные параметры обоих полей и статус обучения"""
+    return {
+      'lottery': self.config.get('name'),
+      'is_trained': self.is_trained,
+      'last_draw_number': self.last_draw_number,
+      'training_metrics': self.training_metrics,
+      'updater': self.updater.get_state()
+    }
+
+  def set_state(self, state: Dict):
+    """Восстановление генератора из get_state без повторного обучения"""
+    self.updater.set_state(state['updater'])
+    self.is_trained = state.get('is_trained', False)
+    self.last_draw_number = state.get('last_draw_number')
+    self.training_metrics = state.get('training_metrics', {})
+
   def get_probability_analysis(self) -> Dict:
     """
     Получение полного анализа вероятностей
@@ -222,132 +240,130 @@ class CDMGenerator:
     return analysis
 
   def simulate_performance(self, test_data: pd.DataFrame,
-                           n_simulations: int = 100) -> Dict:
+                           n_simulations: int = 100,
+                           ticket_price: float = 100.0,
+                           chunk_tickets: int = 200_000) -> Dict:
     """
     Симуляция производительности модели на тестовых данных
 
+    Предсказания для n_simulations x n_test_draws сэмплируются пакетами
+    из апостериорного распределения (не более chunk_tickets билетов в пакете),
+    совпадения считаются битовыми масками, выигрыш - по точной таблице
+    призов лотереи. По пакетам накапливаются только итоги каждой симуляции.
+
     Args:
         test_data: Тестовые тиражи
         n_simulations: Количество симуляций
+        ticket_price: Стоимость билета
+        chunk_tickets: Максимум билетов в одном пакете сэмплирования
 
     Returns:
         Результаты симуляции
     """
     if not self.is_trained:
       raise ValueError("Модель не обучена")
+    if test_data.empty:
+      raise ValueError("Нет тестовых тиражей")
+    if n_simulations < 1:
+      raise ValueError("Количество симуляций должно быть положительным")
 
     logger.info(f"Симуляция производительности на {len(test_data)} тиражах")
 
-    results = {
-      'hits': [],
-      'partial_hits': [],
-      'roi': []
+    n_draws = len(test_data)
+    f1_size = self.config['field1_size']
+
+    backtester = HistoricalBacktester(self.config)
+    draws = (numbers_to_bitmask(self._draw_numbers(test_data, 'field1')),
+             numbers_to_bitmask(self._draw_numbers(test_data, 'field2')))
+
+    models = self.updater.field_models
+    chunk_size = max(1, chunk_tickets // n_draws)
+
+    # Итоги по симуляциям: выплаты, частичные попадания, выигрышные билеты
+    total_payouts = np.zeros(n_simulations)
+    partial_hits = np.zeros(n_simulations)
+    winning_tickets = np.zeros(n_simulations)
+    hits_sum = np.zeros(f1_size + 1)
+
+    for start in range(0, n_simulations, chunk_size):
+      n_chunk = min(chunk_size, n_simulations - start)
+      total = n_chunk * n_draws
+
+      # Предсказание для каждого (симуляция, тираж) - как generate(1): сэмплирование CDM
+      predicted_f1 = models['field1'].sample_draws(total, method='sampling') + 1
+      predicted_f2 = (models['field2'].sample_draws(total, method='sampling') + 1
+                      if 'field2' in models else np.zeros((total, 0), dtype=np.int64))
+      tickets = (numbers_to_bitmask(predicted_f1), numbers_to_bitmask(predicted_f2))
+
+      draw_index = np.tile(np.arange(n_draws), n_chunk)
+      m1, m2 = backtester.match_pairs(tickets, draws, draw_index)
+      m1 = m1.reshape(n_chunk, n_draws)
+      payouts = backtester.payouts(m1, m2.reshape(n_chunk, n_draws))
+
+      # Распределение попаданий поля 1 по каждой симуляции; частичные попадания - от 3 чисел
+      hits = (m1[:, :, None] == np.arange(f1_size + 1)).sum(axis=1)
+      chunk = slice(start, start + n_chunk)
+      total_payouts[chunk] = payouts.sum(axis=1)
+      partial_hits[chunk] = hits[:, 3:].sum(axis=1)
+      winning_tickets[chunk] = (payouts > 0).sum(axis=1)
+      hits_sum += hits.sum(axis=0)
+
+    total_cost = n_draws * ticket_price
+    roi = (total_payouts - total_cost) / total_cost * 100 if total_cost > 0 else np.zeros(n_simulations)
+
+    return {
+      'mean_roi': float(np.mean(roi)),
+      'std_roi': float(np.std(roi)),
+      'mean_partial_hits': float(np.mean(partial_hits)),
+      'mean_winning_tickets': float(np.mean(winning_tickets)),
+      'hit_distribution': {i: float(v) for i, v in enumerate(hits_sum / n_simulations)}
     }
 
-    for _ in range(n_simulations):
-      total_cost = 0
-      total_wins = 0
-      hits_distribution = {i: 0 for i in range(self.config['field1_size'] + 1)}
-
-      for _, actual_draw in test_data.iterrows():
-        # Генерация предсказания
-        prediction = self.generate(1)[0]
-
-        # Подсчет попаданий
-        actual_field1 = set()
-        for i in range(1, self.config['field1_size'] + 1):
-          col_name = f'field1_{i}'
-          if col_name in actual_draw:
-            actual_field1.add(actual_draw[col_name])
-
-        predicted_field1 = set(prediction['field1'])
-        hits = len(actual_field1 & predicted_field1)
-
-        hits_distribution[hits] += 1
-
-        # Расчет выигрыша (упрощенный)
-        total_cost += 1  # Стоимость билета
-        if hits >= 3:  # Минимальный выигрыш
-          win_amount = self._calculate_win(hits)
-          total_wins += win_amount
-
-      results['hits'].append(hits_distribution)
-      results['partial_hits'].append(
-        sum(hits_distribution[i] for i in range(3, self.config['field1_size'] + 1))
-      )
-      results['roi'].append((total_wins - total_cost) / total_cost * 100)
-
-    # Агрегация результатов
-    aggregated = {
-      'mean_roi': float(np.mean(results['roi'])),
-      'std_roi': float(np.std(results['roi'])),
-      'mean_partial_hits': float(np.mean(results['partial_hits'])),
-      'hit_distribution': {}
-    }
+  def _draw_numbers(self, df: pd.DataFrame, field: str) -> List[List[int]]:
+    """Номера поля для каждого тиража: списки 'Числа_ПолеN_list' или колонки 'fieldN_i'"""
+    list_column = f"Числа_Поле{field[-1]}_list"
+    if list_column in df.columns:
+      return [list(r) if isinstance(r, (list, tuple)) else [] for r in df[list_column]]
 
-    # Усредненное распределение попаданий
-    for i in range(self.config['field1_size'] + 1):
-      aggregated['hit_distribution'][i] = float(
-        np.mean([h[i] for h in results['hits']])
-      )
+    columns = [f'{field}_{i}' for i in range(1, self.config.get(f'{field}_size', 0) + 1)]
+    columns = [c for c in columns if c in df.columns]
+    return df[columns].astype(int).values.tolist() if columns else [[] for _ in range(len(df))]
 
-    return aggregated
+  def _bayesian_context(self) -> Dict:
+    """Общие для всех комбинаций характеристики апостериорного распределения"""
+    manager = self.updater.prior_managers['field1']
+    return {
+      'probs': manager.get_posterior_mean(),
+      'entropy': manager.calculate_entropy(),
+      'effective_sample_size': float(manager.posterior_alpha.sum() - len(manager.posterior_alpha))
+    }
 
-  def _get_bayesian_info(self, combination: Dict) -> Dict:
+  def _get_bayesian_info(self, combination: Dict, context: Optional[Dict] = None) -> Dict:
     """
     Получение байесовской информации для комбинации
 
     Args:
         combination: Сгенерированная комбинация
+        context: Результат _bayesian_context (считается заново, если не передан)
 
     Returns:
         Байесовская информация
     """
-    info = {}
+    context = context or self._bayesian_context()
 
     # Вероятности для чисел в комбинации
-    field1_probs = []
-    manager = self.updater.prior_managers['field1']
-    probs = manager.get_posterior_mean()
-
-    for number in combination['field1']:
-      prob = probs[number - 1]
-      field1_probs.append(float(prob))
-
-    info['field1_probabilities'] = field1_probs
-    info['field1_mean_probability'] = float(np.mean(field1_probs))
-    info['field1_joint_probability'] = float(np.prod(field1_probs))
-
-    # Энтропия
-    info['model_entropy'] = manager.calculate_entropy()
-
-    # Эффективный размер выборки
-    info['effective_sample_size'] = float(
-      manager.posterior_alpha.sum() - len(manager.posterior_alpha)
-    )
-
-    return info
-
-  def _calculate_win(self, hits: int) -> float:
-    """
-    Упрощенный расчет выигрыша
-
-    Args:
-        hits: Количество угаданных чисел
-
-    Returns:
-        Сумма выигрыша
-    """
-    # Упрощенная таблица выигрышей
-    win_table = {
-      3: 10,
-      4: 100,
-      5: 1000,
-      6: 10000
+    field1_probs = context['probs'][np.asarray(combination['field1']) - 1]
+
+    return {
+      'field1_probabilities': field1_probs.tolist(),
+      'field1_mean_probability': float(np.mean(field1_probs)),
+      'field1_joint_probability': float(np.prod(field1_probs)),
+      # Энтропия
+      'model_entropy': context['entropy'],
+      # Эффективный размер выборки
+      'effective_sample_size': context['effective_sample_size']
     }
 
-    return win_table.get(hits, 0)
-
   def _assess_convergence(self) -> str:
     """
     Оценка сходимости модели
@@ -0,0 +1,204 @@
+"""
+Реестр живых CDM генераторов
+
+Держит по одному генератору на лотерею, принимает новые тиражи из пути
+загрузки данных (инкрементальное O(field_max) обновление апостериорного)
+и сохраняет состояние на диск после каждого обновления - при старте
+сервера модели восстанавливаются из снапшотов без полного train().
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .cdm_generator import CDMGenerator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_DIR = os.path.join('backend', 'models', 'bayesian')
+
+
+def _json_default(value):
+  """numpy-скаляры и массивы в метриках обучения"""
+  if hasattr(value, 'tolist'):
+    return value.tolist()
+  return str(value)
+
+
+class CDMRegistry:
+  """Живые CDM генераторы по типам лотерей со снапшотами на диске"""
+
+  def __init__(self, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR):
+    """
+    Args:
+        snapshot_dir: Каталог снапшотов ({lottery}_cdm.json)
+    """
+    self.snapshot_dir = snapshot_dir
+    self.generators: Dict[str, CDMGenerator] = {}
+    self._locks: Dict[str, threading.RLock] = {}
+    self._registry_lock = threading.Lock()
+
+  def _lock(self, lottery_type: str) -> threading.RLock:
+    with self._registry_lock:
+      if lottery_type not in self._locks:
+        self._locks[lottery_type] = threading.RLock()
+      return self._locks[lottery_type]
+
+  def snapshot_path(self, lottery_type: str) -> str:
+    return os.path.join(self.snapshot_dir, f"{lottery_type}_cdm.json")
+
+  def get_or_create(self, lottery_type: str) -> CDMGenerator:
+    """Получить генератор; новый восстанавливается из снапшота, если он есть"""
+    with self._lock(lottery_type):
+      if lottery_type not in self.generators:
+        from backend.app.core.data_manager import LOTTERY_CONFIGS
+        config = LOTTERY_CONFIGS.get(lottery_type)
+        if not config:
+          raise ValueError(f"Неизвестный тип лотереи: {lottery_type}")
+        generator = CDMGenerator(config)
+        self._load_snapshot(lottery_type, generator)
+        self.generators[lottery_type] = generator
+      return self.generators[lottery_type]
+
+  def train(self, lottery_type: str, df: pd.DataFrame) -> Dict:
+    """Полное обучение генератора с сохранением снапшота"""
+    generator = self.get_or_create(lottery_type)
+    with self._lock(lottery_type):
+      metrics = generator.train(df)
+      self.save_snapshot(lottery_type)
+    return metrics
+
+  def update(self, lottery_type: str, new_draw: Dict) -> Dict:
+    """Ручное инкрементальное обновление одним тиражом с сохранением снапшота"""
+    generator = self.get_or_create(lottery_type)
+    with self._lock(lottery_type):
+      metrics = generator.update_with_new_draw(new_draw)
+      self.save_snapshot(lottery_type)
+    return metrics
+
+  def on_new_draws(self, lottery_type: str, draws: Iterable[Dict]) -> int:
+    """
+    Применение новых тиражей к живому генератору лотереи
+
+    Необученные и еще не созданные генераторы пропускаются - они получат
+    эти тиражи при полном обучении. Тиражи с номером не больше уже
+    учтенного игнорируются.
+
+    Args:
+        lottery_type: Тип лотереи
+        draws: Тиражи {'draw_number', 'field1', 'field2'} в порядке номеров
+
+    Returns:
+        Число примененных тиражей
+    """
+    generator = self.generators.get(lottery_type)
+    if generator is None or not generator.is_trained:
+      return 0
+
+    applied = 0
+    with self._lock(lottery_type):
+      for draw in sorted(draws, key=lambda d: d['draw_number']):
+        if generator.last_draw_number is not None and draw['draw_number'] <= generator.last_draw_number:
+          continue
+        generator.update_with_new_draw({
+          'draw_number': int(draw['draw_number']),
+          'field1': [int(n) for n in draw['field1']],
+          'field2': [int(n) for n in draw.get('field2') or []]
+        })
+        applied += 1
+
+      if applied:
+        self.save_snapshot(lottery_type)
+
+    if applied:
+      logger.info(f"CDM {lottery_type}: применено новых тиражей {applied}")
+    return applied
+
+  def catch_up(self, lottery_type: str, df: pd.DataFrame) -> int:
+    """Догоняющее обновление тиражами истории, появившимися после снапшота"""
+    generator = self.generators.get(lottery_type)
+    if generator is None or df is None or df.empty or generator.last_draw_number is None:
+      return 0
+
+    fresh = df[df['Тираж'] > generator.last_draw_number]
+    draws = [
+      {'draw_number': int(row['Тираж']),
+       'field1': row['Числа_Поле1_list'],
+       'field2': row.get('Числа_Поле2_list') or []}
+      for _, row in fresh.iterrows()
+    ]
+    return self.on_new_draws(lottery_type, draws)
+
+  def save_snapshot(self, lottery_type: str) -> Optional[str]:
+    """Атомарная запись состояния генератора (временный файл + os.replace)"""
+    generator = self.generators.get(lottery_type)
+    if generator is None or not generator.is_trained:
+      return None
+
+    path = self.snapshot_path(lottery_type)
+    try:
+      os.makedirs(self.snapshot_dir, exist_ok=True)
+      with self._lock(lottery_type):
+        state = generator.get_state()
+        fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_dir, suffix='.tmp')
+        try:
+          with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f, default=_json_default)
+          os.replace(tmp_path, path)
+        except Exception:
+          if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+          raise
+      return path
+    except Exception as e:
+      logger.error(f"Ошибка сохранения снапшота CDM {lottery_type}: {e}")
+      return None
+
+  def _load_snapshot(self, lottery_type: str, generator: CDMGenerator) -> bool:
+    path = self.snapshot_path(lottery_type)
+    if not os.path.exists(path):
+      return False
+    try:
+      with open(path, 'r', encoding='utf-8') as f:
+        generator.set_state(json.load(f))
+      logger.info(f"CDM {lottery_type} восстановлен из снапшота (тираж {generator.last_draw_number})")
+      return True
+    except Exception as e:
+      logger.error(f"Снапшот CDM {lottery_type} не загружен: {e}")
+      return False
+
+  def restore_all(self) -> List[str]:
+    """
+    Восстановление генераторов всех лотерей, для которых есть снапшот,
+    с догоняющим обновлением тиражами, загруженными пока сервер был остановлен
+
+    Returns:
+        Список восстановленных лотерей
+    """
+    from backend.app.core import data_manager
+    from backend.app.core.lottery_context import LotteryContext
+
+    restored = []
+    for lottery_type in data_manager.LOTTERY_CONFIGS:
+      if not os.path.exists(self.snapshot_path(lottery_type)):
+        continue
+      generator = self.get_or_create(lottery_type)
+      if not generator.is_trained:
+        continue
+      restored.append(lottery_type)
+
+      try:
+        with LotteryContext(lottery_type):
+          self.catch_up(lottery_type, data_manager.fetch_draws_from_db())
+      except Exception as e:
+        logger.error(f"Догоняющее обновление CDM {lottery_type} не выполнено: {e}")
+
+    return restored
+
+
+GLOBAL_CDM_REGISTRY = CDMRegistry()
@@ -13,6 +13,30 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def gumbel_top_k(log_weights: np.ndarray, k: int,
+                 rng: Optional[np.random.Generator] = None) -> np.ndarray:
+  """
+  Пакетная взвешенная выборка без возвращения (Gumbel-top-k)
+
+  Для каждой строки log_weights берутся k индексов с наибольшим
+  log_weight + Gumbel(0, 1) - это распределение совпадает с последовательным
+  выбором без возвращения пропорционально весам (np.random.choice(replace=False, p=...)).
+
+  Args:
+      log_weights: Логарифмы весов (n, num_balls) или (num_balls,); нормировка не нужна
+      k: Количество элементов в каждой выборке
+
+  Returns:
+      Отсортированные индексы (n, k)
+  """
+  rng = rng or np.random.default_rng()
+  log_weights = np.atleast_2d(log_weights)
+  keys = log_weights - np.log(-np.log(rng.random(log_weights.shape)))
+  top = np.argpartition(-keys, k - 1, axis=1)[:, :k]
+  top.sort(axis=1)
+  return top
+
+
 class DirichletMultinomialModel:
   """
   Compound Dirichlet-Multinomial модель для анализа лотерейных данных
@@ -41,6 +65,9 @@ class DirichletMultinomialModel:
     self.alpha = np.ones(num_balls) * concentration
     self.counts = np.zeros(num_balls)
     self.num_observations = 0
+    # Концентрация, с которой построен текущий alpha
+    self._alpha_concentration = concentration
+    self._rng = np.random.default_rng()
 
     # Кэш для оптимизации вычислений
     self._cache = {}
@@ -60,23 +87,8 @@ class DirichletMultinomialModel:
     """
     logger.info(f"Обучение CDM модели на {len(historical_draws)} тиражах")
 
-    # Сброс счетчиков
-    self.counts = np.zeros(self.num_balls)
-    self.num_observations = 0
-
-    # Подсчет частот
-    for draw in historical_draws:
-      for number in draw:
-        if 0 <= number < self.num_balls:
-          self.counts[number] += 1
-      self.num_observations += 1
-
-    # Обновление параметров альфа
-    self.alpha = np.ones(self.num_balls) * self.concentration + self.counts
-
-    # Адаптивное обновление концентрации
-    if self.adaptive:
-      self._update_concentration()
+    draws = self._as_draws(historical_draws)
+    self._set_counts(self._count_numbers(draws), len(draws))
 
     # Расчет метрик
     metrics = self._calculate_metrics()
@@ -86,6 +98,42 @@ class DirichletMultinomialModel:
 
     return metrics
 
+  def _as_draws(self, draws) -> np.ndarray:
+    """Тиражи в виде int-матрицы (n_draws, draws_size)"""
+    if len(draws) == 0:
+      return np.zeros((0, self.draws_size), dtype=np.int64)
+    return np.asarray(draws, dtype=np.int64).reshape(len(draws), -1)
+
+  def _count_numbers(self, numbers: np.ndarray) -> np.ndarray:
+    """Частоты чисел 0..num_balls-1 (числа вне диапазона игнорируются)"""
+    numbers = np.asarray(numbers, dtype=np.int64).ravel()
+    numbers = numbers[(numbers >= 0) & (numbers < self.num_balls)]
+    return np.bincount(numbers, minlength=self.num_balls).astype(np.float64)
+
+  def _draws_matrix(self, draws: np.ndarray) -> np.ndarray:
+    """Матрица вхождений (n_draws, num_balls) для набора тиражей"""
+    draws = self._as_draws(draws)
+    rows = np.repeat(np.arange(len(draws)), draws.shape[1])
+    numbers = draws.ravel()
+    mask = (numbers >= 0) & (numbers < self.num_balls)
+
+    matrix = np.zeros((len(draws), self.num_balls))
+    np.add.at(matrix, (rows[mask], numbers[mask]), 1)
+    return matrix
+
+  def _set_counts(self, counts: np.ndarray, num_observations: int):
+    """Установка частот и апостериорных параметров (общая часть fit и cross_validate)"""
+    self.counts = counts
+    self.num_observations = num_observations
+
+    # Обновление параметров альфа
+    self.alpha = np.ones(self.num_balls) * self.concentration + self.counts
+    self._alpha_concentration = self.concentration
+
+    # Адаптивное обновление концентрации
+    if self.adaptive:
+      self._update_concentration()
+
   def predict_probabilities(self, lookback: Optional[int] = None) -> np.ndarray:
     """
     Предсказание вероятностей для каждого числа
@@ -121,45 +169,61 @@ class DirichletMultinomialModel:
     Returns:
         Список предсказанных комбинаций
     """
-    predictions = []
-
-    for _ in range(n_predictions):
-      if method == 'sampling':
-        # Сэмплирование из апостериорного распределения
-        theta = np.random.dirichlet(self.alpha)
-        # Взвешенная выборка без возвращения
-        prediction = np.random.choice(
-          self.num_balls,
-          size=self.draws_size,
-          replace=False,
-          p=theta
-        )
-
-      elif method == 'map':
-        # Maximum a posteriori оценка
-        if np.all(self.alpha > 1):
-          theta = (self.alpha - 1) / (self.alpha.sum() - self.num_balls)
-        else:
-          theta = self.alpha / self.alpha.sum()
-
-        # Выбор наиболее вероятных чисел
-        prediction = np.argsort(theta)[-self.draws_size:]
-
-      elif method == 'mean':
-        # Использование среднего апостериорного
-        theta = self.alpha / self.alpha.sum()
+    return list(self.sample_draws(n_predictions, method))
+
+  def sample_draws(self, n: int, method: str = 'sampling',
+                   rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Пакетная генерация n комбинаций
 
-        # Стохастический выбор с учетом вероятностей
-        prediction = self._weighted_sample_without_replacement(
-          theta, self.draws_size
-        )
+    'sampling' тянет n векторов theta из апостериорного Дирихле сразу
+    (нормированные Gamma), 'mean' использует апостериорное среднее;
+    выборка без возвращения в обоих случаях - Gumbel-top-k по (n, num_balls).
 
+    Returns:
+        Отсортированные индексы чисел (n, draws_size)
+    """
+    rng = rng or self._rng
+
+    if method == 'sampling':
+      # Нормировка theta не нужна: top-k по log(theta) + Gumbel инвариантен к масштабу
+      with np.errstate(divide='ignore'):
+        log_theta = np.log(rng.standard_gamma(self.alpha, size=(n, self.num_balls)))
+      return gumbel_top_k(log_theta, self.draws_size, rng)
+
+    if method == 'map':
+      # Maximum a posteriori оценка
+      if np.all(self.alpha > 1):
+        theta = (self.alpha - 1) / (self.alpha.sum() - self.num_balls)
       else:
-        raise ValueError(f"Неизвестный метод: {method}")
+        theta = self.alpha / self.alpha.sum()
+
+      # Выбор наиболее вероятных чисел
+      prediction = np.sort(np.argsort(theta)[-self.draws_size:])
+      return np.tile(prediction, (n, 1))
 
-      predictions.append(np.sort(prediction))
+    if method == 'mean':
+      # Стохастический выбор с учетом апостериорного среднего
+      log_theta = np.log(self.alpha / self.alpha.sum())
+      return gumbel_top_k(np.broadcast_to(log_theta, (n, self.num_balls)), self.draws_size, rng)
 
-    return predictions
+    raise ValueError(f"Неизвестный метод: {method}")
+
+  def credible_intervals(self, confidence: float = 0.95) -> Dict[str, np.ndarray]:
+    """
+    Доверительные интервалы вероятностей чисел
+
+    Маргинальное распределение компоненты Дирихле - Beta(alpha_i, sum(alpha) - alpha_i),
+    квантили считаются сразу для всех чисел.
+    """
+    alpha_sum = self.alpha.sum()
+    tail = (1 - confidence) / 2
+    b = alpha_sum - self.alpha
+    return {
+      'lower': stats.beta.ppf(tail, self.alpha, b),
+      'upper': stats.beta.ppf(1 - tail, self.alpha, b),
+      'mean': self.alpha / alpha_sum
+    }
 
   def calculate_likelihood(self, draw: np.ndarray) -> float:
     """
@@ -171,21 +235,17 @@ class DirichletMultinomialModel:
     Returns:
         Логарифмическое правдоподобие
     """
-    # Подсчет вхождений
-    x = np.zeros(self.num_balls)
-    for number in draw:
-      if 0 <= number < self.num_balls:
-        x[number] += 1
-
-    # Log P(x | alpha) для Дирихле-Мультиномиального
-    n = x.sum()
+    return float(self._log_likelihood_batch(self._draws_matrix([draw]))[0])
+
+  def _log_likelihood_batch(self, x: np.ndarray) -> np.ndarray:
+    """Log P(x | alpha) Дирихле-Мультиномиального для строк матрицы вхождений"""
+    n = x.sum(axis=1)
     alpha_sum = self.alpha.sum()
 
     # Логарифмическая функция бета
     log_likelihood = loggamma(alpha_sum) - loggamma(n + alpha_sum)
-    log_likelihood += np.sum(loggamma(x + self.alpha) - loggamma(self.alpha))
-
-    return float(log_likelihood)
+    log_likelihood += np.sum(loggamma(x + self.alpha) - loggamma(self.alpha), axis=1)
+    return np.real(log_likelihood)
 
   def update_online(self, new_draw: np.ndarray) -> Dict:
     """
@@ -197,15 +257,18 @@ class DirichletMultinomialModel:
     Returns:
         Метрики после обновления
     """
-    # Обновление счетчиков
-    for number in new_draw:
-      if 0 <= number < self.num_balls:
-        self.counts[number] += 1
+    numbers = np.asarray(new_draw, dtype=np.int64).ravel()
+    numbers = numbers[(numbers >= 0) & (numbers < self.num_balls)]
 
-    self.num_observations += 1
+    # После смены концентрации alpha пересобирается, иначе - только числа тиража
+    if self.concentration != self._alpha_concentration:
+      self.alpha = np.ones(self.num_balls) * self.concentration + self.counts
+      self._alpha_concentration = self.concentration
 
-    # Обновление параметров
-    self.alpha = np.ones(self.num_balls) * self.concentration + self.counts
+    # Обновление счетчиков и параметров
+    np.add.at(self.counts, numbers, 1)
+    np.add.at(self.alpha, numbers, 1)
+    self.num_observations += 1
 
     # Адаптивное обновление концентрации
     if self.adaptive and self.num_observations % 10 == 0:
@@ -219,6 +282,30 @@ class DirichletMultinomialModel:
 
     return metrics
 
+  def get_state(self) -> Dict:
+    """Состояние модели для снапшота (JSON-совместимое)"""
+    return {
+      'num_balls': self.num_balls,
+      'draws_size': self.draws_size,
+      'concentration': float(self.concentration),
+      'alpha_concentration': float(self._alpha_concentration),
+      'adaptive': self.adaptive,
+      'alpha': self.alpha.tolist(),
+      'counts': self.counts.tolist(),
+      'num_observations': int(self.num_observations)
+    }
+
+  def set_state(self, state: Dict):
+    """Восстановление состояния из get_state"""
+    if state['num_balls'] != self.num_balls or state['draws_size'] != self.draws_size:
+      raise ValueError("Снапшот CDM модели не соответствует конфигурации лотереи")
+    self.concentration = state['concentration']
+    self._alpha_concentration = state.get('alpha_concentration', state['concentration'])
+    self.adaptive = state.get('adaptive', self.adaptive)
+    self.alpha = np.array(state['alpha'], dtype=np.float64)
+    self.counts = np.array(state['counts'], dtype=np.float64)
+    self.num_observations = state['num_observations']
+
   def _weighted_sample_without_replacement(self, weights: np.ndarray,
                                            k: int) -> np.ndarray:
     """
@@ -231,12 +318,8 @@ class DirichletMultinomialModel:
     Returns:
         Индексы выбранных элементов
     """
-    # Алгоритм A-ExpJ для взвешенной выборки
-    v = np.random.uniform(0, 1, self.num_balls)
-    keys = np.power(v, 1.0 / weights)
-    indices = np.argsort(keys)[-k:]
-
-    return indices
+    with np.errstate(divide='ignore'):
+      return gumbel_top_k(np.log(weights), k, self._rng)[0]
 
   def _update_concentration(self):
     """
@@ -304,42 +387,36 @@ class DirichletMultinomialModel:
     Returns:
         Метрики кросс-валидации
     """
-    n_draws = len(historical_draws)
+    draws = self._as_draws(historical_draws)
+    n_draws = len(draws)
     fold_size = n_draws // folds
 
+    # Частоты считаются один раз; обучающая выборка фолда = все минус тестовые
+    x = self._draws_matrix(draws)
+    total_counts = x.sum(axis=0)
+    state = (self.alpha, self.counts, self.num_observations, self.concentration, self._alpha_concentration)
+
     likelihoods = []
     accuracies = []
 
-    for fold in range(folds):
-      # Разделение на обучение и тест
-      test_start = fold * fold_size
-      test_end = test_start + fold_size
-
-      test_indices = list(range(test_start, test_end))
-      train_indices = list(range(0, test_start)) + list(range(test_end, n_draws))
-
-      train_data = historical_draws[train_indices]
-      test_data = historical_draws[test_indices]
-
-      # Обучение на тренировочных данных
-      self.fit(train_data)
-
-      # Оценка на тестовых данных
-      fold_likelihoods = []
-      fold_hits = []
+    try:
+      for fold in range(folds):
+        # Разделение на обучение и тест
+        test_start = fold * fold_size
+        test_end = test_start + fold_size
+        test_x = x[test_start:test_end]
 
-      for test_draw in test_data:
-        # Правдоподобие
-        likelihood = self.calculate_likelihood(test_draw)
-        fold_likelihoods.append(likelihood)
+        self._set_counts(total_counts - test_x.sum(axis=0), n_draws - len(test_x))
 
-        # Точность предсказания
-        prediction = self.predict_next_draw(1, method='mean')[0]
-        hits = len(set(prediction) & set(test_draw))
-        fold_hits.append(hits / self.draws_size)
+        # Правдоподобие и точность предсказания сразу для всех тестовых тиражей
+        likelihoods.extend(self._log_likelihood_batch(test_x).tolist())
 
-      likelihoods.extend(fold_likelihoods)
-      accuracies.extend(fold_hits)
+        predictions = self.sample_draws(len(test_x), method='mean')
+        hits = (np.take_along_axis(test_x, predictions, axis=1) > 0).sum(axis=1)
+        accuracies.extend((hits / self.draws_size).tolist())
+    finally:
+      # Кросс-валидация не меняет обученную модель
+      self.alpha, self.counts, self.num_observations, self.concentration, self._alpha_concentration = state
 
     return {
       'mean_log_likelihood': float(np.mean(likelihoods)),
@@ -74,10 +74,9 @@ class PriorPosteriorManager:
         Обновленные параметры альфа
     """
     # Подсчет частот для каждой категории
-    counts = np.zeros(self.num_categories)
-    for obs in observations:
-      if 0 <= obs < self.num_categories:
-        counts[obs] += 1
+    obs = np.asarray(observations, dtype=np.int64).ravel()
+    obs = obs[(obs >= 0) & (obs < self.num_categories)]
+    counts = np.bincount(obs, minlength=self.num_categories).astype(np.float64)
 
     # Байесовское обновление: posterior_alpha = prior_alpha + counts
     self.posterior_alpha = self.prior_alpha + counts
@@ -145,27 +144,15 @@ class PriorPosteriorManager:
     Returns:
         Словарь с нижними и верхними границами интервалов
     """
-    # Используем бета-распределение для маргинальных распределений
+    # Маргинальное распределение p_i ~ Beta(alpha_i, sum(alpha) - alpha_i),
+    # квантили считаются сразу для всех категорий
     alpha_sum = self.posterior_alpha.sum()
-    lower_bounds = []
-    upper_bounds = []
-
     alpha_level = (1 - confidence) / 2
-
-    for i in range(self.num_categories):
-      # Маргинальное распределение p_i ~ Beta(alpha_i, sum(alpha) - alpha_i)
-      a = self.posterior_alpha[i]
-      b = alpha_sum - a
-
-      lower = stats.beta.ppf(alpha_level, a, b)
-      upper = stats.beta.ppf(1 - alpha_level, a, b)
-
-      lower_bounds.append(lower)
-      upper_bounds.append(upper)
+    b = alpha_sum - self.posterior_alpha
 
     return {
-      'lower': np.array(lower_bounds),
-      'upper': np.array(upper_bounds),
+      'lower': stats.beta.ppf(alpha_level, self.posterior_alpha, b),
+      'upper': stats.beta.ppf(1 - alpha_level, self.posterior_alpha, b),
       'mean': self.get_posterior_mean()
     }
 
@@ -225,6 +212,24 @@ class PriorPosteriorManager:
 
     return float(kl)
 
+  def add_observations(self, observations: Union[List[int], np.ndarray]) -> np.ndarray:
+    """
+    Инкрементальное обновление: частоты новых наблюдений добавляются
+    к текущему апостериорному (в отличие от update_posterior, который
+    пересчитывает его от априорного)
+
+    Args:
+        observations: Наблюдаемые числа (индексы категорий)
+
+    Returns:
+        Обновленные параметры альфа
+    """
+    obs = np.asarray(observations, dtype=np.int64).ravel()
+    obs = obs[(obs >= 0) & (obs < self.num_categories)]
+    np.add.at(self.posterior_alpha, obs, 1)
+    self.observation_count += len(obs)
+    return self.posterior_alpha
+
   def reset_to_prior(self):
     """Сброс апостериорного распределения к априорному"""
     self.posterior_alpha = self.prior_alpha.copy()
@@ -239,17 +244,8 @@ class PriorPosteriorManager:
     Args:
         filepath: Путь для сохранения
     """
-    state = {
-      'num_categories': self.num_categories,
-      'prior_type': self.prior_type,
-      'prior_alpha': self.prior_alpha.tolist(),
-      'posterior_alpha': self.posterior_alpha.tolist(),
-      'observation_count': self.observation_count,
-      'update_history': self.update_history
-    }
-
     with open(filepath, 'w') as f:
-      json.dump(state, f, indent=2)
+      json.dump(self.get_state(), f, indent=2)
 
     logger.info(f"Состояние сохранено в {filepath}")
 
@@ -261,8 +257,23 @@ class PriorPosteriorManager:
         filepath: Путь к файлу состояния
     """
     with open(filepath, 'r') as f:
-      state = json.load(f)
+      self.set_state(json.load(f))
 
+    logger.info(f"Состояние загружено из {filepath}")
+
+  def get_state(self) -> Dict:
+    """Состояние менеджера в JSON-совместимом виде"""
+    return {
+      'num_categories': self.num_categories,
+      'prior_type': self.prior_type,
+      'prior_alpha': self.prior_alpha.tolist(),
+      'posterior_alpha': self.posterior_alpha.tolist(),
+      'observation_count': self.observation_count,
+      'update_history': self.update_history
+    }
+
+  def set_state(self, state: Dict):
+    """Восстановление состояния из get_state"""
     self.num_categories = state['num_categories']
     self.prior_type = state['prior_type']
     self.prior_alpha = np.array(state['prior_alpha'])
@@ -270,8 +281,6 @@ class PriorPosteriorManager:
     self.observation_count = state['observation_count']
     self.update_history = state['update_history']
 
-    logger.info(f"Состояние загружено из {filepath}")
-
   def get_summary_statistics(self) -> Dict:
     """
     Получение сводной статистики
@@ -132,11 +132,8 @@ def generate_xgboost_ranked_combinations(df_history, num_to_generate, num_candid
 
   # Оцениваем все кандидаты через XGBoost
   print(f"⚡ Оценка {len(unique_candidates)} кандидатов через XGBoost...")
-  scored_combinations = []
-
-  for f1, f2 in unique_candidates:
-    score = xgb_model.score_combination(f1, f2, df_history)
-    scored_combinations.append((f1, f2, score))
+  scores = xgb_model.score_combinations(unique_candidates, df_history)
+  scored_combinations = [(f1, f2, float(score)) for (f1, f2), score in zip(unique_candidates, scores)]
 
   # Сортируем по оценке
   scored_combinations.sort(key=lambda x: x[2], reverse=True)
@@ -199,18 +196,20 @@ def generate_xgboost_prediction(df_history):
 
   return None, None
 
-def generate_random_combination():
+def generate_random_combination(rng=None):
   """
   Генерирует случайную комбинацию на основе ТЕКУЩЕЙ конфигурации лотереи.
+  rng - генератор random.Random (по умолчанию общий модуль random).
   """
+  rng = rng or random
   config = get_current_config()
   field1_size = config['field1_size']
   field2_size = config['field2_size']
   field1_max = config['field1_max']
   field2_max = config['field2_max']
 
-  field1 = sorted(random.sample(range(1, field1_max + 1), field1_size))
-  field2 = sorted(random.sample(range(1, field2_max + 1), field2_size))
+  field1 = sorted(rng.sample(range(1, field1_max + 1), field1_size))
+  field2 = sorted(rng.sample(range(1, field2_max + 1), field2_size))
   return field1, field2
 
 
@@ -357,7 +356,7 @@ def generate_ml_based_combinations(df_history, num_combinations=5):
   return results[:num_combinations]
 
 
-def generate_rf_ranked_combinations(df_history, num_to_generate, num_candidates_to_score=500):
+def generate_rf_ranked_combinations(df_history, num_to_generate, num_candidates_to_score=500, rng=None):
   """
   Генерирует комбинации с использованием "умного" подхода + динамический анализ трендов:
   1. Анализирует текущие тренды и паттерны
@@ -370,6 +369,7 @@ def generate_rf_ranked_combinations(df_history, num_to_generate, num_candidates_
       df_history (pd.DataFrame): DataFrame с историей тиражей.
       num_to_generate (int): Количество лучших комбинаций для возврата.
       num_candidates_to_score (int): Количество случайных комбинаций для генерации и оценки.
+      rng (random.Random): Генератор случайных чисел (по умолчанию общий модуль random).
 
   Returns:
       list: Список кортежей (field1_list, field2_list, type_str_with_score).
@@ -384,7 +384,7 @@ def generate_rf_ranked_combinations(df_history, num_to_generate, num_candidates_
   if df_history.empty or len(df_history) < 2:
     print("RF Ranked Gen: Недостаточно данных. Генерация случайных.")
     return [(r1, r2, "Случайная (нет данных)") for r1, r2 in
-            [generate_random_combination() for _ in range(num_to_generate)]]
+            [generate_random_combination(rng) for _ in range(num_to_generate)]]
 
   print("⚡ КЭШИРОВАННАЯ УЛЬТРА БЫСТРАЯ RF генерация с анализом трендов...")
 
@@ -420,7 +420,7 @@ def generate_rf_ranked_combinations(df_history, num_to_generate, num_candidates_
     if not GLOBAL_RF_MODEL.is_trained:
       print("❌ RF обучение не удалось.")
       return [(r1, r2, "Случайная (ошибка обучения)") for r1, r2 in
-              [generate_random_combination() for _ in range(num_to_generate)]]
+              [generate_random_combination(rng) for _ in range(num_to_generate)]]
     else:
       print(f"✅ RF модель обучена за {training_time:.1f}с")
   else:
@@ -448,11 +448,11 @@ def generate_rf_ranked_combinations(df_history, num_to_generate, num_candidates_
     if use_trends and current_trends:
       print(f"🎯 Генерация с учетом трендов...")
       candidates = _generate_trend_aware_candidates(
-        current_trends, candidates_count, num_to_generate
+        current_trends, candidates_count, num_to_generate, rng
       )
     else:
       print(f"🔄 Обычная генерация кандидатов...")
-      candidates = smart_combination_generator(candidates_count, avoid_duplicates=True)
+      candidates = smart_combination_generator(candidates_count, avoid_duplicates=True, rng=rng)
 
     # Кэшированная обработка с RF оценкой
     print(f"⚡ Кэшированная обработка {len(candidates)} кандидатов")
@@ -511,7 +511,7 @@ def generate_rf_ranked_combinations(df_history, num_to_generate, num_candidates_
     for i in range(min(3, num_to_generate)):
       if time.time() - start_time > max_time_seconds:
         break
-      f1, f2 = generate_random_combination()
+      f1, f2 = generate_random_combination(rng)
       score = GLOBAL_RF_MODEL.score_combination(sorted(f1), sorted(f2), cached_df)
       if score > -float('inf'):
         results_with_scores.append({'f1': f1, 'f2': f2, 'score': score, 'desc': 'fallback'})
@@ -519,7 +519,7 @@ def generate_rf_ranked_combinations(df_history, num_to_generate, num_candidates_
   if not results_with_scores:
     print("❌ Нет результатов. Генерация случайных.")
     return [(r1, r2, "Случайная (нет результатов)") for r1, r2 in
-            [generate_random_combination() for _ in range(num_to_generate)]]
+            [generate_random_combination(rng) for _ in range(num_to_generate)]]
 
   # Быстрая сортировка по комбинированной оценке
   ranked_results = sorted(results_with_scores, key=lambda x: x['score'], reverse=True)
@@ -552,7 +552,7 @@ def generate_rf_ranked_combinations(df_history, num_to_generate, num_candidates_
 
   # Дополнение случайными при необходимости
   while len(final_combinations) < num_to_generate:
-    f1_rand, f2_rand = generate_random_combination()
+    f1_rand, f2_rand = generate_random_combination(rng)
     final_combinations.append((f1_rand, f2_rand, "Случайная"))
 
   elapsed_total = time.time() - start_time
@@ -569,7 +569,7 @@ def generate_rf_ranked_combinations(df_history, num_to_generate, num_candidates_
 
   return final_combinations
 
-def _generate_trend_aware_candidates(trends, total_candidates, target_results):
+def _generate_trend_aware_candidates(trends, total_candidates, target_results, rng=None):
     """
     Генерирует кандидатов с учетом текущих трендов
 
@@ -577,10 +577,12 @@ def _generate_trend_aware_candidates(trends, total_candidates, target_results):
         trends: Словарь с трендами от GLOBAL_TREND_ANALYZER
         total_candidates: Общее количество кандидатов
         target_results: Целевое количество результатов
+        rng: Генератор random.Random (по умолчанию общий модуль random)
 
     Returns:
         List[Tuple]: Список кандидатов (f1, f2)
     """
+    rng = rng or random
     candidates = []
 
     # Получаем тренды для полей
@@ -592,12 +594,12 @@ def _generate_trend_aware_candidates(trends, total_candidates, target_results):
 
     for _ in range(trend_candidates):
       try:
-        f1 = _generate_smart_field_combination(field1_trends, 1)
-        f2 = _generate_smart_field_combination(field2_trends, 2)
+        f1 = _generate_smart_field_combination(field1_trends, 1, rng)
+        f2 = _generate_smart_field_combination(field2_trends, 2, rng)
         candidates.append((f1, f2))
       except Exception:
         # Fallback на случайную генерацию
-        f1, f2 = generate_random_combination()
+        f1, f2 = generate_random_combination(rng)
         candidates.append((f1, f2))
 
     # 30% кандидатов - смешанные
@@ -606,46 +608,49 @@ def _generate_trend_aware_candidates(trends, total_candidates, target_results):
     for _ in range(mixed_candidates):
       try:
         # Одно поле - тренд, другое - случайное
-        if random.choice([True, False]):
-          f1 = _generate_smart_field_combination(field1_trends, 1)
-          f2 = _generate_random_field(2)
+        if rng.choice([True, False]):
+          f1 = _generate_smart_field_combination(field1_trends, 1, rng)
+          f2 = _generate_random_field(2, rng)
         else:
-          f1 = _generate_random_field(1)
-          f2 = _generate_smart_field_combination(field2_trends, 2)
+          f1 = _generate_random_field(1, rng)
+          f2 = _generate_smart_field_combination(field2_trends, 2, rng)
         candidates.append((f1, f2))
       except Exception:
-        f1, f2 = generate_random_combination()
+        f1, f2 = generate_random_combination(rng)
         candidates.append((f1, f2))
 
     # Остальные 30% - случайные
     remaining = total_candidates - len(candidates)
     for _ in range(remaining):
-      f1, f2 = generate_random_combination()
+      f1, f2 = generate_random_combination(rng)
       candidates.append((f1, f2))
 
     return candidates[:total_candidates]
 
 
-def _generate_random_field(field_num):
+def _generate_random_field(field_num, rng=None):
   """Генерирует случайное поле"""
+  rng = rng or random
   from backend.app.core import data_manager
   config = data_manager.get_current_config()
   field_size = config[f'field{field_num}_size']
   max_num = config[f'field{field_num}_max']
-  return sorted(random.sample(range(1, max_num + 1), field_size))
+  return sorted(rng.sample(range(1, max_num + 1), field_size))
 
 
-def _generate_smart_field_combination(field_trends, field_num):
+def _generate_smart_field_combination(field_trends, field_num, rng=None):
   """
   Генерирует умную комбинацию для поля на основе трендов
 
   Args:
       field_trends: TrendMetrics для поля
       field_num: Номер поля (1 или 2)
+      rng: Генератор random.Random (по умолчанию общий модуль random)
 
   Returns:
       List[int]: Комбинация чисел для поля
   """
+  rng = rng or random
   from backend.app.core import data_manager
   config = data_manager.get_current_config()
   field_size = config[f'field{field_num}_size']
@@ -653,7 +658,7 @@ def _generate_smart_field_combination(field_trends, field_num):
 
   if not field_trends:
     # Fallback на случайную генерацию
-    return sorted(random.sample(range(1, max_num + 1), field_size))
+    return sorted(rng.sample(range(1, max_num + 1), field_size))
 
   result = []
   all_numbers = list(range(1, max_num + 1))
@@ -674,12 +679,12 @@ def _generate_smart_field_combination(field_trends, field_num):
   if remaining > 0:
     available = [n for n in all_numbers if n not in result]
     if len(available) >= remaining:
-      result.extend(random.sample(available, remaining))
+      result.extend(rng.sample(available, remaining))
     else:
       result.extend(available)
       # Если все еще не хватает, заполняем любыми доступными
       while len(result) < field_size:
-        result.append(random.randint(1, max_num))
+        result.append(rng.randint(1, max_num))
 
   return sorted(result[:field_size])
 
@@ -696,7 +701,7 @@ def _generate_random_field_combination(field_num):
   return sorted(random.sample(range(1, field_max + 1), field_size))
 
 
-def generate_pattern_based_combinations(df_history, num_to_generate, strategy='balanced'):
+def generate_pattern_based_combinations(df_history, num_to_generate, strategy='balanced', rng=None):
   """
   Генерирует комбинации на основе анализа паттернов.
   Использует горячие/холодные числа, корреляции и циклы.
@@ -706,6 +711,7 @@ def generate_pattern_based_combinations(df_history, num_to_generate, strategy='b
       num_to_generate: Количество комбинаций
       strategy: 'hot' (горячие), 'cold' (холодные), 'balanced' (сбалансированные),
                'correlated' (с учетом корреляций), 'overdue' (просроченные)
+      rng: Генератор random.Random (по умолчанию общий модуль random)
 
   Returns:
       list: Список кортежей (field1, field2, описание)
@@ -713,7 +719,7 @@ def generate_pattern_based_combinations(df_history, num_to_generate, strategy='b
   if df_history.empty:
     print("Pattern Generator: История пуста. Генерация случайных комбинаций.")
     return [(f1, f2, "Случайная (нет истории)") for f1, f2 in
-            [generate_random_combination() for _ in range(num_to_generate)]]
+            [generate_random_combination(rng) for _ in range(num_to_generate)]]
 
   # --- ГЛАВНОЕ ИСПРАВЛЕНИЕ: ПОЛУЧАЕМ КОНФИГУРАЦИЮ ---
   config = get_current_config()
@@ -750,27 +756,27 @@ def generate_pattern_based_combinations(df_history, num_to_generate, strategy='b
   for i in range(num_to_generate):
     # --- ИСПОЛЬЗУЕМ ДИНАМИЧЕСКИЕ РАЗМЕРЫ ПОЛЕЙ ВМЕСТО '4' ---
     if strategy == 'hot':
-      f1 = _generate_with_preference(field1_hot, all_numbers_f1, f1_size, min_preferred=2)
-      f2 = _generate_with_preference(field2_hot, all_numbers_f2, f2_size, min_preferred=1 if f2_size < 3 else 2)
+      f1 = _generate_with_preference(field1_hot, all_numbers_f1, f1_size, min_preferred=2, rng=rng)
+      f2 = _generate_with_preference(field2_hot, all_numbers_f2, f2_size, min_preferred=1 if f2_size < 3 else 2, rng=rng)
       desc = "Горячие числа"
     elif strategy == 'cold':
-      f1 = _generate_with_preference(field1_cold, all_numbers_f1, f1_size, min_preferred=2)
-      f2 = _generate_with_preference(field2_cold, all_numbers_f2, f2_size, min_preferred=1 if f2_size < 3 else 2)
+      f1 = _generate_with_preference(field1_cold, all_numbers_f1, f1_size, min_preferred=2, rng=rng)
+      f2 = _generate_with_preference(field2_cold, all_numbers_f2, f2_size, min_preferred=1 if f2_size < 3 else 2, rng=rng)
       desc = "Холодные числа"
     elif strategy == 'balanced':
-      f1 = _generate_balanced(field1_hot, field1_cold, all_numbers_f1, f1_size)
-      f2 = _generate_balanced(field2_hot, field2_cold, all_numbers_f2, f2_size)
+      f1 = _generate_balanced(field1_hot, field1_cold, all_numbers_f1, f1_size, rng=rng)
+      f2 = _generate_balanced(field2_hot, field2_cold, all_numbers_f2, f2_size, rng=rng)
       desc = "Сбалансированная (горячие+холодные)"
     elif strategy == 'correlated':
-      f1 = _generate_with_correlations(field1_pairs, all_numbers_f1, f1_size)
-      f2 = _generate_with_correlations(field2_pairs, all_numbers_f2, f2_size)
+      f1 = _generate_with_correlations(field1_pairs, all_numbers_f1, f1_size, rng=rng)
+      f2 = _generate_with_correlations(field2_pairs, all_numbers_f2, f2_size, rng=rng)
       desc = "Коррелированные пары"
     elif strategy == 'overdue':
-      f1 = _generate_with_preference(field1_overdue, all_numbers_f1, f1_size, min_preferred=1)
-      f2 = _generate_with_preference(field2_overdue, all_numbers_f2, f2_size, min_preferred=1)
+      f1 = _generate_with_preference(field1_overdue, all_numbers_f1, f1_size, min_preferred=1, rng=rng)
+      f2 = _generate_with_preference(field2_overdue, all_numbers_f2, f2_size, min_preferred=1, rng=rng)
       desc = "Просроченные числа"
     else:
-      f1, f2 = generate_random_combination()
+      f1, f2 = generate_random_combination(rng)
       desc = "Случайная"
 
     results.append((sorted(f1), sorted(f2), desc))
@@ -778,20 +784,21 @@ def generate_pattern_based_combinations(df_history, num_to_generate, strategy='b
   return results
 
 
-def _generate_with_preference(preferred_numbers, all_numbers, count, min_preferred=1):
+def _generate_with_preference(preferred_numbers, all_numbers, count, min_preferred=1, rng=None):
   """Генерирует комбинацию с предпочтением определенных чисел"""
+  rng = rng or random
   result = []
   available = list(all_numbers)
 
   if not preferred_numbers:
     # Если нет предпочитаемых чисел, просто берем случайные
-    return random.sample(available, count)
+    return rng.sample(available, count)
 
   preferred_available = [n for n in preferred_numbers if n in available]
   num_to_take = min(min_preferred, len(preferred_available), count)
 
   if preferred_available and num_to_take > 0:
-    selected = random.sample(preferred_available, num_to_take)
+    selected = rng.sample(preferred_available, num_to_take)
     result.extend(selected)
     for n in selected:
       available.remove(n)
@@ -807,23 +814,24 @@ def _generate_with_preference(preferred_numbers, all_numbers, count, min_preferr
     if len(available) < remaining:
       # Если не хватает, дополняем изначальным списком (минус уже взятые)
       available_fallback = [n for n in all_numbers if n not in result]
-      result.extend(random.sample(available_fallback, remaining))
+      result.extend(rng.sample(available_fallback, remaining))
     else:
-      result.extend(random.sample(available, remaining))
+      result.extend(rng.sample(available, remaining))
 
   return result[:count]
 
 
-def _generate_balanced(hot_numbers, cold_numbers, all_numbers, count):
+def _generate_balanced(hot_numbers, cold_numbers, all_numbers, count, rng=None):
   """Генерирует сбалансированную комбинацию."""
+  rng = rng or random
   result = []
   available = list(all_numbers)
 
   # 1-2 горячих числа
   hot_available = [n for n in hot_numbers if n in available]
   if hot_available and len(result) < count:
-    num_hot = random.randint(1, min(2, len(hot_available), count - len(result)))
-    selected_hot = random.sample(hot_available, num_hot)
+    num_hot = rng.randint(1, min(2, len(hot_available), count - len(result)))
+    selected_hot = rng.sample(hot_available, num_hot)
     result.extend(selected_hot)
     for n in selected_hot:
       available.remove(n)
@@ -831,8 +839,8 @@ def _generate_balanced(hot_numbers, cold_numbers, all_numbers, count):
   # 1-2 холодных числа
   cold_available = [n for n in cold_numbers if n in available]
   if cold_available and len(result) < count:
-    num_cold = random.randint(1, min(2, len(cold_available), count - len(result)))
-    selected_cold = random.sample(cold_available, num_cold)
+    num_cold = rng.randint(1, min(2, len(cold_available), count - len(result)))
+    selected_cold = rng.sample(cold_available, num_cold)
     result.extend(selected_cold)
     for n in selected_cold:
       available.remove(n)
@@ -840,26 +848,27 @@ def _generate_balanced(hot_numbers, cold_numbers, all_numbers, count):
   # Дополняем нейтральными числами
   remaining = count - len(result)
   if remaining > 0 and available:
-    result.extend(random.sample(available, remaining))
+    result.extend(rng.sample(available, remaining))
 
   # Если после всех шагов не набралось нужное количество
   while len(result) < count:
     fallback_available = [n for n in all_numbers if n not in result]
     if not fallback_available: break
-    result.append(random.choice(fallback_available))
+    result.append(rng.choice(fallback_available))
 
   return result[:count]
 
 
-def _generate_with_correlations(frequent_pairs, all_numbers, count):
+def _generate_with_correlations(frequent_pairs, all_numbers, count, rng=None):
   """Генерирует комбинацию используя частые пары."""
+  rng = rng or random
   result = []
   available = list(all_numbers)
 
   if frequent_pairs:
     # Выбираем 1-2 частые пары
-    num_pairs_to_try = random.randint(1, min(2, len(frequent_pairs)))
-    selected_pairs = random.sample(frequent_pairs[:10], num_pairs_to_try)
+    num_pairs_to_try = rng.randint(1, min(2, len(frequent_pairs)))
+    selected_pairs = rng.sample(frequent_pairs[:10], num_pairs_to_try)
 
     for pair_data in selected_pairs:
       pair = pair_data[0]
@@ -873,12 +882,12 @@ def _generate_with_correlations(frequent_pairs, all_numbers, count):
   remaining = count - len(result)
   if remaining > 0 and available:
     if len(available) >= remaining:
-      result.extend(random.sample(available, remaining))
+      result.extend(rng.sample(available, remaining))
     else:  # Если доступных не хватает, берем что есть и дополняем
       result.extend(available)
       needed = count - len(result)
       fallback_available = [n for n in all_numbers if n not in result]
-      result.extend(random.sample(fallback_available, needed))
+      result.extend(rng.sample(fallback_available, needed))
 
   return result[:count]
 
@@ -307,6 +307,9 @@ def store_draws_to_db(df, lottery_type=None):
   limits = get_lottery_limits()
   max_draws = limits['max_draws_in_db']
 
+  # Новые тиражи для уведомлений - рассылаются после закрытия сессии
+  fresh_draws = []
+
   db = get_db_session()
   try:
     # Проверяем и удаляем возможные дубликаты в таблице
@@ -338,6 +341,11 @@ def store_draws_to_db(df, lottery_type=None):
       db.commit()
       print(f"✅ Дубликаты удалены для {lottery_type}")
 
+    # Последний тираж до вставки - уведомления только о более новых
+    latest_before = db.query(func.max(LotteryDraw.draw_number)).filter(
+      LotteryDraw.lottery_type == lottery_type
+    ).scalar()
+
     # Подготавливаем записи для вставки
     new_records = []
 
@@ -391,6 +399,10 @@ def store_draws_to_db(df, lottery_type=None):
       db.add_all(new_records)
       db.commit()
       print(f"PostgreSQL Store: Добавлено {len(new_records)} новых тиражей для {lottery_type}")
+
+      # Первичная загрузка архива уведомлений не порождает
+      if latest_before is not None:
+        fresh_draws = _draws_payload([r for r in new_records if r.draw_number > latest_before])
     else:
       print(f"PostgreSQL Store: Все тиражи уже существуют в БД для {lottery_type}")
 
@@ -425,6 +437,38 @@ def store_draws_to_db(df, lottery_type=None):
   finally:
     db.close()
 
+  _notify_new_draws(lottery_type, fresh_draws)
+
+
+def _draws_payload(records):
+  """Записи LotteryDraw в виде словарей (по возрастанию номера), не зависящих от сессии"""
+  return [{
+    'draw_number': r.draw_number,
+    'draw_date': r.draw_date,
+    'field1': r.field1_numbers,
+    'field2': r.field2_numbers
+  } for r in sorted(records, key=lambda r: r.draw_number)]
+
+
+def _notify_new_draws(lottery_type, draws):
+  """Передает новые тиражи в индекс подписок на выигрышные билеты и живым CDM генераторам"""
+  if not draws:
+    return
+
+  try:
+    from backend.app.core.win_notifications import GLOBAL_WIN_NOTIFIER
+
+    GLOBAL_WIN_NOTIFIER.notify_draws(lottery_type, draws)
+  except Exception as e:
+    print(f"⚠️ Уведомления о выигрышах не отправлены: {e}")
+
+  try:
+    from backend.app.core.bayesian.cdm_registry import GLOBAL_CDM_REGISTRY
+
+    GLOBAL_CDM_REGISTRY.on_new_draws(lottery_type, draws)
+  except Exception as e:
+    print(f"⚠️ CDM модели не обновлены новыми тиражами: {e}")
+
 
 def import_csv_data(csv_file_path, lottery_type):
   """
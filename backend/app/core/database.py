@@ -317,6 +317,12 @@ class ValidationResult(Base):
     lottery_type = Column(String(20), nullable=False)
     model_name = Column(String(50), nullable=False)
 
+    # Ключ результата: (модель, параметры, лотерея, версия данных, окна)
+    result_key = Column(String(64), nullable=True, index=True)
+    params_hash = Column(String(16), nullable=True)
+    data_version = Column(String(64), nullable=True)
+    window_config = Column(JSON, nullable=True)
+
     # Метрики
     avg_accuracy = Column(Float)
     avg_f1 = Column(Float)
@@ -13,6 +13,7 @@ from backend.app.core.genetic.evolution import GeneticEvolution, EvolutionConfig
 from backend.app.core.genetic.population import Chromosome
 from backend.app.core import data_manager
 from backend.app.core.combination_generator import generate_random_combination
+from backend.app.core.utils import get_data_version
 
 logger = logging.getLogger(__name__)
 
@@ -58,7 +59,7 @@ class GeneticCombinationGenerator:
         lottery_config = data_manager.get_current_config()
         
         # Проверяем кэш
-        cache_key = f"{data_manager.CURRENT_LOTTERY}_{len(df_history)}_{generations}_{population_size}"
+        cache_key = f"{data_manager.CURRENT_LOTTERY}_{get_data_version(df_history)}_{generations}_{population_size}"
         
         if use_cache and cache_key in self.evolution_cache:
             logger.info("📦 Использование кэшированных результатов эволюции")
@@ -10,6 +10,9 @@ from collections import Counter
 import logging
 from datetime import datetime, timedelta
 
+from backend.app.core.genetic.fitness_cache import GLOBAL_FITNESS_CACHE, SharedFitnessCache
+from backend.app.core.utils import combination_rank, get_data_version
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,11 +22,13 @@ class FitnessEvaluator:
   Использует множественные критерии для комплексной оценки
   """
 
-  def __init__(self, df_history: pd.DataFrame, lottery_config: Dict):
+  def __init__(self, df_history: pd.DataFrame, lottery_config: Dict,
+               fitness_cache: Optional[SharedFitnessCache] = None):
     """
     Args:
         df_history: История тиражей
         lottery_config: Конфигурация лотереи
+        fitness_cache: Общий кэш fitness (по умолчанию глобальный)
     """
     self.df_history = df_history
     self.lottery_config = lottery_config
@@ -48,8 +53,15 @@ class FitnessEvaluator:
       'trend_alignment': 0.1  # Соответствие трендам
     }
 
-    # Кэш для ускорения
-    self._fitness_cache = {}
+    # Общий кэш: ключ включает лотерею, версию данных и хэш весов,
+    # поэтому оценки разделяются между эволюциями на одних и тех же данных
+    self._fitness_cache = fitness_cache if fitness_cache is not None else GLOBAL_FITNESS_CACHE
+    self.lottery_key = lottery_config.get(
+      'db_table',
+      f"{self.field1_size}x{self.field1_max}+{self.field2_size}x{self.field2_max}"
+    )
+    self.data_version = get_data_version(df_history)
+    self._weights_hash = SharedFitnessCache.weights_hash(self.weights)
     self._cache_hits = 0
     self._cache_misses = 0
 
@@ -165,10 +177,11 @@ class FitnessEvaluator:
         Значение fitness от 0 до 100+
     """
     # Проверяем кэш
-    cache_key = (tuple(sorted(field1)), tuple(sorted(field2)))
-    if cache_key in self._fitness_cache:
+    cache_key = self._cache_key(field1, field2)
+    cached = self._fitness_cache.get(cache_key)
+    if cached is not None:
       self._cache_hits += 1
-      return self._fitness_cache[cache_key]
+      return cached
 
     self._cache_misses += 1
 
@@ -202,18 +215,19 @@ class FitnessEvaluator:
     # Нормализация и масштабирование (0-100+)
     total_fitness = total_fitness * 100
 
-    # Сохраняем в кэш
-    self._fitness_cache[cache_key] = total_fitness
-
-    # Ограничиваем размер кэша
-    if len(self._fitness_cache) > 10000:
-      # Удаляем старые записи
-      keys_to_remove = list(self._fitness_cache.keys())[:5000]
-      for key in keys_to_remove:
-        del self._fitness_cache[key]
+    # Сохраняем в кэш (вытеснение по LRU выполняет сам кэш)
+    self._fitness_cache.put(cache_key, total_fitness)
 
     return total_fitness
 
+  def _cache_key(self, field1: List[int], field2: List[int]) -> Tuple:
+    """Ключ общего кэша для комбинации (некорректные комбинации - по отсортированным числам)"""
+    try:
+      combo_key = combination_rank(field1, field2, self.lottery_config)
+    except ValueError:
+      combo_key = (tuple(sorted(field1)), tuple(sorted(field2)))
+    return (self.lottery_key, self.data_version, self._weights_hash, combo_key)
+
   def _evaluate_historical_matches(self, field1: List[int], field2: List[int]) -> float:
     """Оценка совпадений с историческими тиражами"""
     if self.df_history.empty:
@@ -474,8 +488,8 @@ class FitnessEvaluator:
       for key in self.weights:
         self.weights[key] /= total
 
-    # Очищаем кэш после изменения весов
-    self._fitness_cache.clear()
+    # Новые веса дают новое пространство ключей кэша
+    self._weights_hash = SharedFitnessCache.weights_hash(self.weights)
     logger.info(f"📊 Веса fitness обновлены: {self.weights}")
 
   def get_statistics(self) -> Dict:
@@ -488,6 +502,7 @@ class FitnessEvaluator:
       'cache_misses': self._cache_misses,
       'cache_hit_rate': cache_hit_rate,
       'cache_size': len(self._fitness_cache),
+      'shared_cache': self._fitness_cache.get_stats(),
       'hot_numbers_f1': self.hot_numbers_f1[:5],
       'cold_numbers_f1': self.cold_numbers_f1[:5],
       'hot_numbers_f2': self.hot_numbers_f2[:5],
@@ -496,8 +511,8 @@ class FitnessEvaluator:
     }
 
   def clear_cache(self):
-    """Очистка кэша"""
-    self._fitness_cache.clear()
+    """Очистка кэша текущей лотереи"""
+    self._fitness_cache.invalidate(self.lottery_key)
     self._cache_hits = 0
     self._cache_misses = 0
     logger.info("🧹 Кэш fitness очищен")
@@ -0,0 +1,166 @@
+"""
+Общий для процесса кэш значений fitness
+Переживает отдельные эволюции и используется всеми FitnessEvaluator
+"""
+
+import hashlib
+import threading
+import logging
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class SharedFitnessCache:
+  """
+  LRU-кэш fitness с хранением в преаллоцированных массивах
+
+  Ключ: (lottery, data_version, weights_hash, combination_rank).
+  Значения и двусвязный список LRU лежат в numpy-массивах фиксированного
+  размера, словарь хранит только отображение ключ -> слот.
+  """
+
+  _NIL = -1
+
+  def __init__(self, capacity: int = 200000):
+    if capacity < 1:
+      raise ValueError(f"Емкость кэша fitness должна быть не меньше 1, получено {capacity}")
+    self.capacity = capacity
+    self._lock = threading.Lock()
+
+    self._values = np.zeros(capacity, dtype=np.float64)
+    self._prev = np.full(capacity, self._NIL, dtype=np.int64)
+    self._next = np.full(capacity, self._NIL, dtype=np.int64)
+    self._slot_keys = [None] * capacity
+    self._index: Dict[Tuple, int] = {}
+
+    self._free = []  # Слоты, освобожденные invalidate()
+
+    self._head = self._NIL  # Самый свежий
+    self._tail = self._NIL  # Самый старый
+    self._allocated = 0
+
+    # Статистика
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  @staticmethod
+  def weights_hash(weights: Dict[str, float]) -> str:
+    """Стабильный хэш набора весов fitness-функции"""
+    payload = ';'.join(f"{k}={round(float(v), 10)}" for k, v in sorted(weights.items()))
+    return hashlib.md5(payload.encode()).hexdigest()[:12]
+
+  def _unlink(self, slot: int):
+    prev_slot, next_slot = self._prev[slot], self._next[slot]
+    if prev_slot != self._NIL:
+      self._next[prev_slot] = next_slot
+    else:
+      self._head = next_slot
+    if next_slot != self._NIL:
+      self._prev[next_slot] = prev_slot
+    else:
+      self._tail = prev_slot
+
+  def _push_front(self, slot: int):
+    self._prev[slot] = self._NIL
+    self._next[slot] = self._head
+    if self._head != self._NIL:
+      self._prev[self._head] = slot
+    self._head = slot
+    if self._tail == self._NIL:
+      self._tail = slot
+
+  def get(self, key: Tuple[Hashable, ...]) -> Optional[float]:
+    """Получает значение и помечает его как недавно использованное"""
+    with self._lock:
+      slot = self._index.get(key)
+      if slot is None:
+        self.misses += 1
+        return None
+
+      if slot != self._head:
+        self._unlink(slot)
+        self._push_front(slot)
+
+      self.hits += 1
+      return float(self._values[slot])
+
+  def put(self, key: Tuple[Hashable, ...], value: float):
+    """Сохраняет значение, вытесняя самую старую запись при переполнении"""
+    with self._lock:
+      slot = self._index.get(key)
+      if slot is not None:
+        self._values[slot] = value
+        if slot != self._head:
+          self._unlink(slot)
+          self._push_front(slot)
+        return
+
+      if self._free:
+        slot = self._free.pop()
+      elif self._allocated < self.capacity:
+        slot = self._allocated
+        self._allocated += 1
+      else:
+        slot = self._tail
+        self._unlink(slot)
+        del self._index[self._slot_keys[slot]]
+        self.evictions += 1
+
+      self._values[slot] = value
+      self._slot_keys[slot] = key
+      self._index[key] = slot
+      self._push_front(slot)
+
+  def invalidate(self, lottery: Optional[str] = None):
+    """Удаляет записи лотереи (или все записи)"""
+    with self._lock:
+      if lottery is None:
+        self._reset(keep_stats=True)
+        return
+
+      for key in [k for k in self._index if k[0] == lottery]:
+        slot = self._index.pop(key)
+        self._unlink(slot)
+        self._slot_keys[slot] = None
+        self._free.append(slot)
+
+  def _reset(self, keep_stats: bool = False):
+    self._prev.fill(self._NIL)
+    self._next.fill(self._NIL)
+    self._slot_keys = [None] * self.capacity
+    self._index.clear()
+    self._free = []
+    self._head = self._tail = self._NIL
+    self._allocated = 0
+    if not keep_stats:
+      self.hits = self.misses = self.evictions = 0
+
+  def clear(self):
+    """Полная очистка кэша"""
+    with self._lock:
+      self._reset()
+    logger.info("🧹 Общий кэш fitness очищен")
+
+  def __len__(self) -> int:
+    return len(self._index)
+
+  def get_stats(self) -> Dict:
+    """Статистика кэша"""
+    with self._lock:
+      total = self.hits + self.misses
+      return {
+        'cache_size': len(self._index),
+        'capacity': self.capacity,
+        'hits': self.hits,
+        'misses': self.misses,
+        'evictions': self.evictions,
+        'hit_rate': self.hits / total if total > 0 else 0.0
+      }
+
+
+# Глобальный экземпляр кэша
+GLOBAL_FITNESS_CACHE = SharedFitnessCache()
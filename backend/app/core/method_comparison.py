@@ -0,0 +1,513 @@
+# core/method_comparison.py
+"""
+Параллельное сравнение методов генерации комбинаций.
+
+Каждый метод тестируется в отдельном процессе пула. История тиражей
+публикуется один раз в разделяемой памяти (SharedMemory), воркеры
+подключаются к ней по имени без пересылки DataFrame. У каждого метода
+свой бюджет времени и потоков; при исчерпании времени возвращается
+частичный результат. Сид метода выводится из общего сида и имени метода,
+поэтому сравнение воспроизводимо и кэшируется по
+(лотерея, версия данных, методы, сид). Генераторы получают локальные
+random.Random / numpy Generator - общие генераторы процесса не пересеиваются.
+
+Метод 'ai' оценивает комбинации обученной RF моделью API: родитель пишет
+ее снапшот на диск, воркер загружает его при смене версии модели.
+"""
+
+import logging
+import multiprocessing
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait as wait_futures
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from backend.app.core.utils import get_data_version
+
+logger = logging.getLogger(__name__)
+
+COMPARISON_METHODS = ("random", "hot", "cold", "mixed", "ai")
+
+# Бюджеты по умолчанию: время на метод (сек) и потоки BLAS/sklearn
+DEFAULT_METHOD_BUDGETS = {
+  'ai': {'time_budget': 120.0, 'threads': 2},
+  'default': {'time_budget': 30.0, 'threads': 1}
+}
+
+_PATTERN_STRATEGIES = {'hot': 'hot', 'cold': 'cold', 'mixed': 'balanced'}
+
+
+def method_seed(seed: int, method: str) -> int:
+  """Детерминированный сид метода (не зависит от PYTHONHASHSEED)"""
+  return zlib.crc32(f"{seed}:{method}".encode()) & 0x7FFFFFFF
+
+
+def check_combination_win(field1, field2, draw_field1, draw_field2, config):
+  """Проверка выигрыша комбинации (упрощённые уровни сравнения методов)"""
+  match_f1 = len(set(field1) & set(draw_field1))
+  match_f2 = len(set(field2) & set(draw_field2))
+
+  if match_f1 == config['field1_size'] and match_f2 == config['field2_size']:
+    return {"won": True, "match_level": "jackpot"}
+  elif match_f1 == config['field1_size'] and match_f2 >= 1:
+    return {"won": True, "match_level": "major"}
+  elif match_f1 >= 3 and match_f2 >= 1:
+    return {"won": True, "match_level": "minor"}
+  elif match_f1 >= 2:
+    return {"won": True, "match_level": "small"}
+  else:
+    return {"won": False, "match_level": None}
+
+
+class SharedDrawHistory:
+  """
+  История тиражей в разделяемой памяти.
+
+  Числа полей, номера и даты тиражей лежат одним блоком; descriptor()
+  возвращает компактное описание блока, по которому attach() в другом
+  процессе восстанавливает DataFrame поверх тех же байтов.
+  """
+
+  def __init__(self, df_history: pd.DataFrame):
+    field1 = self._pad(df_history['Числа_Поле1_list'].tolist())
+    field2 = self._pad(df_history['Числа_Поле2_list'].tolist())
+    draws = df_history['Тираж'].to_numpy(dtype=np.int64) if 'Тираж' in df_history else np.arange(len(df_history), dtype=np.int64)
+    dates = (pd.to_datetime(df_history['Дата'], errors='coerce').to_numpy(dtype='datetime64[ns]').astype(np.int64)
+             if 'Дата' in df_history else np.zeros(len(df_history), dtype=np.int64))
+
+    arrays = {'field1': field1, 'field2': field2, 'draws': draws, 'dates': dates}
+    self._layout = {}
+    offset = 0
+    for name, arr in arrays.items():
+      self._layout[name] = (offset, arr.shape, arr.dtype.str)
+      offset += arr.nbytes
+
+    self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, arr in arrays.items():
+      start, shape, dtype = self._layout[name]
+      np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=start)[...] = arr
+
+  @staticmethod
+  def _pad(rows: List) -> np.ndarray:
+    """Списки чисел -> матрица int16, недостающие позиции = 0"""
+    width = max((len(r) for r in rows if isinstance(r, (list, tuple, np.ndarray))), default=0)
+    out = np.zeros((len(rows), width), dtype=np.int16)
+    for i, row in enumerate(rows):
+      if isinstance(row, (list, tuple, np.ndarray)) and len(row):
+        out[i, :len(row)] = row
+    return out
+
+  def descriptor(self) -> Dict:
+    """Описание блока для передачи в воркер"""
+    return {'name': self.shm.name, 'layout': self._layout}
+
+  @staticmethod
+  def attach(descriptor: Dict):
+    """
+    Подключение к блоку в воркере
+
+    Returns:
+        (SharedMemory, DataFrame) - блок нужно закрыть после работы
+    """
+    shm = shared_memory.SharedMemory(name=descriptor['name'])
+    views = {
+      name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+      for name, (start, shape, dtype) in descriptor['layout'].items()
+    }
+
+    field1 = [[int(n) for n in row if n] for row in views['field1']]
+    field2 = [[int(n) for n in row if n] for row in views['field2']]
+    df = pd.DataFrame({
+      'Дата': pd.to_datetime(views['dates'].copy()),
+      'Тираж': views['draws'].copy(),
+      'Числа_Поле1': [', '.join(map(str, r)) for r in field1],
+      'Числа_Поле2': [', '.join(map(str, r)) for r in field2],
+      'Числа_Поле1_list': field1,
+      'Числа_Поле2_list': field2
+    })
+    return shm, df
+
+  def close(self):
+    """Освобождение блока (вызывается создателем)"""
+    try:
+      self.shm.close()
+      self.shm.unlink()
+    except FileNotFoundError:
+      pass
+
+
+def _hot_numbers(df_history: pd.DataFrame):
+  """Горячие числа последних 20 тиражей (для оценки комбинаций)"""
+  from backend.app.core import pattern_analyzer
+
+  hot_f1, hot_f2 = set(), set()
+  try:
+    hot_cold = pattern_analyzer.GLOBAL_PATTERN_ANALYZER.analyze_hot_cold_numbers(
+      df_history.tail(20), window_sizes=[20], top_n=10
+    )
+    if 'field1_window20' in hot_cold:
+      hot_f1 = {item[0] for item in hot_cold['field1_window20'].get('hot_numbers', [])}
+    if 'field2_window20' in hot_cold:
+      hot_f2 = {item[0] for item in hot_cold['field2_window20'].get('hot_numbers', [])}
+  except Exception as e:
+    logger.warning(f"Ошибка анализа горячих чисел: {e}")
+  return hot_f1, hot_f2
+
+
+def score_combination(combo: Dict, hot_f1: set, hot_f2: set) -> float:
+  """Оценка комбинации по пересечению с горячими числами"""
+  score = 50 + len(set(combo['field1']) & hot_f1) * 5 + len(set(combo['field2']) & hot_f2) * 3
+  return min(100, max(0, score))
+
+
+def _generate_combination(method: str, df_recent: pd.DataFrame, py_rng: random.Random) -> Dict:
+  """Одна комбинация методом (при пустом результате - случайная)"""
+  from backend.app.core import combination_generator
+
+  generated = None
+  if method in _PATTERN_STRATEGIES:
+    generated = combination_generator.generate_pattern_based_combinations(
+      df_recent, 1, _PATTERN_STRATEGIES[method], rng=py_rng
+    )
+  elif method == "ai":
+    generated = combination_generator.generate_rf_ranked_combinations(df_recent, 1, rng=py_rng)
+
+  if generated:
+    f1, f2 = generated[0][0], generated[0][1]
+  else:
+    f1, f2 = combination_generator.generate_random_combination(py_rng)
+  return {'field1': f1, 'field2': f2}
+
+
+def run_method_trials(method: str, df_history: pd.DataFrame, config: Dict,
+                      num_simulations: int, seed: int,
+                      time_budget: Optional[float] = None,
+                      partial_results: bool = True) -> Dict:
+  """
+  Тестирование одного метода: генерация, оценка и проверка на случайном тираже
+
+  Горячие числа для оценки считаются один раз на прогон, а не на каждую
+  комбинацию. Случайность (генераторы и выбор тиража) засеяна seed через
+  локальные генераторы, общие random / np.random не затрагиваются.
+
+  Returns:
+      Сырые результаты: оценки, выигрыши, число выполненных прогонов и статус
+  """
+  py_rng = random.Random(seed)
+  rng = np.random.default_rng(seed)
+
+  start = time.time()
+  deadline = start + time_budget if time_budget else None
+
+  df_recent = df_history.tail(50)
+  hot_f1, hot_f2 = _hot_numbers(df_history)
+  draws_f1 = df_history['Числа_Поле1_list'].tolist()
+  draws_f2 = df_history['Числа_Поле2_list'].tolist()
+
+  scores = []
+  wins = 0
+  timed_out = False
+
+  for _ in range(num_simulations):
+    if deadline and time.time() > deadline:
+      timed_out = True
+      break
+
+    try:
+      combo = _generate_combination(method, df_recent, py_rng)
+      scores.append(score_combination(combo, hot_f1, hot_f2))
+
+      if draws_f1:
+        idx = int(rng.integers(len(draws_f1)))
+        if isinstance(draws_f1[idx], list) and isinstance(draws_f2[idx], list):
+          if check_combination_win(combo['field1'], combo['field2'], draws_f1[idx], draws_f2[idx], config)['won']:
+            wins += 1
+    except Exception as e:
+      logger.warning(f"Ошибка тестирования метода {method}: {e}")
+      scores.append(50)  # Средний скор при ошибке
+
+  status = 'completed'
+  if timed_out:
+    status = 'partial' if partial_results else 'timeout'
+
+  return {
+    'method': method,
+    'status': status,
+    'seed': seed,
+    'requested': num_simulations,
+    'completed': len(scores),
+    'scores': scores if status != 'timeout' else [],
+    'wins': wins if status != 'timeout' else 0,
+    'elapsed': time.time() - start
+  }
+
+
+# Версии RF моделей, загруженных в этот процесс пула: {лотерея: токен снапшота}
+_WORKER_RF_TOKENS: Dict[str, Optional[str]] = {}
+
+
+def _install_rf_model(lottery_type: str, snapshot: Optional[Dict], threads: int):
+  """
+  RF модель API в процессе пула для метода 'ai'
+
+  Снапшот загружается, только если его токен отличается от загруженного.
+  Без снапшота (модель API не обучена) модель лотереи сбрасывается, чтобы
+  в процессе не осталась модель, обученная предыдущей задачей.
+  """
+  from backend.app.core import ai_model
+  from backend.app.core.rf_cache import GLOBAL_RF_CACHE
+
+  token = snapshot['token'] if snapshot else None
+  if token is None or _WORKER_RF_TOKENS.get(lottery_type) != token:
+    if snapshot is None:
+      ai_model.GLOBAL_MODEL_MANAGER.clear_lottery_models(lottery_type)
+    else:
+      with open(snapshot['path'], 'rb') as f:
+        ai_model.GLOBAL_MODEL_MANAGER.set_rf_model(lottery_type, pickle.load(f))
+    ai_model.GLOBAL_RF_MODEL.invalidate()
+    GLOBAL_RF_CACHE.clear_cache()
+    _WORKER_RF_TOKENS[lottery_type] = token
+
+  # n_jobs=-1 леса не ограничивается threadpool_limits - задаем бюджет явно
+  if snapshot is not None:
+    model = ai_model.GLOBAL_MODEL_MANAGER.get_rf_model(lottery_type, snapshot['config'])
+    for estimator in model.models_f1 + model.models_f2:
+      estimator.set_params(n_jobs=threads)
+
+
+def _method_worker(method: str, lottery_type: str, descriptor: Dict, num_simulations: int,
+                   seed: int, time_budget: Optional[float], threads: int,
+                   partial_results: bool, rf_snapshot: Optional[Dict] = None) -> Dict:
+  """Тело задачи в процессе пула"""
+  from backend.app.core import data_manager
+
+  data_manager.set_current_lottery(lottery_type)
+  if method == 'ai':
+    _install_rf_model(lottery_type, rf_snapshot, threads)
+  shm, df_history = SharedDrawHistory.attach(descriptor)
+  try:
+    try:
+      from threadpoolctl import threadpool_limits
+      limits = threadpool_limits(threads)
+    except ImportError:
+      limits = None
+
+    try:
+      return run_method_trials(method, df_history, data_manager.LOTTERY_CONFIGS[lottery_type],
+                               num_simulations, seed, time_budget, partial_results)
+    finally:
+      if limits is not None:
+        limits.restore_original_limits()
+  finally:
+    shm.close()
+
+
+class MethodComparisonRunner:
+  """Пул процессов для сравнения методов с кэшем результатов"""
+
+  def __init__(self, cpu_budget: Optional[int] = None, cache_size: int = 32):
+    """
+    Args:
+        cpu_budget: Суммарный бюджет ядер (по умолчанию os.cpu_count())
+        cache_size: Сколько сравнений хранить в кэше
+    """
+    self.cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+    self.cache_size = cache_size
+    self._cache: OrderedDict = OrderedDict()
+    self._executor = None
+    self._lock = threading.Lock()
+
+    # Снапшоты RF моделей API для метода 'ai': {лотерея: {'path', 'token', 'config'}}
+    self._snapshot_dir = None
+    self._rf_snapshots: Dict[str, Dict] = {}
+
+  def _get_executor(self) -> ProcessPoolExecutor:
+    with self._lock:
+      if self._executor is None:
+        self._executor = ProcessPoolExecutor(
+          max_workers=self.cpu_budget,
+          mp_context=multiprocessing.get_context('spawn')
+        )
+        logger.info(f"✅ Пул сравнения методов: {self.cpu_budget} процессов")
+      return self._executor
+
+  def threads_for(self, method: str, num_methods: int, budgets: Optional[Dict[str, Dict]] = None) -> int:
+    """
+    Потоки задачи метода: запрошенные, но не больше доли бюджета ядер
+    на одновременно работающий процесс пула
+    """
+    concurrent = max(1, min(self.cpu_budget, num_methods))
+    share = max(1, self.cpu_budget // concurrent)
+    return max(1, min(int(self.budget_for(method, budgets).get('threads', 1)), share))
+
+  def rf_snapshot(self, lottery_type: str, df_history: pd.DataFrame) -> Optional[Dict]:
+    """
+    Снапшот обученной RF модели API для метода 'ai'
+
+    Необученная модель сначала обучается на df_history (как при первой
+    генерации в API). Файл перезаписывается только при смене модели или
+    ее переобучении.
+
+    Returns:
+        {'path', 'token', 'config'} или None, если модель обучить не удалось
+    """
+    from backend.app.core import ai_model, data_manager
+
+    config = data_manager.LOTTERY_CONFIGS[lottery_type]
+    model = ai_model.GLOBAL_MODEL_MANAGER.get_rf_model(lottery_type, config)
+    if not model.is_trained:
+      model.train(df_history)
+    if not model.is_trained:
+      return None
+
+    token = f"{id(model)}_{model.train_version}"
+    with self._lock:
+      snapshot = self._rf_snapshots.get(lottery_type)
+      if snapshot and snapshot['token'] == token:
+        return snapshot
+
+      if self._snapshot_dir is None:
+        self._snapshot_dir = tempfile.mkdtemp(prefix='method_comparison_')
+      path = os.path.join(self._snapshot_dir, f"{lottery_type}_rf.pkl")
+      fd, tmp_path = tempfile.mkstemp(dir=self._snapshot_dir, suffix='.tmp')
+      try:
+        with os.fdopen(fd, 'wb') as f:
+          pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+      except Exception:
+        if os.path.exists(tmp_path):
+          os.remove(tmp_path)
+        raise
+
+      snapshot = {'path': path, 'token': token, 'config': config}
+      self._rf_snapshots[lottery_type] = snapshot
+      logger.info(f"💾 Снапшот RF модели {lottery_type} для сравнения методов: версия {model.train_version}")
+      return snapshot
+
+  @staticmethod
+  def budget_for(method: str, budgets: Optional[Dict[str, Dict]] = None) -> Dict:
+    """Бюджет метода: пользовательский поверх значений по умолчанию"""
+    budget = dict(DEFAULT_METHOD_BUDGETS.get(method, DEFAULT_METHOD_BUDGETS['default']))
+    if budgets:
+      budget.update(budgets.get('default', {}))
+      budget.update(budgets.get(method, {}))
+    return budget
+
+  def compare(self, lottery_type: str, df_history: pd.DataFrame,
+              methods: Sequence[str] = COMPARISON_METHODS, num_simulations: int = 50,
+              seed: int = 42, budgets: Optional[Dict[str, Dict]] = None,
+              partial_results: bool = True, parallel: bool = True,
+              use_cache: bool = True) -> Dict:
+    """
+    Сравнение методов
+
+    Args:
+        lottery_type: Тип лотереи
+        df_history: История тиражей
+        methods: Методы генерации
+        num_simulations: Прогонов на метод
+        seed: Общий сид сравнения
+        budgets: {'method' | 'default': {'time_budget': сек, 'threads': n}}
+        partial_results: Возвращать частичные результаты при нехватке времени
+        parallel: Запускать методы в пуле процессов
+        use_cache: Использовать кэш полных результатов
+
+    Returns:
+        {'results': [...], 'cached': bool, 'data_version': str}
+    """
+    methods = list(dict.fromkeys(methods))
+    data_version = get_data_version(df_history)
+    cache_key = (lottery_type, data_version, tuple(methods), seed, num_simulations)
+
+    if use_cache and cache_key in self._cache:
+      self._cache.move_to_end(cache_key)
+      logger.info(f"📦 Сравнение методов из кэша: {lottery_type}, сид {seed}")
+      return {'results': self._cache[cache_key], 'cached': True, 'data_version': data_version}
+
+    if parallel:
+      results = self._run_parallel(lottery_type, df_history, methods, num_simulations, seed, budgets, partial_results)
+    else:
+      from backend.app.core import data_manager
+      config = data_manager.LOTTERY_CONFIGS[lottery_type]
+      results = [
+        run_method_trials(m, df_history, config, num_simulations, method_seed(seed, m),
+                          self.budget_for(m, budgets)['time_budget'], partial_results)
+        for m in methods
+      ]
+
+    # Кэшируются только полные (воспроизводимые) сравнения
+    if use_cache and all(r['status'] == 'completed' for r in results):
+      self._cache[cache_key] = results
+      while len(self._cache) > self.cache_size:
+        self._cache.popitem(last=False)
+
+    return {'results': results, 'cached': False, 'data_version': data_version}
+
+  def _run_parallel(self, lottery_type, df_history, methods, num_simulations,
+                    seed, budgets, partial_results) -> List[Dict]:
+    executor = self._get_executor()
+    rf_snapshot = self.rf_snapshot(lottery_type, df_history) if 'ai' in methods else None
+    shared = SharedDrawHistory(df_history)
+    try:
+      futures = {}
+      for method in methods:
+        budget = self.budget_for(method, budgets)
+        futures[method] = executor.submit(
+          _method_worker, method, lottery_type, shared.descriptor(), num_simulations,
+          method_seed(seed, method), budget.get('time_budget'),
+          self.threads_for(method, len(methods), budgets), partial_results,
+          rf_snapshot if method == 'ai' else None
+        )
+
+      # Запас сверх бюджета на запуск процесса и последнюю начатую генерацию
+      time_budgets = [self.budget_for(m, budgets).get('time_budget') for m in methods]
+      timeout = None if any(t is None for t in time_budgets) else max(time_budgets) * 2 + 30
+      wait_futures(list(futures.values()), timeout=timeout)
+
+      results = []
+      for method, future in futures.items():
+        if not future.done():
+          # cancel() снимает только задачу, ждущую в очереди: уже запущенный
+          # воркер не прерывается и освобождает процесс пула, когда истечет
+          # его собственный time_budget (результат при этом отбрасывается)
+          future.cancel()
+          results.append({'method': method, 'status': 'timeout', 'seed': method_seed(seed, method),
+                          'requested': num_simulations, 'completed': 0, 'scores': [], 'wins': 0,
+                          'elapsed': timeout})
+          continue
+        try:
+          results.append(future.result())
+        except Exception as e:
+          logger.error(f"❌ Ошибка тестирования метода {method}: {e}")
+          results.append({'method': method, 'status': 'failed', 'error': str(e),
+                          'seed': method_seed(seed, method), 'requested': num_simulations,
+                          'completed': 0, 'scores': [], 'wins': 0, 'elapsed': 0.0})
+      return results
+    finally:
+      shared.close()
+
+  def shutdown(self):
+    """Остановка пула и удаление снапшотов RF моделей"""
+    with self._lock:
+      if self._executor is not None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+      if self._snapshot_dir is not None:
+        shutil.rmtree(self._snapshot_dir, ignore_errors=True)
+        self._snapshot_dir = None
+        self._rf_snapshots.clear()
+
+
+# Глобальный экземпляр для API
+GLOBAL_METHOD_COMPARATOR = MethodComparisonRunner(cpu_budget=int(os.getenv('COMPARE_METHODS_JOBS', '0')) or None)
@@ -99,8 +99,8 @@ def ultra_fast_parallel_ranking(combinations, max_workers=3):
 
     return all_scores
 
-def smart_combination_generator(num_needed, avoid_duplicates=True):
-    """Умная генерация комбинаций"""
+def smart_combination_generator(num_needed, avoid_duplicates=True, rng=None):
+    """Умная генерация комбинаций (rng - генератор random.Random для generate_random_combination)"""
     from backend.app.core.combination_generator import generate_random_combination
 
     combinations = []
@@ -111,7 +111,7 @@ def smart_combination_generator(num_needed, avoid_duplicates=True):
         if len(combinations) >= num_needed:
             break
 
-        f1, f2 = generate_random_combination()
+        f1, f2 = generate_random_combination(rng)
 
         if avoid_duplicates:
             combo_key = (tuple(sorted(f1)), tuple(sorted(f2)))
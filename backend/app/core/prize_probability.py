@@ -0,0 +1,234 @@
+# core/prize_probability.py
+"""
+Точные вероятности призовых категорий и математическое ожидание билета.
+
+Число совпадений в каждом поле распределено гипергеометрически:
+P(k) = C(K, k) * C(N - K, K - k) / C(N, K), где N - размер поля, K - количество
+выбираемых чисел. Поля тянутся независимо, поэтому совместное распределение
+совпадений - произведение маргинальных. Категории сопоставляются с парами
+совпадений по тем же правилам, что и в ticket_verifier.get_prize_category
+(первая подходящая категория в порядке конфигурации).
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from math import comb
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def match_distribution(field_max: int, field_size: int) -> np.ndarray:
+  """
+  Гипергеометрическое распределение числа совпадений в одном поле.
+
+  Args:
+      field_max: Количество чисел в поле (N)
+      field_size: Количество выбираемых чисел (K), одинаково для билета и тиража
+
+  Returns:
+      np.ndarray длины field_size + 1, элемент k - вероятность k совпадений
+  """
+  total = comb(field_max, field_size)
+  return np.array([
+    comb(field_size, k) * comb(field_max - field_size, field_size - k) / total
+    for k in range(field_size + 1)
+  ], dtype=np.float64)
+
+
+def joint_match_distribution(config: Dict) -> np.ndarray:
+  """Матрица P[m1, m2] совпадений в двух полях для одного билета"""
+  p1 = match_distribution(config['field1_max'], config['field1_size'])
+  p2 = match_distribution(config['field2_max'], config['field2_size'])
+  return np.outer(p1, p2)
+
+
+def category_index_matrix(config: Dict) -> np.ndarray:
+  """
+  Индекс призовой категории для каждой пары совпадений (m1, m2).
+
+  Returns:
+      Матрица int (field1_size + 1, field2_size + 1), -1 означает отсутствие выигрыша
+  """
+  categories = config.get('prize_categories', [])
+  index = np.full((config['field1_size'] + 1, config['field2_size'] + 1), -1, dtype=np.int64)
+
+  for m1 in range(index.shape[0]):
+    for m2 in range(index.shape[1]):
+      for cat_idx, category in enumerate(categories):
+        f1_req = category.get('f1')
+        f2_req = category.get('f2')
+        if (f1_req is None or m1 == f1_req) and (f2_req is None or m2 == f2_req):
+          index[m1, m2] = cat_idx
+          break
+
+  return index
+
+
+@dataclass
+class PrizeTable:
+  """Таблица точных вероятностей и выплат одного билета"""
+  categories: List[Dict]
+  probabilities: np.ndarray        # Вероятность каждой категории
+  payouts: np.ndarray              # Выплата каждой категории
+  joint_probabilities: np.ndarray  # P[m1, m2]
+  category_index: np.ndarray       # Категория для (m1, m2), -1 - без выигрыша
+  win_probability: float = 0.0
+  expected_payout: float = 0.0
+  payout_variance: float = 0.0
+  _outcome_probs: np.ndarray = field(default=None, repr=False)
+  _outcome_payouts: np.ndarray = field(default=None, repr=False)
+
+  def __post_init__(self):
+    self.win_probability = float(self.probabilities.sum())
+    self.expected_payout = float(np.dot(self.probabilities, self.payouts))
+    self.payout_variance = float(np.dot(self.probabilities, self.payouts ** 2) - self.expected_payout ** 2)
+
+    # Исходы для выборок: категории + "без выигрыша" последним элементом
+    self._outcome_probs = np.append(self.probabilities, max(0.0, 1.0 - self.win_probability))
+    self._outcome_probs /= self._outcome_probs.sum()
+    self._outcome_payouts = np.append(self.payouts, 0.0)
+
+  @property
+  def average_prize(self) -> float:
+    """Средний выигрыш при условии, что билет выиграл"""
+    return self.expected_payout / self.win_probability if self.win_probability > 0 else 0.0
+
+  def expected_value(self, ticket_price: float = 0.0) -> float:
+    """Математическое ожидание прибыли с одного билета"""
+    return self.expected_payout - ticket_price
+
+  def return_rate(self, ticket_price: float) -> float:
+    """Доля возврата стоимости билета (expected_payout / ticket_price)"""
+    return self.expected_payout / ticket_price if ticket_price > 0 else 0.0
+
+  def summary(self, ticket_price: float = 0.0, num_tickets: int = 1) -> Dict:
+    """
+    Точные характеристики для num_tickets независимых билетов.
+
+    Выплаты билетов независимы (каждый сравнивается со своим тиражом
+    или с разными комбинациями), поэтому среднее и дисперсия суммируются.
+    """
+    num_tickets = max(int(num_tickets), 0)
+    cost = ticket_price * num_tickets
+    mean = self.expected_payout * num_tickets
+    variance = self.payout_variance * num_tickets
+    std = float(np.sqrt(max(variance, 0.0)))
+
+    return {
+      'num_tickets': num_tickets,
+      'ticket_price': ticket_price,
+      'win_probability': self.win_probability,
+      'prob_at_least_one_win': 1.0 - (1.0 - self.win_probability) ** num_tickets,
+      'expected_wins': self.win_probability * num_tickets,
+      'average_prize': self.average_prize,
+      'expected_payout': mean,
+      'expected_value': mean - cost,
+      'payout_std': std,
+      'expected_roi_percent': ((mean - cost) / cost) * 100 if cost > 0 else 0.0,
+      'roi_std_percent': (std / cost) * 100 if cost > 0 else 0.0,
+      'return_rate': self.return_rate(ticket_price)
+    }
+
+  def sample_payouts(self, size, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Выборка выплат отдельных билетов из точного распределения"""
+    rng = rng or np.random.default_rng()
+    outcomes = rng.choice(len(self._outcome_probs), size=size, p=self._outcome_probs)
+    return self._outcome_payouts[outcomes]
+
+  def sample_total_payouts(self, num_tickets: int, num_samples: int,
+                           rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Выборка суммарных выплат num_tickets билетов.
+
+    Вместо перебора билетов тянется мультиномиальное число попаданий
+    в каждую категорию - стоимость не зависит от num_tickets.
+    """
+    rng = rng or np.random.default_rng()
+    counts = rng.multinomial(max(int(num_tickets), 0), self._outcome_probs, size=num_samples)
+    return counts @ self._outcome_payouts
+
+  def to_dict(self, ticket_price: float = 0.0) -> Dict:
+    """Сериализация таблицы для API"""
+    categories = []
+    for category, prob, payout in zip(self.categories, self.probabilities, self.payouts):
+      categories.append({
+        'name': category.get('name'),
+        'f1': category.get('f1'),
+        'f2': category.get('f2'),
+        'probability': float(prob),
+        'odds_one_in': float(1.0 / prob) if prob > 0 else None,
+        'payout': float(payout),
+        'ev_contribution': float(prob * payout)
+      })
+
+    return {
+      'categories': categories,
+      'joint_match_probabilities': self.joint_probabilities.tolist(),
+      'payout_std': float(np.sqrt(max(self.payout_variance, 0.0))),
+      **self.summary(ticket_price)
+    }
+
+
+def build_prize_table(config: Dict) -> PrizeTable:
+  """Расчёт таблицы призов для произвольной конфигурации лотереи"""
+  categories = config.get('prize_categories', [])
+  payouts_cfg = config.get('prize_payouts', {})
+
+  joint = joint_match_distribution(config)
+  index = category_index_matrix(config)
+
+  probabilities = np.zeros(len(categories), dtype=np.float64)
+  for cat_idx in range(len(categories)):
+    probabilities[cat_idx] = joint[index == cat_idx].sum()
+
+  payouts = np.array([float(payouts_cfg.get(c.get('name'), 0)) for c in categories], dtype=np.float64)
+
+  return PrizeTable(
+    categories=list(categories),
+    probabilities=probabilities,
+    payouts=payouts,
+    joint_probabilities=joint,
+    category_index=index
+  )
+
+
+class PrizeProbabilityEngine:
+  """Кэш таблиц призов по типам лотерей"""
+
+  def __init__(self):
+    self._tables: Dict[str, PrizeTable] = {}
+    self._lock = threading.Lock()
+
+  def get_table(self, lottery_type: Optional[str] = None) -> PrizeTable:
+    """
+    Таблица призов лотереи (по умолчанию - текущей).
+
+    Таблица считается один раз и хранится до clear().
+    """
+    from backend.app.core.data_manager import LOTTERY_CONFIGS, CURRENT_LOTTERY
+
+    lottery_type = lottery_type or CURRENT_LOTTERY
+    if lottery_type not in LOTTERY_CONFIGS:
+      raise ValueError(f"Неизвестный тип лотереи: {lottery_type}")
+
+    with self._lock:
+      table = self._tables.get(lottery_type)
+      if table is None:
+        table = build_prize_table(LOTTERY_CONFIGS[lottery_type])
+        self._tables[lottery_type] = table
+        logger.info(f"🎯 Таблица призов {lottery_type}: P(выигрыш)={table.win_probability:.5f}, "
+                    f"E[выплата]={table.expected_payout:.2f}")
+    return table
+
+  def clear(self):
+    """Сброс кэша (например, после изменения призовых выплат)"""
+    with self._lock:
+      self._tables.clear()
+
+
+# Глобальный экземпляр движка вероятностей
+GLOBAL_PRIZE_ENGINE = PrizeProbabilityEngine()
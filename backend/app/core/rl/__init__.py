@@ -4,7 +4,9 @@
 """
 
 from backend.app.core.rl.environment import LotteryEnvironment, LotteryState
+from backend.app.core.rl.vector_env import VectorizedLotteryEnvironment
 from backend.app.core.rl.q_agent import QLearningAgent
+from backend.app.core.rl.q_table import CompactQTable
 from backend.app.core.rl.dqn_agent import DQNAgent, DQNNetwork
 from backend.app.core.rl.state_encoder import StateEncoder, ActionEncoder
 from backend.app.core.rl.reward_calculator import RewardCalculator, RewardScheme, ShapedRewardCalculator
@@ -19,9 +21,11 @@ __all__ = [
   # Environment
   'LotteryEnvironment',
   'LotteryState',
+  'VectorizedLotteryEnvironment',
 
   # Agents
   'QLearningAgent',
+  'CompactQTable',
   'DQNAgent',
   'DQNNetwork',
 
@@ -0,0 +1,110 @@
+"""
+Пакетная оценка RL агентов
+Предсказания для всего среза истории за один проход и векторный подсчет наград
+"""
+
+import logging
+import numpy as np
+from typing import Dict, Tuple
+
+from backend.app.core.rl.environment import LotteryEnvironment
+from backend.app.core.rl.vector_env import VectorizedLotteryEnvironment
+
+logger = logging.getLogger(__name__)
+
+
+def _suffix_sum(values: np.ndarray) -> np.ndarray:
+    """S[i] = sum(values[i:])"""
+    return np.cumsum(values[::-1])[::-1]
+
+
+class BatchedAgentEvaluator:
+    """
+    Оценка агента на срезе истории без пошагового проигрывания среды
+
+    Агенты в режиме эксплуатации детерминированы по состоянию, поэтому
+    действие для каждой позиции вычисляется один раз (predict_batch агента),
+    а награды - по таблице призов VectorizedLotteryEnvironment. Эпизоды
+    валидации (от случайной позиции до конца среза) после этого сводятся
+    к суффиксным суммам наград.
+    """
+
+    def __init__(self, env: LotteryEnvironment):
+        """
+        Args:
+            env: Среда над оцениваемым срезом истории
+        """
+        self.env = env
+        self.scorer = VectorizedLotteryEnvironment(env, num_envs=1)
+        self.n_draws = len(env.df_history)
+
+    def predict(self, agent, positions: np.ndarray,
+                return_values: bool = False):
+        """
+        Действия агента для позиций
+
+        Агенты без predict_batch опрашиваются поштучно (по одному разу на позицию).
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        if hasattr(agent, 'predict_batch'):
+            return agent.predict_batch(self.env, positions, return_values=return_values)
+
+        actions = [agent.predict(self.env._compute_state(int(p))) for p in positions]
+        field1 = np.array([sorted(a[0]) for a in actions], dtype=np.int64).reshape(len(positions), -1)
+        field2 = np.array([sorted(a[1]) for a in actions], dtype=np.int64).reshape(len(positions), -1)
+        if return_values:
+            return field1, field2, np.zeros(len(positions))
+        return field1, field2
+
+    def score(self, field1: np.ndarray, field2: np.ndarray,
+              draw_positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Награды и совпадения предсказаний с тиражами draw_positions
+
+        Returns:
+            (награды, совпадения_поле1, совпадения_поле2)
+        """
+        if len(draw_positions) == 0:
+            empty = np.zeros(0)
+            return empty, empty.astype(np.int64), empty.astype(np.int64)
+        return self.scorer.compute_rewards(field1, field2, np.asarray(draw_positions, dtype=np.int64))
+
+    def episode_positions(self) -> np.ndarray:
+        """Позиции, проходимые эпизодами среды: window_size .. n-2"""
+        return np.arange(self.env.window_size, max(self.env.window_size, self.n_draws - 1))
+
+    def sample_episode_starts(self, num_episodes: int) -> np.ndarray:
+        """Стартовые позиции эпизодов с тем же распределением, что и в reset()"""
+        min_pos = self.env.window_size
+        max_pos = self.n_draws - 10
+        if max_pos > min_pos:
+            return np.random.randint(min_pos, max_pos, size=num_episodes)
+        return np.full(num_episodes, min_pos, dtype=np.int64)
+
+    def play_episodes(self, agent, num_episodes: int, ticket_cost: float) -> Dict[str, np.ndarray]:
+        """
+        Эквивалент num_episodes прогонов reset()/step() до конца среза
+
+        Returns:
+            Словарь с наградами эпизодов, числом шагов, выигрышей и суммой выигранного
+        """
+        positions = self.episode_positions()
+        starts = self.sample_episode_starts(num_episodes)
+
+        if len(positions) == 0:
+            zeros = np.zeros(num_episodes)
+            return {'rewards': zeros, 'steps': zeros, 'wins': zeros, 'won': zeros}
+
+        field1, field2 = self.predict(agent, positions)
+        rewards, _, _ = self.score(field1, field2, positions)
+
+        wins = rewards > 0
+        won = np.where(wins, rewards + ticket_cost, 0.0)
+
+        offsets = np.clip(starts - self.env.window_size, 0, len(positions) - 1)
+        return {
+            'rewards': _suffix_sum(rewards)[offsets],
+            'steps': (len(positions) - offsets).astype(np.float64),
+            'wins': _suffix_sum(wins.astype(np.int64))[offsets],
+            'won': _suffix_sum(won)[offsets]
+        }
@@ -9,13 +9,13 @@ import torch
 import torch.nn as nn
 import torch.optim as optim
 import torch.nn.functional as F
-from typing import Dict, List, Tuple, Optional, Any
-from collections import deque
+from typing import Dict, List, Tuple, Optional, Any, Callable
 import random
 import logging
 from datetime import datetime
 
 from backend.app.core.rl.environment import LotteryEnvironment, LotteryState
+from backend.app.core.rl.vector_env import VectorizedLotteryEnvironment
 from backend.app.core.rl.state_encoder import StateEncoder, ActionEncoder
 from backend.app.core.rl.reward_calculator import RewardCalculator
 
@@ -163,29 +163,226 @@ class DQNNetwork(nn.Module):
         return q_values, field1_probs, field2_probs
 
 
+class SumTree:
+    """
+    Дерево сумм приоритетов для prioritized experience replay
+
+    Листья хранят приоритеты, внутренние узлы - суммы поддеревьев.
+    Обновление и выборка выполняются для всего батча сразу:
+    O(log capacity) векторных операций.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.leaf_offset = 1
+        while self.leaf_offset < capacity:
+            self.leaf_offset *= 2
+        self.depth = self.leaf_offset.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaf_offset, dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        return float(self.tree[1])
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray):
+        """Установка приоритетов листьев и пересчет сумм вверх по дереву"""
+        nodes = np.asarray(indices, dtype=np.int64) + self.leaf_offset
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """Индексы листьев, в чьи отрезки префиксных сумм попадают values"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values = np.where(go_right, values - left_sum, values)
+            nodes = left + go_right
+        return np.minimum(nodes - self.leaf_offset, self.capacity - 1)
+
+    def priorities(self, indices: np.ndarray) -> np.ndarray:
+        return self.tree[np.asarray(indices, dtype=np.int64) + self.leaf_offset]
+
+
 class ReplayBuffer:
     """
-    Буфер воспроизведения для хранения опыта
+    Буфер воспроизведения на преаллоцированных массивах (кольцевой)
+
+    Переходы хранятся в непрерывных массивах состояний, действий
+    (числа обоих полей), наград, следующих состояний и флагов завершения.
+    Выборка - векторный сбор по индексам, ее стоимость не зависит от
+    заполненности буфера. В режиме prioritized индексы выбираются
+    пропорционально приоритету через SumTree.
     """
-    
-    def __init__(self, capacity: int = 10000):
+
+    def __init__(self, capacity: int = 10000, state_size: int = 10, action_size: int = 2,
+                 prioritized: bool = False, alpha: float = 0.6, beta: float = 0.4,
+                 beta_increment: float = 1e-4, epsilon: float = 1e-6):
         """
         Args:
             capacity: Максимальный размер буфера
+            state_size: Размерность вектора состояния
+            action_size: Длина кодировки действия (field1_size + field2_size)
+            prioritized: Prioritized experience replay
+            alpha: Степень приоритизации (0 - равномерно)
+            beta: Начальная степень коррекции importance sampling
+            beta_increment: Прирост beta на каждую выборку
+            epsilon: Добавка к |TD-ошибке|, чтобы приоритет не был нулевым
         """
-        self.buffer = deque(maxlen=capacity)
-    
-    def push(self, state: np.ndarray, action: Tuple, reward: float, 
+        self.capacity = capacity
+        self.state_size = state_size
+        self.action_size = action_size
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+
+        self.states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.actions = np.zeros((capacity, action_size), dtype=np.int16)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.bool_)
+
+        self.position = 0
+        self.size = 0
+
+        self.tree = SumTree(capacity) if prioritized else None
+        self.max_priority = 1.0
+
+    def push(self, state: np.ndarray, action: Tuple, reward: float,
              next_state: Optional[np.ndarray], done: bool):
         """Добавление опыта в буфер"""
-        self.buffer.append((state, action, reward, next_state, done))
-    
-    def sample(self, batch_size: int) -> List[Tuple]:
-        """Случайная выборка из буфера"""
-        return random.sample(self.buffer, batch_size)
-    
+        field1, field2 = action
+        self.push_batch(
+            np.asarray(state, dtype=np.float32)[None, :],
+            np.asarray(list(field1) + list(field2), dtype=np.int16)[None, :],
+            np.array([reward], dtype=np.float32),
+            None if next_state is None else np.asarray(next_state, dtype=np.float32)[None, :],
+            np.array([done], dtype=np.bool_)
+        )
+
+    def push_batch(self, states: np.ndarray, actions: np.ndarray, rewards: np.ndarray,
+                   next_states: Optional[np.ndarray], dones: np.ndarray):
+        """
+        Добавление батча переходов
+
+        Args:
+            states: (B, state_size)
+            actions: (B, action_size) числа полей действия
+            rewards: (B,)
+            next_states: (B, state_size) или None (все переходы терминальные)
+            dones: (B,)
+        """
+        count = len(rewards)
+        if count > self.capacity:
+            states, actions, rewards = states[-self.capacity:], actions[-self.capacity:], rewards[-self.capacity:]
+            next_states = None if next_states is None else next_states[-self.capacity:]
+            dones = dones[-self.capacity:]
+            count = self.capacity
+
+        indices = (self.position + np.arange(count)) % self.capacity
+
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.dones[indices] = dones
+        if next_states is None:
+            self.next_states[indices] = 0.0
+        else:
+            self.next_states[indices] = next_states
+            self.next_states[indices[dones]] = 0.0
+
+        if self.prioritized:
+            self.tree.update(indices, np.full(count, self.max_priority ** self.alpha))
+
+        self.position = int((self.position + count) % self.capacity)
+        self.size = min(self.size + count, self.capacity)
+
+    def sample(self, batch_size: int) -> Dict[str, np.ndarray]:
+        """
+        Выборка батча
+
+        Returns:
+            Словарь массивов: states, actions, rewards, next_states, dones,
+            indices и weights (веса importance sampling, единицы без приоритизации)
+        """
+        if self.prioritized:
+            segment = self.tree.total / batch_size
+            values = (np.arange(batch_size) + np.random.random(batch_size)) * segment
+            indices = self.tree.find(values)
+
+            probs = self.tree.priorities(indices) / max(self.tree.total, 1e-12)
+            weights = (self.size * np.maximum(probs, 1e-12)) ** (-self.beta)
+            weights = (weights / weights.max()).astype(np.float32)
+            self.beta = min(1.0, self.beta + self.beta_increment)
+        else:
+            indices = np.random.randint(0, self.size, size=batch_size)
+            weights = np.ones(batch_size, dtype=np.float32)
+
+        return {
+            'states': self.states[indices],
+            'actions': self.actions[indices],
+            'rewards': self.rewards[indices],
+            'next_states': self.next_states[indices],
+            'dones': self.dones[indices],
+            'indices': indices,
+            'weights': weights
+        }
+
+    def update_priorities(self, indices: np.ndarray, td_errors: np.ndarray):
+        """Обновление приоритетов по TD-ошибкам (только в режиме prioritized)"""
+        if not self.prioritized:
+            return
+        priorities = np.abs(td_errors) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(indices, priorities ** self.alpha)
+
+    def state_dict(self) -> Dict[str, Any]:
+        """Состояние буфера для сохранения в чекпоинт"""
+        n = self.size
+        # Переходы сохраняются в хронологическом порядке
+        order = (np.arange(n) + (self.position - n)) % self.capacity
+        state = {
+            'capacity': self.capacity,
+            'prioritized': self.prioritized,
+            'beta': self.beta,
+            'max_priority': self.max_priority,
+            'states': self.states[order].copy(),
+            'actions': self.actions[order].copy(),
+            'rewards': self.rewards[order].copy(),
+            'next_states': self.next_states[order].copy(),
+            'dones': self.dones[order].copy()
+        }
+        if self.prioritized:
+            state['priorities'] = self.tree.priorities(order).copy()
+        return state
+
+    def load_state_dict(self, state: Dict[str, Any]):
+        """Восстановление буфера из чекпоинта"""
+        self.position = 0
+        self.size = 0
+        if self.prioritized:
+            self.tree = SumTree(self.capacity)
+
+        n = len(state['rewards'])
+        if n:
+            self.push_batch(state['states'], state['actions'], state['rewards'],
+                            state['next_states'], state['dones'])
+            if self.prioritized and 'priorities' in state:
+                kept = min(n, self.capacity)
+                indices = (self.position - kept + np.arange(kept)) % self.capacity
+                self.tree.update(indices, state['priorities'][-kept:])
+
+        self.beta = state.get('beta', self.beta)
+        self.max_priority = state.get('max_priority', self.max_priority)
+
     def __len__(self) -> int:
-        return len(self.buffer)
+        return self.size
 
 
 class DQNAgent:
@@ -203,7 +400,8 @@ class DQNAgent:
                  batch_size: int = 32,
                  memory_size: int = 10000,
                  target_update_freq: int = 100,
-                 device: str = None):
+                 device: str = None,
+                 prioritized_replay: bool = False):
         """
         Args:
             lottery_config: Конфигурация лотереи
@@ -216,6 +414,7 @@ class DQNAgent:
             memory_size: Размер буфера воспроизведения
             target_update_freq: Частота обновления целевой сети
             device: Устройство (cuda/cpu)
+            prioritized_replay: Prioritized experience replay
         """
         self.lottery_config = lottery_config
         self.learning_rate = learning_rate
@@ -264,7 +463,12 @@ class DQNAgent:
         self.optimizer = optim.Adam(self.q_network.parameters(), lr=learning_rate)
         
         # Буфер воспроизведения
-        self.memory = ReplayBuffer(memory_size)
+        self.memory = ReplayBuffer(
+            memory_size,
+            state_size=self.state_size,
+            action_size=self.field1_size + self.field2_size,
+            prioritized=prioritized_replay
+        )
         
         # Статистика
         self.total_steps = 0
@@ -319,6 +523,73 @@ class DQNAgent:
 
         return field1, field2
     
+    def _greedy_batch(self, states: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Жадные действия и max Q для батча состояний (один прямой проход в eval-режиме)
+
+        Returns:
+            (M, field1_size) и (M, field2_size) числа (не отсортированы), (M,) max Q
+        """
+        state_tensor = torch.from_numpy(np.ascontiguousarray(states, dtype=np.float32)).to(self.device)
+
+        # Выбор действия не должен менять статистики BatchNorm
+        was_training = self.q_network.training
+        self.q_network.eval()
+        with torch.no_grad():
+            q_values, field1_probs, field2_probs = self.q_network(state_tensor)
+        if was_training:
+            self.q_network.train()
+
+        field1 = torch.topk(field1_probs[:, :self.field1_max], self.field1_size, dim=1).indices.cpu().numpy() + 1
+        field2 = torch.topk(field2_probs[:, :self.field2_max], self.field2_size, dim=1).indices.cpu().numpy() + 1
+        max_q = q_values.max(dim=1).values.cpu().numpy()
+
+        return field1, field2, max_q
+
+    def choose_actions_batch(self, states: np.ndarray,
+                             training: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Выбор действий для батча состояний одним прямым проходом сети
+
+        Args:
+            states: (M, state_size) векторы состояний
+            training: Режим обучения (epsilon-greedy)
+
+        Returns:
+            (M, field1_size) и (M, field2_size) отсортированные числа
+        """
+        num_states = states.shape[0]
+        field1, field2, _ = self._greedy_batch(states)
+
+        if training:
+            explore = np.random.random(num_states) < self.epsilon
+            n_explore = int(explore.sum())
+            if n_explore:
+                # Случайные сочетания без повторов через argsort случайной матрицы
+                field1[explore] = np.argsort(np.random.random((n_explore, self.field1_max)), axis=1)[:, :self.field1_size] + 1
+                field2[explore] = np.argsort(np.random.random((n_explore, self.field2_max)), axis=1)[:, :self.field2_size] + 1
+
+        return np.sort(field1, axis=1), np.sort(field2, axis=1)
+
+    def predict_batch(self, env: LotteryEnvironment, positions: np.ndarray,
+                      return_values: bool = False):
+        """
+        Предсказания для позиций среды одним прямым проходом (режим эксплуатации)
+
+        Args:
+            env: Среда с предвычисленной таблицей состояний
+            positions: (M,) позиции истории
+            return_values: Вернуть также max Q для каждой позиции
+
+        Returns:
+            (field1 (M, k1), field2 (M, k2)) или (field1, field2, max_q)
+        """
+        field1, field2, max_q = self._greedy_batch(env.state_table[positions])
+        field1, field2 = np.sort(field1, axis=1), np.sort(field2, axis=1)
+        if return_values:
+            return field1, field2, max_q
+        return field1, field2
+
     def _probs_to_numbers(self, probs: torch.Tensor, size: int, max_num: int) -> List[int]:
         """
         Преобразование вероятностей в числа
@@ -359,6 +630,17 @@ class DQNAgent:
         
         self.memory.push(state_vector, action, reward, next_state_vector, done)
 
+    def remember_batch(self, states: np.ndarray, actions_f1: np.ndarray, actions_f2: np.ndarray,
+                       rewards: np.ndarray, next_states: np.ndarray, dones: np.ndarray):
+        """Сохранение батча переходов из векторизованной среды"""
+        self.memory.push_batch(
+            states,
+            np.concatenate([actions_f1, actions_f2], axis=1),
+            rewards,
+            next_states,
+            np.asarray(dones, dtype=np.bool_)
+        )
+
     def replay(self):
         """h
         Обучение на случайной выборке из буфера воспроизведения
@@ -377,12 +659,10 @@ class DQNAgent:
         # Сэмплируем актуальный размер батча
         batch = self.memory.sample(actual_batch_size)
 
-        states_array = np.array([e[0] for e in batch])
-        states = torch.FloatTensor(states_array).to(self.device)
-        actions = [e[1] for e in batch]
-        rewards = torch.FloatTensor([e[2] for e in batch]).to(self.device)
-        next_states = [e[3] for e in batch]
-        dones = torch.FloatTensor([e[4] for e in batch]).to(self.device)
+        states = torch.from_numpy(batch['states']).to(self.device)
+        rewards = torch.from_numpy(batch['rewards']).to(self.device)
+        next_states = torch.from_numpy(batch['next_states']).to(self.device)
+        non_terminal = torch.from_numpy(~batch['dones']).float().to(self.device)
 
         # Устанавливаем правильный режим для BatchNorm
         if states.size(0) == 1:
@@ -392,36 +672,22 @@ class DQNAgent:
         # Текущие Q-значения
         current_q_values, _, _ = self.q_network(states)
 
-        # Целевые Q-значения
-        target_q_values = rewards.clone()
-
-        # Для не-терминальных состояний добавляем будущую награду
-        non_terminal_mask = (dones == 0)
-        if non_terminal_mask.any():
-            non_terminal_list = [ns for ns, d in zip(next_states, dones) if d == 0 and ns is not None]
-            if non_terminal_list:
-                # Используем np.stack для быстрого объединения numpy массивов
-                non_terminal_array = np.stack(non_terminal_list)
-                non_terminal_next_states = torch.FloatTensor(non_terminal_array).to(self.device)
-            else:
-                # Создаем пустой тензор правильной формы
-                non_terminal_next_states = torch.empty(0, 10).to(self.device)  # 10 = размер состояния
-
-            if len(non_terminal_next_states) > 0:
-                with torch.no_grad():
-                    next_q_values, _, _ = self.target_network(non_terminal_next_states)
-                    max_next_q = next_q_values.max(1)[0]
-
-                    # Обновляем целевые значения для не-терминальных состояний
-                    j = 0
-                    for i, is_non_terminal in enumerate(non_terminal_mask):
-                        if is_non_terminal and next_states[i] is not None:
-                            target_q_values[i] += self.discount_factor * max_next_q[j]
-                            j += 1
+        # Целевые Q-значения: для не-терминальных состояний добавляем будущую награду
+        # (сеть считается по всему батчу, терминальные строки обнуляются маской)
+        with torch.no_grad():
+            next_q_values, _, _ = self.target_network(next_states)
+            target_q_values = rewards + self.discount_factor * next_q_values.max(1)[0] * non_terminal
 
         # Вычисляем loss
         # Используем среднее Q-значение как прокси для оценки действия
-        loss = F.mse_loss(current_q_values.mean(1), target_q_values)
+        predicted = current_q_values.mean(1)
+        if self.memory.prioritized:
+            weights = torch.from_numpy(batch['weights']).to(self.device)
+            td_errors = predicted - target_q_values
+            loss = (weights * td_errors.pow(2)).mean()
+            self.memory.update_priorities(batch['indices'], td_errors.detach().cpu().numpy())
+        else:
+            loss = F.mse_loss(predicted, target_q_values)
 
         # Обратное распространение
         self.optimizer.zero_grad()
@@ -521,7 +787,9 @@ class DQNAgent:
               df_history: pd.DataFrame,
               num_episodes: int = 500,
               window_size: int = 50,
-              verbose: bool = True) -> Dict:
+              verbose: bool = True,
+              num_envs: int = 1,
+              progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict:
         """
         Полный цикл обучения
         
@@ -530,6 +798,8 @@ class DQNAgent:
             num_episodes: Количество эпизодов
             window_size: Размер окна для признаков
             verbose: Вывод прогресса
+            num_envs: Количество параллельных эпизодов (>1 - векторизованная среда)
+            progress_callback: Вызывается со статистикой каждого завершенного эпизода
         
         Returns:
             Итоговая статистика
@@ -539,6 +809,11 @@ class DQNAgent:
         # Создаем среду
         env = LotteryEnvironment(df_history, self.lottery_config, window_size)
         
+        if num_envs > 1:
+            best_episode, best_episode_reward = self._train_vectorized(env, num_episodes, num_envs, verbose,
+                                                                       progress_callback=progress_callback)
+            return self._final_stats(best_episode, best_episode_reward)
+
         best_episode_reward = -float('inf')
         best_episode = None
         
@@ -551,6 +826,9 @@ class DQNAgent:
                 best_episode_reward = stats['reward']
                 best_episode = stats['episode']
             
+            if progress_callback is not None:
+                progress_callback(stats)
+            
             # Периодический вывод
             if verbose and (episode + 1) % 50 == 0:
                 avg_reward = np.mean(self.episode_rewards[-50:])
@@ -567,12 +845,96 @@ class DQNAgent:
                           f"Win rate={win_rate:.1f}%, "
                           f"ε={self.epsilon:.3f}")
         
-        # Итоговая статистика
+        return self._final_stats(best_episode, best_episode_reward)
+
+    def _train_vectorized(self, env: LotteryEnvironment, num_episodes: int, num_envs: int,
+                          verbose: bool, max_steps: int = 100,
+                          progress_callback: Optional[Callable[[Dict], None]] = None) -> Tuple[Optional[int], float]:
+        """
+        Обучение на M параллельных эпизодах
+
+        На каждом векторном шаге: один батчевый выбор действий, векторный
+        расчет наград для M позиций и один шаг оптимизации по буферу.
+
+        Returns:
+            (номер лучшего эпизода, его награда)
+        """
+        vec_env = VectorizedLotteryEnvironment(env, num_envs, max_steps=max_steps)
+        states = vec_env.reset()
+
+        episode_rewards = np.zeros(num_envs)
+        episode_wins = np.zeros(num_envs, dtype=np.int64)
+        completed = 0
+
+        best_episode_reward = -float('inf')
+        best_episode = None
+
+        while completed < num_episodes:
+            actions_f1, actions_f2 = self.choose_actions_batch(states, training=True)
+            next_states, rewards, dones, info = vec_env.step(actions_f1, actions_f2)
+
+            self.remember_batch(states, actions_f1, actions_f2, rewards, info['next_states'], dones)
+
+            if len(self.memory) >= self.batch_size:
+                self.replay()
+
+            episode_rewards += rewards
+            episode_wins += rewards > 0
+
+            prev_steps = self.total_steps
+            self.total_steps += num_envs
+            if self.total_steps // self.target_update_freq > prev_steps // self.target_update_freq:
+                self.update_target_network()
+
+            for i in np.flatnonzero(info['episode_end']):
+                if completed >= num_episodes:
+                    break
+
+                if self.epsilon > self.epsilon_min:
+                    self.epsilon *= self.epsilon_decay
+
+                self.total_episodes += 1
+                self.total_reward += float(episode_rewards[i])
+                self.wins += int(episode_wins[i])
+                completed += 1
+
+                episode_stats = {
+                    'episode': self.total_episodes,
+                    'steps': int(info['episode_steps'][i]),
+                    'reward': float(episode_rewards[i]),
+                    'wins': int(episode_wins[i]),
+                    'epsilon': self.epsilon,
+                    'loss': np.mean(self.losses[-100:]) if self.losses else 0
+                }
+                self.episode_rewards.append(episode_stats['reward'])
+                self.learning_history.append(episode_stats)
+
+                if episode_stats['reward'] > best_episode_reward:
+                    best_episode_reward = episode_stats['reward']
+                    best_episode = episode_stats['episode']
+
+                if progress_callback is not None:
+                    progress_callback(episode_stats)
+
+                if verbose and completed % 50 == 0:
+                    logger.info(f"📈 Эпизод {completed}/{num_episodes} ({num_envs} сред): "
+                                f"Средняя награда={np.mean(self.episode_rewards[-50:]):.2f}, "
+                                f"Loss={np.mean(self.losses[-500:]) if self.losses else 0:.4f}, "
+                                f"ε={self.epsilon:.3f}")
+
+            episode_rewards[info['episode_end']] = 0
+            episode_wins[info['episode_end']] = 0
+            states = next_states
+
+        return best_episode, best_episode_reward
+
+    def _final_stats(self, best_episode: Optional[int], best_episode_reward: float) -> Dict:
+        """Итоговая статистика обучения"""
         final_stats = {
             'total_episodes': self.total_episodes,
             'total_steps': self.total_steps,
             'total_reward': self.total_reward,
-            'average_reward': self.total_reward / self.total_episodes,
+            'average_reward': self.total_reward / max(self.total_episodes, 1),
             'win_rate': (self.wins / max(self.total_steps, 1)) * 100,
             'best_episode': best_episode,
             'best_reward': best_episode_reward,
@@ -602,12 +964,13 @@ class DQNAgent:
         """
         return self.choose_action(state, training=False)
     
-    def save(self, filepath: str):
+    def save(self, filepath: str, include_memory: bool = True):
         """
         Сохранение модели
         
         Args:
             filepath: Путь к файлу
+            include_memory: Сохранять буфер воспроизведения вместе с моделью
         """
         save_dict = {
             'q_network_state': self.q_network.state_dict(),
@@ -628,6 +991,9 @@ class DQNAgent:
                 'target_update_freq': self.target_update_freq
             }
         }
+
+        if include_memory:
+            save_dict['replay_buffer'] = self.memory.state_dict()
         
         torch.save(save_dict, filepath)
         logger.info(f"💾 DQN модель сохранена в {filepath}")
@@ -659,6 +1025,9 @@ class DQNAgent:
         self.epsilon_min = config['epsilon_min']
         self.batch_size = config['batch_size']
         self.target_update_freq = config['target_update_freq']
+
+        if 'replay_buffer' in save_dict:
+            self.memory.load_state_dict(save_dict['replay_buffer'])
         
         logger.info(f"✅ DQN модель загружена из {filepath}")
         logger.info(f"   Эпизодов: {self.total_episodes}, Шагов: {self.total_steps}")
\ No newline at end of file
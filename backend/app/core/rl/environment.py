@@ -28,6 +28,11 @@ except ImportError:
     logger.warning("Improved rewards not available, using basic rewards")
     USE_IMPROVED_REWARDS = False
 
+# Размерность вектора состояния и нормировочные множители для to_vector()
+STATE_DIM = 10
+STATE_SCALE = np.array([100, 1, 50, 10, 20, 20, 100, 1, 365, 1000], dtype=np.float32)
+
+
 @dataclass
 class LotteryState:
     """Представление состояния среды лотереи"""
@@ -50,17 +55,46 @@ class LotteryState:
     def to_vector(self) -> np.ndarray:
         """Преобразование в вектор для нейросети"""
         return np.array([
-            self.universe_length / 100,  # Нормализация
+            self.universe_length,
             self.parity_ratio,
-            self.mean_gap / 50,
-            self.mean_frequency / 10,
-            self.hot_numbers_count / 20,
-            self.cold_numbers_count / 20,
-            self.sum_trend / 100,
+            self.mean_gap,
+            self.mean_frequency,
+            self.hot_numbers_count,
+            self.cold_numbers_count,
+            self.sum_trend,
             self.diversity_index,
-            self.days_since_jackpot / 365,
-            self.draw_number / 1000
-        ], dtype=np.float32)
+            self.days_since_jackpot,
+            self.draw_number
+        ], dtype=np.float32) / STATE_SCALE  # Нормализация
+
+    @classmethod
+    def from_features(cls, features: np.ndarray) -> 'LotteryState':
+        """Создание состояния из строки таблицы признаков среды"""
+        return cls(
+            universe_length=int(features[0]),
+            parity_ratio=float(features[1]),
+            mean_gap=float(features[2]),
+            mean_frequency=float(features[3]),
+            hot_numbers_count=int(features[4]),
+            cold_numbers_count=int(features[5]),
+            sum_trend=float(features[6]),
+            diversity_index=float(features[7]),
+            days_since_jackpot=int(features[8]),
+            draw_number=int(features[9])
+        )
+
+    @staticmethod
+    def feature_columns(features: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Столбцы таблицы признаков (N, STATE_DIM) по именам to_dict()
+        с тем же приведением целочисленных полей, что и from_features
+        """
+        names = ['universe_length', 'parity_ratio', 'mean_gap', 'mean_frequency',
+                 'hot_numbers_count', 'cold_numbers_count', 'sum_trend', 'diversity_index',
+                 'days_since_jackpot', 'draw_number']
+        int_fields = {0, 4, 5, 8, 9}
+        return {name: (np.trunc(features[:, i]) if i in int_fields else features[:, i].astype(np.float64))
+                for i, name in enumerate(names)}
 
     def to_dict(self) -> Dict:
         """Преобразование в словарь"""
@@ -110,15 +144,21 @@ class LotteryEnvironment:
         self.total_reward = 0
         self.actions_taken = 0
 
-        # Кэш состояний
-        self._state_cache = {}
-
         # Отладочная информация о структуре данных
         if not df_history.empty:
             logger.debug(f"Колонки DataFrame: {list(df_history.columns)}")
             sample_row = df_history.iloc[0]
             logger.debug(f"Пример строки: {dict(sample_row)}")
 
+        # Числа тиражей разбираются один раз, состояния всех позиций
+        # считаются одним векторизованным проходом
+        self._draws_field1 = []
+        self._draws_field2 = []
+        for _, row in df_history.iterrows():
+            self._draws_field1.append(self._extract_numbers(row, 1))
+            self._draws_field2.append(self._extract_numbers(row, 2))
+        self._state_features, self.state_table = self._build_state_table()
+
         # Инициализация системы наград
         try:
             if USE_IMPROVED_REWARDS:
@@ -227,9 +267,8 @@ class LotteryEnvironment:
         field1, field2 = action
 
         # Получаем реальный результат текущего тиража
-        actual_draw = self.df_history.iloc[self.current_position]
-        actual_field1 = self._extract_numbers(actual_draw, 1)
-        actual_field2 = self._extract_numbers(actual_draw, 2)
+        actual_field1 = self._draws_field1[self.current_position]
+        actual_field2 = self._draws_field2[self.current_position]
 
         # Проверяем, что данные извлечены корректно
         if not actual_field1 or not actual_field2:
@@ -272,112 +311,125 @@ class LotteryEnvironment:
         return self.current_state, reward, done, info
 
     def _compute_state(self, position: int) -> LotteryState:
-        """Вычисление состояния для заданной позиции"""
-
-        # Проверяем кэш
-        if position in self._state_cache:
-            return self._state_cache[position]
-
-        # Берем окно истории
-        window_start = max(0, position - self.window_size)
-        window_df = self.df_history.iloc[window_start:position]
-
-        if len(window_df) == 0:
-            # Возвращаем дефолтное состояние
-            logger.warning(f"Пустое окно для позиции {position}, возвращаем дефолтное состояние")
-            return LotteryState(
-                universe_length=0,
-                parity_ratio=0.5,
-                mean_gap=25,
-                mean_frequency=5,
-                hot_numbers_count=10,
-                cold_numbers_count=10,
-                sum_trend=0,
-                diversity_index=0.5,
-                days_since_jackpot=30,
-                draw_number=position
-            )
-
-        # Вычисляем признаки
-        all_numbers_f1 = []
-        all_numbers_f2 = []
-
-        for _, row in window_df.iterrows():
-            f1 = self._extract_numbers(row, 1)
-            f2 = self._extract_numbers(row, 2)
-            all_numbers_f1.extend(f1)
-            all_numbers_f2.extend(f2)
+        """Состояние для заданной позиции (чтение строки предвычисленной таблицы)"""
+        position = min(max(position, 0), len(self._state_features) - 1)
+        return LotteryState.from_features(self._state_features[position])
+
+    def get_state_vector(self, position: int) -> np.ndarray:
+        """Нормализованный вектор состояния позиции без создания LotteryState"""
+        position = min(max(position, 0), len(self.state_table) - 1)
+        return self.state_table[position]
+
+    @staticmethod
+    def _count_matrix(draws: List[List[int]], max_num: int) -> np.ndarray:
+        """Матрица (n_draws, max_num) с количеством выпадений каждого числа в тираже"""
+        counts = np.zeros((len(draws), max_num), dtype=np.int32)
+        rows = [i for i, nums in enumerate(draws) for n in nums if 1 <= n <= max_num]
+        cols = [n - 1 for nums in draws for n in nums if 1 <= n <= max_num]
+        if rows:
+            np.add.at(counts, (np.array(rows), np.array(cols)), 1)
+        return counts
+
+    def _build_state_table(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Вычисление признаков состояния для всех позиций 0..len(history)
 
-        # Universe length (уникальные числа)
-        universe_length = len(set(all_numbers_f1)) + len(set(all_numbers_f2))
+        Окно позиции p - строки [max(0, p - window_size), p). Частоты, число
+        уникальных чисел, четность и интервалы получаются разностью префиксных
+        сумм по матрице выпадений, тренд суммы - через индексы ближайших
+        непустых тиражей.
 
-        # Parity ratio (четность)
-        if all_numbers_f1:
-            even_count = sum(1 for n in all_numbers_f1 if n % 2 == 0)
-            parity_ratio = even_count / len(all_numbers_f1)
-        else:
-            parity_ratio = 0.5
-
-        # Mean gap (среднее расстояние между выпадениями)
-        from collections import Counter
-        freq_f1 = Counter(all_numbers_f1)
-        gaps = []
-        for num in range(1, self.field1_max + 1):
-            if freq_f1[num] > 0:
-                gap = len(window_df) / max(freq_f1[num], 1)
-                gaps.append(gap)
-        mean_gap = np.mean(gaps) if gaps else 25
-
-        # Mean frequency
-        mean_frequency = np.mean(list(freq_f1.values())) if freq_f1 else 1
-
-        # Hot/Cold numbers - используем безопасную версию
-        try:
-            hot_f1, cold_f1 = _analyze_hot_cold_numbers_for_generator(window_df, 1)
-            hot_f2, cold_f2 = _analyze_hot_cold_numbers_for_generator(window_df, 2)
-            hot_numbers_count = len(hot_f1[:10]) + len(hot_f2[:5])
-            cold_numbers_count = len(cold_f1[:10]) + len(cold_f2[:5])
-        except Exception as e:
-            logger.warning(f"Ошибка анализа горячих/холодных чисел: {e}")
-            hot_numbers_count = 10
-            cold_numbers_count = 10
-
-        # Sum trend (тренд суммы)
-        sums = []
-        for _, row in window_df.tail(10).iterrows():
-            f1 = self._extract_numbers(row, 1)
-            if f1:  # Проверяем что список не пустой
-                sums.append(sum(f1))
-
-        if len(sums) >= 2:
-            sum_trend = (sums[-1] - sums[0]) / max(len(sums), 1)
+        Returns:
+            (сырые признаки float64, нормализованные векторы float32),
+            оба размера (n_positions, STATE_DIM)
+        """
+        n = len(self._draws_field1)
+        positions = np.arange(n + 1)
+        starts = np.maximum(0, positions - self.window_size)
+        lengths = positions - starts
+
+        counts_f1 = self._count_matrix(self._draws_field1, self.field1_max)
+        counts_f2 = self._count_matrix(self._draws_field2, self.field2_max)
+
+        zero_f1 = np.zeros((1, self.field1_max), dtype=np.int64)
+        zero_f2 = np.zeros((1, self.field2_max), dtype=np.int64)
+        prefix_f1 = np.vstack([zero_f1, np.cumsum(counts_f1, axis=0, dtype=np.int64)])
+        prefix_f2 = np.vstack([zero_f2, np.cumsum(counts_f2, axis=0, dtype=np.int64)])
+
+        # Частоты чисел в окне каждой позиции
+        window_f1 = prefix_f1[positions] - prefix_f1[starts]
+        window_f2 = prefix_f2[positions] - prefix_f2[starts]
+        present_f1 = window_f1 > 0
+        n_present_f1 = present_f1.sum(axis=1)
+
+        universe_length = n_present_f1 + (window_f2 > 0).sum(axis=1)
+
+        # Четность по всем числам поля 1 в окне
+        row_len = np.array([len(nums) for nums in self._draws_field1], dtype=np.int64)
+        row_even = np.array([sum(1 for x in nums if x % 2 == 0) for nums in self._draws_field1], dtype=np.int64)
+        len_prefix = np.concatenate([[0], np.cumsum(row_len)])
+        even_prefix = np.concatenate([[0], np.cumsum(row_even)])
+        total_f1 = len_prefix[positions] - len_prefix[starts]
+        even_f1 = even_prefix[positions] - even_prefix[starts]
+        parity_ratio = np.where(total_f1 > 0, even_f1 / np.maximum(total_f1, 1), 0.5)
+
+        # Средний интервал между выпадениями и средняя частота
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gaps = np.where(present_f1, lengths[:, None] / np.maximum(window_f1, 1), 0.0)
+            mean_gap = np.where(n_present_f1 > 0, gaps.sum(axis=1) / n_present_f1, 25.0)
+            mean_frequency = np.where(n_present_f1 > 0, window_f1.sum(axis=1) / n_present_f1, 1.0)
+
+        # Горячие/холодные числа: анализатор берет последние 20 тиражей окна
+        # и возвращает min(top_n, уникальных) чисел в обоих списках
+        if 'Числа_Поле1_list' in self.df_history.columns:
+            starts_20 = np.maximum(starts, positions - 20)
+            unique_f1 = ((prefix_f1[positions] - prefix_f1[starts_20]) > 0).sum(axis=1)
+            unique_f2 = ((prefix_f2[positions] - prefix_f2[starts_20]) > 0).sum(axis=1)
+            hot_cold_count = np.minimum(unique_f1, 10) + np.minimum(unique_f2, 5)
         else:
-            sum_trend = 0
+            hot_cold_count = np.zeros(n + 1, dtype=np.int64)
+
+        # Тренд суммы по непустым тиражам среди последних 10 строк окна
+        row_sum = np.array([sum(nums) for nums in self._draws_field1], dtype=np.float64)
+        non_empty = row_len > 0
+        idx = np.arange(n)
+        last_valid = np.maximum.accumulate(np.where(non_empty, idx, -1)) if n else idx
+        next_valid = np.minimum.accumulate(np.where(non_empty, idx, n)[::-1])[::-1] if n else idx
+        last_valid = np.concatenate([last_valid, [-1]])
+        next_valid = np.concatenate([next_valid, [n]])
+        valid_prefix = np.concatenate([[0], np.cumsum(non_empty)])
+        row_sum = np.concatenate([row_sum, [0.0]])
+
+        starts_10 = np.maximum(starts, positions - 10)
+        n_sums = valid_prefix[positions] - valid_prefix[starts_10]
+        first_sum = row_sum[next_valid[starts_10]]
+        last_sum = row_sum[last_valid[np.maximum(positions - 1, 0)]]
+        sum_trend = np.where(n_sums >= 2, (last_sum - first_sum) / np.maximum(n_sums, 1), 0.0)
 
-        # Diversity index
         total_possible = self.field1_max + self.field2_max
-        diversity_index = universe_length / total_possible if total_possible > 0 else 0
-
-        # Days since jackpot (условно)
-        days_since_jackpot = position % 100  # Упрощение
-
-        state = LotteryState(
-            universe_length=universe_length,
-            parity_ratio=parity_ratio,
-            mean_gap=mean_gap,
-            mean_frequency=mean_frequency,
-            hot_numbers_count=hot_numbers_count,
-            cold_numbers_count=cold_numbers_count,
-            sum_trend=sum_trend,
-            diversity_index=diversity_index,
-            days_since_jackpot=days_since_jackpot,
-            draw_number=position
-        )
-
-        # Сохраняем в кэш
-        self._state_cache[position] = state
-
-        return state
+        diversity_index = universe_length / total_possible if total_possible > 0 else np.zeros(n + 1)
+
+        features = np.column_stack([
+            universe_length,
+            parity_ratio,
+            mean_gap,
+            mean_frequency,
+            hot_cold_count,
+            hot_cold_count,
+            sum_trend,
+            diversity_index,
+            positions % 100,  # Дней с джекпота (условно)
+            positions
+        ]).astype(np.float64)
+
+        # Пустое окно (позиция 0) - дефолтное состояние
+        empty = lengths == 0
+        features[empty, :9] = [0, 0.5, 25, 5, 10, 10, 0, 0.5, 30]
+
+        state_table = (features / STATE_SCALE).astype(np.float32)
+
+        logger.debug(f"📐 Таблица состояний: {state_table.shape}")
+        return features, state_table
 
     def _calculate_reward(self, pred_field1: List[int], pred_field2: List[int],
                           actual_field1: List[int], actual_field2: List[int]) -> float:
@@ -437,45 +489,7 @@ class LotteryEnvironment:
         else:
             # Базовая реалистичная система наград
             if not hasattr(self, '_prize_structure'):
-                from math import comb
-
-                ticket_cost = 100.0
-
-                if self.field1_size == 4:  # 4x20 лотерея
-                    prize_structure = {
-                        (4, 4): 3333333,  # Джекпот
-                        (4, 3): 2300,
-                        (4, 2): 650,
-                        (4, 1): 330,
-                        (4, 0): 1400,
-                        (3, 3): 700,
-                        (3, 2): 70,
-                        (3, 1): 30,
-                        (3, 0): 60,
-                        (2, 2): 20,
-                        (2, 1): 10,
-                        (2, 0): 10,
-                    }
-                elif self.field1_size == 5:  # 5x36 лотерея
-                    prize_structure = {
-                        (5, 1): 290000,  # Суперджекпот
-                        (5, 0): 145000,  # Джекпот
-                        (4, 0): 1000,
-                        (3, 0): 100,
-                        (2, 0): 10,
-                    }
-                else:
-                    # Универсальная схема
-                    prize_structure = {
-                        (self.field1_size, self.field2_size): 100000,
-                        (self.field1_size - 1, 1): 1000,
-                        (self.field1_size - 1, 0): 100,
-                        (self.field1_size - 2, 1): 10,
-                        (self.field1_size - 2, 0): 5,
-                    }
-
-                self._prize_structure = prize_structure
-                self._ticket_cost = ticket_cost
+                self._prize_structure, self._ticket_cost = self.get_basic_prize_structure()
 
             # Защита от пустых данных
             if not actual_field1 or not actual_field2:
@@ -497,6 +511,50 @@ class LotteryEnvironment:
 
             return reward
 
+    def get_basic_prize_structure(self) -> Tuple[Dict[Tuple[int, int], float], float]:
+        """
+        Базовая таблица призов по числу совпадений и стоимость билета
+
+        Returns:
+            ({(совпадения_поле1, совпадения_поле2): приз}, стоимость_билета)
+        """
+        ticket_cost = 100.0
+
+        if self.field1_size == 4:  # 4x20 лотерея
+            prize_structure = {
+                (4, 4): 3333333,  # Джекпот
+                (4, 3): 2300,
+                (4, 2): 650,
+                (4, 1): 330,
+                (4, 0): 1400,
+                (3, 3): 700,
+                (3, 2): 70,
+                (3, 1): 30,
+                (3, 0): 60,
+                (2, 2): 20,
+                (2, 1): 10,
+                (2, 0): 10,
+            }
+        elif self.field1_size == 5:  # 5x36 лотерея
+            prize_structure = {
+                (5, 1): 290000,  # Суперджекпот
+                (5, 0): 145000,  # Джекпот
+                (4, 0): 1000,
+                (3, 0): 100,
+                (2, 0): 10,
+            }
+        else:
+            # Универсальная схема
+            prize_structure = {
+                (self.field1_size, self.field2_size): 100000,
+                (self.field1_size - 1, 1): 1000,
+                (self.field1_size - 1, 0): 100,
+                (self.field1_size - 2, 1): 10,
+                (self.field1_size - 2, 0): 5,
+            }
+
+        return prize_structure, ticket_cost
+
     def get_action_space_size(self) -> int:
         """Получить размер пространства действий"""
         from math import comb
@@ -504,7 +562,7 @@ class LotteryEnvironment:
 
     def get_state_space_size(self) -> int:
         """Получить размерность пространства состояний"""
-        return 10  # Количество признаков в векторе состояния
+        return STATE_DIM  # Количество признаков в векторе состояния
 
     def render(self, mode: str = 'human'):
         """Визуализация текущего состояния"""
@@ -17,6 +17,12 @@ class ImprovedRewardCalculator:
     Улучшенный калькулятор наград с reward shaping
     """
 
+    # Shaping, зависящий только от числа совпадений
+    NEAR_MISS_BONUS = 5.0  # Совпало на 1 число поля 1 меньше максимума
+    CLOSE_MISS_BONUS = 1.0  # На 2 меньше
+    PARTIAL_F1_WEIGHT = 0.5  # За каждое совпадение поля 1
+    PARTIAL_F2_WEIGHT = 0.3  # За каждое совпадение поля 2
+
     def __init__(self, lottery_config: Dict):
         self.lottery_config = lottery_config
         self.field1_size = lottery_config['field1_size']
@@ -124,18 +130,10 @@ class ImprovedRewardCalculator:
             logger.info(f"🎉 Крупный выигрыш: {matches_f1}+{matches_f2} = {match_reward}")
 
         # 3. Reward Shaping - промежуточные награды
-        shaping_reward = 0
-
-        # 3.1 Near-miss bonus (почти угадал)
-        if matches_f1 == self.field1_size - 1:  # На 1 меньше максимума
-            shaping_reward += 5.0  # Значительный бонус за близость
+        # 3.1-3.2 Near-miss bonus и частичные совпадения
+        shaping_reward = self.match_shaping_reward(matches_f1, matches_f2)
+        if matches_f1 == self.field1_size - 1:
             info['near_miss'] = True
-        elif matches_f1 == self.field1_size - 2:  # На 2 меньше
-            shaping_reward += 1.0
-
-        # 3.2 Частичные совпадения (градиент наград)
-        partial_reward = matches_f1 * 0.5 + matches_f2 * 0.3
-        shaping_reward += partial_reward
 
         # 3.3 Бонус за горячие числа
         if state_features and 'hot_numbers' in state_features:
@@ -184,6 +182,21 @@ class ImprovedRewardCalculator:
 
         return total_reward, info
 
+    def match_shaping_reward(self, matches_f1, matches_f2):
+        """
+        Часть shaping, зависящая только от числа совпадений
+
+        Принимает скаляры или numpy-массивы (векторизованная среда строит
+        по ней таблицу наград).
+        """
+        matches_f1 = np.asarray(matches_f1)
+        # Near-miss bonus (почти угадал) - значительный бонус за близость
+        bonus = np.where(matches_f1 == self.field1_size - 1, self.NEAR_MISS_BONUS,
+                         np.where(matches_f1 == self.field1_size - 2, self.CLOSE_MISS_BONUS, 0.0))
+        # Частичные совпадения (градиент наград)
+        reward = bonus + (matches_f1 * self.PARTIAL_F1_WEIGHT + np.asarray(matches_f2) * self.PARTIAL_F2_WEIGHT)
+        return float(reward) if reward.ndim == 0 else reward
+
     def _has_interesting_pattern(self, numbers: List[int]) -> bool:
         """Проверка на интересные паттерны"""
         if len(numbers) < 3:
@@ -1,21 +1,24 @@
 """
 Q-Learning агент для лотереи
-Использует Q-таблицу с оптимизацией памяти
+Использует компактную Q-таблицу на NumPy массивах
 """
 
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple, Optional, Any
-from collections import defaultdict, deque
+from typing import Dict, List, Tuple, Optional, Any, Callable
+from collections import deque
 import pickle
 import json
 import logging
+import zipfile
 from datetime import datetime
 import random
 
 from backend.app.core.rl.environment import LotteryEnvironment, LotteryState
 from backend.app.core.rl.state_encoder import StateEncoder, ActionEncoder
 from backend.app.core.rl.reward_calculator import RewardCalculator
+from backend.app.core.rl.q_table import CompactQTable
+from backend.app.core.utils import combination_rank, combination_unrank
 
 logger = logging.getLogger(__name__)
 
@@ -67,10 +70,9 @@ class QLearningAgent:
         self.state_encoder = StateEncoder(feature_dims)
         self.action_encoder = ActionEncoder(lottery_config)
         
-        # Q-таблица с оптимизацией памяти
-        self.q_table = defaultdict(lambda: defaultdict(float))
-        self.state_visits = defaultdict(int)
-        self.action_visits = defaultdict(lambda: defaultdict(int))
+        # Q-таблица: целочисленные коды состояний x ранги комбинаций,
+        # счетчики посещений хранятся в ней же
+        self.q_table = CompactQTable()
         
         # История для анализа
         self.episode_rewards = []
@@ -89,10 +91,22 @@ class QLearningAgent:
         
         logger.info(f"✅ Q-Learning агент инициализирован: α={learning_rate}, γ={discount_factor}, ε={epsilon}")
     
-    def get_state_key(self, state: LotteryState) -> str:
-        """Получение ключа состояния для Q-таблицы"""
+    def get_state_key(self, state: LotteryState) -> int:
+        """Получение целочисленного ключа состояния для Q-таблицы"""
         state_dict = state.to_dict()
-        return self.state_encoder.encode_discrete(state_dict)
+        return self.state_encoder.encode_discrete_index(state_dict)
+
+    def get_action_key(self, action: Tuple[List[int], List[int]]) -> int:
+        """Ранг комбинации как ключ действия"""
+        return combination_rank(action[0], action[1], self.lottery_config)
+
+    def decode_action(self, action_key: int) -> Tuple[List[int], List[int]]:
+        """Комбинация по рангу"""
+        return combination_unrank(action_key, self.lottery_config)
+
+    def get_q_value(self, state: LotteryState, action: Tuple[List[int], List[int]]) -> float:
+        """Q(s, a) для состояния и комбинации"""
+        return self.q_table.get(self.get_state_key(state), self.get_action_key(action))
     
     def choose_action(self, state: LotteryState, training: bool = True) -> Tuple[List[int], List[int]]:
         """
@@ -122,14 +136,14 @@ class QLearningAgent:
             else:
                 logger.debug(f"🎯 Лучшее действие для состояния")
         
-        # Обновляем статистику посещений
-        self.state_visits[state_key] += 1
-        action_key = self.action_encoder.encode(*action)
-        self.action_visits[state_key][action_key] += 1
+        # Обновляем статистику посещений (только при обучении: при инференсе
+        # таблица, загруженная через mmap, не копируется и не растет)
+        if training:
+            self.q_table.record_visit(state_key, self.get_action_key(action))
         
         return action
     
-    def _get_best_action(self, state_key: str) -> Optional[Tuple[List[int], List[int]]]:
+    def _get_best_action(self, state_key: int) -> Optional[Tuple[List[int], List[int]]]:
         """
         Получение лучшего действия для состояния
         
@@ -139,14 +153,11 @@ class QLearningAgent:
         Returns:
             Лучшее действие или None
         """
-        if state_key not in self.q_table or not self.q_table[state_key]:
+        best_action_key = self.q_table.best_action(state_key)
+        if best_action_key is None:
             return None
         
-        # Находим действие с максимальным Q-значением
-        best_action_key = max(self.q_table[state_key], 
-                              key=lambda a: self.q_table[state_key][a])
-        
-        return self.action_encoder.decode(best_action_key)
+        return self.decode_action(best_action_key)
     
     def update_q_value(self, 
                       state: LotteryState,
@@ -167,22 +178,22 @@ class QLearningAgent:
             done: Признак завершения эпизода
         """
         state_key = self.get_state_key(state)
-        action_key = self.action_encoder.encode(*action)
+        action_key = self.get_action_key(action)
         
         # Текущее Q-значение
-        current_q = self.q_table[state_key][action_key]
+        current_q = self.q_table.get(state_key, action_key)
         
         # Вычисляем целевое значение
         if done or next_state is None:
             target_q = reward
         else:
             next_state_key = self.get_state_key(next_state)
-            max_next_q = max(self.q_table[next_state_key].values()) if self.q_table[next_state_key] else 0
+            max_next_q = self.q_table.max_q(next_state_key)
             target_q = reward + self.discount_factor * max_next_q
         
         # Обновляем Q-значение
         new_q = current_q + self.learning_rate * (target_q - current_q)
-        self.q_table[state_key][action_key] = new_q
+        self.q_table.set(state_key, action_key, new_q)
         
         logger.debug(f"📊 Q обновление: {current_q:.3f} → {new_q:.3f} (награда={reward:.2f})")
         
@@ -262,7 +273,8 @@ class QLearningAgent:
               df_history: pd.DataFrame,
               num_episodes: int = 1000,
               window_size: int = 50,
-              verbose: bool = True) -> Dict:
+              verbose: bool = True,
+              progress_callback: Optional[Callable[[Dict], None]] = None) -> Dict:
         """
         Полный цикл обучения
         
@@ -271,6 +283,7 @@ class QLearningAgent:
             num_episodes: Количество эпизодов
             window_size: Размер окна для признаков
             verbose: Вывод прогресса
+            progress_callback: Вызывается со статистикой каждого эпизода
         
         Returns:
             Итоговая статистика обучения
@@ -295,6 +308,9 @@ class QLearningAgent:
                 best_episode_reward = stats['reward']
                 best_episode = stats['episode']
             
+            if progress_callback is not None:
+                progress_callback(stats)
+            
             # Периодический вывод прогресса
             if verbose and (episode + 1) % 100 == 0:
                 avg_reward = np.mean(self.episode_rewards[-100:])
@@ -321,7 +337,7 @@ class QLearningAgent:
             'final_epsilon': self.epsilon,
             'q_table_size': self._get_q_table_size(),
             'unique_states': len(self.q_table),
-            'unique_actions': sum(len(actions) for actions in self.q_table.values())
+            'unique_actions': self.q_table.num_entries
         }
         
         logger.info(f"✅ Обучение завершено!")
@@ -345,9 +361,61 @@ class QLearningAgent:
         """
         return self.choose_action(state, training=False)
     
+    def predict_batch(self, env: LotteryEnvironment, positions: np.ndarray,
+                      return_values: bool = False):
+        """
+        Предсказания для позиций среды векторизованным поиском в Q-таблице
+        
+        Коды состояний считаются по таблице признаков среды, лучшее действие
+        ищется один раз на уникальное состояние; для неизвестных состояний,
+        как и в predict, выбираются случайные комбинации.
+        
+        Args:
+            env: Среда с предвычисленной таблицей признаков
+            positions: (M,) позиции истории
+            return_values: Вернуть также Q выбранного действия (0 для случайных)
+        
+        Returns:
+            (field1 (M, k1), field2 (M, k2)) или (field1, field2, q_values)
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        num_positions = len(positions)
+        field1_size, field2_size = self.action_encoder.field1_size, self.action_encoder.field2_size
+        field1_max, field2_max = self.action_encoder.field1_max, self.action_encoder.field2_max
+        
+        columns = LotteryState.feature_columns(env._state_features[positions])
+        codes = self.state_encoder.encode_discrete_index_batch(columns)
+        unique_codes, inverse = np.unique(codes, return_inverse=True)
+        
+        field1 = np.zeros((num_positions, field1_size), dtype=np.int64)
+        field2 = np.zeros((num_positions, field2_size), dtype=np.int64)
+        q_values = np.zeros(num_positions, dtype=np.float64)
+        known = np.zeros(num_positions, dtype=bool)
+        
+        for i, code in enumerate(unique_codes):
+            best_action = self.q_table.best_action(int(code))
+            if best_action is None:
+                continue
+            rows = inverse == i
+            f1, f2 = self.decode_action(best_action)
+            field1[rows] = f1
+            field2[rows] = f2
+            q_values[rows] = self.q_table.max_q(int(code))
+            known[rows] = True
+        
+        unknown = ~known
+        n_unknown = int(unknown.sum())
+        if n_unknown:
+            field1[unknown] = np.sort(np.argsort(np.random.random((n_unknown, field1_max)), axis=1)[:, :field1_size] + 1, axis=1)
+            field2[unknown] = np.sort(np.argsort(np.random.random((n_unknown, field2_max)), axis=1)[:, :field2_size] + 1, axis=1)
+        
+        if return_values:
+            return field1, field2, q_values
+        return field1, field2
+    
     def _get_q_table_size(self) -> int:
         """Получение размера Q-таблицы"""
-        return sum(len(actions) for actions in self.q_table.values())
+        return self.q_table.num_entries
     
     def _optimize_memory(self):
         """
@@ -355,33 +423,19 @@ class QLearningAgent:
         """
         logger.info(f"🧹 Оптимизация памяти Q-таблицы (текущий размер: {self._get_q_table_size()})")
         
-        # Сортируем состояния по частоте посещений
-        states_by_visits = sorted(self.state_visits.items(), key=lambda x: x[1])
-        
         # Удаляем 20% наименее посещаемых состояний
-        num_to_remove = len(states_by_visits) // 5
-        
-        for state_key, _ in states_by_visits[:num_to_remove]:
-            if state_key in self.q_table:
-                del self.q_table[state_key]
-            if state_key in self.state_visits:
-                del self.state_visits[state_key]
-            if state_key in self.action_visits:
-                del self.action_visits[state_key]
+        num_to_remove = self.q_table.prune_states(0.2)
         
         logger.info(f"✅ Удалено {num_to_remove} состояний, новый размер: {self._get_q_table_size()}")
     
     def save(self, filepath: str):
         """
-        Сохранение агента в файл
+        Сохранение агента в несжатый .npz (Q-таблица + метаданные)
         
         Args:
             filepath: Путь к файлу
         """
-        save_data = {
-            'q_table': dict(self.q_table),
-            'state_visits': dict(self.state_visits),
-            'action_visits': dict(self.action_visits),
+        metadata = {
             'epsilon': self.epsilon,
             'total_episodes': self.total_episodes,
             'total_steps': self.total_steps,
@@ -397,31 +451,35 @@ class QLearningAgent:
             }
         }
         
-        with open(filepath, 'wb') as f:
-            pickle.dump(save_data, f)
+        self.q_table.save(filepath, metadata)
         
         logger.info(f"💾 Агент сохранен в {filepath}")
     
-    def load(self, filepath: str):
+    def load(self, filepath: str, mmap: bool = True):
         """
         Загрузка агента из файла
         
+        Файлы .npz отображаются в память без перестроения индексов,
+        старые pickle-файлы конвертируются в компактную таблицу.
+        
         Args:
             filepath: Путь к файлу
+            mmap: Отображать массивы Q-таблицы в память
         """
-        with open(filepath, 'rb') as f:
-            save_data = pickle.load(f)
+        if zipfile.is_zipfile(filepath):
+            self.q_table, save_data = CompactQTable.load(filepath, mmap=mmap)
+        else:
+            with open(filepath, 'rb') as f:
+                save_data = pickle.load(f)
+            self.q_table = self._convert_legacy_q_table(save_data)
         
-        self.q_table = defaultdict(lambda: defaultdict(float), save_data['q_table'])
-        self.state_visits = defaultdict(int, save_data['state_visits'])
-        self.action_visits = defaultdict(lambda: defaultdict(int), save_data['action_visits'])
         self.epsilon = save_data['epsilon']
         self.total_episodes = save_data['total_episodes']
         self.total_steps = save_data['total_steps']
         self.total_reward = save_data['total_reward']
         self.wins = save_data['wins']
         self.learning_history = save_data['learning_history']
-        self.best_actions = deque(save_data['best_actions'], maxlen=100)
+        self.best_actions = deque((tuple(item) for item in save_data['best_actions']), maxlen=100)
         
         # Восстанавливаем конфигурацию
         config = save_data['config']
@@ -433,6 +491,29 @@ class QLearningAgent:
         logger.info(f"✅ Агент загружен из {filepath}")
         logger.info(f"   Эпизодов: {self.total_episodes}, Q-размер: {self._get_q_table_size()}")
     
+    def _convert_legacy_q_table(self, save_data: Dict) -> CompactQTable:
+        """Перевод pickle-таблицы со строковыми ключами в CompactQTable"""
+        table = CompactQTable()
+        skipped = 0
+        
+        for state_str, actions in save_data.get('q_table', {}).items():
+            state_key = self.state_encoder.discrete_key_to_index(state_str)
+            if state_key is None:
+                skipped += len(actions)
+                continue
+            
+            for action_str, q_value in actions.items():
+                field1, field2 = self.action_encoder.decode(action_str)
+                if len(field1) != self.action_encoder.field1_size or len(field2) != self.action_encoder.field2_size:
+                    skipped += 1
+                    continue
+                table.set(state_key, self.get_action_key((field1, field2)), q_value)
+        
+        if skipped:
+            logger.warning(f"⚠️ При конвертации Q-таблицы пропущено {skipped} записей")
+        
+        return table
+    
     def get_best_combinations(self, state: LotteryState, top_k: int = 5) -> List[Tuple[Tuple[List[int], List[int]], float]]:
         """
         Получение топ-K лучших комбинаций для состояния
@@ -446,20 +527,10 @@ class QLearningAgent:
         """
         state_key = self.get_state_key(state)
         
-        if state_key not in self.q_table:
-            # Если состояние новое, возвращаем случайные комбинации
-            return [(self.action_encoder.sample_random_action(), 0.0) for _ in range(top_k)]
-        
-        # Сортируем действия по Q-значению
-        sorted_actions = sorted(self.q_table[state_key].items(), 
-                              key=lambda x: x[1], 
-                              reverse=True)
-        
-        # Декодируем и возвращаем топ-K
+        # Топ-K действий по Q-значению (пустой список для нового состояния)
         result = []
-        for action_key, q_value in sorted_actions[:top_k]:
-            action = self.action_encoder.decode(action_key)
-            result.append((action, q_value))
+        for action_key, q_value in self.q_table.top_k(state_key, top_k):
+            result.append((self.decode_action(action_key), q_value))
         
         # Если меньше top_k, добавляем случайные
         while len(result) < top_k:
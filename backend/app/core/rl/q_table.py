@@ -0,0 +1,517 @@
+"""
+Компактная Q-таблица для Q-Learning агента
+Целочисленные коды состояний, ранги комбинаций как действия,
+хранение в NumPy массивах с открытой адресацией
+"""
+
+import heapq
+import json
+import logging
+import struct
+import zipfile
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_EMPTY = -1
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+_HASH_A = 0x9E3779B97F4A7C15
+_HASH_B = 0xC2B2AE3D27D4EB4F
+_FORMAT_VERSION = 1
+
+
+def _hash_pair(a: int, b: int) -> int:
+    """Хэш пары неотрицательных целых (совпадает с _hash_pairs)"""
+    h = ((a * _HASH_A) ^ (b * _HASH_B)) & _MASK64
+    return h ^ (h >> 29)
+
+
+def _hash_pairs(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Векторизованный вариант _hash_pair (арифметика по модулю 2^64)"""
+    h = (a.astype(np.uint64) * np.uint64(_HASH_A)) ^ (b.astype(np.uint64) * np.uint64(_HASH_B))
+    return h ^ (h >> np.uint64(29))
+
+
+def _load_npz_mmap(filepath: str) -> Dict[str, np.ndarray]:
+    """
+    Открытие несжатого .npz с отображением массивов в память
+
+    np.load игнорирует mmap_mode для архивов, поэтому смещения данных
+    каждого .npy внутри zip вычисляются вручную. Сжатые члены архива
+    читаются обычным способом.
+    """
+    arrays = {}
+    with zipfile.ZipFile(filepath) as zf:
+        infos = zf.infolist()
+
+    with open(filepath, 'rb') as f:
+        for info in infos:
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+
+            if info.compress_type != zipfile.ZIP_STORED:
+                with np.load(filepath, allow_pickle=False) as npz:
+                    arrays[name] = npz[name]
+                continue
+
+            f.seek(info.header_offset)
+            local_header = f.read(30)
+            name_len, extra_len = struct.unpack('<HH', local_header[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(filepath, dtype=dtype, mode='r', shape=shape,
+                                         offset=f.tell(), order='F' if fortran_order else 'C')
+
+    return arrays
+
+
+class CompactQTable:
+    """
+    Q-таблица на NumPy массивах
+
+    Состояние задается целым кодом (StateEncoder.encode_discrete_index),
+    действие - рангом комбинации (combination_rank). Коды состояний и пары
+    (состояние, действие) индексируются хэш-таблицами с открытой адресацией
+    и линейным пробированием. Значения лежат построчно, как в CSR:
+    строка состояния s занимает [row_start[s], row_start[s] + row_len[s])
+    с запасом row_cap[s], поэтому max и top-K по состоянию - операции над срезом.
+    Переполненная строка переносится в конец буфера, индекс пар хранит
+    смещение внутри строки и при переносе не меняется.
+    """
+
+    _ROW_INITIAL_CAPACITY = 4
+    _MAX_LOAD = 0.5
+
+    def __init__(self, initial_capacity: int = 1024):
+        """
+        Args:
+            initial_capacity: Начальная емкость буфера значений
+        """
+        capacity = max(16, int(initial_capacity))
+        self._init_arrays(num_states_capacity=64, entries_capacity=capacity)
+        self._readonly = False
+
+    def _init_arrays(self, num_states_capacity: int, entries_capacity: int):
+        # Индекс состояний: код -> id
+        self._state_keys = np.full(self._table_size(num_states_capacity), _EMPTY, dtype=np.int64)
+        self._state_slots = np.zeros(len(self._state_keys), dtype=np.int64)
+
+        # Атрибуты состояний
+        self.state_codes = np.zeros(num_states_capacity, dtype=np.int64)
+        self.row_start = np.zeros(num_states_capacity, dtype=np.int64)
+        self.row_len = np.zeros(num_states_capacity, dtype=np.int64)
+        self.row_cap = np.zeros(num_states_capacity, dtype=np.int64)
+        self.state_visits = np.zeros(num_states_capacity, dtype=np.int64)
+        self.num_states = 0
+
+        # Значения
+        self.actions = np.zeros(entries_capacity, dtype=np.int64)
+        self.q_values = np.zeros(entries_capacity, dtype=np.float64)
+        self.visits = np.zeros(entries_capacity, dtype=np.int64)
+        self._used = 0
+        self.num_entries = 0
+
+        # Индекс пар: (id состояния, действие) -> смещение в строке
+        self._entry_state = np.full(self._table_size(entries_capacity), _EMPTY, dtype=np.int64)
+        self._entry_action = np.zeros(len(self._entry_state), dtype=np.int64)
+        self._entry_offset = np.zeros(len(self._entry_state), dtype=np.int64)
+
+    @classmethod
+    def _table_size(cls, count: int) -> int:
+        """Степень двойки с коэффициентом заполнения не выше _MAX_LOAD"""
+        size = 16
+        while size * cls._MAX_LOAD < count + 1:
+            size *= 2
+        return size
+
+    # ==================== Хэш-индексы ====================
+
+    @staticmethod
+    def _probe(keys_a: np.ndarray, keys_b: Optional[np.ndarray], a: int, b: int) -> Tuple[int, bool]:
+        """Линейное пробирование: (слот, найден ли ключ)"""
+        mask = len(keys_a) - 1
+        i = (_hash_pair(a, b) >> 3) & mask
+        while True:
+            ka = keys_a[i]
+            if ka == _EMPTY:
+                return i, False
+            if ka == a and (keys_b is None or keys_b[i] == b):
+                return i, True
+            i = (i + 1) & mask
+
+    @staticmethod
+    def _insert_many(keys_a: np.ndarray, keys_b: Optional[np.ndarray], values: np.ndarray,
+                     a: np.ndarray, b: np.ndarray, v: np.ndarray):
+        """
+        Векторизованная вставка уникальных ключей в пустые слоты
+
+        На каждой итерации ключи, чей слот свободен, занимают его (при
+        конфликте побеждает первый), остальные сдвигаются на слот вперед.
+        Число итераций равно максимальной длине пробирования.
+        """
+        mask = np.uint64(len(keys_a) - 1)
+        slots = ((_hash_pairs(a, b) >> np.uint64(3)) & mask).astype(np.int64)
+        pending = np.arange(len(a))
+
+        while len(pending):
+            target = slots[pending]
+            free = keys_a[target] == _EMPTY
+            _, first = np.unique(target, return_index=True)
+            winners = np.zeros(len(pending), dtype=bool)
+            winners[first] = True
+            placed = free & winners
+
+            idx = pending[placed]
+            keys_a[slots[idx]] = a[idx]
+            if keys_b is not None:
+                keys_b[slots[idx]] = b[idx]
+            values[slots[idx]] = v[idx]
+
+            pending = pending[~placed]
+            slots[pending] = (slots[pending] + 1) & int(mask)
+
+    def _rebuild_state_index(self, size: int):
+        self._state_keys = np.full(size, _EMPTY, dtype=np.int64)
+        self._state_slots = np.zeros(size, dtype=np.int64)
+        n = self.num_states
+        self._insert_many(self._state_keys, None, self._state_slots,
+                          self.state_codes[:n], np.zeros(n, dtype=np.int64), np.arange(n))
+
+    def _rebuild_entry_index(self, size: int):
+        self._entry_state = np.full(size, _EMPTY, dtype=np.int64)
+        self._entry_action = np.zeros(size, dtype=np.int64)
+        self._entry_offset = np.zeros(size, dtype=np.int64)
+
+        n = self.num_states
+        lengths = self.row_len[:n]
+        state_ids = np.repeat(np.arange(n), lengths)
+        offsets = np.arange(len(state_ids)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = self.row_start[state_ids] + offsets
+        self._insert_many(self._entry_state, self._entry_action, self._entry_offset,
+                          state_ids, self.actions[positions], offsets)
+
+    # ==================== Доступ ====================
+
+    def _ensure_writable(self):
+        """Копирование отображенных в память массивов перед первой записью"""
+        if not self._readonly:
+            return
+        for name in ('_state_keys', '_state_slots', 'state_codes', 'row_start', 'row_len',
+                     'row_cap', 'state_visits', 'actions', 'q_values', 'visits',
+                     '_entry_state', '_entry_action', '_entry_offset'):
+            setattr(self, name, np.array(getattr(self, name)))
+        self._readonly = False
+
+    def _find_state(self, state_code: int) -> int:
+        slot, found = self._probe(self._state_keys, None, int(state_code), 0)
+        return int(self._state_slots[slot]) if found else -1
+
+    def _get_or_create_state(self, state_code: int) -> int:
+        state_code = int(state_code)
+        slot, found = self._probe(self._state_keys, None, state_code, 0)
+        if found:
+            return int(self._state_slots[slot])
+
+        sid = self.num_states
+        if sid >= len(self.state_codes):
+            new_cap = max(64, len(self.state_codes) * 2)
+            for name in ('state_codes', 'row_start', 'row_len', 'row_cap', 'state_visits'):
+                old = getattr(self, name)
+                grown = np.zeros(new_cap, dtype=old.dtype)
+                grown[:len(old)] = old
+                setattr(self, name, grown)
+
+        self.state_codes[sid] = state_code
+        self.row_start[sid] = self._used
+        self.row_len[sid] = 0
+        self.row_cap[sid] = 0
+        self.state_visits[sid] = 0
+        self.num_states += 1
+
+        if (self.num_states + 1) > len(self._state_keys) * self._MAX_LOAD:
+            self._rebuild_state_index(len(self._state_keys) * 2)
+        else:
+            self._state_keys[slot] = state_code
+            self._state_slots[slot] = sid
+
+        return sid
+
+    def _reserve_entries(self, count: int):
+        """Расширение буфера значений (с предварительным уплотнением мусора)"""
+        if self._used + count <= len(self.actions):
+            return
+
+        if self._used - self.num_entries > self.num_entries:
+            self.compact()
+            if self._used + count <= len(self.actions):
+                return
+
+        new_cap = max(16, len(self.actions) * 2, self._used + count)
+        for name in ('actions', 'q_values', 'visits'):
+            old = getattr(self, name)
+            grown = np.zeros(new_cap, dtype=old.dtype)
+            grown[:self._used] = old[:self._used]
+            setattr(self, name, grown)
+
+    def _grow_row(self, sid: int):
+        """Перенос заполненной строки в конец буфера с удвоенной емкостью"""
+        new_cap = max(self._ROW_INITIAL_CAPACITY, int(self.row_cap[sid]) * 2)
+        self._reserve_entries(new_cap)
+
+        start, length = int(self.row_start[sid]), int(self.row_len[sid])
+        new_start = self._used
+        for arr in (self.actions, self.q_values, self.visits):
+            arr[new_start:new_start + length] = arr[start:start + length]
+
+        self.row_start[sid] = new_start
+        self.row_cap[sid] = new_cap
+        self._used += new_cap
+
+    def _find_entry(self, sid: int, action: int) -> int:
+        """Глобальная позиция значения или -1"""
+        slot, found = self._probe(self._entry_state, self._entry_action, sid, action)
+        if not found:
+            return -1
+        return int(self.row_start[sid] + self._entry_offset[slot])
+
+    def _get_or_create_entry(self, sid: int, action: int) -> int:
+        slot, found = self._probe(self._entry_state, self._entry_action, sid, action)
+        if found:
+            return int(self.row_start[sid] + self._entry_offset[slot])
+
+        if self.row_len[sid] >= self.row_cap[sid]:
+            self._grow_row(sid)
+
+        offset = int(self.row_len[sid])
+        pos = int(self.row_start[sid]) + offset
+        self.actions[pos] = action
+        self.q_values[pos] = 0.0
+        self.visits[pos] = 0
+        self.row_len[sid] += 1
+        self.num_entries += 1
+
+        if (self.num_entries + 1) > len(self._entry_state) * self._MAX_LOAD:
+            self._rebuild_entry_index(len(self._entry_state) * 2)
+        else:
+            self._entry_state[slot] = sid
+            self._entry_action[slot] = action
+            self._entry_offset[slot] = offset
+
+        return pos
+
+    def _row(self, state_code: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(действия, Q-значения) строки состояния; пустые массивы для неизвестного"""
+        sid = self._find_state(state_code)
+        if sid < 0:
+            return self.actions[:0], self.q_values[:0]
+        start = int(self.row_start[sid])
+        end = start + int(self.row_len[sid])
+        return self.actions[start:end], self.q_values[start:end]
+
+    def __len__(self) -> int:
+        """Количество состояний"""
+        return self.num_states
+
+    def __contains__(self, state_code) -> bool:
+        return self._find_state(state_code) >= 0
+
+    def get(self, state_code: int, action: int, default: float = 0.0) -> float:
+        """Q(s, a)"""
+        sid = self._find_state(state_code)
+        if sid < 0:
+            return default
+        pos = self._find_entry(sid, int(action))
+        return float(self.q_values[pos]) if pos >= 0 else default
+
+    def set(self, state_code: int, action: int, value: float):
+        """Запись Q(s, a)"""
+        self._ensure_writable()
+        sid = self._get_or_create_state(state_code)
+        pos = self._get_or_create_entry(sid, int(action))
+        self.q_values[pos] = value
+
+    def record_visit(self, state_code: int, action: int, create: bool = True):
+        """
+        Учет посещения состояния и действия
+
+        Args:
+            create: Создавать запись (s, a) с Q=0, если ее еще нет
+        """
+        self._ensure_writable()
+        sid = self._get_or_create_state(state_code)
+        self.state_visits[sid] += 1
+
+        if create:
+            pos = self._get_or_create_entry(sid, int(action))
+        else:
+            pos = self._find_entry(sid, int(action))
+        if pos >= 0:
+            self.visits[pos] += 1
+
+    def max_q(self, state_code: int, default: float = 0.0) -> float:
+        """max_a Q(s, a)"""
+        _, q = self._row(state_code)
+        return float(q.max()) if len(q) else default
+
+    def best_action(self, state_code: int) -> Optional[int]:
+        """argmax_a Q(s, a) или None для неизвестного состояния"""
+        actions, q = self._row(state_code)
+        if not len(q):
+            return None
+        return int(actions[int(np.argmax(q))])
+
+    def top_k(self, state_code: int, k: int) -> List[Tuple[int, float]]:
+        """Топ-K действий состояния по Q-значению (через кучу)"""
+        actions, q = self._row(state_code)
+        if not len(q) or k <= 0:
+            return []
+        return heapq.nlargest(k, zip(actions.tolist(), q.tolist()), key=lambda item: item[1])
+
+    def state_action_count(self, state_code: int) -> int:
+        """Количество известных действий состояния"""
+        sid = self._find_state(state_code)
+        return int(self.row_len[sid]) if sid >= 0 else 0
+
+    # ==================== Обслуживание ====================
+
+    def compact(self):
+        """Плотная упаковка строк (cap = len), удаление мусора от переносов"""
+        self._ensure_writable()
+        n = self.num_states
+        lengths = self.row_len[:n].copy()
+        positions = (np.repeat(self.row_start[:n], lengths)
+                     + np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+
+        capacity = max(16, len(positions))
+        actions = np.zeros(capacity, dtype=np.int64)
+        q_values = np.zeros(capacity, dtype=np.float64)
+        visits = np.zeros(capacity, dtype=np.int64)
+        actions[:len(positions)] = self.actions[positions]
+        q_values[:len(positions)] = self.q_values[positions]
+        visits[:len(positions)] = self.visits[positions]
+
+        self.actions, self.q_values, self.visits = actions, q_values, visits
+        self.row_start[:n] = np.cumsum(lengths) - lengths
+        self.row_cap[:n] = lengths
+        self._used = len(positions)
+
+    def prune_states(self, fraction: float = 0.2) -> int:
+        """
+        Удаление доли наименее посещаемых состояний
+
+        Выбор выполняется через argpartition без полной сортировки,
+        индексы перестраиваются векторизованно.
+
+        Returns:
+            Количество удаленных состояний
+        """
+        self._ensure_writable()
+        n = self.num_states
+        num_to_remove = int(n * fraction)
+        if num_to_remove <= 0:
+            return 0
+
+        removed = np.argpartition(self.state_visits[:n], num_to_remove - 1)[:num_to_remove]
+        keep = np.ones(n, dtype=bool)
+        keep[removed] = False
+        kept = np.nonzero(keep)[0]
+
+        for name in ('state_codes', 'row_start', 'row_len', 'row_cap', 'state_visits'):
+            arr = getattr(self, name)
+            arr[:len(kept)] = arr[kept]
+        self.num_states = len(kept)
+        self.num_entries = int(self.row_len[:self.num_states].sum())
+
+        self.compact()
+        self._rebuild_state_index(self._table_size(self.num_states))
+        self._rebuild_entry_index(self._table_size(self.num_entries))
+
+        return num_to_remove
+
+    # ==================== Сохранение ====================
+
+    def save(self, filepath: str, metadata: Optional[Dict] = None):
+        """
+        Сохранение в несжатый .npz (пригоден для отображения в память)
+
+        Args:
+            filepath: Путь к файлу
+            metadata: Дополнительные JSON-сериализуемые данные
+        """
+        self.compact()
+        n, m = self.num_states, self.num_entries
+        meta_json = json.dumps(metadata or {}, default=lambda o: o.item() if hasattr(o, 'item') else str(o))
+
+        with open(filepath, 'wb') as f:
+            np.savez(
+                f,
+                format_version=np.array([_FORMAT_VERSION], dtype=np.int64),
+                state_codes=self.state_codes[:n],
+                row_start=self.row_start[:n],
+                row_len=self.row_len[:n],
+                state_visits=self.state_visits[:n],
+                actions=self.actions[:m],
+                q_values=self.q_values[:m],
+                visits=self.visits[:m],
+                state_keys=self._state_keys,
+                state_slots=self._state_slots,
+                entry_state=self._entry_state,
+                entry_action=self._entry_action,
+                entry_offset=self._entry_offset,
+                metadata=np.frombuffer(meta_json.encode('utf-8'), dtype=np.uint8)
+            )
+
+    @classmethod
+    def load(cls, filepath: str, mmap: bool = True) -> Tuple['CompactQTable', Dict]:
+        """
+        Загрузка таблицы без перестроения индексов
+
+        При mmap=True массивы отображаются в память и копируются
+        только при первой записи.
+
+        Returns:
+            (таблица, метаданные)
+        """
+        if mmap:
+            arrays = _load_npz_mmap(filepath)
+        else:
+            with np.load(filepath, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+
+        version = int(arrays['format_version'][0])
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Неподдерживаемая версия Q-таблицы: {version}")
+
+        table = cls.__new__(cls)
+        table.state_codes = arrays['state_codes']
+        table.row_start = arrays['row_start']
+        table.row_len = arrays['row_len']
+        table.row_cap = arrays['row_len']
+        table.state_visits = arrays['state_visits']
+        table.actions = arrays['actions']
+        table.q_values = arrays['q_values']
+        table.visits = arrays['visits']
+        table._state_keys = arrays['state_keys']
+        table._state_slots = arrays['state_slots']
+        table._entry_state = arrays['entry_state']
+        table._entry_action = arrays['entry_action']
+        table._entry_offset = arrays['entry_offset']
+        table.num_states = len(table.state_codes)
+        table.num_entries = len(table.actions)
+        table._used = table.num_entries
+        table._readonly = mmap
+
+        if not mmap:
+            table.row_cap = table.row_cap.copy()
+
+        metadata = json.loads(bytes(np.asarray(arrays['metadata'])).decode('utf-8') or '{}')
+        return table, metadata
@@ -8,6 +8,8 @@ from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
 import logging
 
+from backend.app.core.prize_probability import joint_match_distribution
+
 logger = logging.getLogger(__name__)
 
 
@@ -58,6 +60,9 @@ class RewardCalculator:
     self.total_rewards = 0
     self.total_tickets = 0
 
+    # Точное матожидание зависит только от схемы и конфигурации
+    self._expected_value = None
+
     logger.info(f"✅ RewardCalculator инициализирован со схемой '{self.scheme.name}'")
 
   def calculate(self,
@@ -86,26 +91,11 @@ class RewardCalculator:
     matches_f1 = len(set(predicted_f1) & set(actual_f1))
     matches_f2 = len(set(predicted_f2) & set(actual_f2))
 
-    # Награды за поле 1
-    if matches_f1 >= 2:
-      reward += self.scheme.match_2_f1
-    if matches_f1 >= 3:
-      reward += self.scheme.match_3_f1
-    if matches_f1 >= 4:
-      reward += self.scheme.match_4_f1
-    if matches_f1 >= 5:
-      reward += self.scheme.match_5_f1
+    reward += self._match_reward(matches_f1, matches_f2)
+
     if matches_f1 == self.field1_size:
-      reward += self.scheme.jackpot_f1
       logger.info(f"🎯 ДЖЕКПОТ в поле 1! Совпадений: {matches_f1}")
-
-    # Награды за поле 2
-    if matches_f2 >= 1 and matches_f1 >= 2:
-      reward += self.scheme.match_1_f2
-    if matches_f2 == self.field2_size and matches_f1 >= 3:
-      reward += self.scheme.match_all_f2
     if matches_f2 == self.field2_size and matches_f1 == self.field1_size:
-      reward += self.scheme.super_jackpot
       logger.info(f"💎 СУПЕР-ДЖЕКПОТ! Полное совпадение!")
 
     # Дополнительные бонусы на основе признаков состояния
@@ -194,22 +184,55 @@ class RewardCalculator:
 
     return False
 
+  def _match_reward(self, matches_f1: int, matches_f2: int) -> float:
+    """Выигрыш схемы за совпадения (без стоимости билета и бонусов)"""
+    reward = 0.0
+
+    # Награды за поле 1
+    if matches_f1 >= 2:
+      reward += self.scheme.match_2_f1
+    if matches_f1 >= 3:
+      reward += self.scheme.match_3_f1
+    if matches_f1 >= 4:
+      reward += self.scheme.match_4_f1
+    if matches_f1 >= 5:
+      reward += self.scheme.match_5_f1
+    if matches_f1 == self.field1_size:
+      reward += self.scheme.jackpot_f1
+
+    # Награды за поле 2
+    if matches_f2 >= 1 and matches_f1 >= 2:
+      reward += self.scheme.match_1_f2
+    if matches_f2 == self.field2_size and matches_f1 >= 3:
+      reward += self.scheme.match_all_f2
+    if matches_f2 == self.field2_size and matches_f1 == self.field1_size:
+      reward += self.scheme.super_jackpot
+
+    return reward
+
   def calculate_expected_value(self, num_simulations: int = 10000) -> float:
     """
-    Расчет математического ожидания на основе истории
+    Точное математическое ожидание награды случайного билета
+
+    Совпадения распределены гипергеометрически, поэтому ожидание
+    считается суммой по всем парам (совпадения_поле1, совпадения_поле2)
+    без симуляций. Бонусы за признаки состояния не учитываются.
 
     Args:
-        num_simulations: Количество симуляций
+        num_simulations: Не используется, оставлен для совместимости
 
     Returns:
         Математическое ожидание
     """
-    if not self.reward_history:
-      return -self.scheme.ticket_cost
-
-    # Используем последние награды для оценки
-    recent_rewards = self.reward_history[-min(num_simulations, len(self.reward_history)):]
-    return np.mean(recent_rewards)
+    if self._expected_value is None:
+      joint = joint_match_distribution(self.lottery_config)
+      rewards = np.array([
+        [self._match_reward(m1, m2) for m2 in range(joint.shape[1])]
+        for m1 in range(joint.shape[0])
+      ])
+      self._expected_value = float((joint * rewards).sum()) - self.scheme.ticket_cost
+
+    return self._expected_value
 
   def get_statistics(self) -> Dict:
     """
@@ -16,6 +16,7 @@ import torch
 from backend.app.core.rl.environment import LotteryEnvironment, LotteryState
 from backend.app.core.rl.q_agent import QLearningAgent
 from backend.app.core.rl.dqn_agent import DQNAgent
+from backend.app.core.rl.batch_evaluation import BatchedAgentEvaluator
 from backend.app.core.rl.reward_calculator import RewardCalculator, ShapedRewardCalculator
 from backend.app.core import data_manager
 from backend.app.core.combination_generator import _analyze_hot_cold_numbers_for_generator
@@ -86,7 +87,8 @@ class RLGenerator:
               q_episodes: int = 1000,
               dqn_episodes: int = 500,
               window_size: int = 50,
-              verbose: bool = True) -> Dict:
+              verbose: bool = True,
+              num_envs: int = 1) -> Dict:
         """
         Обучение обоих RL агентов
         
@@ -96,6 +98,7 @@ class RLGenerator:
             dqn_episodes: Количество эпизодов для DQN
             window_size: Размер окна для признаков
             verbose: Вывод прогресса
+            num_envs: Количество параллельных сред для обучения DQN
         
         Returns:
             Статистика обучения
@@ -125,7 +128,7 @@ class RLGenerator:
         self.q_trained = True
         
         # Сохраняем Q-агента
-        q_path = os.path.join(self.models_dir, "q_agent.pkl")
+        q_path = os.path.join(self.models_dir, "q_agent.npz")
         self.q_agent.save(q_path)
         logger.info(f"💾 Q-агент сохранен: {q_path}")
         
@@ -135,7 +138,8 @@ class RLGenerator:
             df_history=df_history,
             num_episodes=dqn_episodes,
             window_size=window_size,
-            verbose=verbose
+            verbose=verbose,
+            num_envs=num_envs
         )
         training_stats['dqn'] = dqn_stats
         self.dqn_trained = True
@@ -243,12 +247,7 @@ class RLGenerator:
         field1, field2 = self.q_agent.predict(state)
         
         # Получаем Q-значение для оценки уверенности
-        state_key = self.q_agent.get_state_key(state)
-        action_key = self.q_agent.action_encoder.encode(field1, field2)
-        
-        q_value = 0
-        if state_key in self.q_agent.q_table:
-            q_value = self.q_agent.q_table[state_key].get(action_key, 0)
+        q_value = self.q_agent.get_q_value(state, (field1, field2))
         
         return {
             'field1': sorted(field1),
@@ -334,27 +333,24 @@ class RLGenerator:
             'state_features': {}
         }
     
-    def _normalize_confidence(self, value: float, agent_type: str) -> float:
+    def _normalize_confidence(self, value, agent_type: str):
         """
         Нормализация уверенности в диапазон [0, 1]
         
         Args:
-            value: Q-значение
+            value: Q-значение или массив Q-значений
             agent_type: Тип агента ('q' или 'dqn')
         
         Returns:
-            Нормализованная уверенность
+            Нормализованная уверенность (float для скаляра, массив для массива)
         """
         # Простая сигмоидная нормализация
         # Можно настроить коэффициенты под конкретные диапазоны Q-значений
-        if agent_type == 'q':
-            # Q-Learning обычно имеет меньшие значения
-            normalized = 1 / (1 + np.exp(-value / 10))
-        else:
-            # DQN может иметь больший разброс
-            normalized = 1 / (1 + np.exp(-value / 100))
+        # Q-Learning обычно имеет меньшие значения, DQN - больший разброс
+        scale = 10 if agent_type == 'q' else 100
+        normalized = 1 / (1 + np.exp(-np.asarray(value, dtype=np.float64) / scale))
         
-        return float(normalized)
+        return float(normalized) if normalized.ndim == 0 else normalized
     
     def load_models(self) -> bool:
         """
@@ -366,7 +362,10 @@ class RLGenerator:
         loaded = False
         
         # Загрузка Q-агента
-        q_path = os.path.join(self.models_dir, "q_agent.pkl")
+        q_path = os.path.join(self.models_dir, "q_agent.npz")
+        if not os.path.exists(q_path):
+            # Модель в старом формате (pickle), конвертируется при загрузке
+            q_path = os.path.join(self.models_dir, "q_agent.pkl")
         if os.path.exists(q_path):
             try:
                 self.q_agent.load(q_path)
@@ -395,6 +394,9 @@ class RLGenerator:
         """
         Оценка производительности RL агентов на тестовых данных
 
+        Предсказания для всех позиций считаются пакетно (predict_batch),
+        награды - по векторной таблице призов.
+
         Args:
             df_test: Тестовые данные
             window_size: Размер окна
@@ -409,6 +411,7 @@ class RLGenerator:
         logger.info(f"📊 Оценка RL агентов на {len(df_test)} тиражах...")
 
         env = LotteryEnvironment(df_test, self.lottery_config, window_size)
+        evaluator = BatchedAgentEvaluator(env)
 
         results = {
             'q_learning': {'rewards': [], 'matches': []},
@@ -416,41 +419,36 @@ class RLGenerator:
             'ensemble': {'rewards': [], 'matches': []}
         }
 
-        # Проходим по тестовым данным
-        for i in range(window_size, len(df_test) - 1):
-            state = env._compute_state(i)
-            actual_draw = df_test.iloc[i + 1]
-
-            actual_f1 = eval(actual_draw['field1']) if isinstance(actual_draw['field1'], str) else actual_draw['field1']
-            actual_f2 = eval(actual_draw['field2']) if isinstance(actual_draw['field2'], str) else actual_draw['field2']
+        # Состояние позиции i, прогноз сверяется со следующим тиражом i + 1
+        positions = np.arange(window_size, len(df_test) - 1)
+        if len(positions) == 0:
+            logger.warning("⚠️ Недостаточно тестовых данных для оценки")
+            return {}
 
-            # Тестируем каждого агента
-            if self.q_trained:
-                pred_f1, pred_f2 = self.q_agent.predict(state)
-                reward = env._calculate_reward(pred_f1, pred_f2, actual_f1, actual_f2)
-                matches = len(set(pred_f1) & set(actual_f1))
-                results['q_learning']['rewards'].append(reward)
-                results['q_learning']['matches'].append(matches)
+        predictions = {}
+        if self.q_trained:
+            predictions['q_learning'] = self.q_agent.predict_batch(env, positions, return_values=True)
+        if self.dqn_trained:
+            predictions['dqn'] = self.dqn_agent.predict_batch(env, positions, return_values=True)
 
-            if self.dqn_trained:
-                pred_f1, pred_f2 = self.dqn_agent.predict(state)
-                reward = env._calculate_reward(pred_f1, pred_f2, actual_f1, actual_f2)
-                matches = len(set(pred_f1) & set(actual_f1))
-                results['dqn']['rewards'].append(reward)
-                results['dqn']['matches'].append(matches)
+        if self.q_trained and self.dqn_trained:
+            # Ансамбль: комбинация агента с наибольшей уверенностью (при равенстве - Q-Learning)
+            q_f1, q_f2, q_values = predictions['q_learning']
+            dqn_f1, dqn_f2, dqn_values = predictions['dqn']
+            use_q = (self._normalize_confidence(q_values, 'q') >=
+                     self._normalize_confidence(dqn_values, 'dqn'))
+            predictions['ensemble'] = (np.where(use_q[:, None], q_f1, dqn_f1),
+                                       np.where(use_q[:, None], q_f2, dqn_f2), None)
 
-            if self.q_trained and self.dqn_trained:
-                ensemble_combo = self._generate_ensemble(state)
-                pred_f1, pred_f2 = ensemble_combo['field1'], ensemble_combo['field2']
-                reward = env._calculate_reward(pred_f1, pred_f2, actual_f1, actual_f2)
-                matches = len(set(pred_f1) & set(actual_f1))
-                results['ensemble']['rewards'].append(reward)
-                results['ensemble']['matches'].append(matches)
+        for agent_name, (pred_f1, pred_f2, _) in predictions.items():
+            rewards, matches_f1, _ = evaluator.score(pred_f1, pred_f2, positions + 1)
+            results[agent_name]['rewards'] = rewards
+            results[agent_name]['matches'] = matches_f1
 
         # Вычисляем метрики
         metrics = {}
         for agent_name, agent_results in results.items():
-            if agent_results['rewards']:
+            if len(agent_results['rewards']):
                 rewards = np.array(agent_results['rewards'])
                 matches = np.array(agent_results['matches'])
 
@@ -534,37 +532,74 @@ class RLGeneratorManager:
         
         return self.generators[lottery_type]
     
-    def train_all(self, verbose: bool = True) -> Dict:
+    def reload_models(self, lottery_type: str) -> bool:
+        """
+        Перечитывание моделей лотереи с диска (после обучения в другом процессе)
+        
+        Returns:
+            True если хотя бы одна модель загружена
+        """
+        generator = self.generators.get(lottery_type)
+        if generator is None:
+            return False
+        return generator.load_models()
+    
+    def train_all(self,
+                  verbose: bool = True,
+                  q_episodes: int = 1000,
+                  dqn_episodes: int = 500,
+                  window_size: int = 50,
+                  num_envs: int = 1,
+                  jobs: int = 1) -> Dict:
         """
         Обучение всех RL генераторов
         
+        Каждая пара (лотерея, агент) обучается отдельной задачей
+        RLTrainingOrchestrator в процессе-воркере; после завершения
+        модели перечитываются с диска.
+        
         Args:
             verbose: Вывод прогресса
+            q_episodes: Количество эпизодов для Q-Learning
+            dqn_episodes: Количество эпизодов для DQN
+            window_size: Размер окна для признаков
+            num_envs: Количество параллельных сред для обучения DQN
+            jobs: Количество одновременных процессов обучения
         
         Returns:
             Статистика обучения
         """
-        results = {}
+        from backend.app.core.rl.training_orchestrator import RLTrainingOrchestrator
+        
+        orchestrator = RLTrainingOrchestrator(max_jobs=jobs)
+        job_ids = {}
         
-        for lottery_type in data_manager.LOTTERY_CONFIGS.keys():
-            logger.info(f"🎯 Обучение RL для {lottery_type}...")
+        try:
+            for lottery_type in data_manager.LOTTERY_CONFIGS.keys():
+                logger.info(f"🎯 Постановка обучения RL для {lottery_type}...")
+                job_ids[lottery_type] = orchestrator.submit_lottery(
+                    lottery_type, q_episodes, dqn_episodes, window_size, num_envs
+                )
             
-            config = data_manager.LOTTERY_CONFIGS[lottery_type]
-            generator = self.get_generator(lottery_type, config)
+            statuses = orchestrator.wait()
+        finally:
+            orchestrator.shutdown()
+        
+        results = {}
+        for lottery_type, ids in job_ids.items():
+            lottery_results = {}
+            for job_id in ids:
+                status = statuses.get(job_id) or {}
+                if status.get('status') == 'completed':
+                    lottery_results[status['agent']] = status.get('stats', {})
+                elif 'error' not in lottery_results:
+                    lottery_results['error'] = status.get('error', 'Неизвестная ошибка')
             
-            # Загружаем данные
-            # with data_manager.LotteryContext(lottery_type):
-            #     df = data_manager.fetch_draws_from_db()
-            with data_manager.set_current_lottery(lottery_type):
-                df = data_manager.fetch_draws_from_db()
-
-
-            if len(df) >= 60:  # Минимум для обучения
-                stats = generator.train(df, verbose=verbose)
-                results[lottery_type] = stats
-            else:
-                logger.warning(f"⚠️ Недостаточно данных для {lottery_type}: {len(df)} тиражей")
-                results[lottery_type] = {'error': 'Недостаточно данных'}
+            results[lottery_type] = lottery_results
+            self.reload_models(lottery_type)
+            
+            if verbose:
+                logger.info(f"📊 {lottery_type}: {', '.join(lottery_results.keys())}")
         
         return results
 
@@ -118,6 +118,84 @@ class StateEncoder:
 
     return key
 
+  def encode_discrete_index(self, state_dict: Dict) -> int:
+    """
+    Дискретное кодирование в целое число для компактной Q-таблицы
+
+    Бины признаков складываются в смешанную систему счисления,
+    отсутствующий признак кодируется отдельной цифрой num_bins.
+
+    Args:
+        state_dict: Словарь признаков состояния
+
+    Returns:
+        Целочисленный код состояния
+    """
+    code = 0
+    for feature_name, num_bins in self.discretization_bins.items():
+      digit = num_bins
+      if feature_name in state_dict:
+        max_val = self.feature_dims.get(feature_name, 100)
+        normalized = state_dict[feature_name] / max_val if max_val > 0 else 0
+        digit = min(max(int(normalized * num_bins), 0), num_bins - 1)
+      code = code * (num_bins + 1) + digit
+
+    return code
+
+  def encode_discrete_index_batch(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Векторизованный encode_discrete_index для столбцов признаков
+
+    Args:
+        columns: {'feature_name': (N,) значения}
+
+    Returns:
+        (N,) целочисленные коды состояний
+    """
+    n = len(next(iter(columns.values()))) if columns else 0
+    codes = np.zeros(n, dtype=np.int64)
+    for feature_name, num_bins in self.discretization_bins.items():
+      digits = np.full(n, num_bins, dtype=np.int64)
+      if feature_name in columns:
+        max_val = self.feature_dims.get(feature_name, 100)
+        values = np.asarray(columns[feature_name], dtype=np.float64)
+        normalized = values / max_val if max_val > 0 else np.zeros(n)
+        digits = np.clip(np.trunc(normalized * num_bins), 0, num_bins - 1).astype(np.int64)
+      codes = codes * (num_bins + 1) + digits
+
+    return codes
+
+  def discrete_key_to_index(self, encoded_state: str) -> Optional[int]:
+    """
+    Перевод строкового ключа encode_discrete в код encode_discrete_index
+
+    Args:
+        encoded_state: Закодированная строка
+
+    Returns:
+        Целочисленный код или None, если строка не является ключом состояния
+    """
+    bins = {}
+    try:
+      for part in encoded_state.split("|"):
+        if ":" in part:
+          feature_name, bin_idx = part.split(":", 1)
+          bins[feature_name] = int(bin_idx)
+    except ValueError:
+      return None
+
+    if not bins:
+      return None
+
+    code = 0
+    for feature_name, num_bins in self.discretization_bins.items():
+      digit = num_bins
+      if feature_name in bins:
+        digit = min(max(bins[feature_name], 0), num_bins - 1)
+      code = code * (num_bins + 1) + digit
+
+    return code
+
   def encode_hash(self, state_dict: Dict) -> str:
     """
     Хэш-кодирование для компактного хранения
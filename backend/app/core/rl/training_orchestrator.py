@@ -0,0 +1,379 @@
+"""
+Оркестратор обучения RL агентов
+Каждая задача (лотерея, агент) выполняется в отдельном процессе
+с ограничением потоков, прогресс пишется в общее хранилище статусов
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, wait as wait_futures
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+AGENT_TYPES = ('q_learning', 'dqn')
+CHECKPOINT_FILES = {'q_learning': 'q_agent.npz', 'dqn': 'dqn_agent.pth'}
+
+
+def _json_default(obj):
+    """Сериализация numpy-скаляров и прочих объектов в JSON"""
+    if hasattr(obj, 'item'):
+        return obj.item()
+    return str(obj)
+
+
+def atomic_write(filepath: str, write_fn: Callable[[str], None]):
+    """
+    Атомарная запись файла: write_fn пишет во временный файл
+    в той же директории, затем он подменяет целевой через os.replace
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(filepath) + '.', suffix='.tmp', dir=directory)
+    os.close(fd)
+    try:
+        write_fn(tmp_path)
+        os.replace(tmp_path, filepath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def models_dir_for(lottery_type: str, models_root: str = 'backend/models/rl') -> str:
+    """Директория моделей лотереи (как в RLGenerator)"""
+    from backend.app.core import data_manager
+    config = data_manager.LOTTERY_CONFIGS[lottery_type]
+    return os.path.join(models_root, config.get('db_table', lottery_type).replace('draws_', ''))
+
+
+class TrainingStatusStore:
+    """
+    Хранилище статусов задач обучения
+
+    Один JSON-файл на задачу, запись атомарная, поэтому файлы безопасно
+    читать из API-процесса, пока воркеры обновляют прогресс.
+    """
+
+    def __init__(self, status_dir: str):
+        self.status_dir = status_dir
+        os.makedirs(status_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.status_dir, f"{job_id}.json")
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Статус задачи или None"""
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def update(self, job_id: str, **fields) -> Dict:
+        """Слияние полей со статусом задачи"""
+        with self._lock:
+            status = self.get(job_id) or {'job_id': job_id}
+            status.update(fields)
+            status['updated_at'] = datetime.now().isoformat()
+
+            def write(tmp_path: str):
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(status, f, ensure_ascii=False, default=_json_default)
+
+            atomic_write(self._path(job_id), write)
+            return status
+
+    def list(self, lottery_type: Optional[str] = None) -> List[Dict]:
+        """Все статусы (новые первыми)"""
+        statuses = []
+        for name in os.listdir(self.status_dir):
+            if name.endswith('.json'):
+                status = self.get(name[:-5])
+                if status and (lottery_type is None or status.get('lottery_type') == lottery_type):
+                    statuses.append(status)
+        return sorted(statuses, key=lambda s: s.get('created_at', ''), reverse=True)
+
+
+class _ProgressReporter:
+    """Колбэк эпизодов: пишет прогресс в хранилище не чаще min_interval секунд"""
+
+    def __init__(self, store: TrainingStatusStore, job_id: str, total_episodes: int,
+                 min_interval: float = 0.5):
+        self.store = store
+        self.job_id = job_id
+        self.total_episodes = max(total_episodes, 1)
+        self.min_interval = min_interval
+        self.episodes_done = 0
+        self.recent_rewards = []
+        self._last_write = 0.0
+
+    def __call__(self, episode_stats: Dict):
+        self.episodes_done += 1
+        self.recent_rewards.append(float(episode_stats.get('reward', 0)))
+        self.recent_rewards = self.recent_rewards[-50:]
+
+        now = time.time()
+        if now - self._last_write < self.min_interval and self.episodes_done < self.total_episodes:
+            return
+        self._last_write = now
+
+        self.store.update(
+            self.job_id,
+            episodes_done=self.episodes_done,
+            progress=round(100.0 * self.episodes_done / self.total_episodes, 1),
+            last_reward=self.recent_rewards[-1],
+            average_reward=float(np.mean(self.recent_rewards)),
+            epsilon=float(episode_stats.get('epsilon', 0))
+        )
+
+
+def _run_training_job(job: Dict, status_dir: str, num_threads: int,
+                      df_history: Optional[pd.DataFrame] = None) -> Dict:
+    """
+    Тело задачи в процессе-воркере: обучение одного агента и атомарное
+    сохранение чекпоинта
+
+    Args:
+        job: Описание задачи (job_id, lottery_type, agent, episodes, ...)
+        status_dir: Директория хранилища статусов
+        num_threads: Бюджет потоков BLAS/torch для процесса
+        df_history: История тиражей (если None, загружается из БД)
+    """
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(num_threads)
+
+    import torch
+    torch.set_num_threads(num_threads)
+
+    from backend.app.core import data_manager
+    from backend.app.core.rl.q_agent import QLearningAgent
+    from backend.app.core.rl.dqn_agent import DQNAgent
+
+    store = TrainingStatusStore(status_dir)
+    job_id = job['job_id']
+    store.update(job_id, status='running', started_at=datetime.now().isoformat(),
+                 pid=os.getpid(), threads=num_threads)
+
+    try:
+        lottery_type = job['lottery_type']
+        config = data_manager.LOTTERY_CONFIGS[lottery_type]
+
+        if df_history is None:
+            data_manager.set_current_lottery(lottery_type)
+            df_history = data_manager.fetch_draws_from_db()
+
+        if len(df_history) < job['window_size'] + 10:
+            raise ValueError(f"Недостаточно данных для обучения: {len(df_history)} < {job['window_size'] + 10}")
+
+        reporter = _ProgressReporter(store, job_id, job['episodes'])
+        if job['agent'] == 'q_learning':
+            agent = QLearningAgent(config)
+            stats = agent.train(df_history=df_history, num_episodes=job['episodes'],
+                                window_size=job['window_size'], verbose=False,
+                                progress_callback=reporter)
+        else:
+            agent = DQNAgent(config, device='cpu')
+            stats = agent.train(df_history=df_history, num_episodes=job['episodes'],
+                                window_size=job['window_size'], verbose=False,
+                                num_envs=job.get('num_envs', 1), progress_callback=reporter)
+
+        checkpoint = os.path.join(job['models_dir'], CHECKPOINT_FILES[job['agent']])
+        atomic_write(checkpoint, agent.save)
+
+        stats = json.loads(json.dumps(stats, default=_json_default))
+        store.update(job_id, status='completed', finished_at=datetime.now().isoformat(),
+                     progress=100.0, stats=stats, checkpoint=checkpoint)
+        return {'job_id': job_id, 'stats': stats, 'checkpoint': checkpoint}
+
+    except Exception as e:
+        store.update(job_id, status='failed', finished_at=datetime.now().isoformat(), error=str(e))
+        raise
+
+
+class RLTrainingOrchestrator:
+    """
+    Параллельное обучение RL агентов в пуле процессов
+
+    Задача - пара (лотерея, агент). Пул использует spawn-контекст, каждому
+    процессу выделяется cpu_budget // max_jobs потоков. Процесс, вызвавший
+    submit, только ставит задачи в очередь; по завершении задачи
+    в нем обновляется training_stats.json и вызываются слушатели.
+    """
+
+    def __init__(self,
+                 max_jobs: Optional[int] = None,
+                 cpu_budget: Optional[int] = None,
+                 models_root: str = 'backend/models/rl',
+                 status_dir: Optional[str] = None):
+        """
+        Args:
+            max_jobs: Количество одновременных процессов обучения
+            cpu_budget: Общий бюджет ядер (по умолчанию os.cpu_count())
+            models_root: Корневая директория моделей
+            status_dir: Директория статусов (по умолчанию models_root/_jobs)
+        """
+        self.cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+        self.max_jobs = max(1, min(max_jobs or 2, self.cpu_budget))
+        self.threads_per_job = max(1, self.cpu_budget // self.max_jobs)
+        self.models_root = models_root
+        self.status_store = TrainingStatusStore(status_dir or os.path.join(models_root, '_jobs'))
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._futures: Dict[str, Future] = {}
+        self._finalized: Dict[str, threading.Event] = {}
+        self._listeners: List[Callable[[Dict], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_jobs,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                logger.info(f"✅ Пул обучения RL: {self.max_jobs} процессов × {self.threads_per_job} потоков")
+            return self._executor
+
+    def add_completion_listener(self, callback: Callable[[Dict], None]):
+        """Колбэк, вызываемый с финальным статусом каждой задачи"""
+        self._listeners.append(callback)
+
+    def submit(self,
+               lottery_type: str,
+               agent: str,
+               episodes: int,
+               window_size: int = 50,
+               num_envs: int = 1,
+               df_history: Optional[pd.DataFrame] = None) -> str:
+        """
+        Постановка задачи обучения в очередь
+
+        Returns:
+            Идентификатор задачи
+        """
+        if agent not in AGENT_TYPES:
+            raise ValueError(f"Неизвестный тип агента: {agent}")
+
+        job_id = f"{lottery_type}-{agent}-{uuid.uuid4().hex[:8]}"
+        job = {
+            'job_id': job_id,
+            'lottery_type': lottery_type,
+            'agent': agent,
+            'episodes': int(episodes),
+            'window_size': int(window_size),
+            'num_envs': int(num_envs),
+            'models_dir': models_dir_for(lottery_type, self.models_root)
+        }
+        self.status_store.update(job_id, status='queued', created_at=datetime.now().isoformat(),
+                                 progress=0.0, episodes_done=0,
+                                 **{k: v for k, v in job.items() if k != 'job_id'})
+
+        self._finalized[job_id] = threading.Event()
+        future = self._get_executor().submit(_run_training_job, job, self.status_store.status_dir,
+                                             self.threads_per_job, df_history)
+        self._futures[job_id] = future
+        future.add_done_callback(lambda f, job=job: self._on_job_done(job, f))
+
+        logger.info(f"📥 Задача обучения {job_id} поставлена в очередь ({episodes} эпизодов)")
+        return job_id
+
+    def submit_lottery(self,
+                       lottery_type: str,
+                       q_episodes: int = 1000,
+                       dqn_episodes: int = 500,
+                       window_size: int = 50,
+                       num_envs: int = 1,
+                       df_history: Optional[pd.DataFrame] = None) -> List[str]:
+        """Постановка в очередь обоих агентов лотереи"""
+        return [
+            self.submit(lottery_type, 'q_learning', q_episodes, window_size, df_history=df_history),
+            self.submit(lottery_type, 'dqn', dqn_episodes, window_size, num_envs, df_history=df_history)
+        ]
+
+    def _on_job_done(self, job: Dict, future: Future):
+        """Финализация задачи в процессе-оркестраторе"""
+        job_id = job['job_id']
+        error = future.exception()
+        if error is not None:
+            status = self.status_store.get(job_id) or {}
+            if status.get('status') != 'failed':
+                status = self.status_store.update(job_id, status='failed', error=str(error),
+                                                  finished_at=datetime.now().isoformat())
+            logger.error(f"❌ Задача обучения {job_id} завершилась ошибкой: {error}")
+        else:
+            status = self.status_store.get(job_id) or {}
+            self._merge_training_stats(job, future.result()['stats'])
+            logger.info(f"✅ Задача обучения {job_id} завершена")
+
+        for callback in self._listeners:
+            try:
+                callback(status)
+            except Exception as e:
+                logger.error(f"❌ Ошибка обработчика завершения {job_id}: {e}")
+
+        self._finalized[job_id].set()
+
+    def _merge_training_stats(self, job: Dict, stats: Dict):
+        """Обновление training_stats.json лотереи статистикой агента"""
+        stats_path = os.path.join(job['models_dir'], 'training_stats.json')
+        with self._lock:
+            training_stats = {}
+            if os.path.exists(stats_path):
+                try:
+                    with open(stats_path, 'r') as f:
+                        training_stats = json.load(f)
+                except (json.JSONDecodeError, OSError):
+                    training_stats = {}
+            training_stats[job['agent']] = stats
+
+            def write(tmp_path: str):
+                with open(tmp_path, 'w') as f:
+                    json.dump(training_stats, f, indent=2, default=_json_default)
+
+            atomic_write(stats_path, write)
+
+    def get_status(self, job_id: str) -> Optional[Dict]:
+        """Статус задачи"""
+        return self.status_store.get(job_id)
+
+    def list_jobs(self, lottery_type: Optional[str] = None) -> List[Dict]:
+        """Статусы всех задач"""
+        return self.status_store.list(lottery_type)
+
+    def wait(self, job_ids: Optional[List[str]] = None, timeout: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Ожидание завершения задач
+
+        Returns:
+            {job_id: финальный статус}
+        """
+        job_ids = list(self._futures.keys()) if job_ids is None else job_ids
+        futures = [self._futures[job_id] for job_id in job_ids if job_id in self._futures]
+        wait_futures(futures, timeout=timeout)
+        # Колбэки завершения выполняются после пробуждения ожидающих - дожидаемся их
+        for job_id in job_ids:
+            if job_id in self._finalized and self._futures[job_id].done():
+                self._finalized[job_id].wait()
+        return {job_id: self.status_store.get(job_id) for job_id in job_ids}
+
+    def shutdown(self, wait: bool = True):
+        """Остановка пула процессов"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+# Глобальный оркестратор для API (задачи выполняются вне процесса сервера)
+GLOBAL_RL_ORCHESTRATOR = RLTrainingOrchestrator(max_jobs=int(os.getenv('RL_TRAINING_JOBS', '2')))
@@ -232,6 +232,9 @@ class PerformanceValidator:
     """
     Валидация агента на отдельных данных
 
+    Каждый эпизод - проход от случайной позиции до конца среза, как при
+    reset()/step(); действия вычисляются пакетно, награды - по таблице призов.
+
     Args:
         agent: Обученный агент (Q-Learning или DQN)
         val_df: Валидационные данные
@@ -242,43 +245,19 @@ class PerformanceValidator:
         Метрики производительности
     """
     from backend.app.core.rl.environment import LotteryEnvironment
+    from backend.app.core.rl.batch_evaluation import BatchedAgentEvaluator
 
     # Создаем среду для валидации
     env = LotteryEnvironment(val_df, lottery_config)
 
-    rewards = []
-    wins = 0
-    total_invested = 0
-    total_won = 0
-
-    for episode in range(num_episodes):
-      state = env.reset()
-      episode_reward = 0
-      episode_invested = 0
-      episode_won = 0
-
-      done = False
-      while not done:
-        # Получаем действие от агента (без обучения)
-        if hasattr(agent, 'choose_action'):
-          action = agent.choose_action(state, training=False)
-        else:
-          action = agent.predict(state)
-
-        next_state, reward, done, info = env.step(action)
-
-        episode_reward += reward
-        episode_invested += self.reward_calculator.ticket_cost
-
-        if reward > 0:
-          episode_won += reward + self.reward_calculator.ticket_cost
-          wins += 1
-
-        state = next_state
+    # Действия для всего среза одним пакетом, эпизоды - суффиксные суммы наград
+    ticket_cost = self.reward_calculator.ticket_cost
+    episodes = BatchedAgentEvaluator(env).play_episodes(agent, num_episodes, ticket_cost)
 
-      rewards.append(episode_reward)
-      total_invested += episode_invested
-      total_won += episode_won
+    rewards = episodes['rewards'].tolist()
+    wins = int(episodes['wins'].sum())
+    total_invested = float(episodes['steps'].sum() * ticket_cost)
+    total_won = float(episodes['won'].sum())
 
     # Вычисляем метрики
     avg_reward = np.mean(rewards)
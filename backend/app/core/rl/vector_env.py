@@ -0,0 +1,178 @@
+"""
+Векторизованная среда лотереи для RL
+Одновременно ведет M независимых эпизодов над одной историей тиражей
+"""
+
+import logging
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from backend.app.core.rl.environment import LotteryEnvironment
+
+logger = logging.getLogger(__name__)
+
+
+class VectorizedLotteryEnvironment:
+    """
+    Обертка над LotteryEnvironment, выполняющая шаг для M позиций сразу
+
+    Состояния читаются из предвычисленной таблицы среды, совпадения
+    считаются по one-hot маскам тиражей, награды - по таблице призов
+    (совпадения_поле1, совпадения_поле2) за одну операцию индексирования.
+    Завершившиеся эпизоды автоматически сбрасываются на новую позицию.
+
+    Награда включает стоимость билета, приз и те компоненты reward shaping,
+    которые зависят только от числа совпадений (near-miss и частичные
+    совпадения). Бонусы исследования и curiosity требуют последовательной
+    истории и здесь не начисляются.
+    """
+
+    def __init__(self, env: LotteryEnvironment, num_envs: int, max_steps: int = 100,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            env: Базовая среда (источник таблицы состояний и тиражей)
+            num_envs: Количество параллельных эпизодов M
+            max_steps: Максимальная длина эпизода
+            seed: Зерно генератора случайных позиций
+        """
+        self.env = env
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.rng = np.random.default_rng(seed)
+
+        self.field1_size = env.field1_size
+        self.field2_size = env.field2_size
+        self.field1_max = env.field1_max
+        self.field2_max = env.field2_max
+        self.n_draws = len(env.df_history)
+
+        # One-hot маски фактических тиражей
+        self.draw_mask_f1 = env._count_matrix(env._draws_field1, self.field1_max) > 0
+        self.draw_mask_f2 = env._count_matrix(env._draws_field2, self.field2_max) > 0
+        self.draw_valid = np.array([bool(f1) and bool(f2) for f1, f2 in
+                                    zip(env._draws_field1, env._draws_field2)], dtype=bool)
+
+        self.reward_table, self.ticket_cost = self._build_reward_table()
+
+        # Состояние M эпизодов
+        self.positions = np.zeros(num_envs, dtype=np.int64)
+        self.episode_steps = np.zeros(num_envs, dtype=np.int64)
+
+        logger.info(f"✅ Векторизованная среда: {num_envs} эпизодов, история={self.n_draws}")
+
+    def _build_reward_table(self) -> Tuple[np.ndarray, float]:
+        """Таблица наград [совпадения_поле1, совпадения_поле2] с учетом стоимости билета"""
+        table = np.zeros((self.field1_size + 1, self.field2_size + 1), dtype=np.float64)
+        calculator = getattr(self.env, 'reward_calculator', None)
+
+        if calculator is not None and hasattr(calculator, 'match_shaping_reward'):
+            ticket_cost = calculator.ticket_cost
+            prizes = calculator.match_rewards
+            m1 = np.arange(self.field1_size + 1)[:, None]
+            m2 = np.arange(self.field2_size + 1)[None, :]
+
+            # Shaping, зависящий только от совпадений - тем же методом, что и в скалярной награде
+            table += calculator.match_shaping_reward(m1, m2)
+        else:
+            prizes, ticket_cost = self.env.get_basic_prize_structure()
+
+        for (m1, m2), prize in prizes.items():
+            if 0 <= m1 <= self.field1_size and 0 <= m2 <= self.field2_size:
+                table[m1, m2] += prize
+
+        return table - ticket_cost, ticket_cost
+
+    def _sample_positions(self, count: int) -> np.ndarray:
+        """Случайные стартовые позиции, как в LotteryEnvironment.reset"""
+        min_pos = self.env.window_size
+        max_pos = self.n_draws - 10
+        if max_pos > min_pos:
+            return self.rng.integers(min_pos, max_pos, size=count)
+        return np.full(count, min_pos, dtype=np.int64)
+
+    def reset(self, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Сброс всех эпизодов
+
+        Returns:
+            Состояния (M, state_dim)
+        """
+        if positions is None:
+            positions = self._sample_positions(self.num_envs)
+
+        self.positions = np.asarray(positions, dtype=np.int64).copy()
+        self.episode_steps[:] = 0
+        return self.env.state_table[self.positions]
+
+    @staticmethod
+    def _numbers_to_mask(numbers: np.ndarray, max_num: int) -> np.ndarray:
+        """(M, k) массив чисел 1..max_num -> (M, max_num) булева маска"""
+        mask = np.zeros((numbers.shape[0], max_num), dtype=bool)
+        rows = np.repeat(np.arange(numbers.shape[0]), numbers.shape[1])
+        mask[rows, numbers.ravel() - 1] = True
+        return mask
+
+    def compute_rewards(self, actions_f1: np.ndarray, actions_f2: np.ndarray,
+                        positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Векторизованный расчет совпадений и наград
+
+        Args:
+            actions_f1: (M, field1_size) числа поля 1
+            actions_f2: (M, field2_size) числа поля 2
+            positions: (M,) индексы тиражей
+
+        Returns:
+            (награды, совпадения_поле1, совпадения_поле2)
+        """
+        pred_f1 = self._numbers_to_mask(actions_f1, self.field1_max)
+        pred_f2 = self._numbers_to_mask(actions_f2, self.field2_max)
+
+        matches_f1 = (pred_f1 & self.draw_mask_f1[positions]).sum(axis=1)
+        matches_f2 = (pred_f2 & self.draw_mask_f2[positions]).sum(axis=1)
+
+        rewards = self.reward_table[np.minimum(matches_f1, self.field1_size),
+                                    np.minimum(matches_f2, self.field2_size)]
+        rewards = np.where(self.draw_valid[positions], rewards, -self.ticket_cost)
+
+        return rewards, matches_f1, matches_f2
+
+    def step(self, actions_f1: np.ndarray,
+             actions_f2: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict]:
+        """
+        Шаг всех M эпизодов
+
+        Returns:
+            (следующие_состояния (M, state_dim), награды (M,), терминальные (M,), инфо)
+            Для эпизодов, завершенных в этом шаге, в info['next_states'] лежит
+            последнее состояние эпизода, а в основном массиве - состояние после сброса.
+        """
+        rewards, matches_f1, matches_f2 = self.compute_rewards(actions_f1, actions_f2, self.positions)
+
+        self.positions += 1
+        self.episode_steps += 1
+
+        dones = self.positions >= self.n_draws - 1
+        truncated = ~dones & (self.episode_steps >= self.max_steps)
+        episode_end = dones | truncated
+
+        next_states = self.env.state_table[np.minimum(self.positions, len(self.env.state_table) - 1)]
+
+        info = {
+            'matches_field1': matches_f1,
+            'matches_field2': matches_f2,
+            'episode_end': episode_end,
+            'episode_steps': self.episode_steps.copy(),
+            'next_states': next_states
+        }
+
+        # Авто-сброс завершившихся эпизодов
+        if episode_end.any():
+            count = int(episode_end.sum())
+            self.positions[episode_end] = self._sample_positions(count)
+            self.episode_steps[episode_end] = 0
+            next_states = next_states.copy()
+            next_states[episode_end] = self.env.state_table[self.positions[episode_end]]
+
+        return next_states, rewards, dones, info
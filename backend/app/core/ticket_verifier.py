@@ -1,7 +1,9 @@
+import numpy as np
 import pandas as pd
 
 from backend.app.core.utils import parse_numbers, format_numbers
 from backend.app.core.data_manager import get_current_config
+from backend.app.core.verification_engine import GLOBAL_VERIFICATION_ENGINE
 
 
 def _check_single_ticket_against_draw(user_numbers_f1, user_numbers_f2, winning_numbers_f1, winning_numbers_f2):
@@ -108,6 +110,7 @@ def get_prize_category(matches_f1, matches_f2):
 def verify_ticket_against_history(user_f1_str, user_f2_str, df_history):
   """
   Verifies a single user ticket against all draws in history.
+  Совпадения считаются по битсетам тиражей (verification_engine).
   """
   config = get_current_config()
   f1_size = config['field1_size']
@@ -122,32 +125,12 @@ def verify_ticket_against_history(user_f1_str, user_f2_str, df_history):
              "Совпадения": f"Неверный формат номеров. Введите {f1_size} чисел в Поле 1 и {f2_size} в Поле 2.",
              "Категория": "-", "Дата тиража": "-", "Выигрышные номера": "-"}]
 
-  results = []
   if df_history.empty:
     return [{"Тираж": "Информация", "Совпадения": "История тиражей пуста.",
              "Категория": "-", "Дата тиража": "-", "Выигрышные номера": "-"}]
 
-  for _, draw in df_history.iterrows():
-    winning_f1 = draw.get('Числа_Поле1_list')
-    winning_f2 = draw.get('Числа_Поле2_list')
-    draw_num = draw.get('Тираж')
-    draw_date = draw.get('Дата').strftime('%Y-%m-%d') if pd.notnull(draw.get('Дата')) else 'N/A'
-
-    if not (isinstance(winning_f1, list) and len(winning_f1) == f1_size and
-            isinstance(winning_f2, list) and len(winning_f2) == f2_size):
-      continue
-
-    matches_f1, matches_f2 = _check_single_ticket_against_draw(user_numbers_f1, user_numbers_f2, winning_f1, winning_f2)
-    prize_category = get_prize_category(matches_f1, matches_f2)
-
-    if prize_category:
-      results.append({
-        "Тираж": draw_num,
-        "Дата тиража": draw_date,
-        "Выигрышные номера": f"Поле1: {format_numbers(winning_f1)}; Поле2: {format_numbers(winning_f2)}",
-        "Совпадения": f"{matches_f1} (П1) + {matches_f2} (П2)",
-        "Категория": prize_category
-      })
+  results = GLOBAL_VERIFICATION_ENGINE.verify_numbers(
+    np.array([user_numbers_f1]), np.array([user_numbers_f2]), df_history)[0]
 
   if not results:
     return [{"Тираж": "Без выигрыша",
@@ -159,7 +142,9 @@ def verify_ticket_against_history(user_f1_str, user_f2_str, df_history):
 def verify_multiple_tickets_from_df(tickets_df, df_history):
   """
   Verifies multiple tickets from a DataFrame against historical draws.
+  Все билеты проверяются одним проходом по битсетам тиражей.
   """
+  config = get_current_config()
   all_results = []
   if tickets_df.empty:
     return [{"Билет": "Ошибка файла", "Совпадения": "Файл с билетами пуст.", "Категория": "-"}]
@@ -168,27 +153,30 @@ def verify_multiple_tickets_from_df(tickets_df, df_history):
     return [{"Билет": "Ошибка колонок", "Совпадения": "В CSV файле отсутствуют колонки 'Поле1' и/или 'Поле2'.",
              "Категория": "-"}]
 
-  for index, ticket_row in tickets_df.iterrows():
-    user_f1_str = str(ticket_row['Поле1'])
-    user_f2_str = str(ticket_row['Поле2'])
-    ticket_identifier = f"Билет {index + 1} ({user_f1_str} | {f2_str})"
-
-    ticket_wins_or_info = verify_ticket_against_history(user_f1_str, user_f2_str, df_history)
+  if df_history.empty:
+    return [{"Билет": "Нет данных", "Совпадения": "История тиражей пуста.", "Категория": "-"}]
 
-    first_result = ticket_wins_or_info[0]
-    if first_result.get("Тираж") in ["Ошибка ввода", "Информация", "Без выигрыша"]:
+  for ticket in GLOBAL_VERIFICATION_ENGINE.verify_frame(tickets_df, df_history):
+    if not ticket['valid']:
+      all_results.append({
+        "Билет": ticket['ticket'], "Тираж": "Ошибка ввода",
+        "Дата тиража": "-", "Выигрышные номера": "-",
+        "Совпадения": f"Неверный формат номеров. Введите {config['field1_size']} чисел в Поле 1 "
+                      f"и {config['field2_size']} в Поле 2.",
+        "Категория": "-"
+      })
+    elif not ticket['wins']:
       all_results.append({
-        "Билет": ticket_identifier,
-        "Тираж": first_result.get("Тираж"),
+        "Билет": ticket['ticket'], "Тираж": "Без выигрыша",
         "Дата тиража": "-", "Выигрышные номера": "-",
-        "Совпадения": first_result.get("Совпадения"),
-        "Категория": first_result.get("Категория", "-")
+        "Совпадения": "Ваша комбинация не выиграла ни в одном из прошедших тиражей.",
+        "Категория": "-"
       })
     else:
-      for win_info in ticket_wins_or_info:
-        all_results.append({"Билет": ticket_identifier, **win_info})
+      for win_info in ticket['wins']:
+        all_results.append({"Билет": ticket['ticket'], **win_info})
 
   if not all_results:
     return [{"Билет": "Нет данных", "Совпадения": "Проверка билетов не дала результатов.", "Категория": "-"}]
 
-  return all_results
\ No newline at end of file
+  return all_results
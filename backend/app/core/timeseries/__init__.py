@@ -8,11 +8,13 @@ from .acf_pacf_analysis import ACFPACFAnalyzer
 from .seasonality import SeasonalityDetector
 from .trend_decomposition import TrendDecomposer
 from .timeseries_generator import TimeSeriesGenerator
+from .arima_cache import ARIMAFitCache
 
 __all__ = [
     'ARIMAModel',
     'ACFPACFAnalyzer',
     'SeasonalityDetector',
     'TrendDecomposer',
-    'TimeSeriesGenerator'
+    'TimeSeriesGenerator',
+    'ARIMAFitCache'
 ]
\ No newline at end of file
@@ -5,14 +5,81 @@
 
 import numpy as np
 import pandas as pd
+from scipy import stats
 from statsmodels.stats.diagnostic import acorr_ljungbox
 from statsmodels.tsa.stattools import acf, pacf, adfuller
-from typing import Dict, Tuple, List, Optional
+from typing import Dict, Tuple, List, Optional, Sequence
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def batch_acf(data: np.ndarray, nlags: int) -> np.ndarray:
+  """
+  Автокорреляции всех рядов сразу через FFT (как acf(fft=True, adjusted=False))
+
+  Args:
+      data: Матрица рядов (n_series, n_obs)
+      nlags: Максимальный лаг
+
+  Returns:
+      Матрица (n_series, nlags + 1); у постоянных рядов - нули после лага 0
+  """
+  data = np.asarray(data, dtype=np.float64)
+  n_obs = data.shape[1]
+  centered = data - data.mean(axis=1, keepdims=True)
+
+  # Дополнение нулями до степени двойки >= 2n - без циклической свертки
+  size = 1 << int(np.ceil(np.log2(2 * n_obs - 1)))
+  spectrum = np.fft.rfft(centered, n=size, axis=1)
+  acov = np.fft.irfft(spectrum * np.conj(spectrum), n=size, axis=1)[:, :nlags + 1]
+
+  variance = acov[:, :1]
+  result = np.divide(acov, variance, out=np.zeros_like(acov), where=variance > 1e-12)
+  result[:, 0] = 1.0
+  return result
+
+
+def batch_pacf(acf_values: np.ndarray, n_obs: int) -> np.ndarray:
+  """
+  Частичные автокорреляции пакетной рекурсией Дурбина-Левинсона
+
+  Рекурсия идет по скорректированным автоковариациям (деление на n - k),
+  что совпадает с pacf(method='ywadjusted') statsmodels.
+
+  Args:
+      acf_values: Матрица ACF (n_series, nlags + 1) из batch_acf
+      n_obs: Длина рядов
+
+  Returns:
+      Матрица (n_series, nlags + 1)
+  """
+  nlags = acf_values.shape[1] - 1
+  lags = np.arange(nlags + 1)
+  r = acf_values * n_obs / (n_obs - lags)
+
+  n_series = r.shape[0]
+  result = np.zeros_like(r)
+  result[:, 0] = 1.0
+  if nlags == 0:
+    return result
+
+  phi = np.zeros((n_series, nlags + 1))
+  phi[:, 1] = r[:, 1]
+  result[:, 1] = r[:, 1]
+  sigma = 1.0 - r[:, 1] ** 2
+
+  for k in range(2, nlags + 1):
+    numerator = r[:, k] - np.einsum('ij,ij->i', phi[:, 1:k], r[:, k - 1:0:-1])
+    reflection = np.divide(numerator, sigma, out=np.zeros(n_series), where=np.abs(sigma) > 1e-12)
+    phi[:, 1:k] = phi[:, 1:k] - reflection[:, None] * phi[:, k - 1:0:-1]
+    phi[:, k] = reflection
+    sigma = sigma * (1.0 - reflection ** 2)
+    result[:, k] = reflection
+
+  return result
+
+
 class ACFPACFAnalyzer:
   """Анализатор автокорреляционных функций"""
 
@@ -77,6 +144,67 @@ class ACFPACFAnalyzer:
     logger.info(f"Анализ завершен. Предложенные параметры ARIMA: {suggested_params}")
     return results
 
+  def analyze_batch(self, data: np.ndarray, names: Optional[Sequence[str]] = None,
+                    alpha: float = 0.05) -> Dict:
+    """
+    ACF/PACF анализ матрицы рядов одним пакетом
+
+    Args:
+        data: Матрица рядов одинаковой длины (n_series, n_obs)
+        names: Имена рядов (по умолчанию series_0..)
+        alpha: Уровень значимости полос
+
+    Returns:
+        Матрицы ACF/PACF, полуширины доверительных полос и по каждому
+        ряду: значимые лаги и p-value теста Льюнга-Бокса
+    """
+    data = np.atleast_2d(np.asarray(data, dtype=np.float64))
+    n_series, n_obs = data.shape
+    names = list(names) if names is not None else [f'series_{i}' for i in range(n_series)]
+    # PACF определена для лагов < n/2 - общий предел для обеих функций
+    nlags = max(1, min(self.max_lag, n_obs // 2 - 1))
+    z = stats.norm.ppf(1 - alpha / 2)
+
+    logger.info(f"Пакетный ACF/PACF анализ: {n_series} рядов x {n_obs} точек, лагов {nlags}")
+
+    acf_values = batch_acf(data, nlags)
+    pacf_values = batch_pacf(acf_values, n_obs)
+
+    # Полосы Бартлетта для ACF и 1/sqrt(n) для PACF (как в statsmodels)
+    acf_var = np.full((n_series, nlags + 1), 1.0 / n_obs)
+    acf_var[:, 0] = 0.0
+    acf_var[:, 2:] *= 1 + 2 * np.cumsum(acf_values[:, 1:-1] ** 2, axis=1)
+    acf_band = z * np.sqrt(acf_var)
+    pacf_band = z / np.sqrt(n_obs)
+
+    acf_significant = np.abs(acf_values) > acf_band
+    pacf_significant = np.abs(pacf_values) > pacf_band
+
+    # Льюнг-Бокс по тем же автокорреляциям
+    lb_lags = max(1, min(10, n_obs // 5, nlags))
+    q_terms = acf_values[:, 1:lb_lags + 1] ** 2 / (n_obs - np.arange(1, lb_lags + 1))
+    lb_stat = n_obs * (n_obs + 2) * np.cumsum(q_terms, axis=1)
+    lb_pvalue = stats.chi2.sf(lb_stat, np.arange(1, lb_lags + 1))
+
+    series = {}
+    for i, name in enumerate(names):
+      series[name] = {
+        'significant_acf_lags': (np.flatnonzero(acf_significant[i, 1:]) + 1)[:10].tolist(),
+        'significant_pacf_lags': (np.flatnonzero(pacf_significant[i, 1:]) + 1)[:10].tolist(),
+        'ljung_box_p_value': float(lb_pvalue[i, -1]),
+        'constant': bool(np.ptp(data[i]) == 0)
+      }
+
+    return {
+      'series_names': names,
+      'nlags': nlags,
+      'acf_values': acf_values.tolist(),
+      'pacf_values': pacf_values.tolist(),
+      'acf_band': acf_band.tolist(),
+      'pacf_band': float(pacf_band),
+      'series': series
+    }
+
   def _test_stationarity(self, data: pd.Series) -> Dict:
     """
     Тест Дики-Фуллера на стационарность
@@ -98,7 +226,8 @@ class ACFPACFAnalyzer:
     significant_lags = []
     for i in range(1, len(values)):
       lower, upper = confint[i]
-      if values[i] < lower or values[i] > upper:
+      # Интервал statsmodels центрирован на оценке: лаг значим, если не накрывает ноль
+      if lower > 0 or upper < 0:
         significant_lags.append(i)
     return significant_lags[:10]  # Ограничиваем первыми 10 значимыми лагами
 
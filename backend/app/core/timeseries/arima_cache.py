@@ -0,0 +1,170 @@
+"""
+Дисковый кэш обученных ARIMA моделей позиционных рядов
+
+Ключ записи - (лотерея, ряд, версия данных, порядок). Порядок - 'auto'
+для auto_arima или 'acf' для параметров, предложенных ACF/PACF анализом.
+Кроме точного совпадения кэш отдает последнюю запись ряда: если с тех
+пор добавилось несколько тиражей, модель продлевается (append) вместо
+повторного подбора параметров.
+"""
+
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join('backend', 'models', 'timeseries')
+
+# Больше новых тиражей за раз - полное переобучение вместо продления
+MAX_EXTEND_DRAWS = 5
+# Столько продлений подряд - и параметры подбираются заново
+REFIT_EVERY = 50
+# Версий на ряд, которые остаются на диске
+KEEP_VERSIONS = 3
+
+
+def positional_series(df: pd.DataFrame, config: Dict) -> Dict[str, np.ndarray]:
+  """
+  Позиционные ряды field1_i / field2_i
+
+  Берутся готовые столбцы, если они есть, иначе строятся из списков
+  чисел тиража: i-й ряд - i-е по возрастанию число поля. История
+  должна идти от старых тиражей к новым (chronological_history).
+  """
+  result = {}
+  for field, column in (('field1', 'Числа_Поле1_list'), ('field2', 'Числа_Поле2_list')):
+    size = config.get(f'{field}_size', 0)
+    if size <= 0:
+      continue
+
+    names = [f'{field}_{i}' for i in range(1, size + 1)]
+    if all(name in df.columns for name in names):
+      for name in names:
+        result[name] = df[name].to_numpy(dtype=np.float64)
+    elif column in df.columns:
+      rows = [sorted(numbers)[:size] for numbers in df[column]]
+      if rows and all(len(row) == size for row in rows):
+        matrix = np.asarray(rows, dtype=np.float64)
+        for i, name in enumerate(names):
+          result[name] = matrix[:, i]
+
+  return result
+
+
+def draw_numbers(df: pd.DataFrame) -> np.ndarray:
+  """
+  Номера тиражей окна от старых к новым (по ним проверяется,
+  что новое окно продолжает старое)
+  """
+  if 'Тираж' in df.columns:
+    return df['Тираж'].to_numpy(dtype=np.int64)
+  return np.arange(len(df), dtype=np.int64)
+
+
+class ARIMAFitCache:
+  """Кэш обученных моделей: память (LRU) поверх pickle-файлов"""
+
+  def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, memory_size: int = 64):
+    """
+    Args:
+        cache_dir: Каталог кэша ({lottery}/{series}/{order}/{data_version}.pkl)
+        memory_size: Сколько записей держать в памяти
+    """
+    self.cache_dir = cache_dir
+    self.memory_size = memory_size
+    self._memory: OrderedDict = OrderedDict()
+    self._latest: Dict[tuple, str] = {}
+    self._lock = threading.Lock()
+
+  def _series_dir(self, lottery_type: str, series: str, order: str) -> str:
+    return os.path.join(self.cache_dir, lottery_type, series, order)
+
+  def _path(self, lottery_type: str, series: str, data_version: str, order: str) -> str:
+    return os.path.join(self._series_dir(lottery_type, series, order), f"{data_version}.pkl")
+
+  def _read(self, path: str) -> Optional[Dict]:
+    with self._lock:
+      if path in self._memory:
+        self._memory.move_to_end(path)
+        return self._memory[path]
+
+    if not os.path.exists(path):
+      return None
+    try:
+      with open(path, 'rb') as f:
+        entry = pickle.load(f)
+    except Exception as e:
+      logger.warning(f"Запись кэша ARIMA {path} не прочитана: {e}")
+      return None
+
+    self._remember(path, entry)
+    return entry
+
+  def _remember(self, path: str, entry: Dict):
+    with self._lock:
+      self._memory[path] = entry
+      self._memory.move_to_end(path)
+      while len(self._memory) > self.memory_size:
+        self._memory.popitem(last=False)
+
+  def get(self, lottery_type: str, series: str, data_version: str, order: str) -> Optional[Dict]:
+    """Запись для точной версии данных"""
+    return self._read(self._path(lottery_type, series, data_version, order))
+
+  def latest(self, lottery_type: str, series: str, order: str) -> Optional[Dict]:
+    """Последняя сохраненная запись ряда (кандидат на продление)"""
+    path = self._latest.get((lottery_type, series, order))
+    if path is None:
+      directory = self._series_dir(lottery_type, series, order)
+      if not os.path.isdir(directory):
+        return None
+      files = [os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.pkl')]
+      if not files:
+        return None
+      path = max(files, key=os.path.getmtime)
+    return self._read(path)
+
+  def put(self, lottery_type: str, series: str, data_version: str, order: str, entry: Dict):
+    """Сохранение записи (атомарно) с удалением старых версий ряда"""
+    path = self._path(lottery_type, series, data_version, order)
+    self._remember(path, entry)
+    self._latest[(lottery_type, series, order)] = path
+
+    directory = os.path.dirname(path)
+    try:
+      os.makedirs(directory, exist_ok=True)
+      fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+      try:
+        with os.fdopen(fd, 'wb') as f:
+          pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+      except Exception:
+        if os.path.exists(tmp_path):
+          os.remove(tmp_path)
+        raise
+
+      versions = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.pkl')),
+        key=os.path.getmtime
+      )
+      for old in versions[:-KEEP_VERSIONS]:
+        os.remove(old)
+    except Exception as e:
+      logger.warning(f"Запись кэша ARIMA {path} не сохранена: {e}")
+
+  def clear(self):
+    """Очистка памяти (файлы остаются)"""
+    with self._lock:
+      self._memory.clear()
+      self._latest.clear()
+
+
+GLOBAL_ARIMA_CACHE = ARIMAFitCache()
@@ -48,6 +48,9 @@ class ARIMAModel:
     """
     logger.info(f"Обучение ARIMA модели на {len(data)} точках данных")
 
+    # Модель строится на массиве: продление append() не зависит от индекса ряда
+    data = np.asarray(data, dtype=np.float64)
+
     if self.use_auto:
       # Автоматический подбор параметров
       logger.info("Используем auto_arima для подбора параметров")
@@ -67,7 +70,8 @@ class ARIMAModel:
         'order': self.model.order,
         'seasonal_order': self.model.seasonal_order if self.seasonal else None
       }
-      self.fitted_model = self.model
+      # Результаты statsmodels выбранной модели - общий интерфейс с ручным режимом
+      self.fitted_model = self.model.arima_res_
 
     else:
       # Ручные параметры
@@ -92,14 +96,14 @@ class ARIMAModel:
           enforce_invertibility=False
         )
 
-      self.fitted_model = self.model.fit(disp=0)
+      self.fitted_model = self.model.fit()
       self.params = {
         'order': order,
         'seasonal_order': seasonal_order if self.seasonal else None
       }
 
     # Сохранение остатков и метрик
-    self.residuals = self.fitted_model.resid
+    self.residuals = np.asarray(self.fitted_model.resid)
     self._calculate_metrics()
 
     results = {
@@ -133,22 +137,11 @@ class ARIMAModel:
       raise ValueError("Модель не обучена. Вызовите fit() сначала.")
 
     # Прогноз
-    if self.use_auto:
-      forecast, conf_int = self.fitted_model.predict(
-        n_periods=steps,
-        return_conf_int=return_confidence
-      )
-      forecast = pd.Series(forecast)
-    else:
-      forecast_result = self.fitted_model.forecast(steps=steps)
-      forecast = forecast_result
+    forecast_result = self.fitted_model.get_forecast(steps=steps)
+    forecast = np.asarray(forecast_result.predicted_mean)
 
-      if return_confidence:
-        # Получаем доверительные интервалы
-        forecast_df = self.fitted_model.get_forecast(steps=steps)
-        conf_int = forecast_df.conf_int()
-      else:
-        conf_int = None
+    # Получаем доверительные интервалы
+    conf_int = forecast_result.conf_int() if return_confidence else None
 
     result = {
       'forecast': forecast.tolist() if hasattr(forecast, 'tolist') else forecast,
@@ -169,6 +162,29 @@ class ARIMAModel:
 
     return result
 
+  def extend(self, new_data) -> Dict:
+    """
+    Продление обученной модели новыми наблюдениями без подбора параметров
+
+    Фильтр состояния продолжается с последней точки (append в statsmodels),
+    параметры и порядок модели остаются прежними.
+
+    Args:
+        new_data: Новые значения ряда (после последней точки обучения)
+
+    Returns:
+        Обновленные метрики модели
+    """
+    if self.fitted_model is None:
+      raise ValueError("Модель не обучена. Вызовите fit() сначала.")
+
+    self.fitted_model = self.fitted_model.append(np.asarray(new_data, dtype=np.float64))
+    self.residuals = np.asarray(self.fitted_model.resid)
+    # Копия модели из кэша не должна менять метрики исходной
+    self.metrics = dict(self.metrics)
+    self._calculate_metrics()
+    return self.metrics
+
   def _calculate_metrics(self):
     """Расчет метрик качества модели"""
     if self.residuals is not None:
@@ -107,6 +107,53 @@ class SeasonalityDetector:
 
     return unique_periods
 
+  def dominant_periods_batch(self, data: np.ndarray, top: int = 5) -> Dict:
+    """
+    Доминирующие периоды матрицы рядов по общей периодограмме
+
+    Детрендирование и периодограмма считаются по всем рядам сразу,
+    дальше - те же правила отбора, что в _find_dominant_periods.
+
+    Args:
+        data: Матрица рядов одинаковой длины (n_series, n_obs)
+        top: Сколько периодов вернуть на ряд
+
+    Returns:
+        {'periods': [[...] на ряд], 'power_share': [[...] доля мощности периода]}
+    """
+    data = np.atleast_2d(np.asarray(data, dtype=np.float64))
+    detrended = signal.detrend(data, axis=1)
+    frequencies, power = signal.periodogram(detrended, axis=1)
+
+    frequencies = frequencies[1:]
+    power = power[:, 1:]
+    periods = 1 / frequencies
+
+    valid_mask = (periods >= self.min_period) & (periods <= self.max_period)
+    rounded = np.rint(periods[valid_mask]).astype(int)
+    power = power[:, valid_mask]
+    total = power.sum(axis=1)
+
+    order = np.argsort(-power, axis=1, kind='stable')
+    result_periods = []
+    result_share = []
+    for row in range(len(power)):
+      seen = set()
+      row_periods, row_share = [], []
+      for idx in order[row]:
+        period = int(rounded[idx])
+        if period in seen:
+          continue
+        seen.add(period)
+        row_periods.append(period)
+        row_share.append(float(power[row, idx] / total[row]) if total[row] > 0 else 0.0)
+        if len(row_periods) == top:
+          break
+      result_periods.append(row_periods)
+      result_share.append(row_share)
+
+    return {'periods': result_periods, 'power_share': result_share}
+
   def _test_seasonality(self, data: pd.Series, period: int) -> Dict:
     """
     Тестирование силы сезонности для заданного периода
@@ -0,0 +1,79 @@
+"""
+Пакетный анализ всех числовых рядов лотереи
+
+Позиционные ряды (field1_i / field2_i) и ряды появления каждого числа
+(0/1 по тиражам) собираются в одну матрицу; ACF/PACF и периодограмма
+считаются по ней одним пакетом.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .acf_pacf_analysis import ACFPACFAnalyzer
+from .arima_cache import positional_series
+from .seasonality import SeasonalityDetector
+from ..validation.walk_forward import chronological_history
+
+SERIES_KINDS = ('all', 'positional', 'occurrence')
+
+
+def occurrence_series(df: pd.DataFrame, config: Dict) -> Dict[str, np.ndarray]:
+  """Ряды появления чисел: field1_n{k} = 1, если число k выпало в тираже"""
+  result = {}
+  for field, column in (('field1', 'Числа_Поле1_list'), ('field2', 'Числа_Поле2_list')):
+    max_num = config.get(f'{field}_max', 0)
+    if config.get(f'{field}_size', 0) <= 0 or column not in df.columns:
+      continue
+
+    matrix = np.zeros((len(df), max_num + 1))
+    for row, numbers in enumerate(df[column]):
+      valid = [n for n in numbers if 1 <= n <= max_num]
+      matrix[row, valid] = 1.0
+
+    for number in range(1, max_num + 1):
+      result[f'{field}_n{number}'] = matrix[:, number]
+
+  return result
+
+
+def build_series_matrix(df: pd.DataFrame, config: Dict, kind: str = 'all') -> Tuple[List[str], np.ndarray]:
+  """Имена рядов и матрица (n_series, n_draws)"""
+  if kind not in SERIES_KINDS:
+    raise ValueError(f"Неизвестный тип рядов: {kind}")
+
+  df, _ = chronological_history(df)
+  series = {}
+  if kind in ('all', 'positional'):
+    series.update(positional_series(df, config))
+  if kind in ('all', 'occurrence'):
+    series.update(occurrence_series(df, config))
+
+  names = list(series)
+  matrix = np.vstack([series[name] for name in names]) if names else np.zeros((0, len(df)))
+  return names, matrix
+
+
+def analyze_series_matrix(df: pd.DataFrame, config: Dict, kind: str = 'all',
+                          max_lag: int = 40, max_period: int = 52) -> Dict:
+  """
+  ACF/PACF и доминирующие периоды всех рядов одним пакетом
+
+  Returns:
+      Результат ACFPACFAnalyzer.analyze_batch, в котором по каждому ряду
+      добавлены доминирующие периоды и их доля мощности периодограммы
+  """
+  names, matrix = build_series_matrix(df, config, kind)
+  if not names:
+    return {'series_names': [], 'nlags': 0, 'acf_values': [], 'pacf_values': [],
+            'acf_band': [], 'pacf_band': 0.0, 'series': {}}
+
+  result = ACFPACFAnalyzer(max_lag=max_lag).analyze_batch(matrix, names)
+  periods = SeasonalityDetector(max_period=max_period).dominant_periods_batch(matrix)
+
+  for i, name in enumerate(names):
+    result['series'][name]['dominant_periods'] = periods['periods'][i]
+    result['series'][name]['period_power_share'] = periods['power_share'][i]
+
+  return result
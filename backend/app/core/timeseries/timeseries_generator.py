@@ -2,6 +2,12 @@
 Генератор комбинаций на основе анализа временных рядов
 """
 
+import copy
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 from typing import Dict, List, Optional
@@ -9,32 +15,82 @@ from .arima_model import ARIMAModel
 from .acf_pacf_analysis import ACFPACFAnalyzer
 from .seasonality import SeasonalityDetector
 from .trend_decomposition import TrendDecomposer
+from .arima_cache import (GLOBAL_ARIMA_CACHE, MAX_EXTEND_DRAWS, REFIT_EVERY,
+                          ARIMAFitCache, draw_numbers, positional_series)
+from ..utils import get_data_version
+from ..validation.walk_forward import chronological_history
 import logging
 
 logger = logging.getLogger(__name__)
 
+_FIT_EXECUTOR = None
+_FIT_EXECUTOR_LOCK = threading.Lock()
+
+
+def _fit_workers() -> int:
+  """Число процессов обучения (TIMESERIES_FIT_JOBS или число ядер)"""
+  return int(os.getenv('TIMESERIES_FIT_JOBS', '0')) or os.cpu_count() or 1
+
+
+def _get_fit_executor() -> ProcessPoolExecutor:
+  """Общий пул процессов для обучения моделей рядов"""
+  global _FIT_EXECUTOR
+  with _FIT_EXECUTOR_LOCK:
+    if _FIT_EXECUTOR is None:
+      workers = _fit_workers()
+      _FIT_EXECUTOR = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn')
+      )
+      logger.info(f"✅ Пул обучения ARIMA: {workers} процессов")
+    return _FIT_EXECUTOR
+
+
+def _fit_series_worker(config: Dict, field_name: str, values: np.ndarray, use_auto: bool) -> Dict:
+  """Полный анализ и обучение ARIMA одного ряда (выполняется в процессе пула)"""
+  generator = TimeSeriesGenerator(config, use_auto=use_auto)
+  series = pd.Series(values)
+  analysis = generator._analyze_series(series, field_name)
+  model = generator._fit_model(series, analysis)
+  return {'analysis': analysis, 'model': model, 'extended': 0}
+
 
 class TimeSeriesGenerator:
   """Генератор лотерейных комбинаций на основе анализа временных рядов"""
 
-  def __init__(self, config: Dict):
+  def __init__(self, config: Dict, lottery_type: Optional[str] = None,
+               use_auto: bool = True, fit_cache: Optional[ARIMAFitCache] = None,
+               parallel: bool = True):
     """
     Args:
         config: Конфигурация лотереи
+        lottery_type: Тип лотереи - ключ кэша обученных моделей (без него кэш не используется)
+        use_auto: Подбор порядка через auto_arima (иначе - по ACF/PACF)
+        fit_cache: Кэш моделей (по умолчанию глобальный)
+        parallel: Обучать ряды в пуле процессов
     """
     self.config = config
-    self.arima = ARIMAModel(use_auto=True)
+    self.lottery_type = lottery_type
+    self.use_auto = use_auto
+    self.fit_cache = fit_cache or GLOBAL_ARIMA_CACHE
+    self.parallel = parallel
     self.acf_analyzer = ACFPACFAnalyzer()
     self.seasonality = SeasonalityDetector()
     self.trend_decomposer = TrendDecomposer()
     self.analysis_results = {}
+    self.fit_stats = {}
+
+  @property
+  def order_key(self) -> str:
+    """Порядок модели в ключе кэша"""
+    return 'auto' if self.use_auto else 'acf'
 
   def analyze_and_generate(self, df: pd.DataFrame, count: int = 5) -> List[Dict]:
     """
     Анализ временных рядов и генерация комбинаций
 
     Args:
-        df: DataFrame с историей тиражей
+        df: DataFrame с историей тиражей (в любом порядке, как из fetch_draws_from_db)
         count: Количество комбинаций для генерации
 
     Returns:
@@ -42,34 +98,22 @@ class TimeSeriesGenerator:
     """
     logger.info(f"Начинаем анализ временных рядов для {len(df)} тиражей")
 
-    # Анализ каждого числового поля
+    # Ряды, номера тиражей и продление моделей - от старых тиражей к новым
+    df, _ = chronological_history(df)
+
+    # Позиционные ряды field1_i / field2_i
+    series_map = positional_series(df, self.config)
+    fits = self._fit_all(series_map, draw_numbers(df), get_data_version(df))
+
     field_predictions = {}
     field_analysis = {}
 
-    # Анализируем field1 (основные числа)
-    for i in range(1, self.config['field1_size'] + 1):
-      field_name = f'field1_{i}'
-      if field_name in df.columns:
-        series = pd.Series(df[field_name].values, index=df.index)
-
-        # Комплексный анализ
-        analysis = self._analyze_series(series, field_name)
-        field_analysis[field_name] = analysis
-
-        # Прогнозирование
-        predictions = self._predict_numbers(series, analysis, count)
-        field_predictions[field_name] = predictions
-
-    # Анализируем field2 (дополнительные числа)
-    if self.config.get('field2_size', 0) > 0:
-      for i in range(1, self.config['field2_size'] + 1):
-        field_name = f'field2_{i}'
-        if field_name in df.columns:
-          series = pd.Series(df[field_name].values, index=df.index)
-          analysis = self._analyze_series(series, field_name)
-          field_analysis[field_name] = analysis
-          predictions = self._predict_numbers(series, analysis, count)
-          field_predictions[field_name] = predictions
+    for field_name, values in series_map.items():
+      fit = fits[field_name]
+      field_analysis[field_name] = fit['analysis']
+      field_predictions[field_name] = self._predict_numbers(
+        pd.Series(values), fit['analysis'], count, fit['model']
+      )
 
     # Сохранение результатов анализа
     self.analysis_results = field_analysis
@@ -80,6 +124,118 @@ class TimeSeriesGenerator:
     logger.info(f"Сгенерировано {len(combinations)} комбинаций")
     return combinations
 
+  def _fit_all(self, series_map: Dict[str, np.ndarray], draws: np.ndarray,
+               data_version: str) -> Dict[str, Dict]:
+    """
+    Анализ и модели всех рядов: точное попадание в кэш, продление
+    закэшированной модели новыми тиражами или полное обучение в пуле
+    """
+    fits = {}
+    pending = {}
+    stats = {'cached': 0, 'extended': 0, 'fitted': 0}
+
+    for field_name, values in series_map.items():
+      fit = None
+      if self.lottery_type:
+        fit = self.fit_cache.get(self.lottery_type, field_name, data_version, self.order_key)
+        if fit is not None:
+          stats['cached'] += 1
+        else:
+          fit = self._extend_cached(field_name, draws, values)
+          if fit is not None:
+            stats['extended'] += 1
+            self._store_fit(field_name, data_version, fit)
+
+      if fit is None:
+        pending[field_name] = values
+      else:
+        fits[field_name] = fit
+
+    if pending:
+      stats['fitted'] = len(pending)
+      for field_name, fit in self._fit_pending(pending).items():
+        fit['draws'] = draws
+        fits[field_name] = fit
+        self._store_fit(field_name, data_version, fit)
+
+    self.fit_stats = stats
+    logger.info(f"Модели рядов: из кэша {stats['cached']}, продлено {stats['extended']}, "
+                f"обучено {stats['fitted']}")
+    return fits
+
+  def _fit_pending(self, pending: Dict[str, np.ndarray]) -> Dict[str, Dict]:
+    """Полное обучение рядов - параллельно в пуле процессов"""
+    # На одном ядре пул только добавляет запуск процессов и пересылку моделей
+    if not self.parallel or len(pending) < 2 or _fit_workers() < 2:
+      return {name: _fit_series_worker(self.config, name, values, self.use_auto)
+              for name, values in pending.items()}
+
+    executor = _get_fit_executor()
+    futures = {
+      name: executor.submit(_fit_series_worker, self.config, name, values, self.use_auto)
+      for name, values in pending.items()
+    }
+    return {name: future.result() for name, future in futures.items()}
+
+  def _extend_cached(self, field_name: str, draws: np.ndarray, values: np.ndarray) -> Optional[Dict]:
+    """
+    Продление последней закэшированной модели ряда новыми тиражами
+
+    Возможно, если окно продолжает закэшированное: последний учтенный
+    тираж есть в окне, после него не больше MAX_EXTEND_DRAWS тиражей,
+    а общий хвост номеров совпадает.
+    """
+    entry = self.fit_cache.latest(self.lottery_type, field_name, self.order_key)
+    if entry is None or entry.get('model') is None or not len(entry.get('draws', [])):
+      return None
+
+    old_draws = entry['draws']
+    positions = np.flatnonzero(draws == old_draws[-1])
+    if not len(positions):
+      return None
+
+    last = int(positions[0])
+    new_values = values[last + 1:]
+    if not 0 < len(new_values) <= MAX_EXTEND_DRAWS or entry['extended'] + len(new_values) > REFIT_EVERY:
+      return None
+
+    overlap = min(len(old_draws), last + 1)
+    if not np.array_equal(draws[last + 1 - overlap:last + 1], old_draws[-overlap:]):
+      return None
+
+    # Запись кэша не меняется: продлевается копия модели
+    model = copy.copy(entry['model'])
+    try:
+      model.extend(new_values)
+    except Exception as e:
+      logger.warning(f"Модель {field_name} не продлена, полное обучение: {e}")
+      return None
+
+    return {
+      'analysis': self._analyze_series(pd.Series(values), field_name),
+      'model': model,
+      'extended': entry['extended'] + len(new_values),
+      'draws': draws
+    }
+
+  def _store_fit(self, field_name: str, data_version: str, fit: Dict):
+    if self.lottery_type:
+      self.fit_cache.put(self.lottery_type, field_name, data_version, self.order_key, fit)
+
+  def _fit_model(self, series: pd.Series, analysis: Dict) -> Optional[ARIMAModel]:
+    """Обучение ARIMA ряда (auto_arima или порядок из ACF/PACF)"""
+    suggested = (analysis.get('acf_pacf') or {}).get('suggested_arima_params')
+    if not self.use_auto and not suggested:
+      return None
+
+    model = ARIMAModel(use_auto=self.use_auto)
+    try:
+      model.fit(series, order=suggested)
+    except Exception as e:
+      logger.warning(f"Ошибка обучения ARIMA для {analysis.get('field_name')}: {e}")
+      return None
+    return model
+
   def _analyze_series(self, series: pd.Series, field_name: str) -> Dict:
     """
     Комплексный анализ временного ряда
@@ -122,22 +278,19 @@ class TimeSeriesGenerator:
 
     return analysis
 
-  def _predict_numbers(self, series: pd.Series, analysis: Dict, count: int) -> List[int]:
+  def _predict_numbers(self, series: pd.Series, analysis: Dict, count: int,
+                       model: Optional[ARIMAModel] = None) -> List[int]:
     """
-    Прогнозирование чисел на основе анализа
+    Прогнозирование чисел на основе анализа и обученной модели ряда
     """
     predictions = []
+    if count <= 0:
+      return predictions
 
     try:
       # ARIMA прогноз
-      if analysis.get('acf_pacf') and analysis['acf_pacf'].get('suggested_arima_params'):
-        params = analysis['acf_pacf']['suggested_arima_params']
-
-        # Обучение ARIMA с предложенными параметрами
-        self.arima.fit(series, order=params)
-
-        # Прогноз
-        forecast = self.arima.predict(steps=count)
+      if model is not None:
+        forecast = model.predict(steps=count)
         raw_predictions = forecast['forecast']
 
         # Учет сезонности
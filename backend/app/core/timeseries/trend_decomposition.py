@@ -146,7 +146,7 @@ class TrendDecomposer:
     trend = data.rolling(window=window, center=True).mean()
 
     # Заполнение пропусков на краях
-    trend = trend.fillna(method='bfill').fillna(method='ffill')
+    trend = trend.bfill().ffill()
 
     return {
       'values': trend,
@@ -1,7 +1,9 @@
 import re
+import hashlib
 import pandas as pd
 import random
 from datetime import datetime, timedelta
+from math import comb
 import numpy as np
 
 
@@ -86,4 +88,69 @@ def generate_sample_draws(num_draws=100):
       "Числа_Поле2": format_numbers(field2),
       "Приз": prize
     })
-  return pd.DataFrame(data)
\ No newline at end of file
+  return pd.DataFrame(data)
+
+
+def get_data_version(df_history):
+  """
+  Возвращает идентификатор версии данных для истории тиражей.
+  Версия меняется при добавлении/удалении любого тиража, поэтому
+  ее можно использовать как часть ключа межзапросных кэшей.
+  """
+  if df_history is None or df_history.empty:
+    return 'empty'
+
+  if 'Тираж' in df_history.columns:
+    payload = np.ascontiguousarray(df_history['Тираж'].to_numpy(dtype=np.int64)).tobytes()
+  else:
+    payload = pd.util.hash_pandas_object(df_history.astype(str), index=False).to_numpy().tobytes()
+
+  return f"{len(df_history)}_{hashlib.md5(payload).hexdigest()[:12]}"
+
+
+def _field_rank(numbers):
+  """Колексикографический ранг сочетания натуральных чисел"""
+  rank = 0
+  for i, n in enumerate(sorted(int(x) for x in numbers)):
+    rank += comb(n - 1, i + 1)
+  return rank
+
+
+def _check_field(numbers, size, max_num, field):
+  """Ранг определен только для size различных чисел 1..max_num"""
+  values = {int(x) for x in numbers}
+  if len(numbers) != size or len(values) != size or min(values, default=1) < 1 or max(values, default=1) > max_num:
+    raise ValueError(f"Некорректные числа {field}: {list(numbers)} (нужно {size} различных чисел 1..{max_num})")
+
+
+def combination_rank(field1, field2, config):
+  """
+  Взаимно-однозначно кодирует комбинацию (field1, field2) целым числом
+  в диапазоне [0, C(field1_max, field1_size) * C(field2_max, field2_size)).
+
+  Raises:
+      ValueError: если в поле повторы, не то количество чисел или число вне диапазона
+  """
+  _check_field(field1, config['field1_size'], config['field1_max'], 'поля 1')
+  _check_field(field2, config['field2_size'], config['field2_max'], 'поля 2')
+  f2_total = comb(config['field2_max'], config['field2_size'])
+  return _field_rank(field1) * f2_total + _field_rank(field2)
+
+
+def _field_unrank(rank, size):
+  """Восстанавливает сочетание по колексикографическому рангу"""
+  numbers = []
+  for k in range(size, 0, -1):
+    n = k
+    while comb(n, k) <= rank:
+      n += 1
+    rank -= comb(n - 1, k)
+    numbers.append(n)
+  return sorted(numbers)
+
+
+def combination_unrank(rank, config):
+  """Обратное преобразование к combination_rank"""
+  f2_total = comb(config['field2_max'], config['field2_size'])
+  rank1, rank2 = divmod(int(rank), f2_total)
+  return _field_unrank(rank1, config['field1_size']), _field_unrank(rank2, config['field2_size'])
@@ -0,0 +1,207 @@
+"""
+Постоянное хранилище результатов walk-forward валидации
+
+Результаты пишутся в таблицу validation_results основной БД и ищутся по
+ключу (модель, хэш параметров, лотерея, версия данных, конфигурация окон):
+повторный запрос с тем же ключом отвечается из хранилища без пересчета,
+а история валидаций переживает перезапуск и общая для всех реплик.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.app.core.validation.walk_forward import ValidationResults, _json_default
+
+logger = logging.getLogger(__name__)
+
+# model_name строк со сравнением нескольких моделей
+COMPARISON_MODEL_NAME = 'comparison'
+
+
+def params_hash(model_params: Dict) -> str:
+    """Короткий хэш параметров модели"""
+    payload = json.dumps(model_params or {}, sort_keys=True, default=_json_default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def result_key(model_name: str, model_params: Dict, lottery_type: str,
+               data_version: str, window_config: Dict) -> str:
+    """Ключ результата валидации"""
+    payload = json.dumps(
+        [model_name, params_hash(model_params), lottery_type, data_version, window_config],
+        sort_keys=True, default=_json_default
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def comparison_key(model_keys: List[str]) -> str:
+    """Ключ сравнения - по ключам результатов входящих в него моделей"""
+    payload = json.dumps([COMPARISON_MODEL_NAME] + sorted(model_keys))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ValidationResultStore:
+    """
+    Результаты валидаций в таблице validation_results
+
+    Ошибки БД не прерывают валидацию: методы записи логируют их, методы
+    чтения возвращают None.
+    """
+
+    def __init__(self, session_factory: Optional[Callable] = None):
+        """
+        Args:
+            session_factory: Фабрика сессий SQLAlchemy (по умолчанию SessionLocal)
+        """
+        self._session_factory = session_factory
+
+    def _session(self):
+        if self._session_factory is None:
+            from backend.app.core.database import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict[str, Any]:
+        return {
+            'task_id': row.task_id,
+            'status': row.status,
+            'model_type': row.model_name,
+            'lottery_type': row.lottery_type,
+            'user_id': row.user_id,
+            'result_key': row.result_key,
+            'params_hash': row.params_hash,
+            'data_version': row.data_version,
+            'window_config': row.window_config,
+            'avg_accuracy': row.avg_accuracy,
+            'avg_f1': row.avg_f1,
+            'total_windows': row.total_windows,
+            'full_results': row.full_results,
+            'error': row.error_message,
+            'started_at': row.started_at.isoformat() if row.started_at else None,
+            'completed_at': row.completed_at.isoformat() if row.completed_at else None
+        }
+
+    def find(self, key: str) -> Optional[Dict[str, Any]]:
+        """Последний завершенный результат с этим ключом"""
+        from backend.app.core.database import ValidationResult
+
+        db = self._session()
+        try:
+            row = (db.query(ValidationResult)
+                   .filter(ValidationResult.result_key == key, ValidationResult.status == 'completed')
+                   .order_by(ValidationResult.completed_at.desc())
+                   .first())
+            return self._row_to_dict(row) if row else None
+        except Exception as e:
+            logger.warning(f"Хранилище валидаций недоступно: {e}")
+            return None
+        finally:
+            db.close()
+
+    def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Запись задачи по task_id"""
+        from backend.app.core.database import ValidationResult
+
+        db = self._session()
+        try:
+            row = db.query(ValidationResult).filter(ValidationResult.task_id == task_id).first()
+            return self._row_to_dict(row) if row else None
+        except Exception as e:
+            logger.warning(f"Хранилище валидаций недоступно: {e}")
+            return None
+        finally:
+            db.close()
+
+    def history(self, lottery_type: str, user_id: Optional[int] = None,
+                limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """Последние задачи лотереи (и пользователя), новые первыми"""
+        from backend.app.core.database import ValidationResult
+
+        db = self._session()
+        try:
+            query = db.query(ValidationResult).filter(ValidationResult.lottery_type == lottery_type)
+            if user_id is not None:
+                query = query.filter(ValidationResult.user_id == user_id)
+            rows = query.order_by(ValidationResult.started_at.desc()).limit(limit).all()
+            return [self._row_to_dict(row) for row in rows]
+        except Exception as e:
+            logger.warning(f"Хранилище валидаций недоступно: {e}")
+            return None
+        finally:
+            db.close()
+
+    def start(self, task_id: str, key: str, model_name: str, model_params: Dict,
+              lottery_type: str, data_version: str, window_config: Dict,
+              user_id: Optional[int] = None):
+        """Запись о запущенной задаче"""
+        from backend.app.core.database import ValidationResult
+
+        self._write(lambda db: db.add(ValidationResult(
+            task_id=task_id,
+            user_id=user_id,
+            lottery_type=lottery_type,
+            model_name=model_name,
+            result_key=key,
+            params_hash=params_hash(model_params),
+            data_version=data_version,
+            window_config=window_config,
+            started_at=datetime.utcnow(),
+            status='running'
+        )))
+
+    def complete(self, task_id: str, results: ValidationResults):
+        """Результаты завершенной валидации одной модели"""
+        self._finish(task_id, {
+            'avg_accuracy': float(results.average_metrics.get('accuracy', 0)),
+            'avg_f1': float(results.average_metrics.get('f1', 0)),
+            'avg_roc_auc': float(results.average_metrics['roc_auc']) if 'roc_auc' in results.average_metrics else None,
+            'total_windows': results.total_windows,
+            'full_results': results.to_dict()
+        })
+
+    def complete_comparison(self, task_id: str, comparison: Dict):
+        """Результаты сравнения моделей ({'comparison', 'winner', 'ranking'})"""
+        best = max((r for r in comparison['comparison'] if r.get('status') == 'success'),
+                   key=lambda r: r.get('avg_f1', 0), default=None)
+        self._finish(task_id, {
+            'avg_accuracy': best.get('avg_accuracy') if best else None,
+            'avg_f1': best.get('avg_f1') if best else None,
+            'total_windows': len(comparison['comparison']),
+            'full_results': json.loads(json.dumps(comparison, default=_json_default))
+        })
+
+    def fail(self, task_id: str, error: str):
+        """Ошибка задачи"""
+        self._finish(task_id, {'error_message': error}, status='error')
+
+    def _finish(self, task_id: str, values: Dict, status: str = 'completed'):
+        from backend.app.core.database import ValidationResult
+
+        def apply(db):
+            row = db.query(ValidationResult).filter(ValidationResult.task_id == task_id).first()
+            if row is None:
+                return
+            for name, value in values.items():
+                setattr(row, name, value)
+            row.status = status
+            row.completed_at = datetime.utcnow()
+
+        self._write(apply)
+
+    def _write(self, action: Callable):
+        db = self._session()
+        try:
+            action(db)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Результат валидации не сохранен: {e}")
+        finally:
+            db.close()
+
+
+GLOBAL_VALIDATION_STORE = ValidationResultStore()
@@ -8,18 +8,27 @@ import pandas as pd
 from typing import Dict, List, Tuple, Any, Optional, Callable
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
 import logging
+import multiprocessing
+import os
+import time
 from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score,
     roc_auc_score, mean_squared_error, mean_absolute_error
 )
 import json
 
-from backend.app.core import data_manager
-
 logger = logging.getLogger(__name__)
 
 
+def _json_default(value):
+    """numpy-скаляры и массивы в метриках"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
 @dataclass
 class ValidationWindow:
     """Окно для валидации"""
@@ -98,8 +107,8 @@ class ValidationResults:
             'total_time_seconds': self.total_time
         }
     
-    def to_json(self) -> str:
-        """Сериализация в JSON"""
+    def to_dict(self) -> Dict:
+        """Словарь результатов (numpy-скаляры приводятся к Python типам)"""
         data = {
             'model_name': self.model_name,
             'lottery_type': self.lottery_type,
@@ -115,7 +124,213 @@ class ValidationResults:
             'parameters': self.parameters,
             'summary': self.get_summary()
         }
-        return json.dumps(data, indent=2)
+        return json.loads(json.dumps(data, default=_json_default))
+    
+    def to_json(self) -> str:
+        """Сериализация в JSON"""
+        return json.dumps(self.to_dict(), indent=2)
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'ValidationResults':
+        """Восстановление из to_dict (ключи распределений совпадений снова int)"""
+        def int_keys(distribution: Dict) -> Dict[int, int]:
+            return {int(k): v for k, v in distribution.items()}
+        
+        average_metrics = dict(data['average_metrics'])
+        if 'avg_matches_distribution' in average_metrics:
+            average_metrics['avg_matches_distribution'] = int_keys(average_metrics['avg_matches_distribution'])
+        
+        return cls(
+            model_name=data['model_name'],
+            lottery_type=data['lottery_type'],
+            total_windows=data['total_windows'],
+            window_metrics=[
+                ValidationMetrics(**{**m, 'matches_distribution': int_keys(m['matches_distribution'])})
+                for m in data['window_metrics']
+            ],
+            average_metrics=average_metrics,
+            std_metrics=data['std_metrics'],
+            best_window=data['best_window'],
+            worst_window=data['worst_window'],
+            training_times=data['training_times'],
+            prediction_times=data['prediction_times'],
+            total_time=data['total_time'],
+            parameters=data['parameters']
+        )
+
+
+def chronological_history(df_history: pd.DataFrame) -> Tuple[pd.DataFrame, bool]:
+    """
+    История от старых тиражей к новым и признак того, что исходная шла
+    от новых к старым (так ее возвращает fetch_draws_from_db)
+    """
+    if 'Тираж' in df_history.columns and len(df_history) > 1:
+        draws = df_history['Тираж'].to_numpy()
+        if draws[0] > draws[-1]:
+            return df_history.iloc[::-1].reset_index(drop=True), True
+    return df_history.reset_index(drop=True), False
+
+
+def supports_feature_matrix(model_class: Any) -> bool:
+    """Модель умеет обучаться и предсказывать по общей матрице признаков"""
+    return all(hasattr(model_class, name)
+               for name in ('walk_forward_features', 'fit_features', 'predict_features'))
+
+
+def window_metrics(window_id: int, predicted: List[Tuple[List[int], List[int]]],
+                   actual_f1: List[List[int]], actual_f2: List[List[int]],
+                   lottery_config: Dict, custom_metrics: Optional[Dict] = None) -> ValidationMetrics:
+    """Метрики окна по парам (предсказание, фактический тираж)"""
+    matches_distribution = {i: 0 for i in range(9)}
+    f1_max, f2_max = lottery_config['field1_max'], lottery_config['field2_max']
+    pred_matrix = np.zeros((len(predicted), f1_max + f2_max), dtype=np.int8)
+    actual_matrix = np.zeros_like(pred_matrix)
+    
+    for row, ((pred_f1, pred_f2), real_f1, real_f2) in enumerate(zip(predicted, actual_f1, actual_f2)):
+        total_matches = len(set(pred_f1) & set(real_f1)) + len(set(pred_f2) & set(real_f2))
+        matches_distribution[total_matches] = matches_distribution.get(total_matches, 0) + 1
+        
+        # Бинарная метрика для каждого числа
+        pred_matrix[row, [n - 1 for n in pred_f1 if 1 <= n <= f1_max]] = 1
+        pred_matrix[row, [f1_max + n - 1 for n in pred_f2 if 1 <= n <= f2_max]] = 1
+        actual_matrix[row, [n - 1 for n in real_f1 if 1 <= n <= f1_max]] = 1
+        actual_matrix[row, [f1_max + n - 1 for n in real_f2 if 1 <= n <= f2_max]] = 1
+    
+    if not len(predicted):
+        # Возвращаем нулевые метрики если нет предсказаний
+        return ValidationMetrics(
+            window_id=window_id,
+            accuracy=0, precision=0, recall=0, f1=0, roc_auc=None,
+            mse=1.0, mae=1.0,
+            matches_distribution=matches_distribution,
+            custom_metrics=custom_metrics or {}
+        )
+    
+    predictions = pred_matrix.ravel()
+    actuals = actual_matrix.ravel()
+    return ValidationMetrics(
+        window_id=window_id,
+        accuracy=accuracy_score(actuals, predictions),
+        precision=precision_score(actuals, predictions, average='micro', zero_division=0),
+        recall=recall_score(actuals, predictions, average='micro', zero_division=0),
+        f1=f1_score(actuals, predictions, average='micro', zero_division=0),
+        roc_auc=None,
+        mse=mean_squared_error(actuals, predictions),
+        mae=mean_absolute_error(actuals, predictions),
+        matches_distribution=matches_distribution,
+        custom_metrics=custom_metrics or {}
+    )
+
+
+def run_window_chunk(payload: Dict, windows: List[ValidationWindow],
+                     custom_evaluator: Optional[Callable] = None,
+                     df_chrono: Optional[pd.DataFrame] = None) -> List[Dict]:
+    """
+    Обучение и оценка группы окон по порядку
+    
+    Модели с матрицей признаков получают срезы строк общей матрицы (без
+    копий DataFrame); при warm start модель окна дообучается из модели
+    предыдущего окна группы.
+    """
+    model_class = payload['model_class']
+    config = payload['lottery_config']
+    features = payload['features']
+    draws_f1, draws_f2 = payload['draws_f1'], payload['draws_f2']
+    df_chrono = df_chrono if df_chrono is not None else payload['df_chrono']
+    
+    outcomes = []
+    previous = None
+    for window in windows:
+        logger.info(f"📍 Окно {window.window_id}: "
+                   f"train[{window.train_start}:{window.train_end}], "
+                   f"test[{window.test_start}:{window.test_end}]")
+        
+        model = model_class(config, **payload['model_params'])
+        train_start = time.time()
+        try:
+            if features is not None:
+                positions = features['positions']
+                lo = np.searchsorted(positions, window.train_start + features['lookback'])
+                hi = np.searchsorted(positions, window.train_end, side='right')
+                success = model.fit_features(features['X'][lo:hi], features['Y'][lo:hi],
+                                             warm_start=previous if payload['warm_start'] else None)
+            else:
+                train_data = df_chrono.iloc[window.train_start:window.train_end + 1]
+                # Модели получают срез в порядке исходной истории
+                success = model.train(train_data.iloc[::-1] if payload['source_descending'] else train_data)
+                success = success is not False and getattr(model, 'is_trained', True)
+            if not success:
+                logger.warning(f"Не удалось обучить модель для окна {window.window_id}")
+                continue
+        except Exception as e:
+            logger.error(f"Ошибка обучения для окна {window.window_id}: {e}")
+            continue
+        training_time = time.time() - train_start
+        
+        pred_start = time.time()
+        predicted, targets = [], []
+        if features is not None:
+            lo = np.searchsorted(positions, max(window.test_start, 1))
+            hi = np.searchsorted(positions, window.test_end, side='right')
+            try:
+                predicted = model.predict_features(features['X'][lo:hi])
+                targets = positions[lo:hi].tolist()
+            except Exception as e:
+                logger.warning(f"Ошибка предсказания: {e}")
+        else:
+            history = train_data.iloc[::-1] if payload['source_descending'] else train_data
+            for pos in range(max(window.test_start, 1), window.test_end + 1):
+                try:
+                    if hasattr(model, 'predict_next_combination'):
+                        pred = model.predict_next_combination(draws_f1[pos - 1], draws_f2[pos - 1], history)
+                    else:
+                        # Fallback для моделей без этого метода
+                        pred = (list(range(1, config['field1_size'] + 1)),
+                                list(range(1, config['field2_size'] + 1)))
+                    predicted.append(pred)
+                    targets.append(pos)
+                except Exception as e:
+                    logger.warning(f"Ошибка предсказания: {e}")
+        
+        # Пропуски (None) - неудачные предсказания отдельных тиражей
+        pairs = [(p, t) for p, t in zip(predicted, targets) if p[0] is not None and p[1] is not None]
+        
+        custom_metrics = {}
+        if custom_evaluator and df_chrono is not None:
+            try:
+                custom_metrics = custom_evaluator(
+                    model,
+                    df_chrono.iloc[window.train_start:window.train_end + 1],
+                    df_chrono.iloc[window.test_start:window.test_end + 1]
+                )
+            except Exception as e:
+                logger.warning(f"Ошибка кастомного evaluator: {e}")
+        
+        metrics = window_metrics(
+            window.window_id, [p for p, _ in pairs],
+            [draws_f1[t] for _, t in pairs], [draws_f2[t] for _, t in pairs],
+            config, custom_metrics
+        )
+        prediction_time = time.time() - pred_start
+        
+        logger.info(f"✅ Окно {window.window_id}: "
+                   f"accuracy={metrics.accuracy:.3f}, "
+                   f"f1={metrics.f1:.3f}")
+        outcomes.append({'metrics': metrics, 'training_time': training_time,
+                         'prediction_time': prediction_time})
+        previous = model
+    
+    return outcomes
+
+
+def _window_chunk_worker(payload: Dict, windows: List[ValidationWindow], threads: int) -> List[Dict]:
+    """Группа окон в процессе пула с ограничением потоков BLAS/моделей"""
+    from threadpoolctl import threadpool_limits
+    
+    # Бюджет потоков XGBoostLotteryModel в этом процессе
+    os.environ['XGBOOST_THREADS'] = str(threads)
+    with threadpool_limits(limits=threads):
+        return run_window_chunk(payload, windows)
 
 
 class WalkForwardValidator:
@@ -128,18 +343,21 @@ class WalkForwardValidator:
                  initial_train_size: int = 500,
                  test_size: int = 50,
                  step_size: int = 50,
-                 expanding_window: bool = True):
+                 expanding_window: bool = True,
+                 max_workers: Optional[int] = None):
         """
         Args:
             initial_train_size: Начальный размер обучающего окна
             test_size: Размер тестового окна
             step_size: Шаг сдвига окна
             expanding_window: True = расширяющееся окно, False = скользящее
+            max_workers: Процессов для окон (по умолчанию WALK_FORWARD_JOBS или число ядер)
         """
         self.initial_train_size = initial_train_size
         self.test_size = test_size
         self.step_size = step_size
         self.expanding_window = expanding_window
+        self.max_workers = max(1, max_workers or int(os.getenv('WALK_FORWARD_JOBS', '0')) or os.cpu_count() or 1)
         
         logger.info(f"✅ Walk-forward валидатор инициализирован: "
                    f"train={initial_train_size}, test={test_size}, "
@@ -193,21 +411,30 @@ class WalkForwardValidator:
                        model_params: Dict,
                        df_history: pd.DataFrame,
                        lottery_config: Dict,
-                       custom_evaluator: Optional[Callable] = None) -> ValidationResults:
+                       custom_evaluator: Optional[Callable] = None,
+                       parallel: bool = True,
+                       warm_start: bool = True) -> ValidationResults:
         """
         Полная walk-forward валидация модели
         
+        Окна строятся по хронологии: обучение всегда на тиражах раньше
+        тестовых. Модели с walk_forward_features/fit_features/predict_features
+        получают общую матрицу признаков, посчитанную один раз, и срезы
+        строк окна; остальные обучаются на срезе истории через train().
+        
         Args:
-            model_class: Класс модели (XGBoostLotteryModel, LotteryRFOps и т.д.)
+            model_class: Класс модели (XGBoostLotteryModel, RFModel и т.д.)
             model_params: Параметры для инициализации модели
             df_history: История тиражей
             lottery_config: Конфигурация лотереи
             custom_evaluator: Кастомная функция оценки (опционально)
+            parallel: Обрабатывать окна в пуле процессов
+            warm_start: Дообучать модель предыдущего окна (для моделей,
+                        поддерживающих инкрементальное обучение)
             
         Returns:
             Результаты валидации
         """
-        import time
         start_time = time.time()
         
         if df_history.empty or len(df_history) < self.initial_train_size + self.test_size:
@@ -222,50 +449,41 @@ class WalkForwardValidator:
         
         logger.info(f"🚀 Начало walk-forward валидации модели {model_class.__name__}")
         
-        window_metrics = []
-        training_times = []
-        prediction_times = []
+        df_chrono, source_descending = chronological_history(df_history)
+        payload = {
+            'model_class': model_class,
+            'model_params': model_params,
+            'lottery_config': lottery_config,
+            'draws_f1': [list(x) for x in df_chrono['Числа_Поле1_list']],
+            'draws_f2': [list(x) for x in df_chrono['Числа_Поле2_list']],
+            'warm_start': warm_start and self.expanding_window,
+            'features': None,
+            'df_chrono': None,
+            'source_descending': source_descending
+        }
         
-        for window in windows:
-            logger.info(f"📍 Окно {window.window_id}: "
-                       f"train[{window.train_start}:{window.train_end}], "
-                       f"test[{window.test_start}:{window.test_end}]")
-            
-            # Разделяем данные
-            train_data = df_history.iloc[window.train_start:window.train_end + 1].copy()
-            test_data = df_history.iloc[window.test_start:window.test_end + 1].copy()
-
-            # Создаем новый экземпляр модели для каждого окна
-            model = model_class(lottery_config, **model_params)
-            
-            # Обучаем модель
-            train_start = time.time()
-            try:
-                success = model.train(train_data)
-                if not success:
-                    logger.warning(f"Не удалось обучить модель для окна {window.window_id}")
-                    continue
-            except Exception as e:
-                logger.error(f"Ошибка обучения для окна {window.window_id}: {e}")
-                continue
-            
-            training_time = time.time() - train_start
-            training_times.append(training_time)
-            
-            # Оцениваем модель
-            pred_start = time.time()
-            metrics = self._evaluate_window(
-                model, train_data, test_data, 
-                window, lottery_config, custom_evaluator
-            )
-            prediction_time = time.time() - pred_start
-            prediction_times.append(prediction_time)
-            
-            window_metrics.append(metrics)
-            
-            logger.info(f"✅ Окно {window.window_id}: "
-                       f"accuracy={metrics.accuracy:.3f}, "
-                       f"f1={metrics.f1:.3f}")
+        if supports_feature_matrix(model_class):
+            feature_start = time.time()
+            payload['features'] = model_class(lottery_config, **model_params).walk_forward_features(df_chrono)
+            logger.info(f"📐 Матрица признаков {payload['features']['X'].shape} "
+                       f"за {time.time() - feature_start:.2f}с")
+        else:
+            payload['df_chrono'] = df_chrono
+        
+        # Кастомный evaluator может быть непереносим в другой процесс
+        chunks = self._split_windows(windows, parallel and custom_evaluator is None)
+        if len(chunks) > 1:
+            outcomes = self._run_parallel(payload, chunks)
+        else:
+            outcomes = run_window_chunk(payload, windows, custom_evaluator, df_chrono)
+        
+        outcomes.sort(key=lambda o: o['metrics'].window_id)
+        window_metrics = [o['metrics'] for o in outcomes]
+        training_times = [o['training_time'] for o in outcomes]
+        prediction_times = [o['prediction_time'] for o in outcomes]
+        
+        if not window_metrics:
+            raise ValueError("Ни одно окно не удалось обучить")
         
         # Вычисляем агрегированные метрики
         avg_metrics, std_metrics = self._calculate_aggregate_metrics(window_metrics)
@@ -304,119 +522,28 @@ class WalkForwardValidator:
         
         return results
     
-    def _evaluate_window(self,
-                        model: Any,
-                        train_data: pd.DataFrame,
-                        test_data: pd.DataFrame,
-                        window: ValidationWindow,
-                        lottery_config: Dict,
-                        custom_evaluator: Optional[Callable]) -> ValidationMetrics:
+    def _split_windows(self, windows: List[ValidationWindow], parallel: bool) -> List[List[ValidationWindow]]:
         """
-        Оценка модели на одном окне
+        Непрерывные группы окон по процессам: внутри группы окна идут
+        по порядку, и warm start продолжает модель предыдущего окна
         """
-        predictions = []
-        actuals = []
-        matches_distribution = {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0, 7: 0, 8: 0}
-
-        df_history = data_manager.fetch_draws_from_db()
-
-        # Для каждого тиража в тесте
-        for idx, test_row in test_data.iterrows():
-            # Получаем предыдущий тираж для контекста
-            if idx > 0:
-                prev_idx = idx - 1
-                prev_row = df_history.iloc[prev_idx] if prev_idx >= 0 else train_data.iloc[-1]
-                
-                prev_f1 = prev_row.get('Числа_Поле1_list', [])
-                prev_f2 = prev_row.get('Числа_Поле2_list', [])
-                
-                # Предсказываем
+        workers = min(self.max_workers, len(windows)) if parallel else 1
+        if workers <= 1:
+            return [windows]
+        return [list(chunk) for chunk in np.array_split(np.array(windows, dtype=object), workers) if len(chunk)]
+    
+    def _run_parallel(self, payload: Dict, chunks: List[List[ValidationWindow]]) -> List[Dict]:
+        threads = max(1, (os.cpu_count() or 1) // len(chunks))
+        outcomes = []
+        with ProcessPoolExecutor(max_workers=len(chunks),
+                                 mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(_window_chunk_worker, payload, chunk, threads) for chunk in chunks]
+            for future in futures:
                 try:
-                    if hasattr(model, 'predict_next_combination'):
-                        pred_f1, pred_f2 = model.predict_next_combination(
-                            prev_f1, prev_f2, train_data
-                        )
-                    else:
-                        # Fallback для моделей без этого метода
-                        pred_f1 = list(range(1, lottery_config['field1_size'] + 1))
-                        pred_f2 = list(range(1, lottery_config['field2_size'] + 1))
-                    
-                    # Сравниваем с актуальными
-                    actual_f1 = test_row.get('Числа_Поле1_list', [])
-                    actual_f2 = test_row.get('Числа_Поле2_list', [])
-                    
-                    # Считаем совпадения
-                    matches_f1 = len(set(pred_f1) & set(actual_f1))
-                    matches_f2 = len(set(pred_f2) & set(actual_f2))
-                    total_matches = matches_f1 + matches_f2
-                    
-                    matches_distribution[total_matches] = matches_distribution.get(total_matches, 0) + 1
-                    
-                    # Бинарная метрика для каждого числа
-                    for num in range(1, lottery_config['field1_max'] + 1):
-                        predictions.append(1 if num in pred_f1 else 0)
-                        actuals.append(1 if num in actual_f1 else 0)
-                    
-                    for num in range(1, lottery_config['field2_max'] + 1):
-                        predictions.append(1 if num in pred_f2 else 0)
-                        actuals.append(1 if num in actual_f2 else 0)
-                        
+                    outcomes.extend(future.result())
                 except Exception as e:
-                    logger.warning(f"Ошибка предсказания: {e}")
-                    continue
-        
-        if not predictions or not actuals:
-            # Возвращаем нулевые метрики если нет предсказаний
-            return ValidationMetrics(
-                window_id=window.window_id,
-                accuracy=0, precision=0, recall=0, f1=0, roc_auc=None,
-                mse=1.0, mae=1.0,
-                matches_distribution=matches_distribution,
-                custom_metrics={}
-            )
-        
-        # Вычисляем метрики
-        predictions = np.array(predictions)
-        actuals = np.array(actuals)
-        
-        accuracy = accuracy_score(actuals, predictions)
-        precision = precision_score(actuals, predictions, average='micro', zero_division=0)
-        recall = recall_score(actuals, predictions, average='micro', zero_division=0)
-        f1 = f1_score(actuals, predictions, average='micro', zero_division=0)
-        
-        # ROC-AUC если есть вероятности
-        roc_auc = None
-        if hasattr(model, 'score_combination'):
-            # Можем попробовать получить вероятности
-            try:
-                # Упрощенный подход - используем score как вероятность
-                roc_auc = 0.5  # Placeholder, так как нужны вероятности для каждого предсказания
-            except:
-                pass
-        
-        mse = mean_squared_error(actuals, predictions)
-        mae = mean_absolute_error(actuals, predictions)
-        
-        # Кастомные метрики
-        custom_metrics = {}
-        if custom_evaluator:
-            try:
-                custom_metrics = custom_evaluator(model, train_data, test_data)
-            except Exception as e:
-                logger.warning(f"Ошибка кастомного evaluator: {e}")
-        
-        return ValidationMetrics(
-            window_id=window.window_id,
-            accuracy=accuracy,
-            precision=precision,
-            recall=recall,
-            f1=f1,
-            roc_auc=roc_auc,
-            mse=mse,
-            mae=mae,
-            matches_distribution=matches_distribution,
-            custom_metrics=custom_metrics
-        )
+                    logger.error(f"❌ Ошибка группы окон валидации: {e}")
+        return outcomes
     
     def _calculate_aggregate_metrics(self, 
                                     window_metrics: List[ValidationMetrics]) -> Tuple[Dict, Dict]:
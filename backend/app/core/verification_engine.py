@@ -0,0 +1,351 @@
+# core/verification_engine.py
+"""
+Массовая проверка билетов по истории тиражей.
+
+История индексируется инвертированно: для каждого числа поля хранится
+битсет тиражей (бит d - число выпало в тираже d). Количество совпадений
+билета со всеми тиражами сразу собирается побитовым сумматором из битсетов
+его чисел, выигрышные тиражи выделяются масками "ровно k совпадений"
+и таблицей (совпадения П1, совпадения П2) -> категория. Распаковываются
+только чанки билетов с выигрышами.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.app.core.prize_probability import category_index_matrix
+from backend.app.core.utils import format_numbers, get_data_version
+
+logger = logging.getLogger(__name__)
+
+TICKET_CHUNK_SIZE = 4096
+
+
+@dataclass
+class DrawBitsetIndex:
+  """Инвертированный индекс число -> битсет тиражей для одной истории"""
+  lottery_type: str
+  data_version: str
+  num_draws: int
+  field1_bits: np.ndarray      # (field1_max + 1, W) uint64
+  field2_bits: np.ndarray      # (field2_max + 1, W) uint64
+  valid_bits: np.ndarray       # (W,) uint64 - тиражи с корректными номерами
+  category_index: np.ndarray   # (field1_size + 1, field2_size + 1), -1 - без выигрыша
+  category_names: List[str]
+  draw_numbers: np.ndarray
+  draw_dates: List[str]
+  draw_numbers_text: List[str]
+
+  @property
+  def num_words(self) -> int:
+    return self.valid_bits.shape[0]
+
+
+def _pack_draw_bits(rows: np.ndarray, draws: np.ndarray, num_rows: int, num_words: int) -> np.ndarray:
+  """Упаковка пар (строка, тираж) в битсеты (num_rows, num_words) uint64"""
+  dense = np.zeros((num_rows, num_words * 64), dtype=bool)
+  dense[rows, draws] = True
+  return np.packbits(dense, axis=1, bitorder='little').view('<u8')
+
+
+def build_draw_index(df_history: pd.DataFrame, config: Dict, lottery_type: str = '') -> DrawBitsetIndex:
+  """
+  Построение битсетов тиражей по истории.
+
+  Тиражи с некорректными номерами (не список или неверная длина) остаются
+  в нумерации, но исключаются маской valid_bits - как и в построчной проверке.
+  """
+  f1_size, f2_size = config['field1_size'], config['field2_size']
+  num_draws = len(df_history)
+  num_words = max(1, (num_draws + 63) // 64)
+
+  f1_lists = df_history['Числа_Поле1_list'].tolist() if num_draws else []
+  f2_lists = df_history['Числа_Поле2_list'].tolist() if num_draws else []
+
+  valid = np.array([
+    isinstance(a, list) and len(a) == f1_size and isinstance(b, list) and len(b) == f2_size
+    for a, b in zip(f1_lists, f2_lists)
+  ], dtype=bool)
+  valid_pos = np.flatnonzero(valid)
+
+  def field_bits(lists, size, max_num):
+    nums = np.array([lists[i] for i in valid_pos], dtype=np.int64).reshape(len(valid_pos), size)
+    draws = np.repeat(valid_pos, size)
+    return _pack_draw_bits(nums.ravel(), draws, max_num + 1, num_words)
+
+  valid_bits = _pack_draw_bits(np.zeros(len(valid_pos), dtype=np.int64), valid_pos, 1, num_words)[0]
+
+  if 'Дата' in df_history.columns:
+    dates = pd.to_datetime(df_history['Дата'], errors='coerce')
+    draw_dates = [d.strftime('%Y-%m-%d') if pd.notnull(d) else 'N/A' for d in dates]
+  else:
+    draw_dates = ['N/A'] * num_draws
+  draw_numbers = (df_history['Тираж'].to_numpy() if 'Тираж' in df_history.columns
+                  else np.full(num_draws, None, dtype=object))
+
+  draw_numbers_text = [
+    f"Поле1: {format_numbers(a)}; Поле2: {format_numbers(b)}" if ok else ''
+    for a, b, ok in zip(f1_lists, f2_lists, valid)
+  ]
+
+  return DrawBitsetIndex(
+    lottery_type=lottery_type,
+    data_version=get_data_version(df_history),
+    num_draws=num_draws,
+    field1_bits=field_bits(f1_lists, f1_size, config['field1_max']),
+    field2_bits=field_bits(f2_lists, f2_size, config['field2_max']),
+    valid_bits=valid_bits,
+    category_index=category_index_matrix(config),
+    category_names=[c.get('name') for c in config.get('prize_categories', [])],
+    draw_numbers=draw_numbers,
+    draw_dates=draw_dates,
+    draw_numbers_text=draw_numbers_text
+  )
+
+
+def parse_ticket_column(values: pd.Series, size: int, max_num: int) -> Tuple[np.ndarray, np.ndarray]:
+  """
+  Векторный разбор колонки строк с числами по правилам utils.parse_numbers.
+
+  Разделители - запятые, точки с запятой и пробелы; повторы схлопываются;
+  число вне 1..max_num или нечисловой токен делает строку невалидной.
+
+  Returns:
+      (numbers (T, size) int64 отсортированные, valid (T,) bool)
+  """
+  num_rows = len(values)
+  numbers = np.zeros((num_rows, size), dtype=np.int64)
+  if num_rows == 0:
+    return numbers, np.zeros(0, dtype=bool)
+
+  text = values.astype(str).str.replace(r'[,;\s]+', ' ', regex=True).str.strip()
+  tokens = text.str.split(' ', expand=True)
+  present = tokens.notna() & tokens.ne('')
+
+  parsed = tokens.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+  present = present.to_numpy()
+
+  is_int = np.isfinite(parsed) & (parsed == np.floor(parsed)) & tokens.apply(
+    lambda col: col.str.fullmatch(r'[+-]?\d+', na=False)).to_numpy()
+  in_range = is_int & (parsed >= 1) & (parsed <= max_num)
+  valid = ~np.any(present & ~in_range, axis=1)
+
+  # Уникальные числа: сортировка с "дырами" в конце и отброс повторов
+  cleaned = np.where(present & in_range, parsed, np.inf)
+  cleaned.sort(axis=1)
+  duplicate = np.zeros_like(cleaned, dtype=bool)
+  duplicate[:, 1:] = cleaned[:, 1:] == cleaned[:, :-1]
+  cleaned[duplicate] = np.inf
+  cleaned.sort(axis=1)
+
+  unique_count = np.isfinite(cleaned).sum(axis=1)
+  valid &= unique_count == size
+
+  width = min(size, cleaned.shape[1])
+  numbers[valid, :width] = cleaned[valid, :width].astype(np.int64)
+  return numbers, valid
+
+
+def _bit_slice_counts(bits: np.ndarray, tickets: np.ndarray) -> List[np.ndarray]:
+  """
+  Побитовое сложение битсетов чисел билета.
+
+  Returns:
+      Разряды счётчика совпадений: список (T, W) uint64, разряд b - бит 2^b
+  """
+  size = tickets.shape[1]
+  counters = [np.zeros((tickets.shape[0], bits.shape[1]), dtype=np.uint64)
+              for _ in range(max(1, int(size).bit_length()))]
+  for col in range(size):
+    carry = bits[tickets[:, col]]
+    for counter in counters:
+      next_carry = counter & carry
+      counter ^= carry
+      carry = next_carry
+  return counters
+
+
+def _equals_masks(counters: List[np.ndarray], size: int) -> List[np.ndarray]:
+  """Маски "ровно k совпадений" для k = 0..size"""
+  masks = []
+  for value in range(size + 1):
+    mask = None
+    for bit, counter in enumerate(counters):
+      term = counter if (value >> bit) & 1 else ~counter
+      mask = term.copy() if mask is None else (mask & term)
+    masks.append(mask)
+  return masks
+
+
+def _unpack_counts(counters: List[np.ndarray], num_draws: int) -> np.ndarray:
+  """Распаковка разрядов счётчика в плотную матрицу совпадений (T, num_draws) uint8"""
+  counts = None
+  for bit, counter in enumerate(counters):
+    plane = np.unpackbits(counter.view(np.uint8), axis=1, bitorder='little')[:, :num_draws]
+    if counts is None:
+      counts = plane
+    else:
+      counts |= plane << bit
+  return counts
+
+
+def match_winning_draws(index: DrawBitsetIndex, tickets_f1: np.ndarray, tickets_f2: np.ndarray,
+                        chunk_size: int = TICKET_CHUNK_SIZE) -> Dict[str, np.ndarray]:
+  """
+  Все выигрыши набора билетов по индексу.
+
+  Args:
+      index: Индекс истории
+      tickets_f1: (T, field1_size) номера поля 1
+      tickets_f2: (T, field2_size) номера поля 2
+
+  Returns:
+      Массивы одинаковой длины: ticket, draw (позиция в истории), m1, m2, category;
+      отсортированы по билету, затем по порядку тиражей в истории
+  """
+  tickets_f1 = np.asarray(tickets_f1, dtype=np.int64)
+  tickets_f2 = np.asarray(tickets_f2, dtype=np.int64)
+  f1_size, f2_size = tickets_f1.shape[1], tickets_f2.shape[1]
+  category_index = index.category_index
+
+  # Для каждого числа совпадений П1 - допустимые числа совпадений П2
+  winning_f2 = {m1: [m2 for m2 in range(f2_size + 1) if category_index[m1, m2] >= 0]
+                for m1 in range(f1_size + 1)}
+
+  parts = {key: [] for key in ('ticket', 'draw', 'm1', 'm2')}
+  for start in range(0, len(tickets_f1), chunk_size):
+    c1 = _bit_slice_counts(index.field1_bits, tickets_f1[start:start + chunk_size])
+    c2 = _bit_slice_counts(index.field2_bits, tickets_f2[start:start + chunk_size])
+    eq1 = _equals_masks(c1, f1_size)
+    eq2 = _equals_masks(c2, f2_size)
+
+    win = np.zeros_like(c1[0])
+    for m1, m2_list in winning_f2.items():
+      if not m2_list:
+        continue
+      f2_mask = eq2[m2_list[0]].copy()
+      for m2 in m2_list[1:]:
+        f2_mask |= eq2[m2]
+      win |= eq1[m1] & f2_mask
+    win &= index.valid_bits
+
+    if not win.any():
+      continue
+
+    # Плотная распаковка только для чанков с выигрышами
+    win_dense = np.unpackbits(win.view(np.uint8), axis=1, bitorder='little')[:, :index.num_draws]
+    ticket_pos, draw_pos = np.nonzero(win_dense)
+
+    parts['ticket'].append((ticket_pos + start).astype(np.int32))
+    parts['draw'].append(draw_pos.astype(np.int32))
+    parts['m1'].append(_unpack_counts(c1, index.num_draws)[ticket_pos, draw_pos])
+    parts['m2'].append(_unpack_counts(c2, index.num_draws)[ticket_pos, draw_pos])
+
+  dtypes = {'ticket': np.int32, 'draw': np.int32, 'm1': np.uint8, 'm2': np.uint8}
+  result = {key: (np.concatenate(values) if values else np.zeros(0, dtype=dtypes[key]))
+            for key, values in parts.items()}
+  result['category'] = category_index[result['m1'], result['m2']]
+  return result
+
+
+class TicketVerificationEngine:
+  """Кэш индексов истории и массовая проверка билетов"""
+
+  def __init__(self, cache_size: int = 4):
+    self.cache_size = cache_size
+    self._indexes: 'OrderedDict[Tuple[str, str], DrawBitsetIndex]' = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get_index(self, df_history: pd.DataFrame, lottery_type: Optional[str] = None) -> DrawBitsetIndex:
+    """Индекс истории текущей лотереи; перестраивается при смене версии данных"""
+    from backend.app.core import data_manager
+
+    lottery_type = lottery_type or data_manager.CURRENT_LOTTERY
+    key = (lottery_type, get_data_version(df_history))
+
+    with self._lock:
+      index = self._indexes.get(key)
+      if index is not None:
+        self._indexes.move_to_end(key)
+        return index
+
+    index = build_draw_index(df_history, data_manager.LOTTERY_CONFIGS[lottery_type], lottery_type)
+    logger.info(f"🗂️ Индекс проверки {lottery_type}: {index.num_draws} тиражей, версия {index.data_version}")
+
+    with self._lock:
+      self._indexes[key] = index
+      while len(self._indexes) > self.cache_size:
+        self._indexes.popitem(last=False)
+    return index
+
+  def format_wins(self, index: DrawBitsetIndex, matches: Dict[str, np.ndarray],
+                  num_tickets: int) -> List[List[Dict]]:
+    """Выигрыши в формате ticket_verifier, сгруппированные по билетам"""
+    per_ticket: List[List[Dict]] = [[] for _ in range(num_tickets)]
+    draw_numbers = index.draw_numbers.tolist()
+
+    for t, d, m1, m2, cat in zip(matches['ticket'].tolist(), matches['draw'].tolist(),
+                                 matches['m1'].tolist(), matches['m2'].tolist(),
+                                 matches['category'].tolist()):
+      per_ticket[t].append({
+        "Тираж": draw_numbers[d],
+        "Дата тиража": index.draw_dates[d],
+        "Выигрышные номера": index.draw_numbers_text[d],
+        "Совпадения": f"{m1} (П1) + {m2} (П2)",
+        "Категория": index.category_names[cat]
+      })
+    return per_ticket
+
+  def verify_numbers(self, tickets_f1: np.ndarray, tickets_f2: np.ndarray,
+                     df_history: pd.DataFrame, lottery_type: Optional[str] = None) -> List[List[Dict]]:
+    """Проверка уже разобранных билетов; возвращает выигрыши по каждому билету"""
+    index = self.get_index(df_history, lottery_type)
+    matches = match_winning_draws(index, tickets_f1, tickets_f2)
+    return self.format_wins(index, matches, len(tickets_f1))
+
+  def verify_frame(self, tickets_df: pd.DataFrame, df_history: pd.DataFrame,
+                   lottery_type: Optional[str] = None) -> List[Dict]:
+    """
+    Проверка DataFrame с колонками 'Поле1' и 'Поле2'.
+
+    Returns:
+        Для каждого билета: {'ticket': идентификатор, 'valid': bool, 'wins': [...]}
+    """
+    from backend.app.core import data_manager
+
+    lottery_type = lottery_type or data_manager.CURRENT_LOTTERY
+    config = data_manager.LOTTERY_CONFIGS[lottery_type]
+
+    f1_raw = tickets_df['Поле1'].astype(str)
+    f2_raw = tickets_df['Поле2'].astype(str)
+    f1, valid1 = parse_ticket_column(f1_raw, config['field1_size'], config['field1_max'])
+    f2, valid2 = parse_ticket_column(f2_raw, config['field2_size'], config['field2_max'])
+    valid = valid1 & valid2
+
+    valid_pos = np.flatnonzero(valid)
+    wins = self.verify_numbers(f1[valid_pos], f2[valid_pos], df_history, lottery_type)
+
+    results = []
+    wins_iter = iter(wins)
+    for idx, s1, s2, ok in zip(tickets_df.index, f1_raw.tolist(), f2_raw.tolist(), valid.tolist()):
+      results.append({
+        'ticket': f"Билет {idx + 1} ({s1} | {s2})",
+        'valid': ok,
+        'wins': next(wins_iter) if ok else []
+      })
+    return results
+
+  def clear(self):
+    """Сброс кэша индексов"""
+    with self._lock:
+      self._indexes.clear()
+
+
+# Глобальный экземпляр движка проверки билетов
+GLOBAL_VERIFICATION_ENGINE = TicketVerificationEngine()
@@ -0,0 +1,420 @@
+# core/win_notifications.py
+"""
+Push-уведомления о выигрыше сохранённых билетов при поступлении новых тиражей.
+
+Сохранённые билеты пользователей (полные комбинации из избранных чисел)
+хранятся в индексе подписок: билет идентифицируется рангом комбинации
+(utils.combination_rank), одинаковые комбинации разных пользователей
+делят один ранг, а для каждого числа поля ведётся posting-лист рангов,
+содержащих это число. Для нового тиража обходятся только posting-листы
+выпавших чисел - стоимость пропорциональна числу совпадений, а не числу
+пользователей. Найденные выигрыши рассылаются через подключаемые приёмники:
+очередь в процессе, webhook или WebSocket. Приёмники вызываются из пути
+сохранения тиражей, поэтому send() не должен блокироваться на сети -
+webhook отправляет пачки в фоновом потоке.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.app.core.prize_probability import category_index_matrix
+from backend.app.core.utils import combination_rank
+
+logger = logging.getLogger(__name__)
+
+# Ключ в notification_settings для отключения уведомлений о выигрышах
+WIN_ALERTS_SETTING = 'winning_tickets'
+
+
+@dataclass
+class WinNotification:
+  """Уведомление о выигрыше одного сохранённого билета"""
+  user_id: int
+  lottery_type: str
+  source: str
+  draw_number: int
+  draw_date: Optional[str]
+  field1: List[int]
+  field2: List[int]
+  matches_f1: int
+  matches_f2: int
+  category: str
+  payout: float
+  created_at: str
+
+  def to_dict(self) -> Dict:
+    return asdict(self)
+
+
+class TicketSubscriptionIndex:
+  """Индекс сохранённых билетов одной лотереи: ранг -> подписчики, число -> ранги"""
+
+  def __init__(self, lottery_type: str, config: Dict):
+    self.lottery_type = lottery_type
+    self.config = config
+    self.category_index = category_index_matrix(config)
+    self.category_names = [c.get('name') for c in config.get('prize_categories', [])]
+    self.payouts = config.get('prize_payouts', {})
+
+    self._combinations: Dict[int, Tuple[Tuple[int, ...], Tuple[int, ...]]] = {}
+    self._subscribers: Dict[int, Set[Tuple[int, str]]] = defaultdict(set)
+    self._owned: Dict[Tuple[int, str], Set[int]] = defaultdict(set)
+    self._postings1: List[Set[int]] = [set() for _ in range(config['field1_max'] + 1)]
+    self._postings2: List[Set[int]] = [set() for _ in range(config['field2_max'] + 1)]
+    self._lock = threading.RLock()
+
+  def __len__(self) -> int:
+    return len(self._combinations)
+
+  def normalize(self, field1: Iterable[int], field2: Iterable[int]) -> Optional[Tuple[Tuple[int, ...], Tuple[int, ...]]]:
+    """Полная и корректная комбинация в виде отсортированных кортежей или None"""
+    try:
+      f1 = tuple(sorted({int(n) for n in field1}))
+      f2 = tuple(sorted({int(n) for n in field2}))
+    except (TypeError, ValueError):
+      return None
+
+    if (len(f1) != self.config['field1_size'] or len(f2) != self.config['field2_size'] or
+        not all(1 <= n <= self.config['field1_max'] for n in f1) or
+        not all(1 <= n <= self.config['field2_max'] for n in f2)):
+      return None
+    return f1, f2
+
+  def add(self, user_id: int, field1: Iterable[int], field2: Iterable[int], source: str = 'favorites') -> bool:
+    """Подписка пользователя на билет; False, если комбинация неполная"""
+    combo = self.normalize(field1, field2)
+    if combo is None:
+      return False
+
+    rank = combination_rank(combo[0], combo[1], self.config)
+    key = (user_id, source)
+    with self._lock:
+      if rank not in self._combinations:
+        self._combinations[rank] = combo
+        for n in combo[0]:
+          self._postings1[n].add(rank)
+        for n in combo[1]:
+          self._postings2[n].add(rank)
+      self._subscribers[rank].add(key)
+      self._owned[key].add(rank)
+    return True
+
+  def remove(self, user_id: int, source: str = 'favorites'):
+    """Удаление всех билетов пользователя из данного источника"""
+    key = (user_id, source)
+    with self._lock:
+      for rank in self._owned.pop(key, set()):
+        subscribers = self._subscribers.get(rank)
+        if subscribers is None:
+          continue
+        subscribers.discard(key)
+        if subscribers:
+          continue
+
+        # Последний подписчик - комбинация уходит из posting-листов
+        del self._subscribers[rank]
+        f1, f2 = self._combinations.pop(rank)
+        for n in f1:
+          self._postings1[n].discard(rank)
+        for n in f2:
+          self._postings2[n].discard(rank)
+
+  def replace(self, user_id: int, tickets: Iterable[Tuple[Iterable[int], Iterable[int]]],
+              source: str = 'favorites') -> int:
+    """Замена набора билетов пользователя; возвращает число принятых билетов"""
+    with self._lock:
+      self.remove(user_id, source)
+      return sum(self.add(user_id, f1, f2, source) for f1, f2 in tickets)
+
+  def find_winners(self, draw_f1: Iterable[int], draw_f2: Iterable[int]) -> List[Tuple[int, int, int, int]]:
+    """
+    Выигрышные комбинации для тиража.
+
+    Обходятся только posting-листы выпавших чисел: счётчики совпадений
+    набираются по рангам, у которых есть хотя бы одно совпадение.
+
+    Returns:
+        Список (rank, matches_f1, matches_f2, category_idx)
+    """
+    with self._lock:
+      counts1 = Counter()
+      for n in set(draw_f1):
+        if 0 <= n < len(self._postings1):
+          counts1.update(self._postings1[n])
+      counts2 = Counter()
+      for n in set(draw_f2):
+        if 0 <= n < len(self._postings2):
+          counts2.update(self._postings2[n])
+
+      # Категория без единого совпадения потребовала бы обхода всех билетов
+      candidates = set(counts1) | set(counts2)
+      if self.category_index[0, 0] >= 0:
+        candidates = set(self._combinations)
+
+      winners = []
+      for rank in candidates:
+        m1, m2 = counts1.get(rank, 0), counts2.get(rank, 0)
+        category = int(self.category_index[m1, m2])
+        if category >= 0:
+          winners.append((rank, m1, m2, category))
+      return winners
+
+  def notifications_for_draw(self, draw_number: int, draw_f1: Iterable[int], draw_f2: Iterable[int],
+                             draw_date: Optional[str] = None) -> List[WinNotification]:
+    """Уведомления всем подписчикам выигравших комбинаций"""
+    created_at = datetime.utcnow().isoformat()
+    notifications = []
+    with self._lock:
+      for rank, m1, m2, category in self.find_winners(draw_f1, draw_f2):
+        f1, f2 = self._combinations[rank]
+        name = self.category_names[category]
+        for user_id, source in sorted(self._subscribers[rank]):
+          notifications.append(WinNotification(
+            user_id=user_id,
+            lottery_type=self.lottery_type,
+            source=source,
+            draw_number=int(draw_number),
+            draw_date=draw_date,
+            field1=list(f1),
+            field2=list(f2),
+            matches_f1=m1,
+            matches_f2=m2,
+            category=name,
+            payout=float(self.payouts.get(name, 0)),
+            created_at=created_at
+          ))
+    return notifications
+
+
+class NotificationSink(ABC):
+  """Базовый приёмник уведомлений"""
+
+  name = 'base'
+
+  @abstractmethod
+  def send(self, notifications: List[WinNotification]):
+    """Доставка пачки уведомлений (без блокировки на сетевом вводе-выводе)"""
+
+
+class QueueNotificationSink(NotificationSink):
+  """Очередь уведомлений в процессе - забирается опросом API"""
+
+  name = 'queue'
+
+  def __init__(self, max_per_user: int = 100):
+    self.max_per_user = max_per_user
+    self._queues: Dict[int, deque] = defaultdict(lambda: deque(maxlen=self.max_per_user))
+    self._lock = threading.Lock()
+
+  def send(self, notifications: List[WinNotification]):
+    with self._lock:
+      for notification in notifications:
+        self._queues[notification.user_id].append(notification.to_dict())
+
+  def drain(self, user_id: int) -> List[Dict]:
+    """Забрать и очистить накопленные уведомления пользователя"""
+    with self._lock:
+      queue = self._queues.pop(user_id, None)
+    return list(queue) if queue else []
+
+  def pending(self, user_id: int) -> int:
+    with self._lock:
+      return len(self._queues.get(user_id, ()))
+
+
+class WebhookNotificationSink(NotificationSink):
+  """
+  Отправка пачки уведомлений POST-запросом на внешний URL
+
+  send() только ставит пачку в очередь фонового потока и сразу возвращает
+  управление: медленный webhook не задерживает сохранение тиражей.
+  """
+
+  name = 'webhook'
+
+  def __init__(self, url: str, timeout: float = 5.0):
+    self.url = url
+    self.timeout = timeout
+    self._executor: Optional[ThreadPoolExecutor] = None
+    self._lock = threading.Lock()
+
+  def _get_executor(self) -> ThreadPoolExecutor:
+    with self._lock:
+      if self._executor is None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='win-webhook')
+      return self._executor
+
+  def send(self, notifications: List[WinNotification]):
+    if not notifications:
+      return
+    payload = {'notifications': [n.to_dict() for n in notifications]}
+    self._get_executor().submit(self._post, payload)
+
+  def flush(self, timeout: Optional[float] = None):
+    """Ожидание отправки всех поставленных в очередь пачек"""
+    self._get_executor().submit(lambda: None).result(timeout=timeout)
+
+  def _post(self, payload: Dict):
+    import requests
+
+    try:
+      response = requests.post(self.url, json=payload, timeout=self.timeout)
+      response.raise_for_status()
+    except Exception as e:
+      logger.error(f"❌ Webhook уведомлений {self.url}: {e}")
+
+
+class WebSocketNotificationSink(NotificationSink):
+  """Рассылка уведомлений в открытые WebSocket-соединения пользователей"""
+
+  name = 'websocket'
+
+  def __init__(self):
+    self._connections: Dict[int, List[Tuple[object, asyncio.AbstractEventLoop]]] = defaultdict(list)
+    self._lock = threading.Lock()
+
+  def register(self, user_id: int, websocket, loop: Optional[asyncio.AbstractEventLoop] = None):
+    loop = loop or asyncio.get_event_loop()
+    with self._lock:
+      self._connections[user_id].append((websocket, loop))
+
+  def unregister(self, user_id: int, websocket):
+    with self._lock:
+      remaining = [(ws, loop) for ws, loop in self._connections.get(user_id, []) if ws is not websocket]
+      if remaining:
+        self._connections[user_id] = remaining
+      else:
+        self._connections.pop(user_id, None)
+
+  def send(self, notifications: List[WinNotification]):
+    # Приём идёт из потока сохранения тиражей - отправка планируется в цикл соединения
+    for notification in notifications:
+      with self._lock:
+        connections = list(self._connections.get(notification.user_id, []))
+      for websocket, loop in connections:
+        if loop.is_closed():
+          continue
+        asyncio.run_coroutine_threadsafe(websocket.send_json(notification.to_dict()), loop)
+
+
+class WinNotifier:
+  """Индексы подписок по лотереям и рассылка уведомлений о выигрышах"""
+
+  def __init__(self, sinks: Optional[List[NotificationSink]] = None):
+    self.sinks: List[NotificationSink] = list(sinks or [])
+    self._indexes: Dict[str, TicketSubscriptionIndex] = {}
+    self._loaded = False
+    self._lock = threading.RLock()
+
+  def add_sink(self, sink: NotificationSink):
+    self.sinks.append(sink)
+
+  def get_sink(self, name: str) -> Optional[NotificationSink]:
+    return next((s for s in self.sinks if s.name == name), None)
+
+  def get_index(self, lottery_type: str) -> TicketSubscriptionIndex:
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+
+    with self._lock:
+      index = self._indexes.get(lottery_type)
+      if index is None:
+        index = TicketSubscriptionIndex(lottery_type, LOTTERY_CONFIGS[lottery_type])
+        self._indexes[lottery_type] = index
+      return index
+
+  def set_user_favorites(self, user_id: int, all_favorites: Dict, notification_settings: Optional[Dict] = None):
+    """
+    Синхронизация избранных комбинаций пользователя с индексами.
+
+    Args:
+        all_favorites: {lottery_type: {"field1": [...], "field2": [...]}} как в UserPreferences
+        notification_settings: Настройки уведомлений; {WIN_ALERTS_SETTING: False} отключает подписку
+    """
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+
+    enabled = (notification_settings or {}).get(WIN_ALERTS_SETTING, True)
+    for lottery_type in LOTTERY_CONFIGS:
+      favorites = (all_favorites or {}).get(lottery_type) or {}
+      tickets = []
+      if enabled and isinstance(favorites, dict):
+        tickets.append((favorites.get('field1') or [], favorites.get('field2') or []))
+      self.get_index(lottery_type).replace(user_id, tickets, source='favorites')
+
+  def load_subscriptions(self, db=None) -> int:
+    """Загрузка избранного всех пользователей из БД; возвращает число пользователей"""
+    from backend.app.core.database import SessionLocal, UserPreferences
+
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+      rows = db.query(UserPreferences.user_id, UserPreferences.favorite_numbers,
+                      UserPreferences.notification_settings).all()
+    finally:
+      if own_session:
+        db.close()
+
+    for user_id, favorites_json, settings_json in rows:
+      try:
+        favorites = json.loads(favorites_json) if favorites_json else {}
+        settings = json.loads(settings_json) if settings_json else {}
+      except (TypeError, ValueError):
+        continue
+      self.set_user_favorites(user_id, favorites, settings)
+
+    self._loaded = True
+    logger.info(f"🔔 Подписки на выигрыши загружены: {len(rows)} пользователей, "
+                f"{sum(len(i) for i in self._indexes.values())} комбинаций")
+    return len(rows)
+
+  def notify_draws(self, lottery_type: str, draws: Iterable[Dict]) -> List[WinNotification]:
+    """
+    Поиск выигрышей сохранённых билетов в новых тиражах и рассылка уведомлений.
+
+    Args:
+        draws: Тиражи в виде {'draw_number', 'draw_date', 'field1', 'field2'}
+    """
+    if not self._loaded:
+      try:
+        self.load_subscriptions()
+      except Exception as e:
+        logger.error(f"❌ Не удалось загрузить подписки на выигрыши: {e}")
+        return []
+
+    index = self.get_index(lottery_type)
+    notifications = []
+    for draw in draws:
+      draw_date = draw.get('draw_date')
+      notifications.extend(index.notifications_for_draw(
+        draw['draw_number'], draw['field1'], draw['field2'],
+        draw_date.strftime('%Y-%m-%d') if hasattr(draw_date, 'strftime') else draw_date
+      ))
+
+    if notifications:
+      logger.info(f"🔔 {lottery_type}: {len(notifications)} уведомлений о выигрыше")
+      for sink in self.sinks:
+        try:
+          sink.send(notifications)
+        except Exception as e:
+          logger.error(f"❌ Ошибка приёмника уведомлений {sink.name}: {e}")
+    return notifications
+
+
+def _default_sinks() -> List[NotificationSink]:
+  sinks = [QueueNotificationSink(), WebSocketNotificationSink()]
+  webhook_url = os.getenv('WIN_NOTIFICATION_WEBHOOK_URL')
+  if webhook_url:
+    sinks.append(WebhookNotificationSink(webhook_url))
+  return sinks
+
+
+# Глобальный экземпляр рассылки уведомлений о выигрышах
+GLOBAL_WIN_NOTIFIER = WinNotifier(_default_sinks())
@@ -5,20 +5,38 @@ XGBoost модель для профессионального анализа л
 
 import asyncio
 import hashlib
+import os
 import pickle
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Tuple, Optional, Dict, Any
 import numpy as np
 import pandas as pd
 import xgboost as xgb
-from sklearn.model_selection import TimeSeriesSplit, cross_val_score
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import accuracy_score, roc_auc_score, precision_recall_fscore_support
 import shap
 import logging
 
+from backend.app.core.utils import get_data_version
+
 logger = logging.getLogger(__name__)
 
+# Фоновый предрасчет SHAP значений контекста (один поток на процесс)
+_SHAP_EXECUTOR = None
+_SHAP_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_shap_executor() -> ThreadPoolExecutor:
+    global _SHAP_EXECUTOR
+    with _SHAP_EXECUTOR_LOCK:
+        if _SHAP_EXECUTOR is None:
+            _SHAP_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='xgb-shap')
+        return _SHAP_EXECUTOR
+
 
 class XGBoostLotteryModel:
     """
@@ -43,9 +61,12 @@ class XGBoostLotteryModel:
         self.models_f1 = []  # Список моделей для field1
         self.models_f2 = []  # Список моделей для field2
         
-        # SHAP объяснители
-        self.explainers_f1 = []
-        self.explainers_f2 = []
+        # SHAP объяснители: создаются по запросу, хранятся последние explainer_cache_size
+        self.explainer_cache_size = int(os.getenv('XGBOOST_EXPLAINER_CACHE', '8'))
+        self._explainers = OrderedDict()
+        self._explainer_lock = threading.Lock()
+        # SHAP значения контекста следующего тиража считаются в фоне
+        self.shap_precompute = os.getenv('XGBOOST_SHAP_PRECOMPUTE', '1') == '1'
         
         # Параметры XGBoost (оптимизированы для лотерей)
         self.xgb_params = {
@@ -59,7 +80,7 @@ class XGBoostLotteryModel:
             'reg_alpha': 0.1,
             'reg_lambda': 1,
             'random_state': 42,
-            'n_jobs': -1,  # Использовать все ядра
+            'n_jobs': 1,  # Потоки задаются на модель из thread_budget
             'tree_method': 'hist',  # Быстрый метод для больших данных
             'predictor': 'cpu_predictor',
             'enable_categorical': False
@@ -77,149 +98,264 @@ class XGBoostLotteryModel:
             'prediction_count': 0
         }
         
+        # Общий бюджет потоков обучения (несколько реплик на хосте делят ядра)
+        self.thread_budget = max(1, int(os.getenv('XGBOOST_THREADS', '0')) or os.cpu_count() or 1)
+        # Кросс-валидация не чаще раза в cv_interval_hours (0 - только по запросу)
+        self.cv_interval_hours = float(os.getenv('XGBOOST_CV_INTERVAL_HOURS', '24'))
+        self._last_cv_time = None
+        
         # Статус обучения
         self.is_trained = False
         self._lock = threading.Lock()
         
-        # Кэш предсказаний
-        self._prediction_cache = {}
+        # Контекст следующего тиража: признаки и вероятности всех чисел,
+        # считаются раз на (версию данных, поколение моделей)
+        self._context = None
+        self._context_lock = threading.Lock()
+        self._model_version = 0
         self._cache_hits = 0
         self._cache_misses = 0
         
         logger.info(f"✅ XGBoost модель инициализирована для лотереи {lottery_config.get('name', 'unknown')}")
 
+    # Размеры скользящих окон временных признаков
+    WINDOW_SIZES = (3, 5, 10, 20)
+    # Сколько тиражей назад ищется последнее появление числа
+    LAST_APPEARANCE_DEPTH = 50
+    # Значение для чисел, не появлявшихся в этой глубине
+    NOT_SEEN = 100
+
+    @staticmethod
+    def _field_arrays(draws: pd.Series, max_num: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Матрица частот (тиражи x числа 1..max_num) и числа тиражей
+        построчно, дополненные NaN до самой длинной строки
+        """
+        lists = [list(numbers) if isinstance(numbers, (list, tuple, np.ndarray)) else []
+                 for numbers in draws]
+        lengths = np.array([len(numbers) for numbers in lists], dtype=np.int64)
+        width = int(lengths.max()) if len(lengths) else 0
+
+        values = np.full((len(lists), width), np.nan)
+        if width:
+            flat = np.fromiter((n for numbers in lists for n in numbers), dtype=np.float64, count=int(lengths.sum()))
+            rows = np.repeat(np.arange(len(lists)), lengths)
+            cols = np.arange(len(flat)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            values[rows, cols] = flat
+        else:
+            flat = np.zeros(0)
+            rows = np.zeros(0, dtype=np.int64)
+
+        counts = np.zeros((len(lists), max_num + 1))
+        in_range = (flat >= 1) & (flat <= max_num)
+        np.add.at(counts, (rows[in_range], flat[in_range].astype(np.int64)), 1)
+        return counts[:, 1:], values
+
+    def _window_stats(self, values: np.ndarray, window: int, num_rows: int, max_num: int) -> np.ndarray:
+        """Среднее, std, медиана и разнообразие чисел окна для строк 0..num_rows-1"""
+        stats = np.zeros((num_rows, 4))
+        if values.shape[1] == 0:
+            return stats
+
+        # Окно строки idx - тиражи idx+1..idx+window
+        windows = sliding_window_view(values, (window, values.shape[1]))[1:num_rows + 1, 0]
+        windows = windows.reshape(num_rows, -1)
+        present = ~np.isnan(windows)
+        has_numbers = present.any(axis=1)
+
+        if present.all():
+            stats[:, 0] = np.mean(windows, axis=1)
+            stats[:, 1] = np.std(windows, axis=1)
+            stats[:, 2] = np.median(windows, axis=1)
+        elif has_numbers.any():
+            # Тиражи разной длины: NaN-заполнение, пустые окна остаются нулями
+            with np.errstate(invalid='ignore'):
+                stats[has_numbers, 0] = np.nanmean(windows[has_numbers], axis=1)
+                stats[has_numbers, 1] = np.nanstd(windows[has_numbers], axis=1)
+                stats[has_numbers, 2] = np.nanmedian(windows[has_numbers], axis=1)
+
+        # Различные значения: NaN сортируются в конец и не считаются
+        ordered = np.sort(windows, axis=1)
+        distinct = np.concatenate([~np.isnan(ordered[:, :1]),
+                                   (ordered[:, 1:] != ordered[:, :-1]) & ~np.isnan(ordered[:, 1:])], axis=1)
+        stats[:, 3] = np.where(has_numbers, distinct.sum(axis=1) / max_num, 0)
+        return stats
+
+    def _last_appearance(self, counts: np.ndarray, num_rows: int) -> np.ndarray:
+        """Через сколько тиражей назад число выпадало последний раз (NOT_SEEN - не выпадало)"""
+        n = len(counts)
+        # Ближайшая строка >= r, где число выпало (n - нигде)
+        seen_at = np.where(counts > 0, np.arange(n)[:, None], n)
+        next_seen = np.minimum.accumulate(seen_at[::-1], axis=0)[::-1]
+
+        look_back = next_seen[1:num_rows + 1] - np.arange(num_rows)[:, None]
+        depth = np.minimum(self.LAST_APPEARANCE_DEPTH, n - np.arange(num_rows))[:, None]
+        return np.where(look_back < depth, look_back, self.NOT_SEEN)
+
     def _extract_features(self, df_history: pd.DataFrame) -> Tuple[np.ndarray, Dict[int, np.ndarray]]:
         """
         Извлечение продвинутых признаков из истории тиражей
         
+        Строка idx (история от новых тиражей к старым) - признаки тиражей
+        idx+1.. и цели тиража idx. Все окна считаются разом по матрице
+        частот: суммы окон - разностями кумулятивных сумм, статистики -
+        по скользящим представлениям массива чисел.
+        
         Returns:
             X: Матрица признаков
             y: Словарь целевых переменных {номер_числа: бинарный_вектор}
         """
         if df_history.empty:
             return np.array([]), {}
-            
-        features_list = []
-        targets_f1 = {i: [] for i in range(1, self.field1_max + 1)}
-        targets_f2 = {i: [] for i in range(1, self.field2_max + 1)}
-        
-        # Скользящее окно для временных признаков
-        window_sizes = [3, 5, 10, 20]
-        
-        for idx in range(len(df_history) - max(window_sizes)):
-            feature_vector = []
-            
-            # Текущий тираж для целевых переменных
-            current_draw = df_history.iloc[idx]
-            current_f1 = current_draw.get('Числа_Поле1_list', [])
-            current_f2 = current_draw.get('Числа_Поле2_list', [])
-            
-            # Признаки из разных окон
-            for window in window_sizes:
-                window_data = df_history.iloc[idx + 1:idx + 1 + window]
-                
-                if len(window_data) < window:
-                    continue
-                    
-                # Частоты чисел в окне
-                freq_f1 = np.zeros(self.field1_max)
-                freq_f2 = np.zeros(self.field2_max)
-                
-                for _, row in window_data.iterrows():
-                    for num in row.get('Числа_Поле1_list', []):
-                        if 1 <= num <= self.field1_max:
-                            freq_f1[num - 1] += 1
-                    for num in row.get('Числа_Поле2_list', []):
-                        if 1 <= num <= self.field2_max:
-                            freq_f2[num - 1] += 1
-                
-                # Нормализация частот
-                freq_f1 = freq_f1 / window
-                freq_f2 = freq_f2 / window
-                
-                # Добавляем в вектор признаков
-                feature_vector.extend(freq_f1)
-                feature_vector.extend(freq_f2)
-                
-                # Статистические признаки окна
-                all_f1_in_window = []
-                all_f2_in_window = []
-                
-                for _, row in window_data.iterrows():
-                    all_f1_in_window.extend(row.get('Числа_Поле1_list', []))
-                    all_f2_in_window.extend(row.get('Числа_Поле2_list', []))
-                
-                if all_f1_in_window:
-                    feature_vector.extend([
-                        np.mean(all_f1_in_window),
-                        np.std(all_f1_in_window),
-                        np.median(all_f1_in_window),
-                        len(set(all_f1_in_window)) / self.field1_max  # Разнообразие
-                    ])
-                else:
-                    feature_vector.extend([0, 0, 0, 0])
-                    
-                if all_f2_in_window:
-                    feature_vector.extend([
-                        np.mean(all_f2_in_window),
-                        np.std(all_f2_in_window),
-                        np.median(all_f2_in_window),
-                        len(set(all_f2_in_window)) / self.field2_max  # Разнообразие
-                    ])
-                else:
-                    feature_vector.extend([0, 0, 0, 0])
-            
-            # Признаки "горячих" и "холодных" чисел
-            last_appearance_f1 = np.full(self.field1_max, 100)  # Большое значение для невиданных
-            last_appearance_f2 = np.full(self.field2_max, 100)
-            
-            for look_back in range(1, min(50, len(df_history) - idx)):
-                past_draw = df_history.iloc[idx + look_back]
-                for num in past_draw.get('Числа_Поле1_list', []):
-                    if 1 <= num <= self.field1_max and last_appearance_f1[num - 1] == 100:
-                        last_appearance_f1[num - 1] = look_back
-                for num in past_draw.get('Числа_Поле2_list', []):
-                    if 1 <= num <= self.field2_max and last_appearance_f2[num - 1] == 100:
-                        last_appearance_f2[num - 1] = look_back
-            
-            feature_vector.extend(last_appearance_f1)
-            feature_vector.extend(last_appearance_f2)
-            
-            # Циклические признаки (синус/косинус номера тиража)
-            draw_number = current_draw.get('Тираж', 0)
-            feature_vector.extend([
-                np.sin(2 * np.pi * draw_number / 365),  # Годовой цикл
-                np.cos(2 * np.pi * draw_number / 365),
-                np.sin(2 * np.pi * draw_number / 30),   # Месячный цикл
-                np.cos(2 * np.pi * draw_number / 30),
-                np.sin(2 * np.pi * draw_number / 7),    # Недельный цикл
-                np.cos(2 * np.pi * draw_number / 7)
-            ])
-            
-            # Добавляем в список признаков
-            features_list.append(feature_vector)
-            
-            # Формируем целевые переменные
-            for num in range(1, self.field1_max + 1):
-                targets_f1[num].append(1 if num in current_f1 else 0)
-            for num in range(1, self.field2_max + 1):
-                targets_f2[num].append(1 if num in current_f2 else 0)
-        
-        if not features_list:
+
+        num_rows = len(df_history) - max(self.WINDOW_SIZES)
+        if num_rows <= 0:
             return np.array([]), {}
-            
-        X = np.array(features_list)
-        
-        # Объединяем целевые переменные
+
+        fields = []
+        for column, max_num in (('Числа_Поле1_list', self.field1_max), ('Числа_Поле2_list', self.field2_max)):
+            draws = df_history[column] if column in df_history.columns else pd.Series([[]] * len(df_history))
+            counts, values = self._field_arrays(draws, max_num)
+            cumulative = np.vstack([np.zeros((1, max_num)), np.cumsum(counts, axis=0)])
+            fields.append((counts, values, cumulative, max_num))
+
+        blocks = []
+        start = np.arange(num_rows) + 1
+        for window in self.WINDOW_SIZES:
+            # Частоты чисел в окне (нормализованные)
+            for counts, values, cumulative, max_num in fields:
+                blocks.append((cumulative[start + window] - cumulative[start]) / window)
+            # Статистические признаки окна
+            for counts, values, cumulative, max_num in fields:
+                blocks.append(self._window_stats(values, window, num_rows, max_num))
+
+        # Признаки "горячих" и "холодных" чисел
+        for counts, values, cumulative, max_num in fields:
+            blocks.append(self._last_appearance(counts, num_rows))
+
+        # Циклические признаки (синус/косинус номера тиража)
+        if 'Тираж' in df_history.columns:
+            draw_number = df_history['Тираж'].to_numpy(dtype=np.float64)[:num_rows]
+        else:
+            draw_number = np.zeros(num_rows)
+        for period in (365, 30, 7):  # Годовой, месячный, недельный циклы
+            blocks.append(np.column_stack([np.sin(2 * np.pi * draw_number / period),
+                                           np.cos(2 * np.pi * draw_number / period)]))
+
+        X = np.hstack(blocks)
+
+        # Целевые переменные - выпало ли число в тираже idx
         all_targets = {}
-        all_targets.update({f'f1_{num}': np.array(targets_f1[num]) for num in targets_f1})
-        all_targets.update({f'f2_{num}': np.array(targets_f2[num]) for num in targets_f2})
-        
+        for prefix, (counts, values, cumulative, max_num) in zip(('f1', 'f2'), fields):
+            present = (counts[:num_rows] > 0).astype(np.int64)
+            all_targets.update({f'{prefix}_{num}': present[:, num - 1] for num in range(1, max_num + 1)})
+
         return X, all_targets
 
-    def train(self, df_history: pd.DataFrame) -> bool:
+    # Доля самых новых строк под holdout для ранней остановки
+    HOLDOUT_FRACTION = 0.15
+    MIN_HOLDOUT = 20
+    EARLY_STOPPING_ROUNDS = 20
+
+    def _target_columns(self) -> List[str]:
+        return [f'f1_{n}' for n in range(1, self.field1_max + 1)] + \
+               [f'f2_{n}' for n in range(1, self.field2_max + 1)]
+
+    @staticmethod
+    def _is_balanced(y: np.ndarray) -> bool:
+        """Достаточно примеров обоих классов для обучения"""
+        return 5 <= np.sum(y) <= len(y) - 5
+
+    def _run_parallel(self, func, items: List) -> List:
+        """
+        func(item, n_jobs) для всех items в пуле потоков: моделей
+        одновременно - не больше thread_budget, потоки делятся поровну
+        """
+        jobs = max(1, min(self.thread_budget, len(items)))
+        n_jobs = max(1, self.thread_budget // jobs)
+        if jobs == 1:
+            return [func(item, n_jobs) for item in items]
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(lambda item: func(item, n_jobs), items))
+
+    def _fit_number_model(self, X: np.ndarray, y: np.ndarray, n_jobs: int) -> Tuple[Any, Optional[float], int]:
+        """
+        Модель одного числа: число деревьев подбирается ранней остановкой
+        на самых новых тиражах (строки X идут от новых к старым), затем
+        модель переобучается на всех строках
+
+        Returns:
+            (модель, ROC-AUC на holdout или None, число деревьев)
+        """
+        holdout = max(self.MIN_HOLDOUT, int(len(y) * self.HOLDOUT_FRACTION))
+        rounds = self.xgb_params['n_estimators']
+        holdout_auc = None
+
+        if len(y) - holdout >= 2 * self.MIN_HOLDOUT and 0 < np.sum(y[:holdout]) < holdout \
+                and self._is_balanced(y[holdout:]):
+            probe = xgb.XGBClassifier(**{**self.xgb_params, 'n_jobs': n_jobs,
+                                         'early_stopping_rounds': self.EARLY_STOPPING_ROUNDS,
+                                         'eval_metric': 'logloss'})
+            probe.fit(X[holdout:], y[holdout:], eval_set=[(X[:holdout], y[:holdout])], verbose=False)
+            rounds = probe.best_iteration + 1
+            holdout_auc = roc_auc_score(y[:holdout], probe.predict_proba(X[:holdout])[:, 1])
+
+        model = xgb.XGBClassifier(**{**self.xgb_params, 'n_jobs': n_jobs, 'n_estimators': rounds})
+        model.fit(X, y)
+        return model, holdout_auc, rounds
+
+    def cv_due(self) -> bool:
+        """Пора ли плановой кросс-валидации"""
+        if self.cv_interval_hours <= 0:
+            return False
+        return self._last_cv_time is None or \
+            time.time() - self._last_cv_time >= self.cv_interval_hours * 3600
+
+    def _cross_validate(self, X: np.ndarray, y_dict: Dict[str, np.ndarray], n_splits: int = 3) -> Dict[str, float]:
+        """ROC-AUC по TimeSeriesSplit в хронологическом порядке строк (фолды всех чисел - в пуле потоков)"""
+        X_chrono = X[::-1]
+        splits = list(TimeSeriesSplit(n_splits=n_splits).split(X_chrono))
+        tasks = [(col, fold) for col in self._target_columns() if self._is_balanced(y_dict[col])
+                 for fold in range(len(splits))]
+
+        def score(task, n_jobs):
+            col, fold = task
+            train_idx, test_idx = splits[fold]
+            y = y_dict[col][::-1]
+            if len(np.unique(y[train_idx])) < 2 or len(np.unique(y[test_idx])) < 2:
+                return col, None
+            model = xgb.XGBClassifier(**{**self.xgb_params, 'n_jobs': n_jobs})
+            model.fit(X_chrono[train_idx], y[train_idx])
+            return col, roc_auc_score(y[test_idx], model.predict_proba(X_chrono[test_idx])[:, 1])
+
+        scores = {}
+        for col, value in self._run_parallel(score, tasks):
+            if value is not None:
+                scores.setdefault(col, []).append(value)
+        return {col: float(np.mean(values)) for col, values in scores.items()}
+
+    def cross_validate(self, df_history: pd.DataFrame, n_splits: int = 3) -> Dict[str, float]:
+        """Кросс-валидация по запросу (не меняет обученные модели)"""
+        X, y_dict = self._extract_features(df_history)
+        if X.shape[0] == 0:
+            return {}
+        start_time = time.time()
+        cv_scores = self._cross_validate(X, y_dict, n_splits)
+        self.metrics['cv_roc_auc'] = cv_scores
+        self.metrics['cv_time'] = time.time() - start_time
+        self._last_cv_time = time.time()
+        logger.info(f"📏 Кросс-валидация XGBoost за {self.metrics['cv_time']:.2f}с, "
+                   f"средний ROC-AUC: {np.mean(list(cv_scores.values())) if cv_scores else 0:.3f}")
+        return cv_scores
+
+    def train(self, df_history: pd.DataFrame, cross_validate: Optional[bool] = None) -> bool:
         """
-        Обучение XGBoost моделей с кросс-валидацией
+        Обучение XGBoost моделей чисел в пуле потоков с ранней остановкой
+        
+        Args:
+            df_history: История тиражей
+            cross_validate: True - выполнить кросс-валидацию, False - нет,
+                            None - если подошел срок плановой (cv_interval_hours)
         """
         if df_history.empty or len(df_history) < 50:
             logger.warning(f"Недостаточно данных для обучения XGBoost: {len(df_history)} тиражей")
@@ -237,73 +373,36 @@ class XGBoostLotteryModel:
                     logger.error("Не удалось извлечь признаки")
                     return False
                 
-                # Очищаем старые модели
-                self.models_f1 = []
-                self.models_f2 = []
-                self.explainers_f1 = []
-                self.explainers_f2 = []
+                columns = self._target_columns()
                 
-                # Обучаем модель для каждого числа field1
-                logger.info(f"📚 Обучение {self.field1_max} моделей для поля 1...")
-                for num in range(1, self.field1_max + 1):
-                    y = y_dict[f'f1_{num}']
-                    
+                def fit(col, n_jobs):
+                    y = y_dict[col]
                     # Проверяем баланс классов
-                    if np.sum(y) < 5 or np.sum(y) > len(y) - 5:
-                        logger.warning(f"Пропуск числа {num} поля 1 - недостаточно примеров")
-                        self.models_f1.append(None)
-                        self.explainers_f1.append(None)
+                    if not self._is_balanced(y):
+                        return None
+                    return self._fit_number_model(X, y, n_jobs)
+                
+                logger.info(f"📚 Обучение {len(columns)} моделей "
+                           f"(бюджет потоков {self.thread_budget})...")
+                fitted = self._run_parallel(fit, columns)
+                
+                models, roc_aucs, rounds = [], [], []
+                for col, result in zip(columns, fitted):
+                    if result is None:
+                        logger.warning(f"Пропуск числа {col} - недостаточно примеров")
+                        models.append(None)
                         continue
-                    
-                    # Создаем и обучаем модель
-                    model = xgb.XGBClassifier(**self.xgb_params)
-                    
-                    # Кросс-валидация временных рядов
-                    tscv = TimeSeriesSplit(n_splits=3)
-                    scores = cross_val_score(model, X, y, cv=tscv, scoring='roc_auc')
-                    
-                    # Обучаем на всех данных
-                    model.fit(X, y)
-                    
-                    # Создаем SHAP explainer
-                    explainer = shap.TreeExplainer(model)
-                    
-                    self.models_f1.append(model)
-                    self.explainers_f1.append(explainer)
-                    
-                    # Сохраняем метрики
-                    self.metrics['roc_auc'].append(np.mean(scores))
+                    models.append(result[0])
+                    if result[1] is not None:
+                        roc_aucs.append(result[1])
+                    rounds.append(result[2])
                 
-                # Обучаем модель для каждого числа field2
-                logger.info(f"📚 Обучение {self.field2_max} моделей для поля 2...")
-                for num in range(1, self.field2_max + 1):
-                    y = y_dict[f'f2_{num}']
-                    
-                    # Проверяем баланс классов
-                    if np.sum(y) < 5 or np.sum(y) > len(y) - 5:
-                        logger.warning(f"Пропуск числа {num} поля 2 - недостаточно примеров")
-                        self.models_f2.append(None)
-                        self.explainers_f2.append(None)
-                        continue
-                    
-                    # Создаем и обучаем модель
-                    model = xgb.XGBClassifier(**self.xgb_params)
-                    
-                    # Кросс-валидация временных рядов
-                    tscv = TimeSeriesSplit(n_splits=3)
-                    scores = cross_val_score(model, X, y, cv=tscv, scoring='roc_auc')
-                    
-                    # Обучаем на всех данных
-                    model.fit(X, y)
-                    
-                    # Создаем SHAP explainer
-                    explainer = shap.TreeExplainer(model)
-                    
-                    self.models_f2.append(model)
-                    self.explainers_f2.append(explainer)
-                    
-                    # Сохраняем метрики
-                    self.metrics['roc_auc'].append(np.mean(scores))
+                self.models_f1 = models[:self.field1_max]
+                self.models_f2 = models[self.field1_max:]
+                
+                # ROC-AUC на holdout последнего обучения
+                self.metrics['roc_auc'] = roc_aucs
+                self.metrics['best_rounds'] = rounds
                 
                 # Сохраняем важность признаков от первой модели
                 if self.models_f1 and self.models_f1[0] is not None:
@@ -314,10 +413,17 @@ class XGBoostLotteryModel:
                 
                 self.metrics['training_time'] = time.time() - start_time
                 self.is_trained = True
+                self._model_version += 1
                 
                 avg_roc_auc = np.mean(self.metrics['roc_auc']) if self.metrics['roc_auc'] else 0
                 logger.info(f"✅ XGBoost обучен за {self.metrics['training_time']:.2f}с, "
-                          f"средний ROC-AUC: {avg_roc_auc:.3f}")
+                          f"средний ROC-AUC (holdout): {avg_roc_auc:.3f}")
+                
+                if cross_validate or (cross_validate is None and self.cv_due()):
+                    cv_start = time.time()
+                    self.metrics['cv_roc_auc'] = self._cross_validate(X, y_dict)
+                    self.metrics['cv_time'] = time.time() - cv_start
+                    self._last_cv_time = time.time()
                 
                 return True
                 
@@ -333,10 +439,167 @@ class XGBoostLotteryModel:
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, self.train, df_history)
 
+    # Число деревьев, добавляемых к модели предыдущего окна при warm start
+    WARM_START_ROUNDS = 50
+
+    def walk_forward_features(self, df_chrono: pd.DataFrame) -> Dict[str, Any]:
+        """
+        Признаки всей истории для walk-forward валидации (считаются один раз)
+
+        Args:
+            df_chrono: История в хронологическом порядке (старые тиражи первыми)
+
+        Returns:
+            X, Y (бинарные цели f1_1..f2_N по столбцам), positions - хронологическая
+            позиция тиража-цели каждой строки, lookback - сколько предыдущих тиражей
+            нужно строке внутри окна обучения
+        """
+        # _extract_features ждет историю от новых тиражей к старым
+        X, y_dict = self._extract_features(df_chrono.iloc[::-1].reset_index(drop=True))
+        if X.shape[0] == 0:
+            return {'X': X, 'Y': np.zeros((0, 0)), 'positions': np.zeros(0, dtype=np.int64), 'lookback': 20}
+
+        columns = [f'f1_{n}' for n in range(1, self.field1_max + 1)] + \
+                  [f'f2_{n}' for n in range(1, self.field2_max + 1)]
+        Y = np.column_stack([y_dict[c] for c in columns])
+        positions = len(df_chrono) - 1 - np.arange(X.shape[0])
+
+        # Строки по возрастанию позиции: окно - непрерывный срез
+        return {'X': X[::-1].copy(), 'Y': Y[::-1].copy(), 'positions': positions[::-1].copy(), 'lookback': 20}
+
+    def fit_features(self, X: np.ndarray, Y: np.ndarray,
+                     warm_start: Optional['XGBoostLotteryModel'] = None) -> bool:
+        """
+        Обучение на готовой матрице признаков (без кросс-валидации и SHAP)
+
+        Args:
+            X: Признаки окна
+            Y: Цели из walk_forward_features
+            warm_start: Модель предыдущего окна - ее бустеры дообучаются
+                        WARM_START_ROUNDS деревьями вместо обучения с нуля
+        """
+        start_time = time.time()
+        prev_models = warm_start.models_f1 + warm_start.models_f2 if warm_start is not None else []
+
+        def fit(col, n_jobs):
+            y = Y[:, col]
+            if not self._is_balanced(y):
+                return None
+
+            prev = prev_models[col] if col < len(prev_models) else None
+            if prev is not None:
+                model = xgb.XGBClassifier(**{**self.xgb_params, 'n_jobs': n_jobs,
+                                             'n_estimators': self.WARM_START_ROUNDS})
+                model.fit(X, y, xgb_model=prev.get_booster())
+            else:
+                model = xgb.XGBClassifier(**{**self.xgb_params, 'n_jobs': n_jobs})
+                model.fit(X, y)
+            return model
+
+        models = self._run_parallel(fit, list(range(Y.shape[1])))
+
+        self.models_f1 = models[:self.field1_max]
+        self.models_f2 = models[self.field1_max:]
+        self.metrics['training_time'] = time.time() - start_time
+        self.is_trained = any(m is not None for m in models)
+        self._model_version += 1
+        return self.is_trained
+
+    def predict_features(self, X: np.ndarray) -> List[Tuple[List[int], List[int]]]:
+        """Комбинации с наибольшими вероятностями для каждой строки признаков"""
+        def top_numbers(models, size):
+            probs = np.full((len(X), len(models)), 0.05)  # Базовая вероятность
+            for i, model in enumerate(models):
+                if model is not None:
+                    probs[:, i] = model.predict_proba(X)[:, 1]
+            top = np.argsort(-probs, axis=1, kind='stable')[:, :size] + 1
+            return np.sort(top, axis=1).tolist()
+
+        return list(zip(top_numbers(self.models_f1, self.field1_size),
+                        top_numbers(self.models_f2, self.field2_size)))
+
+    # Базовая вероятность чисел без модели (мало примеров одного класса)
+    BASE_PROBABILITY = 0.05
+
+    def _context_features(self, df_history: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        Вектор признаков следующего тиража (1, n_features): строка-заглушка
+        нового тиража перед историей (от новых тиражей к старым)
+        """
+        history = df_history.head(self.LAST_APPEARANCE_DEPTH)
+        if len(history) < max(self.WINDOW_SIZES):
+            return None
+
+        next_number = int(history['Тираж'].iloc[0]) + 1 if 'Тираж' in history.columns else len(df_history) + 1
+        placeholder = pd.DataFrame([{'Числа_Поле1_list': [], 'Числа_Поле2_list': [], 'Тираж': next_number}])
+        X, _ = self._extract_features(pd.concat([placeholder, history], ignore_index=True))
+        return X[:1] if X.shape[0] else None
+
+    @staticmethod
+    def _number_probabilities(models: List, X: np.ndarray) -> np.ndarray:
+        """Вероятности выпадения чисел (NaN - нет модели)"""
+        probs = np.full(len(models), np.nan)
+        for i, model in enumerate(models):
+            if model is not None:
+                probs[i] = model.predict_proba(X)[0, 1]
+        return probs
+
+    def _next_draw_context(self, df_history: pd.DataFrame) -> Optional[Dict[str, Any]]:
+        """
+        Контекст следующего тиража для версии данных df_history
+
+        Готовый контекст читается без блокировки (словарь не меняется после
+        публикации); пересчет - под отдельной блокировкой, чтобы параллельные
+        запросы не считали его дважды.
+        """
+        key = (get_data_version(df_history), self._model_version)
+        context = self._context
+        if context is not None and context['key'] == key:
+            self._cache_hits += 1
+            return context
+
+        with self._context_lock:
+            context = self._context
+            if context is not None and context['key'] == key:
+                self._cache_hits += 1
+                return context
+
+            self._cache_misses += 1
+            features = self._context_features(df_history)
+            if features is None:
+                return None
+
+            probs_f1 = self._number_probabilities(self.models_f1, features)
+            probs_f2 = self._number_probabilities(self.models_f2, features)
+            context = {
+                'key': key,
+                'features': features,
+                'probs_f1': probs_f1,
+                'probs_f2': probs_f2,
+                'prediction': (
+                    self._top_numbers(probs_f1, self.field1_size),
+                    self._top_numbers(probs_f2, self.field2_size)
+                ),
+                # (поле, число) -> SHAP значения признаков и базовое значение
+                'shap': {}
+            }
+            self._context = context
+        
+        if self.shap_precompute:
+            _get_shap_executor().submit(self._precompute_shap, context)
+        return context
+
+    def _top_numbers(self, probs: np.ndarray, size: int) -> List[int]:
+        """Числа с наибольшей вероятностью (без модели - базовая вероятность)"""
+        filled = np.where(np.isnan(probs), self.BASE_PROBABILITY, probs)
+        top = np.argsort(-filled, kind='stable')[:size] + 1
+        return sorted(int(n) for n in top)
+
     def predict_next_combination(self, last_f1: List[int], last_f2: List[int], 
                                  df_history: pd.DataFrame) -> Tuple[List[int], List[int]]:
         """
-        Предсказание следующей комбинации с учетом последнего тиража
+        Предсказание следующей комбинации по истории (df_history от новых
+        тиражей к старым; last_f1/last_f2 - ее первый тираж)
         
         Returns:
             Tuple[field1_numbers, field2_numbers]
@@ -345,82 +608,61 @@ class XGBoostLotteryModel:
             logger.warning("XGBoost модель не обучена")
             return [], []
         
-        # Создаем кэш-ключ
-        cache_key = f"{sorted(last_f1)}_{sorted(last_f2)}_{len(df_history)}"
-        
-        # Проверяем кэш
-        if cache_key in self._prediction_cache:
-            self._cache_hits += 1
-            return self._prediction_cache[cache_key]
-        
-        self._cache_misses += 1
-        
-        with self._lock:
-            try:
-                # Готовим данные для предсказания
-                # Создаем фиктивную историю с последним тиражом
-                test_df = pd.DataFrame([{
-                    'Числа_Поле1_list': last_f1,
-                    'Числа_Поле2_list': last_f2,
-                    'Тираж': len(df_history) + 1
-                }])
-                
-                # Добавляем историю для контекста
-                test_df = pd.concat([test_df] + [df_history.head(50)], ignore_index=True)
-                
-                # Извлекаем признаки
-                X_test, _ = self._extract_features(test_df)
-                
-                if X_test.shape[0] == 0:
-                    return [], []
-                
-                # Берем последний вектор признаков
-                X_pred = X_test[-1:] if len(X_test) > 0 else X_test
-                
-                # Предсказываем вероятности для field1
-                probs_f1 = []
-                for i, model in enumerate(self.models_f1):
-                    if model is not None:
-                        prob = model.predict_proba(X_pred)[0, 1]
-                        probs_f1.append((i + 1, prob))
-                    else:
-                        probs_f1.append((i + 1, 0.05))  # Базовая вероятность
-                
-                # Предсказываем вероятности для field2
-                probs_f2 = []
-                for i, model in enumerate(self.models_f2):
-                    if model is not None:
-                        prob = model.predict_proba(X_pred)[0, 1]
-                        probs_f2.append((i + 1, prob))
-                    else:
-                        probs_f2.append((i + 1, 0.05))  # Базовая вероятность
-                
-                # Сортируем по вероятности и выбираем топ
-                probs_f1.sort(key=lambda x: x[1], reverse=True)
-                probs_f2.sort(key=lambda x: x[1], reverse=True)
-                
-                # Выбираем числа с наибольшей вероятностью
-                pred_f1 = [num for num, _ in probs_f1[:self.field1_size]]
-                pred_f2 = [num for num, _ in probs_f2[:self.field2_size]]
-                
-                # Сохраняем в кэш
-                result = (sorted(pred_f1), sorted(pred_f2))
-                self._prediction_cache[cache_key] = result
-                
-                # Ограничиваем размер кэша
-                if len(self._prediction_cache) > 1000:
-                    # Удаляем старые записи
-                    keys = list(self._prediction_cache.keys())
-                    for key in keys[:500]:
-                        del self._prediction_cache[key]
-                
-                self.metrics['prediction_count'] += 1
-                
-                return result
-                
-            except Exception as e:
-                logger.error(f"Ошибка предсказания XGBoost: {e}")
+        try:
+            context = self._next_draw_context(df_history)
+            if context is None:
                 return [], []
+            
+            self.metrics['prediction_count'] += 1
+            pred_f1, pred_f2 = context['prediction']
+            return list(pred_f1), list(pred_f2)
+            
+        except Exception as e:
+            logger.error(f"Ошибка предсказания XGBoost: {e}")
+            return [], []
+
+    @staticmethod
+    def _mean_probabilities(probs: np.ndarray, combinations: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Средняя вероятность чисел каждой комбинации и число учтенных чисел"""
+        width = max((len(c) for c in combinations), default=0)
+        numbers = np.zeros((len(combinations), width), dtype=np.int64)
+        for row, combination in enumerate(combinations):
+            numbers[row, :len(combination)] = combination
+
+        # Индекс 0 и числа вне диапазона - NaN
+        lookup = np.concatenate([[np.nan], probs, [np.nan]])
+        values = lookup[np.clip(numbers, 0, len(probs) + 1)]
+        known = ~np.isnan(values)
+        counts = known.sum(axis=1)
+        sums = np.where(known, values, 0).sum(axis=1)
+        return np.divide(sums, counts, out=np.zeros(len(combinations)), where=counts > 0), counts
+
+    def score_combinations(self, combinations: List[Tuple[List[int], List[int]]],
+                           df_history: pd.DataFrame) -> np.ndarray:
+        """
+        Оценки пачки комбинаций: средняя вероятность чисел поля 1 и поля 2
+        по контексту следующего тиража, шкала 0-100 (50 - нейтральная)
+        """
+        scores = np.full(len(combinations), 50.0)
+        if not self.is_trained or not combinations:
+            return scores
+        
+        try:
+            context = self._next_draw_context(df_history)
+            if context is None:
+                return scores
+            
+            mean_f1, count_f1 = self._mean_probabilities(context['probs_f1'], [list(c[0]) for c in combinations])
+            mean_f2, count_f2 = self._mean_probabilities(context['probs_f2'], [list(c[1]) for c in combinations])
+            
+            # Комбинированная оценка
+            scored = (count_f1 > 0) & (count_f2 > 0)
+            scores[scored] = np.clip((mean_f1[scored] + mean_f2[scored]) / 2 * 100, 0, 100)
+            return scores
+            
+        except Exception as e:
+            logger.error(f"Ошибка оценки комбинаций XGBoost: {e}")
+            return scores
 
     def score_combination(self, field1: List[int], field2: List[int], 
                          df_history: pd.DataFrame) -> float:
@@ -430,53 +672,7 @@ class XGBoostLotteryModel:
         Returns:
             Оценка от 0 до 100
         """
-        if not self.is_trained:
-            return 50.0  # Нейтральная оценка
-        
-        with self._lock:
-            try:
-                # Создаем тестовый датафрейм
-                test_df = pd.DataFrame([{
-                    'Числа_Поле1_list': field1,
-                    'Числа_Поле2_list': field2,
-                    'Тираж': len(df_history) + 1
-                }])
-                
-                # Добавляем историю
-                test_df = pd.concat([test_df] + [df_history.head(50)], ignore_index=True)
-                
-                # Извлекаем признаки
-                X_test, _ = self._extract_features(test_df)
-                
-                if X_test.shape[0] == 0:
-                    return 50.0
-                
-                X_pred = X_test[-1:] if len(X_test) > 0 else X_test
-                
-                # Вычисляем среднюю вероятность для выбранных чисел
-                score_f1 = []
-                for num in field1:
-                    if 1 <= num <= self.field1_max and self.models_f1[num - 1] is not None:
-                        prob = self.models_f1[num - 1].predict_proba(X_pred)[0, 1]
-                        score_f1.append(prob)
-                
-                score_f2 = []
-                for num in field2:
-                    if 1 <= num <= self.field2_max and self.models_f2[num - 1] is not None:
-                        prob = self.models_f2[num - 1].predict_proba(X_pred)[0, 1]
-                        score_f2.append(prob)
-                
-                # Комбинированная оценка
-                if score_f1 and score_f2:
-                    avg_score = (np.mean(score_f1) + np.mean(score_f2)) / 2
-                    # Преобразуем в шкалу 0-100
-                    return min(max(avg_score * 100, 0), 100)
-                else:
-                    return 50.0
-                    
-            except Exception as e:
-                logger.error(f"Ошибка оценки комбинации XGBoost: {e}")
-                return 50.0
+        return float(self.score_combinations([(field1, field2)], df_history)[0])
 
     def get_feature_importance(self, field_type: str = 'field1', number: int = 1) -> Dict[str, float]:
         """
@@ -556,6 +752,70 @@ class XGBoostLotteryModel:
         
         return names
 
+    def _explainer(self, field: str, number: int) -> Optional[Any]:
+        """TreeExplainer модели числа (создается при первом запросе, LRU кэш)"""
+        models = self.models_f1 if field == 'f1' else self.models_f2
+        if not 1 <= number <= len(models) or models[number - 1] is None:
+            return None
+        
+        key = (self._model_version, field, number)
+        with self._explainer_lock:
+            if key in self._explainers:
+                self._explainers.move_to_end(key)
+                return self._explainers[key]
+        
+        explainer = shap.TreeExplainer(models[number - 1])
+        with self._explainer_lock:
+            # Объяснители прошлых поколений моделей больше не нужны
+            for stale in [k for k in self._explainers if k[0] != self._model_version]:
+                del self._explainers[stale]
+            self._explainers[key] = explainer
+            while len(self._explainers) > self.explainer_cache_size:
+                self._explainers.popitem(last=False)
+        return explainer
+
+    def _context_shap(self, context: Dict[str, Any], field: str, number: int) -> Optional[Dict[str, Any]]:
+        """SHAP значения признаков контекста для модели числа (кэшируются в контексте)"""
+        key = (field, number)
+        if key in context['shap']:
+            return context['shap'][key]
+        
+        explainer = self._explainer(field, number)
+        if explainer is None:
+            return None
+        
+        result = self._shap_entry(explainer, context['features'], number)
+        context['shap'][key] = result
+        return result
+
+    @staticmethod
+    def _shap_entry(explainer: Any, features: np.ndarray, number: int) -> Dict[str, Any]:
+        shap_vals = explainer.shap_values(features)
+        return {
+            'number': number,
+            'shap_values': shap_vals[0].tolist() if len(shap_vals) > 0 else [],
+            'base_value': float(np.ravel(explainer.expected_value)[0])
+        }
+
+    def _precompute_shap(self, context: Dict[str, Any]):
+        """
+        Фоновый расчет SHAP значений контекста для всех чисел; объяснители
+        создаются на время расчета и не остаются в памяти
+        """
+        try:
+            for field, models in (('f1', self.models_f1), ('f2', self.models_f2)):
+                for number, model in enumerate(models, start=1):
+                    # Контекст устарел - считать дальше незачем
+                    if self._context is not context:
+                        return
+                    if model is None or (field, number) in context['shap']:
+                        continue
+                    context['shap'][(field, number)] = self._shap_entry(
+                        shap.TreeExplainer(model), context['features'], number
+                    )
+        except Exception as e:
+            logger.warning(f"Фоновый расчет SHAP не выполнен: {e}")
+
     def get_shap_explanation(self, field1: List[int], field2: List[int], 
                             df_history: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -564,81 +824,63 @@ class XGBoostLotteryModel:
         Returns:
             Словарь с SHAP значениями и визуализациями
         """
-        if not self.is_trained or not self.explainers_f1:
+        if not self.is_trained:
             return {'error': 'Модель не обучена или SHAP не инициализирован'}
         
-        with self._lock:
-            try:
-                # Создаем тестовый датафрейм
-                test_df = pd.DataFrame([{
-                    'Числа_Поле1_list': field1,
-                    'Числа_Поле2_list': field2,
-                    'Тираж': len(df_history) + 1
-                }])
-                
-                test_df = pd.concat([test_df] + [df_history.head(50)], ignore_index=True)
-                
-                # Извлекаем признаки
-                X_test, _ = self._extract_features(test_df)
-                
-                if X_test.shape[0] == 0:
-                    return {'error': 'Не удалось извлечь признаки'}
-                
-                X_pred = X_test[-1:] if len(X_test) > 0 else X_test
-                
-                # Получаем SHAP значения для первого числа каждого поля
-                shap_values_f1 = []
-                shap_values_f2 = []
-                
-                # Для field1
-                for num in field1[:1]:  # Берем только первое число для примера
-                    if 1 <= num <= self.field1_max and self.explainers_f1[num - 1] is not None:
-                        shap_vals = self.explainers_f1[num - 1].shap_values(X_pred)
-                        shap_values_f1.append({
-                            'number': num,
-                            'shap_values': shap_vals[0].tolist() if len(shap_vals) > 0 else [],
-                            'base_value': float(self.explainers_f1[num - 1].expected_value)
-                        })
-                
-                # Для field2
-                for num in field2[:1]:  # Берем только первое число для примера
-                    if 1 <= num <= self.field2_max and self.explainers_f2[num - 1] is not None:
-                        shap_vals = self.explainers_f2[num - 1].shap_values(X_pred)
-                        shap_values_f2.append({
-                            'number': num,
-                            'shap_values': shap_vals[0].tolist() if len(shap_vals) > 0 else [],
-                            'base_value': float(self.explainers_f2[num - 1].expected_value)
+        try:
+            # Признаки следующего тиража
+            context = self._next_draw_context(df_history)
+            
+            if context is None:
+                return {'error': 'Не удалось извлечь признаки'}
+            
+            X_pred = context['features']
+            
+            # Получаем SHAP значения для первого числа каждого поля
+            shap_values_f1 = []
+            shap_values_f2 = []
+            
+            # Для field1
+            for num in field1[:1]:  # Берем только первое число для примера
+                explanation = self._context_shap(context, 'f1', num)
+                if explanation is not None:
+                    shap_values_f1.append(explanation)
+            
+            # Для field2
+            for num in field2[:1]:  # Берем только первое число для примера
+                explanation = self._context_shap(context, 'f2', num)
+                if explanation is not None:
+                    shap_values_f2.append(explanation)
+            
+            # Получаем названия признаков
+            feature_names = self._generate_feature_names()
+            
+            # Находим топ важные признаки
+            top_features = []
+            if shap_values_f1 and shap_values_f1[0]['shap_values']:
+                shap_abs = np.abs(shap_values_f1[0]['shap_values'])
+                top_indices = np.argsort(shap_abs)[-10:][::-1]
+                for idx in top_indices:
+                    if idx < len(feature_names):
+                        top_features.append({
+                            'name': feature_names[idx],
+                            'value': float(X_pred[0, idx]) if X_pred.shape[1] > idx else 0,
+                            'shap_value': float(shap_values_f1[0]['shap_values'][idx])
                         })
-                
-                # Получаем названия признаков
-                feature_names = self._generate_feature_names()
-                
-                # Находим топ важные признаки
-                top_features = []
-                if shap_values_f1 and shap_values_f1[0]['shap_values']:
-                    shap_abs = np.abs(shap_values_f1[0]['shap_values'])
-                    top_indices = np.argsort(shap_abs)[-10:][::-1]
-                    for idx in top_indices:
-                        if idx < len(feature_names):
-                            top_features.append({
-                                'name': feature_names[idx],
-                                'value': float(X_pred[0, idx]) if X_pred.shape[1] > idx else 0,
-                                'shap_value': float(shap_values_f1[0]['shap_values'][idx])
-                            })
-                
-                return {
-                    'field1_explanations': shap_values_f1,
-                    'field2_explanations': shap_values_f2,
-                    'feature_names': feature_names[:20],  # Первые 20 для краткости
-                    'top_important_features': top_features,
-                    'prediction_score': self.score_combination(field1, field2, df_history)
-                }
-                
-            except Exception as e:
-                logger.error(f"Ошибка SHAP объяснения: {e}")
-                import traceback
-                traceback.print_exc()
-                return {'error': str(e)}
+            
+            return {
+                'field1_explanations': shap_values_f1,
+                'field2_explanations': shap_values_f2,
+                'feature_names': feature_names[:20],  # Первые 20 для краткости
+                'top_important_features': top_features,
+                'prediction_score': self.score_combination(field1, field2, df_history)
+            }
+            
+        except Exception as e:
+            logger.error(f"Ошибка SHAP объяснения: {e}")
+            import traceback
+            traceback.print_exc()
+            return {'error': str(e)}
 
     def get_metrics(self) -> Dict[str, Any]:
         """Получение метрик производительности модели"""
@@ -650,7 +892,7 @@ class XGBoostLotteryModel:
     def clear_cache(self):
         """Очистка кэша предсказаний"""
         with self._lock:
-            self._prediction_cache.clear()
+            self._context = None
             self._cache_hits = 0
             self._cache_misses = 0
             logger.info("Кэш XGBoost очищен")
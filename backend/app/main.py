@@ -258,6 +258,14 @@ async def lifespan(app: FastAPI):
   except Exception as e:
     print(f"[WARN] Ошибка автообновления данных: {e}")
 
+  # Восстановление байесовских (CDM) моделей из снапшотов - без полного обучения
+  try:
+    from backend.app.core.bayesian.cdm_registry import GLOBAL_CDM_REGISTRY
+    restored = GLOBAL_CDM_REGISTRY.restore_all()
+    print(f"\n[BAYES] CDM модели восстановлены из снапшотов: {', '.join(restored) or 'нет'}")
+  except Exception as e:
+    print(f"[WARN] Ошибка восстановления CDM моделей: {e}")
+
   # Запуск автоматического планировщика
   scheduler_task = None
   try:
@@ -296,7 +304,7 @@ async def lifespan(app: FastAPI):
       if generator and (generator.q_trained or generator.dqn_trained):
         # Сохраняем обученные модели
         if generator.q_trained:
-          q_path = os.path.join(generator.models_dir, "q_agent.pkl")
+          q_path = os.path.join(generator.models_dir, "q_agent.npz")
           generator.q_agent.save(q_path)
           print(f"   [SAVE] Q-агент сохранен для {lottery_type}")
 
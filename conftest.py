@@ -0,0 +1,37 @@
+"""
+Общие фикстуры тестов
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+
+@pytest.fixture
+def make_history():
+  """
+  Фабрика случайной истории тиражей в формате fetch_draws_from_db
+
+  make_history(n, lottery_type='4x20', seed=0, newest_first=True, dates=False):
+  номера тиражей 1..n (по умолчанию новые первыми), числа полей -
+  отсортированные случайные комбинации по конфигурации лотереи.
+  """
+  from backend.app.core.data_manager import LOTTERY_CONFIGS
+
+  def factory(n, lottery_type='4x20', seed=0, newest_first=True, dates=False):
+    config = LOTTERY_CONFIGS[lottery_type]
+    rng = np.random.default_rng(seed)
+
+    def combos(max_num, size):
+      return [sorted(map(int, rng.choice(max_num, size, replace=False) + 1)) for _ in range(n)]
+
+    order = slice(None, None, -1) if newest_first else slice(None)
+    columns = {}
+    if dates:
+      columns['Дата'] = pd.date_range('2024-01-01', periods=n)[order]
+    columns['Тираж'] = np.arange(1, n + 1)[order]
+    columns['Числа_Поле1_list'] = combos(config['field1_max'], config['field1_size'])
+    columns['Числа_Поле2_list'] = combos(config['field2_max'], config['field2_size'])
+    return pd.DataFrame(columns)
+
+  return factory
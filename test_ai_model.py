@@ -0,0 +1,49 @@
+"""
+Тесты для моделей ai_model
+Проверка обучающей выборки Random Forest
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+
+class TestRFTrainingSet:
+  """Тесты для векторной сборки обучающей выборки Random Forest"""
+
+  @pytest.mark.parametrize('lottery_type', ['4x20', '5x36plus'])
+  def test_matches_feature_vector(self, lottery_type):
+    """Строки X и цели совпадают с _create_feature_vector по тому же окну истории"""
+    from backend.app.core.ai_model import RFModel
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+
+    config = LOTTERY_CONFIGS[lottery_type]
+    rng = np.random.default_rng(11)
+    draws = [
+      (list(map(int, rng.choice(config['field1_max'], config['field1_size'], replace=False) + 1)),
+       list(map(int, rng.choice(config['field2_max'], config['field2_size'], replace=False) + 1)))
+      for _ in range(30)
+    ]
+    # Невалидный тираж отбрасывается и не входит в окна
+    df = pd.DataFrame({
+      'Числа_Поле1_list': [f1 for f1, _ in draws[:3]] + [[1]] + [f1 for f1, _ in draws[3:]],
+      'Числа_Поле2_list': [f2 for _, f2 in draws[:3]] + [[1]] + [f2 for _, f2 in draws[3:]]
+    })
+    model = RFModel(config)
+    X, Y_f1, Y_f2 = model._prepare_rf_data(df)
+
+    lookback = 5
+    assert X.dtype == np.float32
+    assert X.shape[0] == len(draws) - lookback
+    assert model._feature_vector_length == X.shape[1]
+    for row, i in enumerate(range(lookback, len(draws))):
+      history = [draws[i - j] for j in range(1, lookback + 1)]
+      expected = model._create_feature_vector(draws[i - 1][0], draws[i - 1][1], history)
+      np.testing.assert_array_equal(X[row], expected)
+      assert [y[row] for y in Y_f1] == draws[i][0]
+      assert [y[row] for y in Y_f2] == draws[i][1]
+
+
+# Запуск тестов
+if __name__ == "__main__":
+  pytest.main([__file__, "-v"])
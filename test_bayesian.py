@@ -0,0 +1,183 @@
+"""
+Тесты для байесовских моделей
+Проверка Dirichlet-Multinomial модели и CDM генераторов
+"""
+
+import pytest
+import numpy as np
+
+
+class TestDirichletModel:
+  """Тесты для векторизованной CDM модели"""
+
+  @pytest.fixture
+  def draws(self):
+    rng = np.random.default_rng(4)
+    return np.array([rng.choice(20, 4, replace=False) for _ in range(200)])
+
+  def test_fit_and_online_update_counts(self, draws):
+    """fit считает частоты как поэлементный подсчёт, update_online их дополняет"""
+    from backend.app.core.bayesian import DirichletMultinomialModel
+
+    model = DirichletMultinomialModel(20, 4, adaptive=False)
+    model.fit(draws[:150])
+    for draw in draws[150:]:
+      model.update_online(draw)
+
+    expected = np.zeros(20)
+    for draw in draws:
+      for number in draw:
+        expected[number] += 1
+
+    assert np.array_equal(model.counts, expected)
+    assert np.allclose(model.alpha, model.concentration + expected)
+    assert model.num_observations == len(draws)
+
+  def test_gumbel_top_k_matches_sequential_sampling(self):
+    """Частоты включения совпадают с выборкой без возвращения пропорционально весам"""
+    from backend.app.core.bayesian.dirichlet_model import gumbel_top_k
+
+    w = np.array([0.4, 0.3, 0.2, 0.1])
+    samples = gumbel_top_k(np.broadcast_to(np.log(w), (100000, 4)), 2, np.random.default_rng(0))
+    frequencies = np.bincount(samples.ravel(), minlength=4) / len(samples)
+
+    # P(i в выборке из 2) = w_i + sum_{j != i} w_j * w_i / (1 - w_j)
+    exact = np.array([w[i] + sum(w[j] * w[i] / (1 - w[j]) for j in range(4) if j != i) for i in range(4)])
+    assert np.allclose(frequencies, exact, atol=0.01)
+    assert np.all(samples[:, 0] < samples[:, 1])
+
+  def test_credible_intervals_and_cross_validation(self, draws):
+    """Интервалы - квантили Beta-маргиналей; кросс-валидация не меняет модель"""
+    from scipy import stats
+    from backend.app.core.bayesian import DirichletMultinomialModel
+
+    model = DirichletMultinomialModel(20, 4)
+    model.fit(draws)
+    alpha_before = model.alpha.copy()
+
+    intervals = model.credible_intervals(0.9)
+    a = model.alpha[3]
+    assert intervals['lower'][3] == pytest.approx(stats.beta.ppf(0.05, a, model.alpha.sum() - a))
+    assert intervals['upper'][3] == pytest.approx(stats.beta.ppf(0.95, a, model.alpha.sum() - a))
+
+    cv = model.cross_validate(draws, folds=4)
+    assert np.isfinite(cv['mean_log_likelihood'])
+    assert 0 <= cv['mean_accuracy'] <= 1
+    assert np.array_equal(model.alpha, alpha_before)
+    assert model.sample_draws(1000).shape == (1000, 4)
+
+
+class TestCDMSimulation:
+  """Тесты для пакетной симуляции CDM генератора"""
+
+  @pytest.mark.parametrize('chunk_tickets', [200_000, 40])
+  def test_simulate_performance_matches_loop(self, chunk_tickets, make_history):
+    """Пакетная симуляция (целиком и по частям) совпадает с поштучным подсчётом на тех же предсказаниях"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.bayesian import CDMGenerator
+    from backend.app.core.prize_probability import category_index_matrix
+
+    config = LOTTERY_CONFIGS['4x20']
+    history = make_history(80, seed=8, newest_first=False)
+    generator = CDMGenerator(config)
+    generator.train(history[:60])
+    test_df = history[60:]
+
+    models = generator.updater.field_models
+    models['field1']._rng = np.random.default_rng(1)
+    models['field2']._rng = np.random.default_rng(2)
+    result = generator.simulate_performance(test_df, n_simulations=5, ticket_price=100,
+                                            chunk_tickets=chunk_tickets)
+
+    # Те же предсказания поштучно: пакеты по chunk симуляций тянутся последовательно
+    chunk = max(1, chunk_tickets // len(test_df))
+    sizes = [min(chunk, 5 - start) * len(test_df) for start in range(0, 5, chunk)]
+    rng1, rng2 = np.random.default_rng(1), np.random.default_rng(2)
+    pred1 = np.concatenate([models['field1'].sample_draws(n, rng=rng1) for n in sizes]) + 1
+    pred2 = np.concatenate([models['field2'].sample_draws(n, rng=rng2) for n in sizes]) + 1
+    index = category_index_matrix(config)
+    names = [c['name'] for c in config['prize_categories']]
+
+    hits = np.zeros(5)
+    roi = []
+    partial_hits = []
+    winning_tickets = []
+    for sim in range(5):
+      won = 0.0
+      partial = 0
+      winning = 0
+      for t, (_, draw) in enumerate(test_df.iterrows()):
+        k = sim * len(test_df) + t
+        m1 = len(set(pred1[k]) & set(draw['Числа_Поле1_list']))
+        m2 = len(set(pred2[k]) & set(draw['Числа_Поле2_list']))
+        hits[m1] += 1
+        partial += m1 >= 3
+        if index[m1, m2] >= 0:
+          payout = config['prize_payouts'].get(names[index[m1, m2]], 0)
+          won += payout
+          winning += payout > 0
+      roi.append((won - 100 * len(test_df)) / (100 * len(test_df)) * 100)
+      partial_hits.append(partial)
+      winning_tickets.append(winning)
+
+    assert result['mean_roi'] == pytest.approx(np.mean(roi))
+    assert [result['hit_distribution'][i] for i in range(5)] == pytest.approx(hits / 5)
+    assert result['mean_partial_hits'] == pytest.approx(np.mean(partial_hits))
+    assert result['mean_winning_tickets'] == pytest.approx(np.mean(winning_tickets))
+
+
+class TestCDMRegistry:
+  """Тесты для реестра живых CDM генераторов"""
+
+  @staticmethod
+  def _draws(df):
+    return [{'draw_number': int(r['Тираж']), 'field1': r['Числа_Поле1_list'],
+             'field2': r['Числа_Поле2_list']} for _, r in df.iterrows()]
+
+  def test_incremental_updates_match_batch_fit(self, tmp_path, make_history):
+    """Инкрементальные обновления накапливают апостериорное как обучение на всей истории"""
+    from backend.app.core.bayesian import CDMRegistry
+
+    history = make_history(80, seed=11, newest_first=False)
+    registry = CDMRegistry(snapshot_dir=str(tmp_path))
+    live = registry.get_or_create('4x20')
+    live.updater.decay_factor = 1.0
+    registry.train('4x20', history[:60])
+    assert registry.on_new_draws('4x20', self._draws(history[60:])) == 20
+
+    full = CDMRegistry(snapshot_dir=str(tmp_path / 'full')).get_or_create('4x20')
+    full.train(history)
+
+    for field in ('field1', 'field2'):
+      np.testing.assert_allclose(live.updater.prior_managers[field].posterior_alpha,
+                                 full.updater.prior_managers[field].posterior_alpha)
+      np.testing.assert_allclose(live.updater.field_models[field].counts,
+                                 full.updater.field_models[field].counts)
+    assert live.last_draw_number == 80
+
+  def test_snapshot_roundtrip_and_stale_draws(self, tmp_path, make_history):
+    """Снапшот восстанавливает модель без обучения, старые тиражи не применяются повторно"""
+    from backend.app.core.bayesian import CDMRegistry
+
+    history = make_history(80, seed=11, newest_first=False)
+    registry = CDMRegistry(snapshot_dir=str(tmp_path))
+    registry.train('4x20', history[:70])
+    registry.on_new_draws('4x20', self._draws(history[65:75]))
+    live = registry.generators['4x20']
+    assert live.last_draw_number == 75
+
+    restored = CDMRegistry(snapshot_dir=str(tmp_path)).get_or_create('4x20')
+    assert restored.is_trained and restored.last_draw_number == 75
+    for field in ('field1', 'field2'):
+      np.testing.assert_allclose(restored.updater.field_models[field].alpha,
+                                 live.updater.field_models[field].alpha)
+      np.testing.assert_allclose(restored.updater.prior_managers[field].posterior_alpha,
+                                 live.updater.prior_managers[field].posterior_alpha)
+
+    # Не созданный генератор не обучается на пути загрузки
+    assert CDMRegistry(snapshot_dir=str(tmp_path / 'empty')).on_new_draws('4x20', self._draws(history)) == 0
+
+
+# Запуск тестов
+if __name__ == "__main__":
+  pytest.main([__file__, "-v"])
@@ -0,0 +1,114 @@
+"""
+Тесты для генетического модуля
+Проверка общего кэша fitness и ранга комбинаций
+"""
+
+from itertools import combinations
+
+import pytest
+
+from backend.app.core.genetic.fitness_cache import SharedFitnessCache
+from backend.app.core.utils import combination_rank, combination_unrank
+
+
+class TestSharedFitnessCache:
+  """Тесты для LRU-кэша fitness на массивах"""
+
+  def test_eviction_order(self):
+    """При переполнении вытесняется самая старая запись"""
+    cache = SharedFitnessCache(capacity=3)
+    for i in range(4):
+      cache.put(('4x20', i), float(i))
+
+    assert len(cache) == 3
+    assert cache.get(('4x20', 0)) is None
+    assert [cache.get(('4x20', i)) for i in (1, 2, 3)] == [1.0, 2.0, 3.0]
+    assert cache.evictions == 1
+
+  def test_get_and_put_move_to_front(self):
+    """get и повторный put делают запись самой свежей"""
+    cache = SharedFitnessCache(capacity=3)
+    for i in range(3):
+      cache.put(('4x20', i), float(i))
+
+    assert cache.get(('4x20', 0)) == 0.0
+    cache.put(('4x20', 3), 3.0)
+    assert cache.get(('4x20', 1)) is None
+
+    cache.put(('4x20', 2), 20.0)
+    cache.put(('4x20', 4), 4.0)
+    assert cache.get(('4x20', 0)) is None
+    assert cache.get(('4x20', 2)) == 20.0
+    assert cache.get(('4x20', 3)) == 3.0
+    assert cache.get(('4x20', 4)) == 4.0
+
+  def test_invalidate_reuses_slots(self):
+    """invalidate(lottery) освобождает слоты, новые записи занимают их без вытеснения"""
+    cache = SharedFitnessCache(capacity=4)
+    cache.put(('4x20', 1), 1.0)
+    cache.put(('5x36plus', 1), 2.0)
+    cache.put(('4x20', 2), 3.0)
+    cache.put(('5x36plus', 2), 4.0)
+
+    cache.invalidate('4x20')
+    assert len(cache) == 2
+    assert cache.get(('4x20', 1)) is None
+
+    cache.put(('4x20', 3), 5.0)
+    cache.put(('4x20', 4), 6.0)
+    assert len(cache) == 4
+    assert cache.evictions == 0
+    assert cache.get(('5x36plus', 1)) == 2.0
+
+    # Порядок LRU после освобождения слотов не нарушен
+    cache.put(('4x20', 5), 7.0)
+    assert cache.get(('5x36plus', 2)) is None
+    assert cache.evictions == 1
+
+  def test_clear(self):
+    """clear удаляет все записи и статистику, кэш продолжает работать"""
+    cache = SharedFitnessCache(capacity=2)
+    cache.put(('4x20', 1), 1.0)
+    cache.get(('4x20', 1))
+    cache.clear()
+
+    assert len(cache) == 0
+    assert cache.get_stats()['hits'] == 0
+    cache.put(('4x20', 2), 2.0)
+    cache.put(('4x20', 3), 3.0)
+    assert cache.get(('4x20', 2)) == 2.0
+    assert cache.get(('4x20', 3)) == 3.0
+
+  def test_invalid_capacity(self):
+    """Кэш нулевой емкости не создается"""
+    with pytest.raises(ValueError):
+      SharedFitnessCache(capacity=0)
+
+
+class TestCombinationRank:
+  """Тесты для ранга комбинаций"""
+
+  config = {'field1_size': 3, 'field2_size': 2, 'field1_max': 7, 'field2_max': 4}
+
+  def test_round_trip_and_injectivity(self):
+    """Ранги всех комбинаций различны, покрывают диапазон и восстанавливаются обратно"""
+    ranks = set()
+    for field1 in combinations(range(1, 8), 3):
+      for field2 in combinations(range(1, 5), 2):
+        rank = combination_rank(list(reversed(field1)), field2, self.config)
+        assert combination_unrank(rank, self.config) == (list(field1), list(field2))
+        ranks.add(rank)
+
+    assert ranks == set(range(35 * 6))
+
+  @pytest.mark.parametrize('field1,field2', [
+    ([1, 1, 2], [1, 2]),
+    ([1, 2], [1, 2]),
+    ([1, 2, 8], [1, 2]),
+    ([0, 1, 2], [1, 2]),
+    ([1, 2, 3], [3, 3])
+  ])
+  def test_invalid_combination(self, field1, field2):
+    """Повторы, неверное количество и числа вне диапазона отклоняются"""
+    with pytest.raises(ValueError):
+      combination_rank(field1, field2, self.config)
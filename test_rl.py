@@ -12,6 +12,7 @@ import os
 
 from backend.app.core.rl.environment import LotteryEnvironment, LotteryState
 from backend.app.core.rl.q_agent import QLearningAgent
+from backend.app.core.rl.q_table import CompactQTable
 from backend.app.core.rl.dqn_agent import DQNAgent
 from backend.app.core.rl.state_encoder import StateEncoder, ActionEncoder
 from backend.app.core.rl.reward_calculator import RewardCalculator, ShapedRewardCalculator
@@ -91,6 +92,22 @@ class TestLotteryEnvironment:
     assert 0 <= state.parity_ratio <= 1
     assert state.mean_gap > 0
 
+  def test_state_table(self, lottery_config, sample_history):
+    """Тест предвычисленной таблицы состояний"""
+    env = LotteryEnvironment(sample_history, lottery_config, window_size=10)
+
+    assert env.state_table.shape == (len(sample_history) + 1, env.get_state_space_size())
+    assert env.state_table.dtype == np.float32
+
+    position = 30
+    window = sample_history.iloc[position - 10:position]
+    numbers_f1 = {n for nums in window['field1'] for n in nums}
+    numbers_f2 = {n for nums in window['field2'] for n in nums}
+
+    state = env._compute_state(position)
+    assert state.universe_length == len(numbers_f1) + len(numbers_f2)
+    np.testing.assert_allclose(env.get_state_vector(position), state.to_vector(), rtol=1e-6)
+
 
 class TestStateEncoder:
   """Тесты для кодировщика состояний"""
@@ -194,6 +211,22 @@ class TestRewardCalculator:
     # Должна быть награда за 2 совпадения + proximity bonus
     assert reward > -calc.scheme.ticket_cost
 
+  def test_exact_expected_value(self):
+    """Точное матожидание совпадает с полным перебором тиражей"""
+    from itertools import combinations
+
+    small_config = {'field1_size': 3, 'field2_size': 1, 'field1_max': 7, 'field2_max': 3}
+    calc = RewardCalculator(small_config)
+
+    ticket_f1, ticket_f2 = [1, 2, 3], [1]
+    rewards = [
+      calc.calculate(ticket_f1, ticket_f2, list(d1), list(d2))
+      for d1 in combinations(range(1, 8), 3)
+      for d2 in combinations(range(1, 4), 1)
+    ]
+
+    assert calc.calculate_expected_value() == pytest.approx(np.mean(rewards))
+
 
 class TestQLearningAgent:
   """Тесты для Q-Learning агента"""
@@ -239,25 +272,120 @@ class TestQLearningAgent:
     agent = QLearningAgent(lottery_config)
 
     # Добавляем данные в Q-таблицу
-    agent.q_table['test_state']['test_action'] = 0.5
+    action_key = agent.get_action_key(([1, 2, 3, 4, 5], [2]))
+    agent.q_table.set(123, action_key, 0.5)
     agent.total_episodes = 100
 
     # Сохраняем
-    with tempfile.NamedTemporaryFile(suffix='.pkl', delete=False) as tmp:
-      agent.save(tmp.name)
+    with tempfile.NamedTemporaryFile(suffix='.npz', delete=False) as tmp:
       tmp_path = tmp.name
+    agent.save(tmp_path)
 
     # Создаем нового агента и загружаем
     new_agent = QLearningAgent(lottery_config)
     new_agent.load(tmp_path)
 
-    assert 'test_state' in new_agent.q_table
-    assert new_agent.q_table['test_state']['test_action'] == 0.5
+    assert 123 in new_agent.q_table
+    assert new_agent.q_table.get(123, action_key) == 0.5
     assert new_agent.total_episodes == 100
 
+    # Запись в отображенную в память таблицу
+    new_agent.q_table.set(123, action_key, 0.7)
+    assert new_agent.q_table.get(123, action_key) == 0.7
+
     # Удаляем временный файл
     os.unlink(tmp_path)
 
+  def test_inference_keeps_table_readonly(self, lottery_config, sample_history):
+    """Выбор действия без обучения не копирует mmap-таблицу и не добавляет состояния"""
+    agent = QLearningAgent(lottery_config)
+    env = LotteryEnvironment(sample_history, lottery_config)
+    state = env.reset()
+    agent.q_table.set(123, agent.get_action_key(([1, 2, 3, 4, 5], [2])), 0.5)
+
+    with tempfile.NamedTemporaryFile(suffix='.npz', delete=False) as tmp:
+      tmp_path = tmp.name
+    agent.save(tmp_path)
+
+    new_agent = QLearningAgent(lottery_config)
+    new_agent.load(tmp_path)
+    size = len(new_agent.q_table)
+
+    new_agent.choose_action(state, training=False)
+
+    assert new_agent.q_table._readonly
+    assert len(new_agent.q_table) == size
+
+    os.unlink(tmp_path)
+
+  def test_load_legacy_pickle(self, lottery_config):
+    """Тест конвертации старого pickle-формата"""
+    agent = QLearningAgent(lottery_config)
+    state_str = 'universe_length:3|parity_ratio:2|mean_gap:1'
+    action_str = agent.action_encoder.encode([5, 4, 3, 2, 1], [3])
+
+    save_data = {
+      'q_table': {state_str: {action_str: 1.25}},
+      'state_visits': {state_str: 1},
+      'action_visits': {state_str: {action_str: 1}},
+      'epsilon': 0.5, 'total_episodes': 7, 'total_steps': 70,
+      'total_reward': -10.0, 'wins': 1, 'learning_history': [],
+      'best_actions': [],
+      'config': {'learning_rate': 0.1, 'discount_factor': 0.95,
+                 'epsilon_decay': 0.995, 'epsilon_min': 0.01}
+    }
+    with tempfile.NamedTemporaryFile(suffix='.pkl', delete=False) as tmp:
+      import pickle
+      pickle.dump(save_data, tmp)
+      tmp_path = tmp.name
+
+    agent.load(tmp_path)
+    state_key = agent.state_encoder.discrete_key_to_index(state_str)
+
+    assert agent.q_table.get(state_key, agent.get_action_key(([1, 2, 3, 4, 5], [3]))) == 1.25
+    assert agent.total_episodes == 7
+
+    os.unlink(tmp_path)
+
+
+class TestCompactQTable:
+  """Тесты для компактной Q-таблицы"""
+
+  def test_growth_and_top_k(self):
+    """Тест роста строк/индексов и выборки лучших действий"""
+    table = CompactQTable(initial_capacity=16)
+    rng = np.random.default_rng(0)
+    reference = {}
+
+    for state in range(20):
+      for action in rng.choice(10 ** 9, size=50, replace=False):
+        value = float(rng.normal())
+        table.set(state, int(action), value)
+        reference[(state, int(action))] = value
+
+    assert len(table) == 20
+    assert table.num_entries == len(reference)
+    assert all(table.get(s, a) == v for (s, a), v in reference.items())
+
+    row = sorted(((a, v) for (s, a), v in reference.items() if s == 3), key=lambda x: -x[1])
+    assert table.top_k(3, 5) == row[:5]
+    assert table.max_q(3) == row[0][1]
+    assert table.best_action(3) == row[0][0]
+    assert table.best_action(999) is None
+
+  def test_prune_states(self):
+    """Тест удаления редко посещаемых состояний"""
+    table = CompactQTable()
+    for state in range(10):
+      for _ in range(state + 1):
+        table.record_visit(state, state * 10)
+      table.set(state, state * 10 + 1, float(state))
+
+    assert table.prune_states(0.2) == 2
+    assert 0 not in table and 1 not in table
+    assert table.get(9, 91) == 9.0
+    assert table.num_entries == 16
+
 
 class TestDQNAgent:
   """Тесты для DQN агента"""
@@ -305,6 +433,181 @@ class TestDQNAgent:
 
     assert len(agent.memory) == 1
 
+  def test_replay_buffer_ring(self):
+    """Тест кольцевого буфера: перезапись и выборка"""
+    from backend.app.core.rl.dqn_agent import ReplayBuffer
+
+    buffer = ReplayBuffer(capacity=5, state_size=3, action_size=2)
+    for i in range(8):
+      buffer.push(np.full(3, i, dtype=np.float32), ([i], [i]), float(i), np.zeros(3), i % 2 == 0)
+
+    assert len(buffer) == 5
+    batch = buffer.sample(16)
+    assert batch['states'].shape == (16, 3)
+    assert set(batch['rewards'].tolist()) <= {3.0, 4.0, 5.0, 6.0, 7.0}
+
+  def test_prioritized_replay_buffer(self):
+    """Тест приоритизированной выборки и сохранения буфера"""
+    from backend.app.core.rl.dqn_agent import ReplayBuffer
+
+    buffer = ReplayBuffer(capacity=8, state_size=2, action_size=2, prioritized=True)
+    buffer.push_batch(np.zeros((8, 2), dtype=np.float32), np.ones((8, 2), dtype=np.int16),
+                      np.arange(8, dtype=np.float32), np.zeros((8, 2), dtype=np.float32),
+                      np.zeros(8, dtype=bool))
+    buffer.update_priorities(np.arange(8), np.array([0, 0, 0, 0, 0, 0, 0, 100.0]))
+
+    batch = buffer.sample(64)
+    assert (batch['indices'] == 7).mean() > 0.5
+    assert batch['weights'].max() == pytest.approx(1.0)
+
+    restored = ReplayBuffer(capacity=8, state_size=2, action_size=2, prioritized=True)
+    restored.load_state_dict(buffer.state_dict())
+    assert len(restored) == 8
+    np.testing.assert_allclose(restored.tree.priorities(np.arange(8)), buffer.tree.priorities(np.arange(8)))
+
+  def test_save_load_with_memory(self, lottery_config, sample_history):
+    """Тест сохранения буфера вместе с чекпоинтом"""
+    agent = DQNAgent(lottery_config, device='cpu')
+    env = LotteryEnvironment(sample_history, lottery_config)
+    state = env.reset()
+    action = agent.choose_action(state)
+    next_state, reward, done, _ = env.step(action)
+    agent.remember(state, action, reward, next_state, done)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+      path = os.path.join(tmpdir, 'dqn.pth')
+      agent.save(path)
+
+      loaded = DQNAgent(lottery_config, device='cpu')
+      loaded.load(path)
+
+    assert len(loaded.memory) == 1
+    np.testing.assert_array_equal(loaded.memory.states[0], state.to_vector())
+
+  def test_vectorized_training(self, lottery_config, sample_history):
+    """Тест обучения на нескольких параллельных средах"""
+    agent = DQNAgent(lottery_config, device='cpu', batch_size=8)
+    stats = agent.train(sample_history, num_episodes=4, window_size=10, verbose=False, num_envs=4)
+
+    assert stats['total_episodes'] == 4
+    assert len(agent.memory) > 0
+
+
+class TestVectorizedEnvironment:
+  """Тесты для векторизованной среды"""
+
+  def test_step_matches_single_env(self, lottery_config, sample_history):
+    """Совпадения векторизованного шага совпадают с одиночной средой"""
+    from backend.app.core.rl.vector_env import VectorizedLotteryEnvironment
+
+    env = LotteryEnvironment(sample_history, lottery_config, window_size=10)
+    vec_env = VectorizedLotteryEnvironment(env, num_envs=3)
+
+    positions = np.array([20, 30, 40])
+    states = vec_env.reset(positions)
+    np.testing.assert_array_equal(states, env.state_table[positions])
+
+    actions_f1 = np.array([[1, 5, 10, 15, 20], [1, 2, 3, 4, 5], [6, 7, 8, 9, 11]])
+    actions_f2 = np.array([[1], [2], [1]])
+    next_states, rewards, dones, info = vec_env.step(actions_f1, actions_f2)
+
+    assert next_states.shape == (3, env.get_state_space_size())
+    assert rewards.shape == (3,)
+    np.testing.assert_array_equal(info['matches_field1'], [5, 2, 0])
+    np.testing.assert_array_equal(info['matches_field2'], [1, 0, 1])
+    assert rewards[0] > rewards[1]
+
+  @pytest.mark.parametrize('config_name', ['4x20', '5x36plus'])
+  def test_reward_table_matches_scalar_calculator(self, config_name, monkeypatch):
+    """Таблица наград совпадает со скалярной наградой для каждой пары (совпадения_поле1, совпадения_поле2)"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.rl.improved_rewards import ImprovedRewardCalculator
+    from backend.app.core.rl.vector_env import VectorizedLotteryEnvironment
+
+    config = LOTTERY_CONFIGS[config_name]
+    history = pd.DataFrame([{
+      'draw_date': datetime.now() - timedelta(days=60 - i),
+      'draw_number': i + 1,
+      'field1': list(range(1, config['field1_size'] + 1)),
+      'field2': list(range(1, config['field2_size'] + 1))
+    } for i in range(60)])
+    env = LotteryEnvironment(history, config, window_size=10)
+    env.reward_calculator = ImprovedRewardCalculator(config)
+    vec_env = VectorizedLotteryEnvironment(env, num_envs=1)
+
+    # Бонусы за паттерн, разнообразие и исследование зависят от комбинации, а не от совпадений
+    calculator = ImprovedRewardCalculator(config)
+    monkeypatch.setattr(calculator, '_has_interesting_pattern', lambda numbers: False)
+    monkeypatch.setattr(calculator, '_calculate_diversity', lambda numbers: 0.0)
+    actual_f1 = list(range(1, config['field1_size'] + 1))
+    actual_f2 = list(range(1, config['field2_size'] + 1))
+    for m1 in range(config['field1_size'] + 1):
+      for m2 in range(config['field2_size'] + 1):
+        predicted_f1 = actual_f1[:m1] + list(range(config['field1_max'] - config['field1_size'] + m1 + 1,
+                                                   config['field1_max'] + 1))
+        predicted_f2 = actual_f2[:m2] + list(range(config['field2_max'] - config['field2_size'] + m2 + 1,
+                                                   config['field2_max'] + 1))
+        reward, info = calculator.calculate_reward(predicted_f1, predicted_f2, actual_f1, actual_f2)
+        assert (info['matches_f1'], info['matches_f2']) == (m1, m2)
+        assert vec_env.reward_table[m1, m2] == pytest.approx(reward - info['exploration_reward'])
+
+
+class TestBatchedEvaluation:
+  """Тесты для пакетной оценки агентов"""
+
+  def test_predict_batch_matches_predict(self, lottery_config, sample_history):
+    """Тест совпадения пакетных и поштучных предсказаний DQN"""
+    agent = DQNAgent(lottery_config, device='cpu')
+    env = LotteryEnvironment(sample_history, lottery_config, window_size=20)
+    positions = np.arange(20, 40)
+
+    field1, field2 = agent.predict_batch(env, positions)
+
+    for i, position in enumerate(positions):
+      f1, f2 = agent.predict(env._compute_state(int(position)))
+      assert list(field1[i]) == sorted(f1)
+      assert list(field2[i]) == sorted(f2)
+
+  def test_validate_agent(self, lottery_config, sample_history):
+    """Тест пакетной валидации агента"""
+    from backend.app.core.rl.validation_utils import PerformanceValidator, RealisticRewardCalculator
+
+    agent = QLearningAgent(lottery_config)
+    validator = PerformanceValidator(RealisticRewardCalculator(lottery_config))
+    metrics = validator.validate_agent(agent, sample_history, lottery_config, num_episodes=10)
+
+    assert metrics.total_games == 10 * len(sample_history)
+    assert metrics.biggest_win >= metrics.biggest_loss
+    assert np.isfinite(metrics.average_reward)
+
+
+class TestTrainingOrchestrator:
+  """Тесты для оркестратора обучения"""
+
+  def test_run_job_inline(self, sample_history):
+    """Тест задачи обучения: прогресс, статус и атомарный чекпоинт"""
+    from backend.app.core.rl.training_orchestrator import TrainingStatusStore, _run_training_job
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+      store = TrainingStatusStore(os.path.join(tmp_dir, '_jobs'))
+      job = {
+        'job_id': 'test-q_learning-1',
+        'lottery_type': '5x36plus',
+        'agent': 'q_learning',
+        'episodes': 3,
+        'window_size': 20,
+        'num_envs': 1,
+        'models_dir': os.path.join(tmp_dir, '5x36plus')
+      }
+      result = _run_training_job(job, store.status_dir, 1, sample_history)
+
+      status = store.get('test-q_learning-1')
+      assert status['status'] == 'completed'
+      assert status['episodes_done'] == 3
+      assert status['progress'] == 100.0
+      assert os.path.exists(result['checkpoint'])
+      assert [name for name in os.listdir(job['models_dir']) if name.endswith('.tmp')] == []
+
 
 class TestRLGenerator:
   """Тесты для RL генератора"""
@@ -317,6 +620,16 @@ class TestRLGenerator:
     assert not generator.q_trained
     assert not generator.dqn_trained
 
+  def test_normalize_confidence_vectorized(self, lottery_config):
+    """Нормализация массива совпадает с поэлементной для обоих агентов"""
+    generator = RLGenerator(lottery_config, use_gpu=False)
+    values = np.array([-250.0, -3.0, 0.0, 7.5, 400.0])
+
+    for agent_type in ('q', 'dqn'):
+      normalized = generator._normalize_confidence(values, agent_type)
+      assert isinstance(generator._normalize_confidence(values[0], agent_type), float)
+      np.testing.assert_allclose(normalized, [generator._normalize_confidence(v, agent_type) for v in values])
+
   def test_generate_combinations(self, lottery_config, sample_history):
     """Тест генерации комбинаций"""
     import logging
@@ -0,0 +1,260 @@
+"""
+Тесты для симуляций и стратегий
+Проверка таблиц призов, бэктестера, банкролла и сравнения методов
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+
+class TestPrizeProbability:
+  """Тесты для точных вероятностей призовых категорий"""
+
+  def test_prize_table_5x36plus(self):
+    """Вероятности категорий 5x36plus совпадают с известными шансами"""
+    from math import comb
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.prize_probability import build_prize_table
+
+    table = build_prize_table(LOTTERY_CONFIGS['5x36plus'])
+    probs = dict(zip([c['name'] for c in table.categories], table.probabilities))
+
+    assert probs["5+1 (Суперприз)"] == pytest.approx(1 / (comb(36, 5) * 4))
+    assert probs["5+0"] == pytest.approx(3 / (comb(36, 5) * 4))
+    assert probs["2 угаданных"] == pytest.approx(comb(5, 2) * comb(31, 3) / comb(36, 5))
+    assert table.joint_probabilities.sum() == pytest.approx(1.0)
+    assert table.expected_payout == pytest.approx(float(np.dot(table.probabilities, table.payouts)))
+
+  def test_prize_table_matches_enumeration(self):
+    """Таблица призов 4x20 совпадает с перебором исходов по категориям"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.prize_probability import build_prize_table, match_distribution
+
+    config = LOTTERY_CONFIGS['4x20']
+    table = build_prize_table(config)
+    p1 = match_distribution(20, 4)
+
+    for category, prob in zip(table.categories, table.probabilities):
+      assert prob == pytest.approx(p1[category['f1']] * p1[category['f2']])
+
+    summary = table.summary(ticket_price=100, num_tickets=10)
+    assert summary['expected_payout'] == pytest.approx(table.expected_payout * 10)
+    assert summary['expected_value'] == pytest.approx(table.expected_payout * 10 - 1000)
+
+    totals = table.sample_total_payouts(num_tickets=10, num_samples=50)
+    assert totals.shape == (50,)
+    assert np.all(totals >= 0)
+
+
+class TestHistoricalBacktester:
+  """Тесты для векторизованного бэктеста на битовых масках"""
+
+  def test_matches_set_intersection(self):
+    """Выплаты совпадают с поштучной проверкой по категориям конфигурации"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.backtester import HistoricalBacktester
+
+    config = LOTTERY_CONFIGS['5x36plus']
+    rng = np.random.default_rng(0)
+
+    def random_ticket():
+      return (sorted(rng.choice(36, 5, replace=False) + 1), sorted(rng.choice(4, 1, replace=False) + 1))
+
+    tickets = [random_ticket() for _ in range(40)]
+    draws = [random_ticket() for _ in range(60)]
+    df_draws = pd.DataFrame({
+      'Числа_Поле1_list': [list(map(int, d[0])) for d in draws],
+      'Числа_Поле2_list': [list(map(int, d[1])) for d in draws]
+    })
+
+    def reference_payout(ticket, draw):
+      m1 = len(set(ticket[0]) & set(draw[0]))
+      m2 = len(set(ticket[1]) & set(draw[1]))
+      for category in config['prize_categories']:
+        if (category['f1'] is None or category['f1'] == m1) and (category['f2'] is None or category['f2'] == m2):
+          return config['prize_payouts'][category['name']]
+      return 0
+
+    expected = np.array([[reference_payout(t, d) for d in draws] for t in tickets], dtype=float)
+
+    backtester = HistoricalBacktester(config)
+    result = backtester.backtest_portfolio(tickets, df_draws, by_category=True, chunk_size=16)
+
+    np.testing.assert_allclose(result['draw_payouts'], expected.sum(axis=0))
+    np.testing.assert_allclose(result['ticket_payouts'], expected.sum(axis=1))
+    assert np.array_equal(result['draw_won'], (expected > 0).any(axis=0))
+    assert sum(result['wins_by_category'].values()) == int((expected > 0).sum())
+
+    pairs = tickets + tickets
+    per_draw = backtester.backtest_per_draw(pairs, df_draws.iloc[:40], tickets_per_draw=2)
+    expected_pairs = np.array([reference_payout(pairs[i], draws[i // 2]) for i in range(80)])
+    np.testing.assert_allclose(per_draw['draw_payouts'], expected_pairs.reshape(40, 2).sum(axis=1))
+
+  def test_betting_strategy_scan(self):
+    """Мартингейл удваивает ставку после проигрыша и сбрасывает после выигрыша"""
+    from backend.app.core.backtester import apply_betting_strategy
+
+    payouts = np.array([0.0, 0.0, 500.0, 0.0])
+    scan = apply_betting_strategy(payouts, payouts > 0, 'martingale', base_bet=100, initial_bankroll=10000)
+
+    np.testing.assert_allclose(scan['bets'], [100, 200, 400, 100])
+    np.testing.assert_allclose(scan['prizes'], [0, 0, 2000, 0])
+    assert scan['bankroll'][-1] == pytest.approx(10000 - 800 + 2000)
+
+
+class TestBankrollSimulator:
+  """Тесты для векторизованной симуляции банкролла"""
+
+  def test_matches_scalar_loop(self):
+    """Синхронные траектории совпадают с пошаговым расчетом BankrollManager"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.prize_probability import build_prize_table
+    from backend.app.core.bankroll_manager import BankrollManager
+    from backend.app.core.bankroll_simulator import VectorizedBankrollSimulator
+
+    table = build_prize_table(LOTTERY_CONFIGS['4x20'])
+    simulator = VectorizedBankrollSimulator(table, ticket_price=100, initial_bankroll=2000)
+    outcomes = simulator.sample_outcomes(50, 40, rng=np.random.default_rng(1))
+
+    for strategy in ['fixed', 'kelly', 'martingale', 'fibonacci', 'percentage']:
+      paths = simulator.run(outcomes, strategy, base_bet=100, risk_level=0.2)
+
+      for sim_idx in range(outcomes.shape[0]):
+        mgr = BankrollManager(initial_bankroll=2000, ticket_cost=100)
+        bankroll, losses = 2000.0, 0
+        for outcome in outcomes[sim_idx]:
+          mgr.current_bankroll = bankroll
+          bet = mgr.calculate_bet_size(
+            strategy, win_probability=table.win_probability,
+            odds=table.average_prize / 100, current_streak=losses
+          )
+          bet = min(bet, bankroll * 0.2)
+          payout = simulator.outcome_payouts[outcome]
+          bankroll += payout * bet / 100 - bet
+          losses = 0 if payout > 0 else losses + 1
+          if bankroll <= 0:
+            break
+
+        assert paths['final_bankroll'][0, sim_idx] == pytest.approx(bankroll), strategy
+
+  def test_grid_search(self):
+    """Сетка параметров считается на общих исходах"""
+    from backend.app.core.prize_probability import GLOBAL_PRIZE_ENGINE
+    from backend.app.core.bankroll_simulator import VectorizedBankrollSimulator
+
+    simulator = VectorizedBankrollSimulator(GLOBAL_PRIZE_ENGINE.get_table('5x36plus'), 100, 5000)
+    outcomes = simulator.sample_outcomes(200, 30)
+
+    results = simulator.grid_search(outcomes, 'kelly', [50, 100], [0.01, 0.05], [0.1, 0.5])
+    assert len(results) == 8
+    assert all(0 <= r['survival_rate'] <= 100 for r in results)
+    assert all(r['cvar_95'] <= r['var_95'] + 1e-9 for r in results)
+
+    single = simulator.run(outcomes, 'kelly', 50, 0.01, 0.1)
+    match = next(r for r in results if (r['base_bet'], r['risk_level'], r['fraction']) == (50, 0.01, 0.1))
+    assert match['median_final_bankroll'] == pytest.approx(float(np.median(single['final_bankroll'][0])))
+
+
+class TestMethodComparison:
+  """Тесты для сравнения методов генерации"""
+
+  @pytest.fixture
+  def draws_history(self, make_history):
+    return make_history(60, newest_first=False, dates=True)
+
+  def test_shared_history_roundtrip(self, draws_history):
+    """История восстанавливается из разделяемой памяти без потерь"""
+    from backend.app.core.method_comparison import SharedDrawHistory
+
+    shared = SharedDrawHistory(draws_history)
+    try:
+      shm, restored = SharedDrawHistory.attach(shared.descriptor())
+      shm.close()
+    finally:
+      shared.close()
+
+    assert restored['Числа_Поле1_list'].tolist() == draws_history['Числа_Поле1_list'].tolist()
+    assert restored['Числа_Поле2_list'].tolist() == draws_history['Числа_Поле2_list'].tolist()
+    assert restored['Тираж'].tolist() == draws_history['Тираж'].tolist()
+
+  def test_seeded_and_cached(self, draws_history):
+    """Одинаковый сид дает одинаковые результаты, полные сравнения кэшируются"""
+    from backend.app.core.method_comparison import MethodComparisonRunner
+
+    runner = MethodComparisonRunner(cpu_budget=1)
+    first = runner.compare('4x20', draws_history, methods=['random'], num_simulations=30,
+                           seed=3, parallel=False)
+    second = runner.compare('4x20', draws_history, methods=['random'], num_simulations=30,
+                            seed=3, parallel=False, use_cache=False)
+    cached = runner.compare('4x20', draws_history, methods=['random'], num_simulations=30,
+                            seed=3, parallel=False)
+
+    assert first['results'][0]['scores'] == second['results'][0]['scores']
+    assert first['results'][0]['wins'] == second['results'][0]['wins']
+    assert not first['cached'] and cached['cached']
+
+  def test_partial_results(self, draws_history):
+    """При исчерпании бюджета времени возвращается частичный результат"""
+    from backend.app.core.method_comparison import run_method_trials
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+
+    raw = run_method_trials('random', draws_history, LOTTERY_CONFIGS['4x20'], 10 ** 7, seed=1,
+                            time_budget=0.2, partial_results=True)
+    assert raw['status'] == 'partial'
+    assert 0 < raw['completed'] < 10 ** 7
+
+  def test_global_rng_untouched(self, draws_history):
+    """Прогон метода не пересеивает общие random и np.random"""
+    import random
+    from backend.app.core.method_comparison import run_method_trials
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+
+    py_state, np_state = random.getstate(), np.random.get_state()
+    run_method_trials('random', draws_history, LOTTERY_CONFIGS['4x20'], 5, seed=1)
+
+    assert random.getstate() == py_state
+    assert all(np.array_equal(a, b) for a, b in zip(np.random.get_state(), np_state))
+
+  def test_thread_budget_split(self):
+    """Потоки задач делят бюджет ядер между одновременно работающими процессами"""
+    from backend.app.core.method_comparison import MethodComparisonRunner
+
+    runner = MethodComparisonRunner(cpu_budget=8)
+    assert runner.threads_for('ai', 5) == 1
+    assert runner.threads_for('ai', 2) == 2
+    assert runner.threads_for('ai', 2, {'ai': {'threads': 6}}) == 4
+    assert MethodComparisonRunner(cpu_budget=2).threads_for('ai', 5) == 1
+
+  def test_ai_uses_api_model_snapshot(self, draws_history):
+    """Воркер получает обученную модель API, а не обучает свою"""
+    from backend.app.core import ai_model
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.method_comparison import MethodComparisonRunner, _install_rf_model
+
+    runner = MethodComparisonRunner(cpu_budget=2)
+    api_model = ai_model.RFModel(LOTTERY_CONFIGS['4x20'], n_estimators=5)
+    api_model.train(draws_history)
+    ai_model.GLOBAL_MODEL_MANAGER.set_rf_model('4x20', api_model)
+    try:
+      snapshot = runner.rf_snapshot('4x20', draws_history)
+      assert runner.rf_snapshot('4x20', draws_history) is snapshot
+
+      _install_rf_model('4x20', snapshot, threads=1)
+      installed = ai_model.GLOBAL_MODEL_MANAGER.get_rf_model('4x20', LOTTERY_CONFIGS['4x20'])
+      assert installed is not api_model and installed.is_trained
+      assert installed.train_version == api_model.train_version
+      assert all(m.n_jobs == 1 for m in installed.models_f1 + installed.models_f2)
+
+      # Переобучение модели API дает новый снапшот
+      api_model.train(draws_history)
+      assert runner.rf_snapshot('4x20', draws_history)['token'] != snapshot['token']
+    finally:
+      runner.shutdown()
+      ai_model.GLOBAL_MODEL_MANAGER.clear_lottery_models('4x20')
+      ai_model.GLOBAL_RF_MODEL.invalidate()
+
+
+# Запуск тестов
+if __name__ == "__main__":
+  pytest.main([__file__, "-v"])
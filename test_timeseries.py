@@ -0,0 +1,111 @@
+"""
+Тесты для анализа временных рядов
+Проверка кэша ARIMA и пакетного ACF/PACF анализа
+"""
+
+import pytest
+import numpy as np
+
+
+class TestARIMAFitCache:
+  """Тесты для кэша и продления моделей временных рядов"""
+
+  def test_cached_models_are_extended_by_new_draws(self, tmp_path, make_history):
+    """Точное попадание берется из кэша, сдвиг окна на тираж продлевает модели без переобучения"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.timeseries import TimeSeriesGenerator, ARIMAFitCache
+
+    history = make_history(91, seed=5, newest_first=False)
+    cache = ARIMAFitCache(str(tmp_path))
+    generator = TimeSeriesGenerator(LOTTERY_CONFIGS['4x20'], lottery_type='4x20',
+                                    use_auto=False, fit_cache=cache, parallel=False)
+
+    combos = generator.analyze_and_generate(history[:90], count=3)
+    assert generator.fit_stats == {'cached': 0, 'extended': 0, 'fitted': 8}
+    assert len(combos) == 3 and all(len(c['field1']) == 4 for c in combos)
+
+    generator.analyze_and_generate(history[:90], count=3)
+    assert generator.fit_stats == {'cached': 8, 'extended': 0, 'fitted': 0}
+
+    old = cache.latest('4x20', 'field1_1', 'acf')['model'].fitted_model
+    # Новый кэш поверх тех же файлов: продление читает модели с диска
+    generator.fit_cache = ARIMAFitCache(str(tmp_path))
+    generator.analyze_and_generate(history[1:91], count=3)
+    assert generator.fit_stats == {'cached': 0, 'extended': 8, 'fitted': 0}
+
+    extended = generator.fit_cache.latest('4x20', 'field1_1', 'acf')
+    assert extended['extended'] == 1
+    assert extended['model'].fitted_model.nobs == old.nobs + 1
+    np.testing.assert_allclose(extended['model'].fitted_model.params, old.params)
+
+  def test_newest_first_history(self, tmp_path, make_history):
+    """История от новых к старым (как из БД) обучается в хронологическом порядке и продлевается"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.timeseries import TimeSeriesGenerator, ARIMAFitCache
+    from backend.app.core.timeseries.arima_cache import positional_series
+    from backend.app.core.timeseries.timeseries_generator import _fit_series_worker
+
+    config = LOTTERY_CONFIGS['4x20']
+    history = make_history(91, seed=5)
+    cache = ARIMAFitCache(str(tmp_path))
+    generator = TimeSeriesGenerator(config, lottery_type='4x20', use_auto=False,
+                                    fit_cache=cache, parallel=False)
+
+    # Тиражи 1..90, новые первыми
+    generator.analyze_and_generate(history.iloc[1:], count=3)
+    assert generator.fit_stats == {'cached': 0, 'extended': 0, 'fitted': 8}
+
+    chronological = positional_series(history.iloc[1:].iloc[::-1], config)['field1_1']
+    fresh = _fit_series_worker(config, 'field1_1', chronological, use_auto=False)['model']
+    cached = cache.latest('4x20', 'field1_1', 'acf')
+    np.testing.assert_array_equal(cached['draws'], np.arange(1, 91))
+    np.testing.assert_allclose(cached['model'].predict(steps=3)['forecast'], fresh.predict(steps=3)['forecast'])
+
+    # Новый тираж 91 в начале выборки продлевает модели
+    generator.analyze_and_generate(history.iloc[:90], count=3)
+    assert generator.fit_stats == {'cached': 0, 'extended': 8, 'fitted': 0}
+
+    extended = cache.latest('4x20', 'field1_1', 'acf')
+    assert extended['model'].fitted_model.nobs == fresh.fitted_model.nobs + 1
+    assert extended['model'].fitted_model.model.endog[-1] == sorted(history.at[0, 'Числа_Поле1_list'])[0]
+
+
+class TestBatchSeriesAnalysis:
+  """Тесты для пакетного ACF/PACF и периодограммы"""
+
+  def test_batch_matches_statsmodels(self):
+    """FFT ACF и пакетный Дурбин-Левинсон совпадают с acf/pacf statsmodels"""
+    from statsmodels.tsa.stattools import acf, pacf
+    from backend.app.core.timeseries.acf_pacf_analysis import batch_acf, batch_pacf
+
+    rng = np.random.default_rng(2)
+    data = rng.integers(1, 21, (5, 120)).astype(float)
+    data[4] = np.cumsum(rng.normal(size=120))
+
+    acf_values = batch_acf(data, 30)
+    pacf_values = batch_pacf(acf_values, 120)
+    for i in range(len(data)):
+      np.testing.assert_allclose(acf_values[i], acf(data[i], nlags=30), atol=1e-10)
+      np.testing.assert_allclose(pacf_values[i], pacf(data[i], nlags=30), atol=1e-8)
+
+  def test_series_matrix(self, make_history):
+    """Матрица включает позиционные ряды и ряды появления каждого числа"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.timeseries.series_matrix import analyze_series_matrix
+
+    df = make_history(60, seed=4)
+    df['Числа_Поле2_list'] = [[1, 2, 3, 4]] * 60
+    result = analyze_series_matrix(df, LOTTERY_CONFIGS['4x20'], max_lag=10)
+
+    assert len(result['series_names']) == 8 + 40
+    assert np.array(result['acf_values']).shape == (48, 11)
+    # Постоянный ряд появления: без значимых лагов и без NaN
+    constant = result['series']['field2_n1']
+    assert constant['constant'] and constant['significant_acf_lags'] == []
+    assert np.isfinite(result['pacf_values']).all()
+    assert all(len(s['dominant_periods']) <= 5 for s in result['series'].values())
+
+
+# Запуск тестов
+if __name__ == "__main__":
+  pytest.main([__file__, "-v"])
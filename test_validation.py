@@ -0,0 +1,108 @@
+"""
+Тесты для walk-forward валидации
+Проверка валидатора и хранилища результатов
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+
+
+class TestWalkForwardValidator:
+  """Тесты для walk-forward валидации на общей матрице признаков"""
+
+  class RecordingModel:
+    """Модель-заглушка: признак строки - позиция тиража-цели"""
+    calls = []
+
+    def __init__(self, config):
+      self.config = config
+
+    def walk_forward_features(self, df_chrono):
+      positions = np.arange(3, len(df_chrono))
+      return {'X': positions.reshape(-1, 1).astype(float), 'Y': np.zeros((len(positions), 1)),
+              'positions': positions, 'lookback': 3}
+
+    def fit_features(self, X, Y, warm_start=None):
+      self.train_positions = X[:, 0].astype(int)
+      TestWalkForwardValidator.RecordingModel.calls.append((self.train_positions, warm_start))
+      return True
+
+    def predict_features(self, X):
+      return [([1, 2, 3, 4], [1, 2, 3, 4]) for _ in range(len(X))]
+
+  def test_windows_use_past_rows_only(self):
+    """Окна обучаются только на тиражах раньше тестовых, история DESC переворачивается"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.validation.walk_forward import WalkForwardValidator
+
+    n = 100
+    df = pd.DataFrame({
+      'Тираж': np.arange(n, 0, -1),
+      'Числа_Поле1_list': [[1, 2, 3, 4]] * n,
+      'Числа_Поле2_list': [[5, 6, 7, 8]] * n
+    })
+    self.RecordingModel.calls.clear()
+    validator = WalkForwardValidator(initial_train_size=40, test_size=20, step_size=20)
+    results = validator.validate_model(self.RecordingModel, {}, df, LOTTERY_CONFIGS['4x20'], parallel=False)
+
+    assert results.total_windows == 3 and len(results.window_metrics) == 3
+    for (train_positions, warm_start), window in zip(self.RecordingModel.calls, validator.create_windows(n)):
+      assert train_positions.min() == window.train_start + 3
+      assert train_positions.max() == window.train_end
+    # Каждое следующее окно продолжает модель предыдущего
+    assert self.RecordingModel.calls[0][1] is None and self.RecordingModel.calls[1][1] is not None
+    # Предсказание [1..4] совпадает с полем 1 каждого тестового тиража полностью
+    assert results.window_metrics[0].matches_distribution[4] == 20
+
+
+class TestValidationResultStore:
+  """Тесты для постоянного хранилища результатов валидации"""
+
+  def test_store_roundtrip(self):
+    """Результат находится по ключу и восстанавливается из другой сессии хранилища"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from backend.app.core.database import Base, User, ValidationResult
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.validation.walk_forward import WalkForwardValidator, ValidationResults
+    from backend.app.core.validation.result_store import ValidationResultStore, result_key
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+      engine = create_engine(f"sqlite:///{os.path.join(temp_dir, 'validation.db')}")
+      Base.metadata.create_all(engine, tables=[User.__table__, ValidationResult.__table__])
+      windows = {'initial_train_size': 40, 'test_size': 20, 'step_size': 20, 'expanding_window': True}
+      key = result_key('RecordingModel', {}, '4x20', 'v1', windows)
+      assert key != result_key('RecordingModel', {'n': 1}, '4x20', 'v1', windows)
+
+      n = 100
+      df = pd.DataFrame({
+        'Тираж': np.arange(n, 0, -1),
+        'Числа_Поле1_list': [[1, 2, 3, 4]] * n,
+        'Числа_Поле2_list': [[5, 6, 7, 8]] * n
+      })
+      results = WalkForwardValidator(40, 20, 20).validate_model(
+        TestWalkForwardValidator.RecordingModel, {}, df, LOTTERY_CONFIGS['4x20'], parallel=False
+      )
+
+      store = ValidationResultStore(sessionmaker(bind=engine))
+      store.start('task_1', key, 'RecordingModel', {}, '4x20', 'v1', windows)
+      assert store.find(key) is None
+      store.complete('task_1', results)
+
+      # Новый экземпляр - как после перезапуска
+      restored = ValidationResultStore(sessionmaker(bind=engine))
+      row = restored.find(key)
+      assert row['task_id'] == 'task_1' and row['status'] == 'completed'
+      loaded = ValidationResults.from_dict(row['full_results'])
+      assert loaded.get_summary() == pytest.approx(results.get_summary())
+      assert loaded.window_metrics[0].matches_distribution[4] == 20
+      assert [r['task_id'] for r in restored.history('4x20')] == ['task_1']
+      engine.dispose()
+
+
+# Запуск тестов
+if __name__ == "__main__":
+  pytest.main([__file__, "-v"])
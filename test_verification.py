@@ -0,0 +1,165 @@
+"""
+Тесты для проверки билетов
+Проверка массовой сверки и уведомлений о выигрышах
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+
+
+class TestVerificationEngine:
+  """Тесты для массовой проверки билетов по битсетам тиражей"""
+
+  @pytest.mark.parametrize('lottery_type', ['4x20', '5x36plus'])
+  def test_matches_bruteforce(self, lottery_type, make_history):
+    """Выигрыши совпадают с прямым пересечением множеств и get_prize_category"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.verification_engine import build_draw_index, match_winning_draws
+
+    config = LOTTERY_CONFIGS[lottery_type]
+    rng = np.random.default_rng(5)
+
+    def combos(n, max_num, size):
+      return [sorted(map(int, rng.choice(max_num, size, replace=False) + 1)) for _ in range(n)]
+
+    history = make_history(150, lottery_type, seed=5, dates=True)
+    history.at[7, 'Числа_Поле1_list'] = [1]  # Битая строка не должна выигрывать
+    tickets_f1 = combos(40, config['field1_max'], config['field1_size'])
+    tickets_f2 = combos(40, config['field2_max'], config['field2_size'])
+
+    index = build_draw_index(history, config, lottery_type)
+    result = match_winning_draws(index, np.array(tickets_f1), np.array(tickets_f2), chunk_size=16)
+
+    names = [c['name'] for c in config['prize_categories']]
+    expected = []
+    for t, (u1, u2) in enumerate(zip(tickets_f1, tickets_f2)):
+      for d, (w1, w2) in enumerate(zip(history['Числа_Поле1_list'], history['Числа_Поле2_list'])):
+        if len(w1) != config['field1_size']:
+          continue
+        m1, m2 = len(set(u1) & set(w1)), len(set(u2) & set(w2))
+        for category in config['prize_categories']:
+          if category.get('f1') in (None, m1) and category.get('f2') in (None, m2):
+            expected.append((t, d, m1, m2, category['name']))
+            break
+
+    actual = [(int(t), int(d), int(m1), int(m2), names[c]) for t, d, m1, m2, c in zip(
+      result['ticket'], result['draw'], result['m1'], result['m2'], result['category'])]
+    assert actual == expected
+
+  def test_parse_ticket_column(self):
+    """Разбор колонки совпадает с utils.parse_numbers"""
+    from backend.app.core.verification_engine import parse_ticket_column
+
+    values = pd.Series(['4, 3 2;1', '1 1 2 3 4', '1 2 3', '1.5 2 3 4', 'abc', '0 1 2 3', '', '20,19,18,17'])
+    numbers, valid = parse_ticket_column(values, 4, 20)
+
+    assert valid.tolist() == [True, True, False, False, False, False, False, True]
+    assert numbers[0].tolist() == [1, 2, 3, 4]
+    assert numbers[1].tolist() == [1, 2, 3, 4]
+    assert numbers[7].tolist() == [17, 18, 19, 20]
+
+
+class TestWinNotifications:
+  """Тесты для индекса подписок и уведомлений о выигрыше"""
+
+  @pytest.mark.parametrize('lottery_type', ['4x20', '5x36plus'])
+  def test_find_winners_matches_bruteforce(self, lottery_type):
+    """Выигравшие комбинации совпадают с полным перебором подписок"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.prize_probability import category_index_matrix
+    from backend.app.core.win_notifications import TicketSubscriptionIndex
+
+    config = LOTTERY_CONFIGS[lottery_type]
+    rng = np.random.default_rng(11)
+
+    def combo(max_num, size):
+      return sorted(map(int, rng.choice(max_num, size, replace=False) + 1))
+
+    index = TicketSubscriptionIndex(lottery_type, config)
+    tickets = {}
+    for user_id in range(300):
+      f1, f2 = combo(config['field1_max'], config['field1_size']), combo(config['field2_max'], config['field2_size'])
+      assert index.add(user_id, f1, f2)
+      tickets[user_id] = (f1, f2)
+    assert not index.add(999, [1, 2], [3])
+
+    draw_f1, draw_f2 = combo(config['field1_max'], config['field1_size']), combo(config['field2_max'], config['field2_size'])
+    categories = category_index_matrix(config)
+    expected = {user_id for user_id, (f1, f2) in tickets.items()
+                if categories[len(set(f1) & set(draw_f1)), len(set(f2) & set(draw_f2))] >= 0}
+
+    notifications = index.notifications_for_draw(100, draw_f1, draw_f2)
+    assert {n.user_id for n in notifications} == expected
+
+    # Отписка убирает комбинацию из posting-листов
+    for user_id in expected:
+      index.remove(user_id)
+    assert index.notifications_for_draw(100, draw_f1, draw_f2) == []
+
+  def test_notify_draws_dispatches_to_sinks(self):
+    """Новый тираж доставляется в очередь подписчика, отключившие уведомления пропускаются"""
+    from backend.app.core.win_notifications import WinNotifier, QueueNotificationSink
+
+    queue_sink = QueueNotificationSink()
+    notifier = WinNotifier([queue_sink])
+    notifier._loaded = True
+
+    favorites = {'4x20': {'field1': [1, 2, 3, 4], 'field2': [5, 6, 7, 8]}}
+    notifier.set_user_favorites(1, favorites)
+    notifier.set_user_favorites(2, favorites)
+    notifier.set_user_favorites(3, favorites, {'winning_tickets': False})
+
+    sent = notifier.notify_draws('4x20', [{'draw_number': 501, 'draw_date': None,
+                                           'field1': [1, 2, 3, 4], 'field2': [5, 6, 7, 8]}])
+
+    assert sorted(n.user_id for n in sent) == [1, 2]
+    received = queue_sink.drain(1)
+    assert len(received) == 1
+    assert received[0]['draw_number'] == 501
+    assert (received[0]['matches_f1'], received[0]['matches_f2']) == (4, 4)
+    assert queue_sink.drain(1) == []
+    assert queue_sink.drain(3) == []
+
+  def test_webhook_does_not_block(self, monkeypatch):
+    """Медленный webhook не задерживает send - пачка уходит в фоновом потоке"""
+    import threading
+    import time
+    import requests
+    from backend.app.core.win_notifications import NotificationSink, WebhookNotificationSink, WinNotification
+
+    release = threading.Event()
+    posted = []
+
+    class Response:
+      def raise_for_status(self):
+        pass
+
+    def slow_post(url, json, timeout):
+      release.wait(5)
+      posted.append(json)
+      return Response()
+
+    monkeypatch.setattr(requests, 'post', slow_post)
+    sink = WebhookNotificationSink('http://example.invalid/hook')
+    notification = WinNotification(user_id=1, lottery_type='4x20', source='favorites', draw_number=501,
+                                   draw_date=None, field1=[1, 2, 3, 4], field2=[5, 6, 7, 8],
+                                   matches_f1=4, matches_f2=4, category='jackpot', payout=0.0,
+                                   created_at='2024-01-01T00:00:00')
+
+    start = time.time()
+    sink.send([notification])
+    assert time.time() - start < 1
+    assert posted == []
+
+    release.set()
+    sink.flush(timeout=5)
+    assert posted[0]['notifications'][0]['draw_number'] == 501
+
+    with pytest.raises(TypeError):
+      NotificationSink()
+
+
+# Запуск тестов
+if __name__ == "__main__":
+  pytest.main([__file__, "-v"])
@@ -0,0 +1,153 @@
+"""
+Тесты для XGBoost модели
+Проверка признаков, обучения, скоринга и SHAP
+"""
+
+import pytest
+import numpy as np
+
+
+def _reference_features(df, window_sizes, field1_max, field2_max):
+  """Построчное извлечение признаков (прежняя реализация _extract_features)"""
+  features = []
+  for idx in range(len(df) - max(window_sizes)):
+    row = []
+    for window in window_sizes:
+      window_data = df.iloc[idx + 1:idx + 1 + window]
+      for column, max_num in (('Числа_Поле1_list', field1_max), ('Числа_Поле2_list', field2_max)):
+        freq = np.zeros(max_num)
+        for draw in window_data[column]:
+          for num in draw:
+            if 1 <= num <= max_num:
+              freq[num - 1] += 1
+        row.extend(freq / window)
+      for column, max_num in (('Числа_Поле1_list', field1_max), ('Числа_Поле2_list', field2_max)):
+        numbers = [num for draw in window_data[column] for num in draw]
+        if numbers:
+          row.extend([np.mean(numbers), np.std(numbers), np.median(numbers), len(set(numbers)) / max_num])
+        else:
+          row.extend([0, 0, 0, 0])
+
+    for column, max_num in (('Числа_Поле1_list', field1_max), ('Числа_Поле2_list', field2_max)):
+      last_appearance = np.full(max_num, 100)
+      for look_back in range(1, min(50, len(df) - idx)):
+        for num in df[column].iloc[idx + look_back]:
+          if 1 <= num <= max_num and last_appearance[num - 1] == 100:
+            last_appearance[num - 1] = look_back
+      row.extend(last_appearance)
+
+    draw_number = df['Тираж'].iloc[idx]
+    for period in (365, 30, 7):
+      row.extend([np.sin(2 * np.pi * draw_number / period), np.cos(2 * np.pi * draw_number / period)])
+    features.append(row)
+  return np.array(features)
+
+
+class TestXGBoostFeatures:
+  """Тесты для векторизованного извлечения признаков XGBoost"""
+
+  @pytest.mark.parametrize('lottery_type', ['4x20', '5x36plus'])
+  @pytest.mark.parametrize('window_sizes', [(3, 5, 10, 20), (1, 4), (2, 7, 30)])
+  def test_window_features(self, lottery_type, window_sizes, monkeypatch, make_history):
+    """Вся матрица признаков и цели совпадают с построчным подсчетом прежней реализации"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.xgboost_model import XGBoostLotteryModel
+
+    config = LOTTERY_CONFIGS[lottery_type]
+    df = make_history(90, lottery_type, seed=6)
+    monkeypatch.setattr(XGBoostLotteryModel, 'WINDOW_SIZES', window_sizes)
+    model = XGBoostLotteryModel(config)
+    X, y = model._extract_features(df)
+
+    expected = _reference_features(df, window_sizes, config['field1_max'], config['field2_max'])
+    assert X.shape == expected.shape
+    np.testing.assert_allclose(X, expected, rtol=1e-12, atol=1e-12)
+
+    for prefix, column, max_num in (('f1', 'Числа_Поле1_list', config['field1_max']),
+                                    ('f2', 'Числа_Поле2_list', config['field2_max'])):
+      for num in range(1, max_num + 1):
+        present = [num in draw for draw in df[column].iloc[:len(expected)]]
+        np.testing.assert_array_equal(y[f'{prefix}_{num}'], present)
+
+  def test_parallel_training_without_cv(self, make_history):
+    """Модели чисел обучаются с ранней остановкой; кросс-валидация только по запросу или сроку"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.xgboost_model import XGBoostLotteryModel
+
+    df = make_history(160, seed=8)
+    model = XGBoostLotteryModel(LOTTERY_CONFIGS['4x20'])
+    model.xgb_params['n_estimators'] = 20
+    model.thread_budget = 2
+    model.cv_interval_hours = 24
+
+    assert model.train(df, cross_validate=False)
+    assert len(model.models_f1) == 20 and len(model.models_f2) == 20
+    assert all(1 <= r <= 20 for r in model.metrics['best_rounds'])
+    assert 'cv_roc_auc' not in model.metrics and model.cv_due()
+
+    # Плановая кросс-валидация выполняется один раз за интервал
+    assert model.train(df)
+    assert model.metrics['cv_roc_auc'] and not model.cv_due()
+
+  def test_next_draw_context_scoring(self, make_history):
+    """Контекст следующего тиража считается раз на версию данных; пачка оценок совпадает с поштучными"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.xgboost_model import XGBoostLotteryModel
+
+    df = make_history(120, seed=9)
+    model = XGBoostLotteryModel(LOTTERY_CONFIGS['4x20'])
+    model.xgb_params['n_estimators'] = 10
+    model.thread_budget = 1
+    assert model.train(df, cross_validate=False)
+
+    combos = [([1, 2, 3, 4], [5, 6, 7, 8]), ([17, 18, 19, 20], [1, 9, 10, 11]), ([1, 2, 3, 99], [])]
+    scores = model.score_combinations(combos, df)
+    context = model._next_draw_context(df)
+    assert model._cache_misses == 1 and model._cache_hits >= 1
+
+    for (f1, f2), score in zip(combos[:2], scores):
+      expected = (np.nanmean(context['probs_f1'][np.array(f1) - 1]) +
+                  np.nanmean(context['probs_f2'][np.array(f2) - 1])) / 2 * 100
+      assert score == pytest.approx(expected)
+      assert model.score_combination(f1, f2, df) == pytest.approx(score)
+    # Пустое поле 2 - нейтральная оценка
+    assert scores[2] == 50.0
+
+    pred_f1, pred_f2 = model.predict_next_combination([], [], df)
+    assert len(pred_f1) == 4 and len(pred_f2) == 4
+    assert model._cache_misses == 1
+
+    # Новый тираж в истории - новый контекст
+    model.score_combinations(combos, df.iloc[1:])
+    assert model._cache_misses == 2
+
+  def test_lazy_shap_explainers(self, make_history):
+    """Объяснители создаются только для запрошенных чисел; значения контекста считаются в фоне"""
+    from backend.app.core.data_manager import LOTTERY_CONFIGS
+    from backend.app.core.xgboost_model import XGBoostLotteryModel, _get_shap_executor
+
+    df = make_history(120, seed=10)
+    model = XGBoostLotteryModel(LOTTERY_CONFIGS['4x20'])
+    model.xgb_params['n_estimators'] = 10
+    model.thread_budget = 1
+    model.shap_precompute = False
+    model.explainer_cache_size = 2
+    assert model.train(df, cross_validate=False)
+    assert len(model._explainers) == 0
+
+    for f1 in ([1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]):
+      explanation = model.get_shap_explanation(f1, [1, 2, 3, 4], df)
+      assert explanation['field1_explanations'][0]['number'] == f1[0]
+      assert len(explanation['field1_explanations'][0]['shap_values']) == model._context['features'].shape[1]
+    assert len(model._explainers) == 2
+
+    # Фоновый предрасчет для нового контекста заполняет значения всех чисел
+    model.shap_precompute = True
+    context = model._next_draw_context(df.iloc[1:])
+    _get_shap_executor().submit(lambda: None).result()
+    assert len(context['shap']) == sum(m is not None for m in model.models_f1 + model.models_f2)
+
+
+# Запуск тестов
+if __name__ == "__main__":
+  pytest.main([__file__, "-v"])
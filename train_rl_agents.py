@@ -7,11 +7,11 @@
 📁 Где хранятся модели:
 backend/models/rl/
 ├── 4x20/
-│   ├── q_agent.pkl           # Q-Learning таблица
+│   ├── q_agent.npz           # Q-Learning таблица
 │   ├── dqn_agent.pth         # DQN нейросеть
 │   └── training_stats.json   # Статистика обучения
 └── 5x36plus/
-    ├── q_agent.pkl
+    ├── q_agent.npz
     ├── dqn_agent.pth
     └── training_stats.json
 🔄 Автоматическая загрузка:
@@ -41,6 +41,12 @@ python train_rl_agents.py --check-only
 
 # Кастомные параметры
 python train_rl_agents.py --q-episodes 2000 --dqn-episodes 1000
+
+# DQN на 64 параллельных средах (батчевый выбор действий)
+python train_rl_agents.py --num-envs 64
+
+# Все пары (лотерея, агент) в 4 процессах, потоки делятся между ними
+python train_rl_agents.py --jobs 4
 ✅ Что происходит после обучения:
 
 Модели сохраняются в файлы - больше не нужно переобучать
@@ -121,7 +127,8 @@ def check_data_availability():
   return data_status
 
 
-def train_specific_lottery(lottery_type: str, q_episodes: int = 1000, dqn_episodes: int = 500):
+def train_specific_lottery(lottery_type: str, q_episodes: int = 1000, dqn_episodes: int = 500,
+                           num_envs: int = 1):
   """Обучение агентов для конкретной лотереи"""
   print(f"🎯 Обучение агентов для лотереи: {lottery_type}")
   print("-" * 50)
@@ -146,6 +153,7 @@ def train_specific_lottery(lottery_type: str, q_episodes: int = 1000, dqn_episod
   print(f"   📊 Данных для обучения: {len(df)} тиражей")
   print(f"   ⚙️ Q-Learning эпизодов: {q_episodes}")
   print(f"   🧠 DQN эпизодов: {dqn_episodes}")
+  print(f"   🔀 Параллельных сред DQN: {num_envs}")
   print()
 
   start_time = time.time()
@@ -156,7 +164,8 @@ def train_specific_lottery(lottery_type: str, q_episodes: int = 1000, dqn_episod
       df_history=df,
       q_episodes=q_episodes,
       dqn_episodes=dqn_episodes,
-      verbose=True
+      verbose=True,
+      num_envs=num_envs
     )
 
     training_time = time.time() - start_time
@@ -188,164 +197,180 @@ def train_specific_lottery(lottery_type: str, q_episodes: int = 1000, dqn_episod
     print(f"❌ Ошибка при обучении: {e}")
     return False
 
-def train_with_validation(lottery_type: str, df_full: pd.DataFrame, config: Dict):
-    """Обучение с валидацией и адаптивными гиперпараметрами"""
-    print(f"🎯 Обучение с валидацией для лотереи: {lottery_type}")
-    print("-" * 50)
-
-    # Разделяем данные на train/val/test
-    n = len(df_full)
-    train_end = int(n * 0.7)
-    val_end = int(n * 0.85)
-
-    train_df = df_full.iloc[:train_end]
-    val_df = df_full.iloc[train_end:val_end]
-    test_df = df_full.iloc[val_end:]
-
-    print(f"   📊 Данные разделены:")
-    print(f"      Обучение: {len(train_df)} тиражей (70%)")
-    print(f"      Валидация: {len(val_df)} тиражей (15%)")
-    print(f"      Тест: {len(test_df)} тиражей (15%)")
-
-    # Получаем адаптивные гиперпараметры
-    complexity = config['field1_size'] * config['field1_max']
-
-    if complexity <= 80:  # Простые лотереи
-      q_episodes = 1500
-      dqn_episodes = 800
-      print(f"   ⚙️ Простая лотерея (сложность: {complexity})")
-    elif complexity <= 180:  # Средние лотереи
-      q_episodes = 2000
-      dqn_episodes = 1200
-      print(f"   ⚙️ Средняя лотерея (сложность: {complexity})")
-    else:  # Сложные лотереи
-      q_episodes = 3000
-      dqn_episodes = 2000
-      print(f"   ⚙️ Сложная лотерея (сложность: {complexity})")
-
-    print(f"   📈 Адаптивные параметры: Q={q_episodes}, DQN={dqn_episodes}")
-    print()
-
-    # Обучаем на train_df
-    generator = GLOBAL_RL_MANAGER.get_generator(lottery_type, config)
-
-    start_time = time.time()
-    stats = generator.train(
-      df_history=train_df,
-      q_episodes=q_episodes,
-      dqn_episodes=dqn_episodes,
-      verbose=True
-    )
-    training_time = time.time() - start_time
-
-    print(f"✅ Обучение завершено за {training_time:.1f} секунд")
-    print()
-
-    # Валидация на val_df
-    print("🔍 ВАЛИДАЦИЯ НА ОТДЕЛЬНЫХ ДАННЫХ")
-    print("-" * 50)
-
-    try:
-      from backend.app.core.rl.environment import LotteryEnvironment
+def split_history(df_full: pd.DataFrame):
+  """Разбиение истории на train/val/test (70/15/15)"""
+  n = len(df_full)
+  train_end = int(n * 0.7)
+  val_end = int(n * 0.85)
+
+  train_df = df_full.iloc[:train_end]
+  val_df = df_full.iloc[train_end:val_end]
+  test_df = df_full.iloc[val_end:]
+
+  print(f"   📊 Данные разделены:")
+  print(f"      Обучение: {len(train_df)} тиражей (70%)")
+  print(f"      Валидация: {len(val_df)} тиражей (15%)")
+  print(f"      Тест: {len(test_df)} тиражей (15%)")
+
+  return train_df, val_df, test_df
+
+
+def adaptive_episodes(config: Dict):
+  """Адаптивное число эпизодов Q-Learning и DQN по сложности лотереи"""
+  complexity = config['field1_size'] * config['field1_max']
+
+  if complexity <= 80:  # Простые лотереи
+    q_episodes = 1500
+    dqn_episodes = 800
+    print(f"   ⚙️ Простая лотерея (сложность: {complexity})")
+  elif complexity <= 180:  # Средние лотереи
+    q_episodes = 2000
+    dqn_episodes = 1200
+    print(f"   ⚙️ Средняя лотерея (сложность: {complexity})")
+  else:  # Сложные лотереи
+    q_episodes = 3000
+    dqn_episodes = 2000
+    print(f"   ⚙️ Сложная лотерея (сложность: {complexity})")
+
+  print(f"   📈 Адаптивные параметры: Q={q_episodes}, DQN={dqn_episodes}")
+  print()
+  return q_episodes, dqn_episodes
 
-      val_env = LotteryEnvironment(val_df, config)
 
-      if generator.q_trained:
-        q_rewards = []
-        q_wins = 0
-        total_plays = 0
+def validate_generator(generator, val_df: pd.DataFrame, config: Dict):
+  """Валидация обученных агентов генератора на отложенных данных"""
+  print("🔍 ВАЛИДАЦИЯ НА ОТДЕЛЬНЫХ ДАННЫХ")
+  print("-" * 50)
 
-        # 20 эпизодов по 30 ходов = 600 тестовых игр
-        for episode in range(20):
-          state = val_env.reset()
+  try:
+    from backend.app.core.rl.environment import LotteryEnvironment
 
-          for step in range(30):
-            if state is None:
-              break
+    val_env = LotteryEnvironment(val_df, config)
 
-            action = generator.q_agent.choose_action(state, training=False)
-            next_state, reward, done, info = val_env.step(action)
+    if generator.q_trained:
+      q_rewards = []
+      q_wins = 0
+      total_plays = 0
+
+      # 20 эпизодов по 30 ходов = 600 тестовых игр
+      for episode in range(20):
+        state = val_env.reset()
+
+        for step in range(30):
+          if state is None:
+            break
+
+          action = generator.q_agent.choose_action(state, training=False)
+          next_state, reward, done, info = val_env.step(action)
+
+          q_rewards.append(reward)
+          total_plays += 1
+
+          # Считаем выигрышем только реальный приз (не просто возврат билета)
+          if reward > 0:
+            q_wins += 1
+
+          if done:
+            break
+          state = next_state
+
+      q_avg_reward = sum(q_rewards) / len(q_rewards) if q_rewards else 0
+      q_win_rate = (q_wins / total_plays) * 100 if total_plays > 0 else 0
+
+      print(f"📈 Q-Learning валидация:")
+      print(f"   Средняя награда: {q_avg_reward:.2f}")
+      print(f"   Win rate: {q_win_rate:.2f}%")
+      print(f"   Всего игр: {total_plays}")
+      print(f"   Выигрышных: {q_wins}")
+      print(f"   Лучший результат: {max(q_rewards) if q_rewards else 0:.2f}")
+      print(f"   Худший результат: {min(q_rewards) if q_rewards else 0:.2f}")
+
+      if q_win_rate > 10:
+        print("   ⚠️  ВНИМАНИЕ: Слишком высокий win rate!")
+      elif q_win_rate > 0.1:
+        print("   ✅ Реалистичный win rate для лотереи")
+      else:
+        print("   📊 Очень консервативный результат")
+
+    # Аналогично для DQN
+    if generator.dqn_trained:
+      dqn_rewards = []
+      dqn_wins = 0
+      total_plays_dqn = 0
 
-            q_rewards.append(reward)
-            total_plays += 1
+      for episode in range(20):
+        state = val_env.reset()
 
-            # Считаем выигрышем только реальный приз (не просто возврат билета)
-            if reward > 0:
-              q_wins += 1
+        for step in range(30):
+          if state is None:
+            break
 
-            if done:
-              break
-            state = next_state
+          action = generator.dqn_agent.choose_action(state, training=False)
+          next_state, reward, done, info = val_env.step(action)
 
-        q_avg_reward = sum(q_rewards) / len(q_rewards) if q_rewards else 0
-        q_win_rate = (q_wins / total_plays) * 100 if total_plays > 0 else 0
+          dqn_rewards.append(reward)
+          total_plays_dqn += 1
 
-        print(f"📈 Q-Learning валидация:")
-        print(f"   Средняя награда: {q_avg_reward:.2f}")
-        print(f"   Win rate: {q_win_rate:.2f}%")
-        print(f"   Всего игр: {total_plays}")
-        print(f"   Выигрышных: {q_wins}")
-        print(f"   Лучший результат: {max(q_rewards) if q_rewards else 0:.2f}")
-        print(f"   Худший результат: {min(q_rewards) if q_rewards else 0:.2f}")
+          if reward > 0:
+            dqn_wins += 1
 
-        if q_win_rate > 10:
-          print("   ⚠️  ВНИМАНИЕ: Слишком высокий win rate!")
-        elif q_win_rate > 0.1:
-          print("   ✅ Реалистичный win rate для лотереи")
-        else:
-          print("   📊 Очень консервативный результат")
+          if done:
+            break
+          state = next_state
 
-      # Аналогично для DQN
-      if generator.dqn_trained:
-        dqn_rewards = []
-        dqn_wins = 0
-        total_plays_dqn = 0
+      dqn_avg_reward = sum(dqn_rewards) / len(dqn_rewards) if dqn_rewards else 0
+      dqn_win_rate = (dqn_wins / total_plays_dqn) * 100 if total_plays_dqn > 0 else 0
 
-        for episode in range(20):
-          state = val_env.reset()
+      print(f"🧠 DQN валидация:")
+      print(f"   Средняя награда: {dqn_avg_reward:.2f}")
+      print(f"   Win rate: {dqn_win_rate:.2f}%")
+      print(f"   Всего игр: {total_plays_dqn}")
+      print(f"   Выигрышных: {dqn_wins}")
+      print(f"   Лучший результат: {max(dqn_rewards) if dqn_rewards else 0:.2f}")
+      print(f"   Худший результат: {min(dqn_rewards) if dqn_rewards else 0:.2f}")
 
-          for step in range(30):
-            if state is None:
-              break
+      if dqn_win_rate > 10:
+        print("   ⚠️  ВНИМАНИЕ: Слишком высокий win rate!")
+      elif dqn_win_rate > 0.1:
+        print("   ✅ Реалистичный win rate для лотереи")
+      else:
+        print("   📊 Очень консервативный результат")
 
-            action = generator.dqn_agent.choose_action(state, training=False)
-            next_state, reward, done, info = val_env.step(action)
+  except Exception as e:
+    print(f"❌ Ошибка валидации: {e}")
+    print()
 
-            dqn_rewards.append(reward)
-            total_plays_dqn += 1
 
-            if reward > 0:
-              dqn_wins += 1
+def train_with_validation(lottery_type: str, df_full: pd.DataFrame, config: Dict, num_envs: int = 1):
+    """Обучение с валидацией и адаптивными гиперпараметрами"""
+    print(f"🎯 Обучение с валидацией для лотереи: {lottery_type}")
+    print("-" * 50)
 
-            if done:
-              break
-            state = next_state
+    train_df, val_df, _ = split_history(df_full)
+    q_episodes, dqn_episodes = adaptive_episodes(config)
 
-        dqn_avg_reward = sum(dqn_rewards) / len(dqn_rewards) if dqn_rewards else 0
-        dqn_win_rate = (dqn_wins / total_plays_dqn) * 100 if total_plays_dqn > 0 else 0
+    # Обучаем на train_df
+    generator = GLOBAL_RL_MANAGER.get_generator(lottery_type, config)
 
-        print(f"🧠 DQN валидация:")
-        print(f"   Средняя награда: {dqn_avg_reward:.2f}")
-        print(f"   Win rate: {dqn_win_rate:.2f}%")
-        print(f"   Всего игр: {total_plays_dqn}")
-        print(f"   Выигрышных: {dqn_wins}")
-        print(f"   Лучший результат: {max(dqn_rewards) if dqn_rewards else 0:.2f}")
-        print(f"   Худший результат: {min(dqn_rewards) if dqn_rewards else 0:.2f}")
+    start_time = time.time()
+    stats = generator.train(
+      df_history=train_df,
+      q_episodes=q_episodes,
+      dqn_episodes=dqn_episodes,
+      verbose=True,
+      num_envs=num_envs
+    )
+    training_time = time.time() - start_time
 
-        if dqn_win_rate > 10:
-          print("   ⚠️  ВНИМАНИЕ: Слишком высокий win rate!")
-        elif dqn_win_rate > 0.1:
-          print("   ✅ Реалистичный win rate для лотереи")
-        else:
-          print("   📊 Очень консервативный результат")
+    print(f"✅ Обучение завершено за {training_time:.1f} секунд")
+    print()
 
-    except Exception as e:
-      print(f"❌ Ошибка валидации: {e}")
-      print()
+    # Валидация на val_df
+    validate_generator(generator, val_df, config)
 
     return True
 
-def train_all_lotteries(q_episodes: int = 1000, dqn_episodes: int = 500):
+def train_all_lotteries(q_episodes: int = 1000, dqn_episodes: int = 500, num_envs: int = 1):
   """Обучение агентов для всех лотерей"""
   print("🌟 МАССОВОЕ ОБУЧЕНИЕ ВСЕХ ЛОТЕРЕЙ")
   print("=" * 50)
@@ -363,7 +388,7 @@ def train_all_lotteries(q_episodes: int = 1000, dqn_episodes: int = 500):
       continue
 
     if train_with_validation(lottery_type, data_manager.fetch_draws_from_db(),
-                             data_manager.LOTTERY_CONFIGS[lottery_type]):
+                             data_manager.LOTTERY_CONFIGS[lottery_type], num_envs=num_envs):
       success_count += 1
 
   print("=" * 70)
@@ -373,6 +398,94 @@ def train_all_lotteries(q_episodes: int = 1000, dqn_episodes: int = 500):
   print("=" * 70)
 
 
+def train_parallel(lottery_types, num_envs: int = 1, jobs: int = 2):
+  """
+  Параллельное обучение: каждая пара (лотерея, агент) в отдельном процессе
+
+  Как и train_with_validation, воркеры обучаются на train-части истории
+  с адаптивным числом эпизодов, после завершения задач агенты
+  проверяются на отложенной val-части.
+  """
+  from backend.app.core.rl.training_orchestrator import RLTrainingOrchestrator
+
+  orchestrator = RLTrainingOrchestrator(max_jobs=jobs)
+  print(f"🔀 ПАРАЛЛЕЛЬНОЕ ОБУЧЕНИЕ: {orchestrator.max_jobs} процессов × "
+        f"{orchestrator.threads_per_job} потоков")
+  print("=" * 50)
+
+  job_ids = []
+  val_splits = {}
+  for lottery_type in lottery_types:
+    config = data_manager.LOTTERY_CONFIGS[lottery_type]
+    data_manager.set_current_lottery(lottery_type)
+    df_full = data_manager.fetch_draws_from_db()
+    if len(df_full) < 60:
+      print(f"⏭️ Пропуск {lottery_type}: недостаточно данных ({len(df_full)} < 60)")
+      continue
+
+    print(f"🎯 {lottery_type}")
+    train_df, val_df, _ = split_history(df_full)
+    q_episodes, dqn_episodes = adaptive_episodes(config)
+    val_splits[lottery_type] = val_df
+    job_ids.extend(orchestrator.submit_lottery(lottery_type, q_episodes, dqn_episodes,
+                                               num_envs=num_envs, df_history=train_df))
+
+  if not job_ids:
+    orchestrator.shutdown()
+    print("❌ Нет лотерей с достаточным количеством данных")
+    return False
+
+  start_time = time.time()
+  try:
+    # Периодический вывод прогресса из хранилища статусов
+    while True:
+      statuses = [orchestrator.get_status(job_id) or {} for job_id in job_ids]
+      line = " | ".join(f"{s.get('lottery_type')}/{s.get('agent')}: {s.get('progress', 0):.0f}%"
+                        for s in statuses)
+      print(f"   ⏳ {line}")
+      if all(s.get('status') in ('completed', 'failed') for s in statuses):
+        break
+      time.sleep(5)
+
+    statuses = orchestrator.wait(job_ids)
+  finally:
+    orchestrator.shutdown()
+
+  print()
+  success_count = 0
+  for job_id in job_ids:
+    status = statuses.get(job_id) or {}
+    if status.get('status') == 'completed':
+      success_count += 1
+      stats = status.get('stats', {})
+      print(f"   ✅ {job_id}: средняя награда={stats.get('average_reward', 0):.3f}, "
+            f"win rate={stats.get('win_rate', 0):.1f}%")
+    else:
+      print(f"   ❌ {job_id}: {status.get('error', 'неизвестная ошибка')}")
+
+  print()
+  training_time = time.time() - start_time
+
+  # Валидация на отложенных данных: чекпоинты воркеров загружаются в генераторы
+  for lottery_type, val_df in val_splits.items():
+    config = data_manager.LOTTERY_CONFIGS[lottery_type]
+    generator = GLOBAL_RL_MANAGER.get_generator(lottery_type, config)
+    if not generator.load_models():
+      print(f"⏭️ {lottery_type}: нет обученных моделей для валидации")
+      continue
+    print(f"🎯 {lottery_type}")
+    validate_generator(generator, val_df, config)
+    print()
+
+  print("=" * 70)
+  print("📊 ИТОГИ ОБУЧЕНИЯ:")
+  print(f"   ✅ Успешных задач: {success_count}/{len(job_ids)} за {training_time:.1f} с")
+  print(f"   📁 Модели сохранены в: backend/models/rl/")
+  print("=" * 70)
+
+  return success_count == len(job_ids)
+
+
 def check_trained_models():
   """Проверка обученных моделей"""
   print("🔍 ПРОВЕРКА ОБУЧЕННЫХ МОДЕЛЕЙ")
@@ -425,6 +538,20 @@ def main():
     help="Количество эпизодов для DQN (по умолчанию: 500)"
   )
 
+  parser.add_argument(
+    "--num-envs",
+    type=int,
+    default=1,
+    help="Количество параллельных сред для обучения DQN (по умолчанию: 1)"
+  )
+
+  parser.add_argument(
+    "--jobs",
+    type=int,
+    default=1,
+    help="Количество параллельных процессов обучения (лотерея × агент); 1 - последовательно"
+  )
+
   parser.add_argument(
     "--quick",
     action="store_true",
@@ -453,12 +580,16 @@ def main():
     check_trained_models()
     return
 
+  # Параллельное обучение в пуле процессов
+  if args.jobs > 1:
+    lottery_types = [args.lottery] if args.lottery else list(data_manager.LOTTERY_CONFIGS.keys())
+    train_parallel(lottery_types, args.num_envs, args.jobs)
   # Обучение конкретной лотереи
-  if args.lottery:
-    train_specific_lottery(args.lottery, args.q_episodes, args.dqn_episodes)
+  elif args.lottery:
+    train_specific_lottery(args.lottery, args.q_episodes, args.dqn_episodes, args.num_envs)
   else:
     # Обучение всех лотерей
-    train_all_lotteries(args.q_episodes, args.dqn_episodes)
+    train_all_lotteries(args.q_episodes, args.dqn_episodes, args.num_envs)
 
   print()
   check_trained_models()